@@ -323,6 +323,17 @@ BEGIN
 END;
 $$;
 
+-- Indexes for cloud-file lookups by cloud / local file id
+CREATE INDEX IF NOT EXISTS ix_cloud_file_mapping_cloud_file_id ON cloud_file_mapping (cloud_file_id);
+CREATE INDEX IF NOT EXISTS ix_cloud_file_mapping_local_file_id ON cloud_file_mapping (local_file_id);
+
+-- Indexes for keyset-paginated memory listing
+CREATE INDEX IF NOT EXISTS ix_episodic_memory_user_occurred_at_id ON episodic_memory (user_id, occurred_at, id);
+CREATE INDEX IF NOT EXISTS ix_semantic_memory_user_created_at_id ON semantic_memory (user_id, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_procedural_memory_user_created_at_id ON procedural_memory (user_id, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_resource_memory_user_created_at_id ON resource_memory (user_id, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_knowledge_vault_user_created_at_id ON knowledge_vault (user_id, created_at, id);
+
 -- Clean up temporary objects
 DROP FUNCTION IF EXISTS column_exists(text, text);
 DROP TABLE IF EXISTS migration_vars;
@@ -12,6 +12,19 @@ import shutil
 from datetime import datetime
 import uuid
 
+# Indexes added to existing tables after they were created (all idempotent)
+INDEX_STATEMENTS = [
+    # Cloud-file lookups by cloud / local file id
+    "CREATE INDEX IF NOT EXISTS ix_cloud_file_mapping_cloud_file_id ON cloud_file_mapping (cloud_file_id)",
+    "CREATE INDEX IF NOT EXISTS ix_cloud_file_mapping_local_file_id ON cloud_file_mapping (local_file_id)",
+    # Keyset-paginated memory listing
+    "CREATE INDEX IF NOT EXISTS ix_episodic_memory_user_occurred_at_id ON episodic_memory (user_id, occurred_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_semantic_memory_user_created_at_id ON semantic_memory (user_id, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_procedural_memory_user_created_at_id ON procedural_memory (user_id, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_resource_memory_user_created_at_id ON resource_memory (user_id, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_knowledge_vault_user_created_at_id ON knowledge_vault (user_id, created_at, id)",
+]
+
 
 def backup_database(db_path):
     """Create a backup of the database before migration"""
@@ -79,6 +92,13 @@ def check_column_exists(conn, table_name, column_name):
     return column_name in columns
 
 
+def create_indexes(conn):
+    """Create the indexes in INDEX_STATEMENTS that do not exist yet"""
+    for index_sql in INDEX_STATEMENTS:
+        conn.execute(index_sql)
+    conn.commit()
+
+
 def migrate_database(old_db_path, new_db_path):
     """Migrate database from old format to new format"""
     
@@ -220,6 +240,8 @@ def migrate_database(old_db_path, new_db_path):
             else:
                 print(f"✓ Skipped (already exists): {migration['name']}")
         
+        create_indexes(conn)
+        
         # Re-enable foreign keys
         conn.execute("PRAGMA foreign_keys = ON")
         conn.commit()
@@ -376,6 +398,8 @@ def migrate_database_inplace(db_path):
             else:
                 print(f"✓ Skipped (already exists): {migration['name']}")
         
+        create_indexes(conn)
+        
         # Re-enable foreign keys
         conn.execute("PRAGMA foreign_keys = ON")
         conn.commit()
@@ -428,6 +428,19 @@ const ChatWindow = ({ settings, messages, setMessages, isScreenMonitoring }) =>
                   }
                   return updated;
                 });
+              } else if (data.type === 'token') {
+                // Reply text as the chat agent generates it; the final response replaces it
+                setActiveStreamingRequests(prev => {
+                  const updated = new Map(prev);
+                  const current = updated.get(requestId);
+                  if (current) {
+                    updated.set(requestId, {
+                      ...current,
+                      streamingContent: (current.streamingContent || '') + data.content
+                    });
+                  }
+                  return updated;
+                });
               } else if (data.type === 'missing_api_keys') {
                 // Handle missing API keys by showing the modal
                 setMissingApiKeys(data.missing_keys);
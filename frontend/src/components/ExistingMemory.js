@@ -3,6 +3,7 @@ import './ExistingMemory.css';
 import MemoryTreeVisualization from './MemoryTreeVisualization';
 import UploadExportModal from './UploadExportModal';
 import queuedFetch from '../utils/requestQueue';
+import runJob from '../utils/jobs';
 import { useTranslation } from 'react-i18next';
 
 const ExistingMemory = ({ settings }) => {
@@ -732,19 +733,8 @@ const ExistingMemory = ({ settings }) => {
       
       console.log('Starting reflexion process...');
       
-      const response = await queuedFetch(`${settings.serverUrl}/reflexion`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({})
-      });
-
-      if (!response.ok) {
-        throw new Error(`Failed to trigger reflexion: ${response.statusText}`);
-      }
-
-      const result = await response.json();
+      // Reflexion runs as a background job on the server; poll it until it finishes
+      const result = await runJob(settings.serverUrl, 'reflexion');
       
       if (result.success) {
         setReflexionSuccess(true);
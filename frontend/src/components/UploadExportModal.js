@@ -1,5 +1,5 @@
 import React, { useState } from 'react';
-import queuedFetch from '../utils/requestQueue';
+import runJob from '../utils/jobs';
 import './UploadExportModal.css';
 import { useTranslation } from 'react-i18next';
 
@@ -72,43 +72,29 @@ function UploadExportModal({ isOpen, onClose, settings }) {
     setExportStatus(null);
 
     try {
-      const response = await queuedFetch(`${settings.serverUrl}/export/memories`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-          file_path: exportPath,
-          memory_types: selectedTypes,
-          include_embeddings: false
-        }),
+      // The export runs as a background job on the server; poll it until it finishes
+      const result = await runJob(settings.serverUrl, 'export_memories', {
+        file_path: exportPath,
+        memory_types: selectedTypes,
+        include_embeddings: false
       });
 
-      if (response.ok) {
-        const result = await response.json();
-        setExportStatus({
-          success: true,
-          message: result.message,
-          counts: result.exported_counts,
-          total: result.total_exported
-        });
-      } else {
-        const errorData = await response.json();
-        const detail = String(errorData?.detail || '');
-        const localized =
-          detail.includes('At least one sheet must be visible') ? t('uploadExport.errors.atLeastOneSheetVisible') :
-          detail.includes('No data') ? t('uploadExport.errors.noData') :
-          detail.toLowerCase().includes('permission') ? t('uploadExport.errors.permissionDenied') :
-          t('uploadExport.errors.unknown');
-
-        setExportStatus({ success: false, message: localized });
-      }
-    } catch (error) {
-      console.error('Export error:', error);
       setExportStatus({
-        success: false,
-        message: `${t('uploadExport.status.failed')}: ${error.message}`
+        success: true,
+        message: result.message,
+        counts: result.exported_counts,
+        total: result.total_exported
       });
+    } catch (error) {
+      console.error('Export error:', error);
+      const detail = String(error.message || '');
+      const localized =
+        detail.includes('At least one sheet must be visible') ? t('uploadExport.errors.atLeastOneSheetVisible') :
+        detail.includes('No data') ? t('uploadExport.errors.noData') :
+        detail.toLowerCase().includes('permission') ? t('uploadExport.errors.permissionDenied') :
+        `${t('uploadExport.status.failed')}: ${detail}`;
+
+      setExportStatus({ success: false, message: localized });
     } finally {
       setIsLoading(false);
     }
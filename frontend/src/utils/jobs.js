@@ -0,0 +1,59 @@
+/**
+ * Background jobs
+ *
+ * Long maintenance work (reflexion, memory export, ...) runs as a server-side job: it is submitted
+ * with POST /jobs and polled with GET /jobs/{job_id} until it finishes, so no request is held open
+ * while the work runs.
+ */
+
+import queuedFetch from './requestQueue';
+
+const FINISHED_STATUSES = ['completed', 'failed', 'cancelled'];
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+const errorDetail = async (response) => {
+  try {
+    const errorData = await response.json();
+    return String(errorData?.detail || response.statusText);
+  } catch (e) {
+    return response.statusText;
+  }
+};
+
+/**
+ * Submit a job and wait for it to finish. Resolves with the job's result; rejects with the job's
+ * error if it failed or was cancelled. `onProgress` receives the job's latest progress while it runs.
+ */
+export const runJob = async (serverUrl, jobType, params = {}, { pollIntervalMs = 1000, onProgress } = {}) => {
+  const submitResponse = await queuedFetch(`${serverUrl}/jobs`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ job_type: jobType, params }),
+  });
+  if (!submitResponse.ok) {
+    throw new Error(await errorDetail(submitResponse));
+  }
+
+  let job = await submitResponse.json();
+  while (!FINISHED_STATUSES.includes(job.status)) {
+    await sleep(pollIntervalMs);
+    const pollResponse = await queuedFetch(`${serverUrl}/jobs/${job.id}`);
+    if (!pollResponse.ok) {
+      throw new Error(await errorDetail(pollResponse));
+    }
+    job = await pollResponse.json();
+    if (onProgress && job.progress) {
+      onProgress(job.progress);
+    }
+  }
+
+  if (job.status !== 'completed') {
+    throw new Error(job.error || `Job ${job.status}`);
+  }
+  return job.result || {};
+};
+
+export default runJob;
@@ -0,0 +1,105 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class AbsorptionPipeline:
+    """
+    Runs memory absorption as three ordered stages (preprocess -> dispatch -> cleanup),
+    each on its own single worker, so consecutive batches overlap: batch N+1 can be
+    preprocessed while batch N is with the memory agents and batch N-1 is being cleaned up.
+
+    Every stage is FIFO, so batches reach the memory agents and get cleaned up in the order
+    they were submitted. `max_in_flight` bounds how many batches may be inside the pipeline;
+    `submit` blocks once the limit is reached.
+    """
+
+    STAGES = ('preprocess', 'dispatch', 'cleanup')
+
+    def __init__(self, preprocess_fn, dispatch_fn, cleanup_fn, max_in_flight=2, name="absorption"):
+        self._stage_fns = {
+            'preprocess': preprocess_fn,
+            'dispatch': dispatch_fn,
+            'cleanup': cleanup_fn,
+        }
+        self._executors = {
+            stage: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{name}_{stage}")
+            for stage in self.STAGES
+        }
+        self.max_in_flight = max_in_flight
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+
+        self.logger = logging.getLogger(f"Mirix.AbsorptionPipeline.{name}")
+
+        # Metrics
+        self._metrics_lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._stage_seconds = {stage: 0.0 for stage in self.STAGES}
+
+    def submit(self, *args):
+        """
+        Submit a batch. `args` are passed to the preprocess stage; each later stage receives the
+        previous stage's return value. Returns a Future resolved with the cleanup result.
+        """
+        self._slots.acquire()
+        with self._metrics_lock:
+            self._in_flight += 1
+
+        result = Future()
+        self._executors['preprocess'].submit(self._run_stage, 0, args, result)
+        return result
+
+    def _run_stage(self, index, args, result):
+        stage = self.STAGES[index]
+        start = time.time()
+        try:
+            output = self._stage_fns[stage](*args)
+        except Exception as e:
+            self.logger.error(f"Absorption {stage} stage failed: {e}")
+            self._finish(result, error=e)
+            return
+        finally:
+            with self._metrics_lock:
+                self._stage_seconds[stage] += time.time() - start
+
+        if index + 1 < len(self.STAGES):
+            next_stage = self.STAGES[index + 1]
+            self._executors[next_stage].submit(self._run_stage, index + 1, (output,), result)
+        else:
+            self._finish(result, output=output)
+
+    def _finish(self, result, output=None, error=None):
+        with self._metrics_lock:
+            self._in_flight -= 1
+            if error is None:
+                self._completed += 1
+            else:
+                self._failed += 1
+        self._slots.release()
+        if error is None:
+            result.set_result(output)
+        else:
+            result.set_exception(error)
+
+    def get_metrics(self):
+        """Get in-flight/completed/failed batch counts and average time spent per stage."""
+        with self._metrics_lock:
+            finished = self._completed + self._failed
+            return {
+                'max_in_flight': self.max_in_flight,
+                'in_flight': self._in_flight,
+                'completed': self._completed,
+                'failed': self._failed,
+                'avg_stage_seconds': {
+                    stage: (seconds / finished if finished else 0.0)
+                    for stage, seconds in self._stage_seconds.items()
+                },
+            }
+
+    def shutdown(self, wait=True):
+        """Stop accepting batches; with `wait`, let submitted batches run to completion."""
+        for stage in self.STAGES:
+            self._executors[stage].shutdown(wait=wait)
@@ -0,0 +1,137 @@
+import threading
+import time
+
+from mirix.agent.app_constants import (
+    ABSORPTION_AUDIO_TOKENS_PER_SECOND,
+    ABSORPTION_IDLE_GAP_SECONDS,
+    ABSORPTION_IMAGE_TOKEN_ESTIMATE,
+    ABSORPTION_MAX_AGE_SECONDS,
+    ABSORPTION_TOKEN_BUDGET,
+)
+
+
+class AdaptiveAbsorptionScheduler:
+    """
+    Decides when buffered content should be absorbed into memory.
+    Absorption triggers on whichever comes first: the message count limit, an estimated
+    token budget, the age of the oldest buffered item, or an idle gap since the last arrival.
+    """
+
+    TRIGGERS = ('count', 'token_budget', 'max_age', 'idle_gap', 'forced')
+
+    def __init__(self, message_limit, token_budget=ABSORPTION_TOKEN_BUDGET,
+                 max_age_seconds=ABSORPTION_MAX_AGE_SECONDS, idle_gap_seconds=ABSORPTION_IDLE_GAP_SECONDS):
+        self.message_limit = message_limit
+        self.token_budget = token_budget
+        self.max_age_seconds = max_age_seconds
+        self.idle_gap_seconds = idle_gap_seconds
+
+        self._lock = threading.Lock()
+        self._last_arrival = None
+
+        # Decision metrics
+        self._evaluations = 0
+        self._trigger_counts = {trigger: 0 for trigger in self.TRIGGERS}
+        self._trigger_batch_sizes = {trigger: 0 for trigger in self.TRIGGERS}
+        self._last_decision = None
+
+    def record_arrival(self):
+        """Note that a new item was buffered (resets the idle gap)."""
+        with self._lock:
+            self._last_arrival = time.monotonic()
+
+    @staticmethod
+    def estimate_item_tokens(item):
+        """Rough token estimate for one buffered item (text, images and audio)."""
+        tokens = 0
+        if item.get('message'):
+            tokens += len(str(item['message'])) // 4
+        tokens += len(item.get('image_uris') or []) * ABSORPTION_IMAGE_TOKEN_ESTIMATE
+        for segment in item.get('audio_segments') or []:
+            # pydub AudioSegments know their duration; raw base64 chunks are assumed to be ~5 seconds
+            duration = getattr(segment, 'duration_seconds', 5)
+            tokens += int(duration * ABSORPTION_AUDIO_TOKENS_PER_SECOND)
+        return tokens
+
+    def evaluate(self, ready_messages, oldest_received_at=None):
+        """
+        Decide whether `ready_messages` should be absorbed now.
+
+        Args:
+            ready_messages: List of (timestamp, item) tuples that can be processed in order
+            oldest_received_at: time.monotonic() arrival time of the oldest buffered item
+
+        Returns:
+            The name of the trigger that fired, or None if absorption should wait
+        """
+        now = time.monotonic()
+        num_ready = len(ready_messages)
+        buffered_tokens = sum(self.estimate_item_tokens(item) for _, item in ready_messages)
+
+        with self._lock:
+            idle_for = now - self._last_arrival if self._last_arrival is not None else None
+            oldest_age = now - oldest_received_at if oldest_received_at is not None else None
+
+            trigger = None
+            if num_ready > 0:
+                if num_ready >= self.message_limit:
+                    trigger = 'count'
+                elif self.token_budget and buffered_tokens >= self.token_budget:
+                    trigger = 'token_budget'
+                elif self.max_age_seconds and oldest_age is not None and oldest_age >= self.max_age_seconds:
+                    trigger = 'max_age'
+                elif self.idle_gap_seconds and idle_for is not None and idle_for >= self.idle_gap_seconds:
+                    trigger = 'idle_gap'
+
+            self._evaluations += 1
+            if trigger is not None:
+                self._record_trigger(trigger, num_ready)
+            self._last_decision = {
+                'trigger': trigger,
+                'ready_messages': num_ready,
+                'buffered_tokens': buffered_tokens,
+                'oldest_age_seconds': oldest_age,
+                'idle_seconds': idle_for,
+            }
+            return trigger
+
+    def record_forced(self, num_messages):
+        """Record an absorption that was forced by the caller rather than decided here."""
+        with self._lock:
+            self._record_trigger('forced', num_messages)
+
+    def _record_trigger(self, trigger, num_messages):
+        self._trigger_counts[trigger] += 1
+        self._trigger_batch_sizes[trigger] += num_messages
+
+    def seconds_until_next_check(self, oldest_received_at=None):
+        """Seconds until the age or idle trigger could fire, or None if neither is enabled."""
+        now = time.monotonic()
+        candidates = []
+        with self._lock:
+            if self.idle_gap_seconds and self._last_arrival is not None:
+                candidates.append(self._last_arrival + self.idle_gap_seconds - now)
+        if self.max_age_seconds and oldest_received_at is not None:
+            candidates.append(oldest_received_at + self.max_age_seconds - now)
+        if not candidates:
+            return None
+        return max(0.0, min(candidates))
+
+    def get_metrics(self):
+        """Get trigger counts, average batch size per trigger and the most recent decision."""
+        with self._lock:
+            return {
+                'evaluations': self._evaluations,
+                'triggers': dict(self._trigger_counts),
+                'avg_batch_size': {
+                    trigger: self._trigger_batch_sizes[trigger] / count
+                    for trigger, count in self._trigger_counts.items() if count
+                },
+                'last_decision': dict(self._last_decision) if self._last_decision else None,
+                'config': {
+                    'message_limit': self.message_limit,
+                    'token_budget': self.token_budget,
+                    'max_age_seconds': self.max_age_seconds,
+                    'idle_gap_seconds': self.idle_gap_seconds,
+                },
+            }
@@ -1,6 +1,7 @@
 import re
 import os
 import copy
+import asyncio
 import json
 import time
 import pytz
@@ -44,7 +45,7 @@ from mirix.utils import num_tokens_from_functions, num_tokens_from_messages
 from mirix.memory import summarize_messages
 from mirix.orm import User
 from mirix.orm.enums import ToolType
-from mirix.schemas.agent import AgentState, AgentStepResponse, UpdateAgent
+from mirix.schemas.agent import AgentState, AgentStepResponse, AgentType, UpdateAgent
 from mirix.schemas.block import BlockUpdate
 from mirix.schemas.embedding_config import EmbeddingConfig
 from mirix.schemas.enums import MessageRole
@@ -70,12 +71,16 @@ from mirix.services.resource_memory_manager import ResourceMemoryManager
 from mirix.services.semantic_memory_manager import SemanticMemoryManager
 from mirix.services.step_manager import StepManager
 from mirix.services.user_manager import UserManager
+from mirix.services.db_executor import run_in_db_executor
 from mirix.services.tool_execution_sandbox import ToolExecutionSandbox
-from mirix.settings import summarizer_settings
+from mirix.settings import settings, summarizer_settings
 from mirix.embeddings import embedding_model
 from mirix.system import get_contine_chaining, get_token_limit_warning, package_function_response, package_summarize_message, package_user_message
 from mirix.tracing import log_event, trace_method
 from mirix.llm_api.llm_client import LLMClient
+from mirix.llm_api.rate_limiter import BACKGROUND, INTERACTIVE, llm_request_priority
+from mirix.llm_api.streaming import SendMessageStreamParser
+from mirix.llm_api.tool_schema_cache import fingerprint_tools
 from mirix.utils import (
     count_tokens,
     get_friendly_error_msg,
@@ -91,6 +96,19 @@ from mirix.utils import (
 )
 from mirix.services.file_manager import FileManager
 
+# Agents whose LLM calls a user is waiting on; they get priority in the LLM rate limiter
+INTERACTIVE_AGENT_TYPES = {AgentType.chat_agent, AgentType.coder_agent}
+
+# Background memory agents whose LLM calls may be sent through the Anthropic Message Batches API
+BATCHABLE_AGENT_TYPES = {
+    AgentType.episodic_memory_agent,
+    AgentType.procedural_memory_agent,
+    AgentType.resource_memory_agent,
+    AgentType.knowledge_vault_agent,
+    AgentType.semantic_memory_agent,
+    AgentType.core_memory_agent,
+}
+
 
 class BaseAgent(ABC):
     """
@@ -142,6 +160,11 @@ class Agent(BaseAgent):
 
         self.tool_rules_solver = ToolRulesSolver(tool_rules=agent_state.tool_rules)
 
+        # Tool schemas offered to the LLM, keyed by (tool set fingerprint, allowed tool names, excluded tool).
+        # Returning the same list objects every step lets the clients reuse their compiled tool payloads.
+        self._tool_set_version = None
+        self._allowed_tool_schemas = {}
+
         # gpt-4, gpt-3.5-turbo, ...
         self.model = self.agent_state.llm_config.model
         self.supports_structured_output = check_supports_structured_output(model=self.model, tool_rules=agent_state.tool_rules)
@@ -186,6 +209,26 @@ class Agent(BaseAgent):
         # Logger that the Agent specifically can use, will also report the agent_state ID with the logs
         # Note: Logger is already initialized earlier in constructor
 
+    def prepare_for_reuse(self, interface: Optional[AgentInterface], user: User) -> bool:
+        """
+        Reset the per-run state of an agent kept between steps, as if it had just been constructed.
+        Returns False if the agent can no longer be used (one of its memory blocks is gone).
+        """
+        self.interface = interface
+        self.user = user
+        self.tool_rules_solver.last_tool_name = None
+        self.agent_alerted_about_memory_pressure = False
+
+        # Block values are edited independently of the agent (e.g. by the core memory agent)
+        blocks = self.block_manager.get_all_blocks_by_ids([block.id for block in self.agent_state.memory.get_blocks()], actor=user)
+        if any(block is None for block in blocks):
+            return False
+        self.agent_state.memory.blocks = blocks
+
+        # Tool rules depend on the last tool response, which may come from a step run by another Agent object
+        self.last_function_response = self.load_last_function_response()
+        return True
+
     def load_last_function_response(self):
         """Load the last function response from message history"""
         in_context_messages = self.agent_manager.get_in_context_messages(agent_id=self.agent_state.id, actor=self.user)
@@ -384,41 +427,32 @@ class Agent(BaseAgent):
 
         return function_response
 
-    @trace_method
-    def _get_ai_reply(
-        self,
-        message_sequence: List[Message],
-        function_call: Optional[str] = None,
-        first_message: bool = False,
-        stream: bool = False,  # TODO move to config?
-        empty_response_retry_limit: int = 3,
-        backoff_factor: float = 0.5,  # delay multiplier for exponential backoff
-        max_delay: float = 10.0,  # max delay between retries
-        step_count: Optional[int] = None,
-        last_function_failed: bool = False,
-        put_inner_thoughts_first: bool = True,
-        get_input_data_for_debugging: bool = False,
-        existing_file_uris: Optional[List[str]] = None,
-        second_try: bool = False,
-    ) -> ChatCompletionResponse:
-        """Get response from LLM API with robust retry mechanism."""
-        log_telemetry(self.logger, "_get_ai_reply start")
-        allowed_tool_names = self.tool_rules_solver.get_allowed_tool_names(
-            last_function_response=self.last_function_response
+    def _llm_request_priority(self) -> str:
+        """Chat-facing agents are interactive; memory and background agents yield to them under rate limits."""
+        return INTERACTIVE if self.agent_state.agent_type in INTERACTIVE_AGENT_TYPES else BACKGROUND
+
+    def _use_batch_api(self) -> bool:
+        """Whether this agent's LLM calls should go through the provider's (Anthropic) batch API."""
+        return (
+            settings.use_anthropic_batch_for_memory_agents
+            and self.agent_state.agent_type in BATCHABLE_AGENT_TYPES
+            and self.agent_state.llm_config.model_endpoint_type == "anthropic"
         )
-        agent_state_tool_jsons = [t.json_schema for t in self.agent_state.tools]
 
-        allowed_functions = (
-            agent_state_tool_jsons
-            if not allowed_tool_names
-            else [func for func in agent_state_tool_jsons if func["name"] in allowed_tool_names]
+    def _select_tools(self, step_count: Optional[int], last_function_failed: bool) -> Tuple[Optional[List[dict]], Optional[str]]:
+        """The tool schemas the LLM may call this step and the tool to force, if any. Returns (None, None) if no tool is allowed."""
+        allowed_tool_names = self.tool_rules_solver.get_allowed_tool_names(
+            last_function_response=self.last_function_response
         )
 
         # Don't allow a tool to be called if it failed last time
+        excluded_tool_name = None
         if last_function_failed and self.tool_rules_solver.tool_call_history:
-            allowed_functions = [f for f in allowed_functions if f["name"] != self.tool_rules_solver.tool_call_history[-1]]
-            if not allowed_functions:
-                return None
+            excluded_tool_name = self.tool_rules_solver.tool_call_history[-1]
+
+        allowed_functions = self._get_allowed_tool_schemas(allowed_tool_names, excluded_tool_name)
+        if excluded_tool_name is not None and not allowed_functions:
+            return None, None
 
         # For the first message, force the initial tool if one is specified
         force_tool_call = None
@@ -434,7 +468,63 @@ class Agent(BaseAgent):
         elif step_count is not None and step_count > 0 and len(allowed_tool_names) == 1:
             force_tool_call = allowed_tool_names[0]
 
+        return allowed_functions, force_tool_call
+
+    def _get_allowed_tool_schemas(self, allowed_tool_names: List[str], excluded_tool_name: Optional[str] = None) -> List[dict]:
+        """The JSON schemas of the agent's tools that the tool rules allow, reused while the tool set is unchanged."""
+        tools = self.agent_state.tools
+        if self._tool_set_version is None or self._tool_set_version[0] is not tools:
+            # agent_state (and its tool list) is replaced whenever the agent is reloaded
+            version = fingerprint_tools([t.json_schema for t in tools])
+            if self._tool_set_version is not None and self._tool_set_version[1] != version:
+                self._allowed_tool_schemas = {}
+            self._tool_set_version = (tools, version)
+
+        key = (self._tool_set_version[1], tuple(allowed_tool_names), excluded_tool_name)
+        allowed_functions = self._allowed_tool_schemas.get(key)
+        if allowed_functions is None:
+            agent_state_tool_jsons = [t.json_schema for t in tools]
+            allowed_functions = (
+                agent_state_tool_jsons
+                if not allowed_tool_names
+                else [func for func in agent_state_tool_jsons if func["name"] in allowed_tool_names]
+            )
+            if excluded_tool_name is not None:
+                allowed_functions = [f for f in allowed_functions if f["name"] != excluded_tool_name]
+            self._allowed_tool_schemas[key] = allowed_functions
+        return allowed_functions
+
+    @trace_method
+    def _get_ai_reply(
+        self,
+        message_sequence: List[Message],
+        function_call: Optional[str] = None,
+        first_message: bool = False,
+        stream: bool = False,  # TODO move to config?
+        empty_response_retry_limit: int = 3,
+        backoff_factor: float = 0.5,  # delay multiplier for exponential backoff
+        max_delay: float = 10.0,  # max delay between retries
+        step_count: Optional[int] = None,
+        last_function_failed: bool = False,
+        put_inner_thoughts_first: bool = True,
+        get_input_data_for_debugging: bool = False,
+        existing_file_uris: Optional[List[str]] = None,
+        second_try: bool = False,
+        token_callback: Optional[Callable[[str], None]] = None,
+    ) -> ChatCompletionResponse:
+        """
+        Get response from LLM API with robust retry mechanism. If `token_callback` is given, the reply text is streamed to it;
+        once a failed attempt has streamed text, the retries are not streamed (the client gets the reply whole, as the final result).
+        """
+        log_telemetry(self.logger, "_get_ai_reply start")
+        allowed_functions, force_tool_call = self._select_tools(step_count, last_function_failed)
+        if allowed_functions is None:
+            return None
+
+        stream_handler = None
         for attempt in range(1, empty_response_retry_limit + 1):
+            if stream_handler is not None and stream_handler.streamed_text:
+                token_callback = None
             try:
                 log_telemetry(self.logger, "_get_ai_reply create start")
 
@@ -442,37 +532,50 @@ class Agent(BaseAgent):
                 llm_client = LLMClient.create(
                     llm_config=self.agent_state.llm_config,
                     put_inner_thoughts_first=put_inner_thoughts_first,
+                    use_batch_api=self._use_batch_api(),
                 )
 
                 if llm_client and not stream:
-                    response = llm_client.send_llm_request(
-                        messages=message_sequence,
-                        tools=allowed_functions,
-                        stream=stream,
-                        force_tool_call=force_tool_call,
-                        get_input_data_for_debugging=get_input_data_for_debugging,
-                        existing_file_uris=existing_file_uris,
-                    )
+                    with llm_request_priority(self._llm_request_priority()):
+                        if token_callback is not None and not get_input_data_for_debugging:
+                            stream_handler = SendMessageStreamParser(token_callback)
+                            response = llm_client.send_llm_request_stream(
+                                messages=message_sequence,
+                                stream_handler=stream_handler,
+                                tools=allowed_functions,
+                                force_tool_call=force_tool_call,
+                                existing_file_uris=existing_file_uris,
+                            )
+                        else:
+                            response = llm_client.send_llm_request(
+                                messages=message_sequence,
+                                tools=allowed_functions,
+                                stream=stream,
+                                force_tool_call=force_tool_call,
+                                get_input_data_for_debugging=get_input_data_for_debugging,
+                                existing_file_uris=existing_file_uris,
+                            )
 
                     if get_input_data_for_debugging:
                         return response
                 
                 else:
                     # Fallback to existing flow
-                    response = create(
-                        llm_config=self.agent_state.llm_config,
-                        messages=message_sequence,
-                        user_id=self.agent_state.created_by_id,
-                        functions=allowed_functions,
-                        # functions_python=self.functions_python, do we need this?
-                        function_call=function_call,
-                        first_message=first_message,
-                        force_tool_call=force_tool_call,
-                        stream=stream,
-                        stream_interface=self.interface,
-                        put_inner_thoughts_first=put_inner_thoughts_first,
-                        name=self.agent_state.name,
-                    )
+                    with llm_request_priority(self._llm_request_priority()):
+                        response = create(
+                            llm_config=self.agent_state.llm_config,
+                            messages=message_sequence,
+                            user_id=self.agent_state.created_by_id,
+                            functions=allowed_functions,
+                            # functions_python=self.functions_python, do we need this?
+                            function_call=function_call,
+                            first_message=first_message,
+                            force_tool_call=force_tool_call,
+                            stream=stream,
+                            stream_interface=self.interface,
+                            put_inner_thoughts_first=put_inner_thoughts_first,
+                            name=self.agent_state.name,
+                        )
                 log_telemetry(self.logger, "_get_ai_reply create finish")
 
                 # These bottom two are retryable
@@ -527,7 +630,9 @@ class Agent(BaseAgent):
                     log_telemetry(self.logger, "_get_ai_reply_last_message_hacking start")
                     if second_try:
                         raise Exception(f"Retries exhausted and no valid response received. Final error: {llm_error}")
-                    return self._get_ai_reply([message_sequence[-1]], function_call, first_message, stream, empty_response_retry_limit, backoff_factor, max_delay, step_count, last_function_failed, put_inner_thoughts_first, get_input_data_for_debugging, second_try=True)
+                    if stream_handler is not None and stream_handler.streamed_text:
+                        token_callback = None
+                    return self._get_ai_reply([message_sequence[-1]], function_call, first_message, stream, empty_response_retry_limit, backoff_factor, max_delay, step_count, last_function_failed, put_inner_thoughts_first, get_input_data_for_debugging, second_try=True, token_callback=token_callback)
                 
                 else:
                     delay = min(backoff_factor * (2 ** (attempt - 1)), max_delay)
@@ -572,6 +677,95 @@ class Agent(BaseAgent):
         log_telemetry(self.logger, "_handle_ai_response finish catch-all exception")
         raise Exception("Retries exhausted and no valid response received.")
 
+    async def _get_ai_reply_async(
+        self,
+        message_sequence: List[Message],
+        first_message: bool = False,
+        empty_response_retry_limit: int = 3,
+        backoff_factor: float = 0.5,  # delay multiplier for exponential backoff
+        max_delay: float = 10.0,  # max delay between retries
+        step_count: Optional[int] = None,
+        last_function_failed: bool = False,
+        put_inner_thoughts_first: bool = True,
+        existing_file_uris: Optional[List[str]] = None,
+        token_callback: Optional[Callable[[str], None]] = None,
+    ) -> ChatCompletionResponse:
+        """Async counterpart of `_get_ai_reply`; waits for the LLM (and between retries) on the event loop."""
+        allowed_functions, force_tool_call = await run_in_db_executor(self._select_tools, step_count, last_function_failed)
+        if allowed_functions is None:
+            return None
+
+        stream_handler = None
+        for attempt in range(1, empty_response_retry_limit + 1):
+            if stream_handler is not None and stream_handler.streamed_text:
+                token_callback = None
+            try:
+                llm_client = LLMClient.create(
+                    llm_config=self.agent_state.llm_config,
+                    put_inner_thoughts_first=put_inner_thoughts_first,
+                    use_batch_api=self._use_batch_api(),
+                )
+
+                with llm_request_priority(self._llm_request_priority()):
+                    if llm_client and token_callback is not None:
+                        stream_handler = SendMessageStreamParser(token_callback)
+                        response = await llm_client.send_llm_request_stream_async(
+                            messages=message_sequence,
+                            stream_handler=stream_handler,
+                            tools=allowed_functions,
+                            force_tool_call=force_tool_call,
+                            existing_file_uris=existing_file_uris,
+                        )
+                    elif llm_client:
+                        response = await llm_client.send_llm_request_async(
+                            messages=message_sequence,
+                            tools=allowed_functions,
+                            force_tool_call=force_tool_call,
+                            existing_file_uris=existing_file_uris,
+                        )
+                    else:
+                        # Providers without an LLMClient only have the blocking legacy flow
+                        response = await run_in_db_executor(
+                            create,
+                            llm_config=self.agent_state.llm_config,
+                            messages=message_sequence,
+                            user_id=self.agent_state.created_by_id,
+                            functions=allowed_functions,
+                            first_message=first_message,
+                            force_tool_call=force_tool_call,
+                            stream_interface=self.interface,
+                            put_inner_thoughts_first=put_inner_thoughts_first,
+                        )
+
+                if len(response.choices) == 0 or response.choices[0] is None:
+                    raise ValueError(f"API call returned an empty message: {response}")
+
+                for choice in response.choices:
+                    if choice.message.content == '' and len(choice.message.tool_calls) == 0:
+                        raise ValueError(f"API call returned an empty message: {response}")
+
+                if response.choices[0].finish_reason not in ["stop", "function_call", "tool_calls"]:
+                    if response.choices[0].finish_reason == "length":
+                        raise ValueError("maximum context length exceeded or generated content is too long")
+                    raise ValueError(f"Bad finish reason from API: {response.choices[0].finish_reason}")
+
+            except (ValueError, KeyError, LLMError, AssertionError, requests.exceptions.HTTPError) as e:
+                if attempt >= empty_response_retry_limit:
+                    self.logger.error(f"Retry limit reached. Final error: {e}")
+                    raise Exception(f"Retries exhausted and no valid response received. Final error: {e}")
+                delay = min(backoff_factor * (2 ** (attempt - 1)), max_delay)
+                self.logger.warning(f"Attempt {attempt} failed: {e}. Retrying in {delay} seconds...")
+                await asyncio.sleep(delay)
+                continue
+
+            # check if we are going over the context window: this allows for articifial constraints
+            if response.usage.total_tokens > self.agent_state.llm_config.context_window:
+                await run_in_db_executor(self.summarize_messages_inplace, existing_file_uris=existing_file_uris)
+
+            return response
+
+        raise Exception("Retries exhausted and no valid response received.")
+
     def _handle_ai_response(
         self,
         input_message: Message,
@@ -966,17 +1160,17 @@ class Agent(BaseAgent):
                         
                         # append the persisted message ID to the message list
                         message_ids.append(persisted_message.id)
-                        self.agent_manager.set_in_context_messages(agent_id=self.agent_state.id, message_ids=message_ids, actor=self.user)
+                        self.agent_manager.set_actor_in_context_messages(agent_id=self.agent_state.id, message_ids=message_ids, actor=self.user)
 
                         # delete the detached messages
                         deleted_count = self.message_manager.delete_detached_messages_for_agent(agent_id=self.agent_state.id, actor=self.user)
 
                     if self.agent_state.name == 'meta_memory_agent':
-                        self.agent_manager.set_in_context_messages(agent_id=self.agent_state.id, message_ids=message_ids, actor=self.user)
+                        self.agent_manager.set_actor_in_context_messages(agent_id=self.agent_state.id, message_ids=message_ids, actor=self.user)
                         deleted_count = self.message_manager.delete_detached_messages_for_agent(agent_id=self.agent_state.id, actor=self.user)
 
                     if self.agent_state.name == 'reflexion_agent':
-                        self.agent_manager.set_in_context_messages(agent_id=self.agent_state.id, message_ids=message_ids, actor=self.user)
+                        self.agent_manager.set_actor_in_context_messages(agent_id=self.agent_state.id, message_ids=message_ids, actor=self.user)
                         deleted_count = self.message_manager.delete_detached_messages_for_agent(agent_id=self.agent_state.id, actor=self.user)
 
                     # Clear all messages since they were manually added to the conversation history
@@ -1019,30 +1213,13 @@ class Agent(BaseAgent):
     ) -> MirixUsageStatistics:
         """Run Agent.step in a loop, handling chaining via contine_chaining requests and function failures"""
 
-        if user_id:
-            self.user = self.user_manager.get_user_by_id(user_id)
-
-        max_chaining_steps = max_chaining_steps or MAX_CHAINING_STEPS
-
-        first_input_message = input_messages[0]
-
-        # Convert MessageCreate objects to Message objects
-        message_objects = [prepare_input_message_create(m, self.agent_state.id, wrap_user_message=False, wrap_system_message=True) for m in input_messages]
-        
-        extra_message_objects = [prepare_input_message_create(m, self.agent_state.id, wrap_user_message=False, wrap_system_message=True) for m in extra_messages] if extra_messages is not None else None
-        next_input_message = message_objects
+        first_input_message, next_input_message, extra_message_objects, initial_message_count, max_chaining_steps = self._start_step_loop(
+            input_messages, extra_messages, max_chaining_steps, user_id
+        )
         counter = 0
         total_usage = UsageStatistics()
         step_count = 0
 
-        initial_message_count = len(self.agent_manager.get_in_context_messages(agent_id=self.agent_state.id, actor=self.user))
-
-        if self.agent_state.name == 'reflexion_agent':
-            # clear previous messages
-            in_context_messages = self.agent_manager.get_in_context_messages(agent_id=self.agent_state.id, actor=self.user)
-            in_context_messages = in_context_messages[:1]
-            self.agent_manager.set_in_context_messages(agent_id=self.agent_state.id, message_ids=[message.id for message in in_context_messages], actor=self.user)
-
         while True:
 
             kwargs["first_message"] = False
@@ -1050,83 +1227,67 @@ class Agent(BaseAgent):
 
             if self.agent_state.name in ['meta_memory_agent', 'chat_agent'] and step_count == 0:
                 # When the agent first gets the screenshots, we need to extract the topic to search the query.
+                topics = self._extract_topics(next_input_message)
+                if topics is not None:
+                    kwargs['topics'] = topics
 
-                try:
-                    topics = None
+            step_response = self.inner_step(
+                first_input_messge=first_input_message,
+                messages=next_input_message,
+                extra_messages=extra_message_objects,
+                initial_message_count=initial_message_count,
+                chaining=chaining,
+                **kwargs,
+            )
 
-                    temporary_messages = copy.deepcopy(next_input_message)
+            step_count += 1
+            total_usage += step_response.usage
+            counter += 1
+            self.interface.step_complete()
 
-                    temporary_messages.append(prepare_input_message_create(MessageCreate(
-                        role=MessageRole.user,
-                        content="The above are the inputs from the user, please look at these content and extract the topic (brief description of what the user is focusing on) from these content. If there are multiple focuses in these content, then extract them all and put them into one string separated by ';'. Call the function `update_topic` to update the topic with the extracted topics.",
-                    ), self.agent_state.id, wrap_user_message=False, wrap_system_message=True))
+            # logger.debug("Saving agent state")
+            # save updated state
+            save_agent(self)
 
-                    temporary_messages = [
-                        prepare_input_message_create(MessageCreate(
-                            role=MessageRole.system,
-                            content="You are a helpful assistant that extracts the topic from the user's input.",
-                        ), self.agent_state.id, wrap_user_message=False, wrap_system_message=True),
-                    ] + temporary_messages
-                    
-                    # Define the function for topic extraction
-                    functions = [{
-                        'name': 'update_topic',
-                        'description': "Update the topic of the conversation/content. The topic will be used for retrieving relevant information from the database",
-                        'parameters': {
-                            'type': 'object',
-                            'properties': {
-                                'topic': {
-                                    'type': 'string', 
-                                    'description': 'The topic of the current conversation/content. If there are multiple topics then separate them with ";".'}
-                            },
-                            'required': ['topic']
-                        },
-                    }]
-                    
-                    # Use LLMClient to extract topics
-                    llm_client = LLMClient.create(
-                        llm_config=self.agent_state.llm_config,
-                        put_inner_thoughts_first=True,
-                    )
-                    
-                    if llm_client:
-                        response = llm_client.send_llm_request(
-                            messages=temporary_messages,
-                            tools=functions,
-                            stream=False,
-                            force_tool_call='update_topic',
-                        )
-                    else:
-                        # Fallback to existing create function
-                        response = create(
-                            llm_config=self.agent_state.llm_config,
-                            messages=temporary_messages,
-                            functions=functions,
-                            force_tool_call='update_topic',
-                        )
+            next_input_message = self._next_chaining_input(step_response, counter, max_chaining_steps, chaining)
+            if next_input_message is None:
+                break
 
-                    # Extract topics from the response
-                    for choice in response.choices:
-                        if hasattr(choice.message, 'tool_calls') and choice.message.tool_calls is not None and len(choice.message.tool_calls) > 0:
-                            try:
-                                function_args = json.loads(choice.message.tool_calls[0].function.arguments)
-                                topics = function_args.get('topic')
-                                break
-                            except (json.JSONDecodeError, KeyError) as parse_error:
-                                self.logger.warning(f"Failed to parse topic extraction response: {parse_error}")
-                                continue
-        
-                    if topics is not None:
-                        kwargs['topics'] = topics
-                        self.update_topic_if_changed(topics)
-                    else:
-                        self.logger.warning("No topics extracted from screenshots")
+        return MirixUsageStatistics(**total_usage.model_dump(), step_count=step_count)
 
-                except Exception as e:
-                    self.logger.info(f"Error in extracting the topic from the screenshots: {e}")
-                    pass
+    async def step_async(
+        self,
+        input_messages: Union[Message, List[Message]],
+        chaining: bool = True,
+        max_chaining_steps: Optional[int] = None,
+        extra_messages: Optional[List[dict]] = None,
+        user_id: Optional[str] = None,
+        **kwargs,
+    ) -> MirixUsageStatistics:
+        """
+        Async counterpart of `step`. LLM calls are awaited on the event loop; database reads/writes and
+        tool execution run in the bounded DB executor, so a waiting agent does not hold a thread.
+        """
 
-            step_response = self.inner_step(
+        first_input_message, next_input_message, extra_message_objects, initial_message_count, max_chaining_steps = await run_in_db_executor(
+            self._start_step_loop, input_messages, extra_messages, max_chaining_steps, user_id
+        )
+        counter = 0
+        total_usage = UsageStatistics()
+        step_count = 0
+
+        while True:
+
+            kwargs["first_message"] = False
+            kwargs["step_count"] = step_count
+
+            if self.agent_state.name in ['meta_memory_agent', 'chat_agent'] and step_count == 0:
+                # When the agent first gets the screenshots, we need to extract the topic to search the query.
+                topics = await self._extract_topics_async(next_input_message)
+                if topics is not None:
+                    kwargs['topics'] = topics
+
+            step_response = await self.inner_step_async(
                 first_input_messge=first_input_message,
                 messages=next_input_message,
                 extra_messages=extra_message_objects,
@@ -1135,81 +1296,226 @@ class Agent(BaseAgent):
                 **kwargs,
             )
 
-            continue_chaining = step_response.continue_chaining
-            function_failed = step_response.function_failed
-            token_warning = step_response.in_context_memory_warning
-            usage = step_response.usage
-
             step_count += 1
-            total_usage += usage
+            total_usage += step_response.usage
             counter += 1
             self.interface.step_complete()
 
-            # logger.debug("Saving agent state")
-            # save updated state
-            save_agent(self)
+            await run_in_db_executor(save_agent, self)
 
-            # Chain stops
-            if not chaining and (not function_failed):
-                self.logger.info("No chaining, stopping after one step")
+            next_input_message = self._next_chaining_input(step_response, counter, max_chaining_steps, chaining)
+            if next_input_message is None:
                 break
-            elif max_chaining_steps is not None and counter == max_chaining_steps:
-                # Add warning message based on agent type
-                if self.agent_state.name == "chat_agent":
-                    warning_content = "[System Message] You have reached the maximum chaining steps. Please call 'send_message' to send your response to the user."
-                else:
-                    warning_content = "[System Message] You have reached the maximum chaining steps. Please call 'finish_memory_update' to end the chaining."
-                next_input_message = Message.dict_to_message(
-                    agent_id=self.agent_state.id,
-                    model=self.model,
-                    openai_message_dict={
-                        "role": "user",
-                        "content": warning_content,
-                    },
-                )
-                continue  # give agent one more chance to respond
-            elif max_chaining_steps is not None and counter > max_chaining_steps:
-                self.logger.info(f"Hit max chaining steps, stopping after {counter} steps")
-                break
-            # Chain handlers
-            elif token_warning and summarizer_settings.send_memory_warning_message:
-                assert self.agent_state.created_by_id is not None
-                next_input_message = Message.dict_to_message(
-                    agent_id=self.agent_state.id,
-                    model=self.model,
-                    openai_message_dict={
-                        "role": "user",  # TODO: change to system?
-                        "content": get_token_limit_warning(),
-                    },
-                )
-                continue  # always chain
-            elif function_failed:
-                assert self.agent_state.created_by_id is not None
-                next_input_message = Message.dict_to_message(
-                    agent_id=self.agent_state.id,
-                    model=self.model,
-                    openai_message_dict={
-                        "role": "user",  # TODO: change to system?
-                        "content": get_contine_chaining(FUNC_FAILED_HEARTBEAT_MESSAGE),
-                    },
-                )
-                continue  # always chain
-            elif continue_chaining:
-                assert self.agent_state.created_by_id is not None
-                next_input_message = Message.dict_to_message(
-                    agent_id=self.agent_state.id,
-                    model=self.model,
-                    openai_message_dict={
-                        "role": "user",  # TODO: change to system?
-                        "content": get_contine_chaining(REQ_HEARTBEAT_MESSAGE),
-                    },
+
+        return MirixUsageStatistics(**total_usage.model_dump(), step_count=step_count)
+
+    def _start_step_loop(
+        self,
+        input_messages: Union[Message, List[Message]],
+        extra_messages: Optional[List[dict]],
+        max_chaining_steps: Optional[int],
+        user_id: Optional[str],
+    ) -> Tuple[Message, List[Message], Optional[List[Message]], int, int]:
+        """Convert the step inputs and reset per-run state; shared by `step` and `step_async`."""
+
+        if user_id:
+            self.user = self.user_manager.get_user_by_id(user_id)
+
+        max_chaining_steps = max_chaining_steps or MAX_CHAINING_STEPS
+
+        first_input_message = input_messages[0]
+
+        # Convert MessageCreate objects to Message objects
+        message_objects = [prepare_input_message_create(m, self.agent_state.id, wrap_user_message=False, wrap_system_message=True) for m in input_messages]
+        
+        extra_message_objects = [prepare_input_message_create(m, self.agent_state.id, wrap_user_message=False, wrap_system_message=True) for m in extra_messages] if extra_messages is not None else None
+
+        initial_message_count = len(self.agent_manager.get_in_context_messages(agent_id=self.agent_state.id, actor=self.user))
+
+        if self.agent_state.name == 'reflexion_agent':
+            # clear previous messages
+            in_context_messages = self.agent_manager.get_in_context_messages(agent_id=self.agent_state.id, actor=self.user)
+            in_context_messages = in_context_messages[:1]
+            self.agent_manager.set_actor_in_context_messages(agent_id=self.agent_state.id, message_ids=[message.id for message in in_context_messages], actor=self.user)
+
+        return first_input_message, message_objects, extra_message_objects, initial_message_count, max_chaining_steps
+
+    def _build_topic_extraction_request(self, input_messages: List[Message]) -> Tuple[List[Message], List[dict]]:
+        """The messages and the `update_topic` function used to extract the topic of the inputs."""
+        temporary_messages = copy.deepcopy(input_messages)
+
+        temporary_messages.append(prepare_input_message_create(MessageCreate(
+            role=MessageRole.user,
+            content="The above are the inputs from the user, please look at these content and extract the topic (brief description of what the user is focusing on) from these content. If there are multiple focuses in these content, then extract them all and put them into one string separated by ';'. Call the function `update_topic` to update the topic with the extracted topics.",
+        ), self.agent_state.id, wrap_user_message=False, wrap_system_message=True))
+
+        temporary_messages = [
+            prepare_input_message_create(MessageCreate(
+                role=MessageRole.system,
+                content="You are a helpful assistant that extracts the topic from the user's input.",
+            ), self.agent_state.id, wrap_user_message=False, wrap_system_message=True),
+        ] + temporary_messages
+        
+        # Define the function for topic extraction
+        functions = [{
+            'name': 'update_topic',
+            'description': "Update the topic of the conversation/content. The topic will be used for retrieving relevant information from the database",
+            'parameters': {
+                'type': 'object',
+                'properties': {
+                    'topic': {
+                        'type': 'string', 
+                        'description': 'The topic of the current conversation/content. If there are multiple topics then separate them with ";".'}
+                },
+                'required': ['topic']
+            },
+        }]
+        return temporary_messages, functions
+
+    def _parse_extracted_topics(self, response: ChatCompletionResponse) -> Optional[str]:
+        """Read the topics from the `update_topic` call and store them on the agent if they changed."""
+        topics = None
+        for choice in response.choices:
+            if hasattr(choice.message, 'tool_calls') and choice.message.tool_calls is not None and len(choice.message.tool_calls) > 0:
+                try:
+                    function_args = json.loads(choice.message.tool_calls[0].function.arguments)
+                    topics = function_args.get('topic')
+                    break
+                except (json.JSONDecodeError, KeyError) as parse_error:
+                    self.logger.warning(f"Failed to parse topic extraction response: {parse_error}")
+                    continue
+
+        if topics is not None:
+            self.update_topic_if_changed(topics)
+        else:
+            self.logger.warning("No topics extracted from screenshots")
+        return topics
+
+    def _extract_topics(self, input_messages: List[Message]) -> Optional[str]:
+        """Ask the LLM for the topics of the inputs; returns None if extraction fails."""
+        try:
+            temporary_messages, functions = self._build_topic_extraction_request(input_messages)
+
+            # Use LLMClient to extract topics
+            llm_client = LLMClient.create(
+                llm_config=self.agent_state.llm_config,
+                put_inner_thoughts_first=True,
+            )
+            
+            if llm_client:
+                response = llm_client.send_llm_request(
+                    messages=temporary_messages,
+                    tools=functions,
+                    stream=False,
+                    force_tool_call='update_topic',
                 )
-                continue  # always chain
-            # Mirix no-op / yield
             else:
-                break
+                # Fallback to existing create function
+                response = create(
+                    llm_config=self.agent_state.llm_config,
+                    messages=temporary_messages,
+                    functions=functions,
+                    force_tool_call='update_topic',
+                )
 
-        return MirixUsageStatistics(**total_usage.model_dump(), step_count=step_count)
+            return self._parse_extracted_topics(response)
+
+        except Exception as e:
+            self.logger.info(f"Error in extracting the topic from the screenshots: {e}")
+            return None
+
+    async def _extract_topics_async(self, input_messages: List[Message]) -> Optional[str]:
+        """Async counterpart of `_extract_topics`."""
+        try:
+            temporary_messages, functions = self._build_topic_extraction_request(input_messages)
+
+            llm_client = LLMClient.create(
+                llm_config=self.agent_state.llm_config,
+                put_inner_thoughts_first=True,
+            )
+            if llm_client is None:
+                return await run_in_db_executor(self._extract_topics, input_messages)
+
+            response = await llm_client.send_llm_request_async(
+                messages=temporary_messages,
+                tools=functions,
+                force_tool_call='update_topic',
+            )
+            return await run_in_db_executor(self._parse_extracted_topics, response)
+
+        except Exception as e:
+            self.logger.info(f"Error in extracting the topic from the screenshots: {e}")
+            return None
+
+    def _next_chaining_input(
+        self,
+        step_response: AgentStepResponse,
+        counter: int,
+        max_chaining_steps: Optional[int],
+        chaining: bool,
+    ) -> Optional[Message]:
+        """The message to continue the chain with after a step, or None if the chain stops."""
+
+        continue_chaining = step_response.continue_chaining
+        function_failed = step_response.function_failed
+        token_warning = step_response.in_context_memory_warning
+
+        # Chain stops
+        if not chaining and (not function_failed):
+            self.logger.info("No chaining, stopping after one step")
+            return None
+        elif max_chaining_steps is not None and counter == max_chaining_steps:
+            # Add warning message based on agent type
+            if self.agent_state.name == "chat_agent":
+                warning_content = "[System Message] You have reached the maximum chaining steps. Please call 'send_message' to send your response to the user."
+            else:
+                warning_content = "[System Message] You have reached the maximum chaining steps. Please call 'finish_memory_update' to end the chaining."
+            # give agent one more chance to respond
+            return Message.dict_to_message(
+                agent_id=self.agent_state.id,
+                model=self.model,
+                openai_message_dict={
+                    "role": "user",
+                    "content": warning_content,
+                },
+            )
+        elif max_chaining_steps is not None and counter > max_chaining_steps:
+            self.logger.info(f"Hit max chaining steps, stopping after {counter} steps")
+            return None
+        # Chain handlers
+        elif token_warning and summarizer_settings.send_memory_warning_message:
+            assert self.agent_state.created_by_id is not None
+            return Message.dict_to_message(
+                agent_id=self.agent_state.id,
+                model=self.model,
+                openai_message_dict={
+                    "role": "user",  # TODO: change to system?
+                    "content": get_token_limit_warning(),
+                },
+            )
+        elif function_failed:
+            assert self.agent_state.created_by_id is not None
+            return Message.dict_to_message(
+                agent_id=self.agent_state.id,
+                model=self.model,
+                openai_message_dict={
+                    "role": "user",  # TODO: change to system?
+                    "content": get_contine_chaining(FUNC_FAILED_HEARTBEAT_MESSAGE),
+                },
+            )
+        elif continue_chaining:
+            assert self.agent_state.created_by_id is not None
+            return Message.dict_to_message(
+                agent_id=self.agent_state.id,
+                model=self.model,
+                openai_message_dict={
+                    "role": "user",  # TODO: change to system?
+                    "content": get_contine_chaining(REQ_HEARTBEAT_MESSAGE),
+                },
+            )
+        # Mirix no-op / yield
+        else:
+            return None
 
     def build_system_prompt_with_memories(self, raw_system: str, topics: Optional[str] = None, retrieved_memories: Optional[dict] = None) -> Tuple[str, dict]:
         """
@@ -1248,7 +1554,11 @@ class Agent(BaseAgent):
         # Retrieve core memory
         if self.agent_state.name == 'core_memory_agent' or "core" not in retrieved_memories:
             current_persisted_memory = Memory(
-                blocks=[self.block_manager.get_block_by_id(block.id, actor=self.user) for block in self.block_manager.get_blocks(actor=self.user)]
+                # Ordered by label (blocks are listed by id) so the rendered prompt is the same from run to run
+                blocks=[
+                    self.block_manager.get_block_by_id(block.id, actor=self.user)
+                    for block in sorted(self.block_manager.get_blocks(actor=self.user), key=lambda block: block.label)
+                ]
             )
             core_memory = current_persisted_memory.compile()
             retrieved_memories['core'] = core_memory
@@ -1369,7 +1679,13 @@ class Agent(BaseAgent):
     def build_system_prompt(self, retrieved_memories: dict) -> str:
         
         """Build the system prompt for the LLM API"""
-        template = """Current Time: {current_time}
+        # Core memory goes first: it changes rarely, so together with the raw system prompt it forms
+        # a stable prefix that providers with prompt caching can reuse across chained steps.
+        template = """<core_memory>
+{core_memory}
+</core_memory>
+
+Current Time: {current_time}
 
 User Focus:
 <keywords>
@@ -1377,10 +1693,6 @@ User Focus:
 </keywords>
 These keywords have been used to retrieve relevant memories from the database. 
 
-<core_memory>
-{core_memory}
-</core_memory>
-
 <episodic_memory> Most Recent Events (Orderred by Timestamp):
 {episodic_memory}
 </episodic_memory>
@@ -1460,226 +1772,346 @@ These keywords have been used to retrieve relevant memories from the database.
         return_memory_types_without_update: bool = False,
         message_queue: Optional[any] = None,
         chaining: bool = True,
+        token_callback: Optional[Callable[[str], None]] = None,
         **kwargs,
     ) -> AgentStepResponse:
         """Runs a single step in the agent loop (generates at most one LLM call)"""
 
         try:
 
-            # Step 0: get in-context messages and get the raw system prompt
-            in_context_messages = self.agent_manager.get_in_context_messages(agent_id=self.agent_state.id, actor=self.user)
-
-            assert in_context_messages[0].role == MessageRole.system
-            raw_system = in_context_messages[0].content[0].text
-
-            # Build the complete system prompt with memories
-            complete_system_prompt, retrieved_memories = self.build_system_prompt_with_memories(
-                raw_system=raw_system,
+            # Step 0 and 1: build the system prompt with memories and add the user message
+            messages, input_message_sequence, retrieved_memories = self._prepare_step_input(
+                messages=messages,
                 topics=topics,
-                retrieved_memories=retrieved_memories
+                retrieved_memories=retrieved_memories,
+                extra_messages=extra_messages,
+                initial_message_count=initial_message_count,
             )
 
-            in_context_messages[0].content[0].text = complete_system_prompt
+            # Step 2: send the conversation and available functions to the LLM
+            response = self._get_ai_reply(
+                message_sequence=input_message_sequence,
+                first_message=first_message,
+                stream=stream,
+                step_count=step_count,
+                put_inner_thoughts_first=put_inner_thoughts_first,
+                existing_file_uris=existing_file_uris,
+                token_callback=token_callback,
+            )
 
-            # Step 1: add user message
-            if isinstance(messages, Message):
-                messages = [messages]
+            # Step 3 to 6: handle the response and persist the new messages
+            return self._complete_step(
+                response=response,
+                messages=messages,
+                first_input_messge=first_input_messge,
+                stream=stream,
+                force_response=force_response,
+                retrieved_memories=retrieved_memories,
+                display_intermediate_message=display_intermediate_message,
+                request_user_confirmation=request_user_confirmation,
+                return_memory_types_without_update=return_memory_types_without_update,
+                message_queue=message_queue,
+                chaining=chaining,
+                existing_file_uris=existing_file_uris,
+            )
 
-            if not all(isinstance(m, Message) for m in messages):
-                raise ValueError(f"messages should be a Message or a list of Message, got {type(messages)}")
+        except Exception as e:
+            # Summarizes and returns if the step can be retried; re-raises otherwise
+            self._recover_from_step_error(e, messages, summarize_attempt_count, existing_file_uris)
 
-            input_message_sequence = in_context_messages + messages
+            # Try step again. It is not streamed: the failed attempt may already have streamed part of its reply,
+            # and the client would show the text twice
+            return self.inner_step(
+                messages=messages,
+                first_message=first_message,
+                first_input_messge=first_input_messge,
+                first_message_retry_limit=first_message_retry_limit,
+                skip_verify=skip_verify,
+                stream=stream,
+                metadata=metadata,
+                summarize_attempt_count=summarize_attempt_count + 1,
+                force_response=force_response,
+                extra_messages=extra_messages,
+                topics=topics,
+                retrieved_memories=retrieved_memories,
+                chaining=chaining,
+                message_queue=message_queue,
+                initial_message_count=initial_message_count,
+                return_memory_types_without_update=return_memory_types_without_update,
+                display_intermediate_message=display_intermediate_message,
+                request_user_confirmation=request_user_confirmation,
+                put_inner_thoughts_first=put_inner_thoughts_first,
+                existing_file_uris=existing_file_uris,
+                token_callback=None,
+            )
 
-            if extra_messages is not None:
-                input_message_sequence = input_message_sequence[:initial_message_count] + extra_messages + input_message_sequence[initial_message_count:]
+    async def inner_step_async(
+        self,
+        first_input_messge: Message,
+        messages: Union[Message, List[Message]],
+        first_message: bool = False,
+        step_count: Optional[int] = None,
+        summarize_attempt_count: int = 0,
+        force_response: bool = False,
+        topics: Optional[str] = None,
+        retrieved_memories: Optional[dict] = None,
+        display_intermediate_message: any = None,
+        request_user_confirmation: Optional[Callable] = None,
+        put_inner_thoughts_first: bool = True,
+        existing_file_uris: Optional[List[str]] = None,
+        extra_messages: Optional[List[dict]] = None,
+        initial_message_count: Optional[int] = None,
+        return_memory_types_without_update: bool = False,
+        message_queue: Optional[any] = None,
+        chaining: bool = True,
+        token_callback: Optional[Callable[[str], None]] = None,
+        **kwargs,
+    ) -> AgentStepResponse:
+        """Async counterpart of `inner_step`: memory retrieval, tool execution and persistence run on the DB executor."""
 
-            if len(input_message_sequence) > 1 and input_message_sequence[-1].role != "user":
-                self.logger.warning(f"{CLI_WARNING_PREFIX}Attempting to run ChatCompletion without user as the last message in the queue")
+        try:
+            messages, input_message_sequence, retrieved_memories = await run_in_db_executor(
+                self._prepare_step_input,
+                messages=messages,
+                topics=topics,
+                retrieved_memories=retrieved_memories,
+                extra_messages=extra_messages,
+                initial_message_count=initial_message_count,
+            )
 
-            # Step 2: send the conversation and available functions to the LLM
-            response = self._get_ai_reply(
+            response = await self._get_ai_reply_async(
                 message_sequence=input_message_sequence,
                 first_message=first_message,
-                stream=stream,
                 step_count=step_count,
                 put_inner_thoughts_first=put_inner_thoughts_first,
                 existing_file_uris=existing_file_uris,
+                token_callback=token_callback,
             )
 
-            # Step 3: check if LLM wanted to call a function
-            # (if yes) Step 4: call the function
-            # (if yes) Step 5: send the info on the function call and function response to LLM
-            all_response_messages = []
-            for response_choice in response.choices:
-                response_message = response_choice.message
-                tmp_response_messages, continue_chaining, function_failed = self._handle_ai_response(
-                    first_input_messge, # give the last message to the function so that other agents can see this message through funciton_calls
-                    response_message,
-                    existing_file_uris=existing_file_uris,
-                    # TODO this is kind of hacky, find a better way to handle this
-                    # the only time we set up message creation ahead of time is when streaming is on
-                    response_message_id=response.id if stream else None,
-                    force_response=force_response,
-                    retrieved_memories=retrieved_memories,
-                    display_intermediate_message=display_intermediate_message,
-                    request_user_confirmation=request_user_confirmation,
-                    return_memory_types_without_update=return_memory_types_without_update,
-                    message_queue=message_queue,
-                    chaining=chaining
-                )
-                all_response_messages.extend(tmp_response_messages)
-
-            if function_failed:
-                self.logger.info(f"Function failed with error: {all_response_messages[-1].content[0].text if all_response_messages else 'Unknown error'}")
-
-            # if function_failed:
-
-            #     inputs = self._get_ai_reply(
-            #         message_sequence=input_message_sequence,
-            #         first_message=first_message,
-            #         stream=stream,
-            #         step_count=step_count,
-            #         # extra_messages=extra_messages,
-            #         get_input_data_for_debugging=True
-            #     )
-
-            #     try:
-            #         error = json.loads(all_response_messages[-1].content[0].text)
-            #     except:
-            #         error = 'Not Known'
-
-            #     response_json = response.model_dump()
-            #     response_json.pop('created', None)
-            #     results_to_log = {
-            #         'input': inputs,
-            #         'output': response_json,
-            #         'error': error
-            #     }
-
-            #     if not os.path.exists("debug"):
-            #         os.makedirs("debug")
-            #     count = 0
-            #     while os.path.exists(f"debug/debug_{count}.json"):
-            #         count += 1
-            #     with open(f"debug/debug_{count}.json", "w") as f:
-            #         json.dump(results_to_log, f, indent=2)
-                
-            # Step 6: extend the message history
-            if len(messages) > 0:
-                all_new_messages = messages + all_response_messages
-            else:
-                all_new_messages = all_response_messages
-
-            # Check the memory pressure and potentially issue a memory pressure warning
-            current_total_tokens = response.usage.total_tokens
-            active_memory_warning = False
-
-            # We can't do summarize logic properly if context_window is undefined
-            if self.agent_state.llm_config.context_window is None:
-                # Fallback if for some reason context_window is missing, just set to the default
-                self.logger.warning(f"Could not find context_window in config, setting to default {LLM_MAX_TOKENS['DEFAULT']}")
-                self.logger.debug(f"Agent state: {self.agent_state}")
-                self.agent_state.llm_config.context_window = (
-                    LLM_MAX_TOKENS[self.model] if (self.model is not None and self.model in LLM_MAX_TOKENS) else LLM_MAX_TOKENS["DEFAULT"]
-                )
+            return await run_in_db_executor(
+                self._complete_step,
+                response=response,
+                messages=messages,
+                first_input_messge=first_input_messge,
+                force_response=force_response,
+                retrieved_memories=retrieved_memories,
+                display_intermediate_message=display_intermediate_message,
+                request_user_confirmation=request_user_confirmation,
+                return_memory_types_without_update=return_memory_types_without_update,
+                message_queue=message_queue,
+                chaining=chaining,
+                existing_file_uris=existing_file_uris,
+            )
 
-            if current_total_tokens > summarizer_settings.memory_warning_threshold * int(self.agent_state.llm_config.context_window):
-                self.logger.info(
-                    f"Memory pressure detected: last response total_tokens ({current_total_tokens}) > {summarizer_settings.memory_warning_threshold * int(self.agent_state.llm_config.context_window)}"
-                )
+        except Exception as e:
+            await run_in_db_executor(self._recover_from_step_error, e, messages, summarize_attempt_count, existing_file_uris)
 
-                # Only deliver the alert if we haven't already (this period)
-                if not self.agent_alerted_about_memory_pressure:
-                    active_memory_warning = True
-                    self.agent_alerted_about_memory_pressure = True  # it's up to the outer loop to handle this
+            return await self.inner_step_async(
+                first_input_messge=first_input_messge,
+                messages=messages,
+                first_message=first_message,
+                step_count=step_count,
+                summarize_attempt_count=summarize_attempt_count + 1,
+                force_response=force_response,
+                topics=topics,
+                retrieved_memories=retrieved_memories,
+                display_intermediate_message=display_intermediate_message,
+                request_user_confirmation=request_user_confirmation,
+                put_inner_thoughts_first=put_inner_thoughts_first,
+                existing_file_uris=existing_file_uris,
+                extra_messages=extra_messages,
+                initial_message_count=initial_message_count,
+                return_memory_types_without_update=return_memory_types_without_update,
+                message_queue=message_queue,
+                chaining=chaining,
+                # Not streamed, for the same reason as in `inner_step`
+                token_callback=None,
+            )
 
-                # if it is too long then run summarization here.
-                self.summarize_messages_inplace(existing_file_uris=existing_file_uris)
+    def _prepare_step_input(
+        self,
+        messages: Union[Message, List[Message]],
+        topics: Optional[str] = None,
+        retrieved_memories: Optional[dict] = None,
+        extra_messages: Optional[List[Message]] = None,
+        initial_message_count: Optional[int] = None,
+    ) -> Tuple[List[Message], List[Message], dict]:
+        """Build the message sequence for one step. Returns (new messages, full input sequence, retrieved memories)."""
 
-            else:
-                self.logger.debug(
-                    f"Memory usage acceptable: last response total_tokens ({current_total_tokens}) < {summarizer_settings.memory_warning_threshold * int(self.agent_state.llm_config.context_window)}"
-                )
+        # Step 0: get in-context messages and get the raw system prompt
+        in_context_messages = self.agent_manager.get_in_context_messages(agent_id=self.agent_state.id, actor=self.user)
 
-            # Log step - this must happen before messages are persisted
-            step = self.step_manager.log_step(
-                actor=self.user,
-                provider_name=self.agent_state.llm_config.model_endpoint_type,
-                model=self.agent_state.llm_config.model,
-                context_window_limit=self.agent_state.llm_config.context_window,
-                usage=response.usage,
+        assert in_context_messages[0].role == MessageRole.system
+        raw_system = in_context_messages[0].content[0].text
+
+        # Build the complete system prompt with memories
+        complete_system_prompt, retrieved_memories = self.build_system_prompt_with_memories(
+            raw_system=raw_system,
+            topics=topics,
+            retrieved_memories=retrieved_memories
+        )
+
+        in_context_messages[0].content[0].text = complete_system_prompt
+
+        # Step 1: add user message
+        if isinstance(messages, Message):
+            messages = [messages]
+
+        if not all(isinstance(m, Message) for m in messages):
+            raise ValueError(f"messages should be a Message or a list of Message, got {type(messages)}")
+
+        input_message_sequence = in_context_messages + messages
+
+        if extra_messages is not None:
+            input_message_sequence = input_message_sequence[:initial_message_count] + extra_messages + input_message_sequence[initial_message_count:]
+
+        if len(input_message_sequence) > 1 and input_message_sequence[-1].role != "user":
+            self.logger.warning(f"{CLI_WARNING_PREFIX}Attempting to run ChatCompletion without user as the last message in the queue")
+
+        return messages, input_message_sequence, retrieved_memories
+
+    def _complete_step(
+        self,
+        response: ChatCompletionResponse,
+        messages: List[Message],
+        first_input_messge: Message,
+        stream: bool = False,
+        force_response: bool = False,
+        retrieved_memories: Optional[dict] = None,
+        display_intermediate_message: any = None,
+        request_user_confirmation: Optional[Callable] = None,
+        return_memory_types_without_update: bool = False,
+        message_queue: Optional[any] = None,
+        chaining: bool = True,
+        existing_file_uris: Optional[List[str]] = None,
+    ) -> AgentStepResponse:
+        """Execute the tool calls in an LLM response, then log the step and persist the new messages."""
+
+        # Step 3: check if LLM wanted to call a function
+        # (if yes) Step 4: call the function
+        # (if yes) Step 5: send the info on the function call and function response to LLM
+        all_response_messages = []
+        for response_choice in response.choices:
+            response_message = response_choice.message
+            tmp_response_messages, continue_chaining, function_failed = self._handle_ai_response(
+                first_input_messge, # give the last message to the function so that other agents can see this message through funciton_calls
+                response_message,
+                existing_file_uris=existing_file_uris,
+                # TODO this is kind of hacky, find a better way to handle this
+                # the only time we set up message creation ahead of time is when streaming is on
+                response_message_id=response.id if stream else None,
+                force_response=force_response,
+                retrieved_memories=retrieved_memories,
+                display_intermediate_message=display_intermediate_message,
+                request_user_confirmation=request_user_confirmation,
+                return_memory_types_without_update=return_memory_types_without_update,
+                message_queue=message_queue,
+                chaining=chaining
             )
-            for message in all_new_messages:
-                message.step_id = step.id
+            all_response_messages.extend(tmp_response_messages)
+
+        if function_failed:
+            self.logger.info(f"Function failed with error: {all_response_messages[-1].content[0].text if all_response_messages else 'Unknown error'}")
+
+        # Step 6: extend the message history
+        if len(messages) > 0:
+            all_new_messages = messages + all_response_messages
+        else:
+            all_new_messages = all_response_messages
 
-            # Persisting into Messages
-            self.agent_state = self.agent_manager.append_to_in_context_messages(
-                all_new_messages, agent_id=self.agent_state.id, actor=self.user
+        # Check the memory pressure and potentially issue a memory pressure warning
+        current_total_tokens = response.usage.total_tokens
+        active_memory_warning = False
+
+        # We can't do summarize logic properly if context_window is undefined
+        if self.agent_state.llm_config.context_window is None:
+            # Fallback if for some reason context_window is missing, just set to the default
+            self.logger.warning(f"Could not find context_window in config, setting to default {LLM_MAX_TOKENS['DEFAULT']}")
+            self.logger.debug(f"Agent state: {self.agent_state}")
+            self.agent_state.llm_config.context_window = (
+                LLM_MAX_TOKENS[self.model] if (self.model is not None and self.model in LLM_MAX_TOKENS) else LLM_MAX_TOKENS["DEFAULT"]
             )
 
-            return AgentStepResponse(
-                messages=all_new_messages,
-                continue_chaining=continue_chaining,
-                function_failed=function_failed,
-                in_context_memory_warning=active_memory_warning,
-                usage=response.usage,
+        if current_total_tokens > summarizer_settings.memory_warning_threshold * int(self.agent_state.llm_config.context_window):
+            self.logger.info(
+                f"Memory pressure detected: last response total_tokens ({current_total_tokens}) > {summarizer_settings.memory_warning_threshold * int(self.agent_state.llm_config.context_window)}"
             )
 
-        except Exception as e:
-            self.logger.error(f"step() failed\nmessages = {messages}\nerror = {e}")
+            # Only deliver the alert if we haven't already (this period)
+            if not self.agent_alerted_about_memory_pressure:
+                active_memory_warning = True
+                self.agent_alerted_about_memory_pressure = True  # it's up to the outer loop to handle this
 
-            # If we got a context alert, try trimming the messages length, then try again
-            if is_context_overflow_error(e):
-                in_context_messages = self.agent_manager.get_in_context_messages(agent_id=self.agent_state.id, actor=self.user)
+            # if it is too long then run summarization here.
+            self.summarize_messages_inplace(existing_file_uris=existing_file_uris)
 
-                if summarize_attempt_count <= summarizer_settings.max_summarizer_retries:
-                    self.logger.warning(
-                        f"context window exceeded with limit {self.agent_state.llm_config.context_window}, attempting to summarize ({summarize_attempt_count}/{summarizer_settings.max_summarizer_retries}"
-                    )
-                    # A separate API call to run a summarizer
-                    self.summarize_messages_inplace(existing_file_uris=existing_file_uris)
-
-                    # Try step again
-                    return self.inner_step(
-                        messages=messages,
-                        first_message=first_message,
-                        first_input_messge=first_input_messge,
-                        first_message_retry_limit=first_message_retry_limit,
-                        skip_verify=skip_verify,
-                        stream=stream,
-                        metadata=metadata,
-                        summarize_attempt_count=summarize_attempt_count + 1,
-                        force_response=force_response,
-                        extra_messages=extra_messages,
-                        topics=topics,
-                        retrieved_memories=retrieved_memories,
-                        chaining=chaining,
-                        message_queue=message_queue,
-                        initial_message_count=initial_message_count,
-                        return_memory_types_without_update=return_memory_types_without_update,
-                        display_intermediate_message=display_intermediate_message,
-                        request_user_confirmation=request_user_confirmation,
-                        put_inner_thoughts_first=put_inner_thoughts_first,
-                        existing_file_uris=existing_file_uris,
-                    )
-                else:
-                    err_msg = f"Ran summarizer {summarize_attempt_count - 1} times for agent id={self.agent_state.id}, but messages are still overflowing the context window."
-                    token_counts = (get_token_counts_for_messages(in_context_messages),)
-                    self.logger.error(err_msg)
-                    self.logger.error(f"num_in_context_messages: {len(self.agent_state.message_ids)}")
-                    self.logger.error(f"token_counts: {token_counts}")
-                    raise ContextWindowExceededError(
-                        err_msg,
-                        details={
-                            "num_in_context_messages": len(self.agent_state.message_ids),
-                            "in_context_messages_text": [m.text for m in in_context_messages],
-                            "token_counts": token_counts,
-                        },
-                    )
+        else:
+            self.logger.debug(
+                f"Memory usage acceptable: last response total_tokens ({current_total_tokens}) < {summarizer_settings.memory_warning_threshold * int(self.agent_state.llm_config.context_window)}"
+            )
+
+        # Log step - this must happen before messages are persisted
+        step = self.step_manager.log_step(
+            actor=self.user,
+            provider_name=self.agent_state.llm_config.model_endpoint_type,
+            model=self.agent_state.llm_config.model,
+            context_window_limit=self.agent_state.llm_config.context_window,
+            usage=response.usage,
+        )
+        for message in all_new_messages:
+            message.step_id = step.id
+
+        # Persisting into Messages
+        self.agent_state = self.agent_manager.append_to_in_context_messages(
+            all_new_messages, agent_id=self.agent_state.id, actor=self.user
+        )
+
+        return AgentStepResponse(
+            messages=all_new_messages,
+            continue_chaining=continue_chaining,
+            function_failed=function_failed,
+            in_context_memory_warning=active_memory_warning,
+            usage=response.usage,
+        )
+
+    def _recover_from_step_error(
+        self,
+        e: Exception,
+        messages: Union[Message, List[Message]],
+        summarize_attempt_count: int,
+        existing_file_uris: Optional[List[str]] = None,
+    ):
+        """Summarize the in-context messages if `e` is a context overflow that may be retried; re-raise otherwise."""
+        self.logger.error(f"step() failed\nmessages = {messages}\nerror = {e}")
 
+        # If we got a context alert, try trimming the messages length, then try again
+        if is_context_overflow_error(e):
+            in_context_messages = self.agent_manager.get_in_context_messages(agent_id=self.agent_state.id, actor=self.user)
+
+            if summarize_attempt_count <= summarizer_settings.max_summarizer_retries:
+                self.logger.warning(
+                    f"context window exceeded with limit {self.agent_state.llm_config.context_window}, attempting to summarize ({summarize_attempt_count}/{summarizer_settings.max_summarizer_retries}"
+                )
+                # A separate API call to run a summarizer
+                self.summarize_messages_inplace(existing_file_uris=existing_file_uris)
             else:
-                self.logger.error(f"step() failed with an unrecognized exception: '{str(e)}'")
-                raise e
+                err_msg = f"Ran summarizer {summarize_attempt_count - 1} times for agent id={self.agent_state.id}, but messages are still overflowing the context window."
+                token_counts = (get_token_counts_for_messages(in_context_messages),)
+                self.logger.error(err_msg)
+                self.logger.error(f"num_in_context_messages: {len(self.agent_state.message_ids)}")
+                self.logger.error(f"token_counts: {token_counts}")
+                raise ContextWindowExceededError(
+                    err_msg,
+                    details={
+                        "num_in_context_messages": len(self.agent_state.message_ids),
+                        "in_context_messages_text": [m.text for m in in_context_messages],
+                        "token_counts": token_counts,
+                    },
+                )
+
+        else:
+            self.logger.error(f"step() failed with an unrecognized exception: '{str(e)}'")
+            raise e
 
     def step_user_message(self, user_message_str: str, **kwargs) -> AgentStepResponse:
         """Takes a basic user message string, turns it into a stringified JSON with extra metadata, then sends it to the agent
@@ -1916,7 +2348,8 @@ def save_agent(agent: Agent):
         tool_rules=agent_state.tool_rules,
         llm_config=agent_state.llm_config,
         embedding_config=agent_state.embedding_config,
-        message_ids=agent_state.message_ids,
+        # message_ids are left out: the in-context list is shared by all users and is only changed through
+        # the agent manager's in-context message methods, so this (possibly stale) copy must not overwrite it
         description=agent_state.description,
         metadata_=agent_state.metadata_,
         # TODO: Add this back in later
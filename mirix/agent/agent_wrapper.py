@@ -19,6 +19,7 @@ from pydub import AudioSegment
 from tqdm import tqdm
 from google import genai
 from functools import partial
+from contextlib import ExitStack, contextmanager
 from dotenv import load_dotenv
 from datetime import datetime, timezone
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -34,9 +35,10 @@ from .app_utils import encode_image_from_pil, encode_image
 from mirix.agent.message_queue import MessageQueue
 from mirix.agent.temporary_message_accumulator import TemporaryMessageAccumulator
 from mirix.agent.upload_manager import UploadManager
+from mirix.agent.user_context_pool import UserAgentContext, UserContextPool, current_user_context
 from mirix.agent.agent_states import AgentStates
 from mirix.agent.agent_configs import AGENT_CONFIGS
-from mirix.agent.app_constants import TEMPORARY_MESSAGE_LIMIT, MAXIMUM_NUM_IMAGES_IN_CLOUD, GEMINI_MODELS, OPENAI_MODELS, WITH_REFLEXION_AGENT, WITH_BACKGROUND_AGENT
+from mirix.agent.app_constants import TEMPORARY_MESSAGE_LIMIT, MAXIMUM_NUM_IMAGES_IN_CLOUD, GEMINI_MODELS, OPENAI_MODELS, WITH_REFLEXION_AGENT, WITH_BACKGROUND_AGENT, PIPELINED_ABSORPTION, ABSORPTION_MAX_IN_FLIGHT, MAX_USER_CONTEXTS
 from mirix.schemas.mirix_message import MessageType
 from mirix.schemas.user import User as PydanticUser
 from mirix import create_client
@@ -45,6 +47,7 @@ from mirix.schemas.agent import AgentType
 from mirix.prompts import gpt_system
 from mirix.schemas.memory import ChatMemory
 from mirix.settings import model_settings
+from mirix.services.db_executor import run_in_db_executor
 
 logging.basicConfig(level=logging.INFO, format='[%(name)s] %(levelname)s: %(message)s')
 
@@ -115,6 +118,14 @@ class AgentWrapper():
         self.logger = logging.getLogger(f"Mirix.AgentWrapper.{self.agent_name}")
         self.logger.setLevel(logging.INFO)
 
+        # Per-user clients, message queues and accumulators for requests made on behalf of a user
+        # (see `use_user_context`); everything else uses the wrapper's own ones set up below
+        self._user_contexts = UserContextPool(
+            self._create_user_context,
+            max_contexts=agent_config.get('max_user_contexts', MAX_USER_CONTEXTS),
+            name=self.agent_name,
+        )
+
         self.client = create_client()
         self.client.set_default_llm_config(LLMConfig.default_config("gpt-4o-mini")) 
         # self.client.set_default_embedding_config(EmbeddingConfig.default_config("text-embedding-3-small"))
@@ -254,16 +265,112 @@ class AgentWrapper():
             upload_manager=self.upload_manager,
             message_queue=self.message_queue,
             model_name=self.model_name,
-            temporary_message_limit=TEMPORARY_MESSAGE_LIMIT
+            temporary_message_limit=TEMPORARY_MESSAGE_LIMIT,
+            pipelined_absorption=agent_config.get('pipelined_absorption', PIPELINED_ABSORPTION),
+            max_in_flight_absorptions=agent_config.get('max_in_flight_absorptions', ABSORPTION_MAX_IN_FLIGHT),
         )
         
         # Pass URI tracking to accumulator
         self.temp_message_accumulator.uri_to_create_time = self.uri_to_create_time
 
+        # Let the accumulator flush buffered content on its own when the age or idle triggers fire
+        self.temp_message_accumulator.flush_callback = self._flush_buffered_content
+
         # For GEMINI models, extract all unprocessed images and fill temporary_messages
         if self.model_name in GEMINI_MODELS and self.google_client is not None:
             self._process_existing_uploaded_files()
 
+    def _user_context(self):
+        """The user context the current request runs in, if it belongs to this wrapper."""
+        context = current_user_context.get()
+        if context is not None and context.pool is self._user_contexts:
+            return context
+        return None
+
+    @property
+    def client(self):
+        context = self._user_context()
+        return context.client if context is not None else self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
+    @property
+    def message_queue(self):
+        context = self._user_context()
+        return context.message_queue if context is not None else self._message_queue
+
+    @message_queue.setter
+    def message_queue(self, message_queue):
+        self._message_queue = message_queue
+
+    @property
+    def temp_message_accumulator(self):
+        context = self._user_context()
+        return context.temp_message_accumulator if context is not None else self._temp_message_accumulator
+
+    @temp_message_accumulator.setter
+    def temp_message_accumulator(self, temp_message_accumulator):
+        self._temp_message_accumulator = temp_message_accumulator
+
+    def _create_user_context(self, user_id):
+        """Build the client, message queue and accumulator serving `user_id`."""
+        user = self._client.server.user_manager.get_user_by_id(user_id)
+        client = self._client.for_user(user)
+        message_queue = MessageQueue()
+        temp_message_accumulator = TemporaryMessageAccumulator(
+            client=client,
+            google_client=self.google_client,
+            timezone=self.timezone,
+            upload_manager=self.upload_manager,
+            message_queue=message_queue,
+            model_name=self._temp_message_accumulator.model_name,
+            temporary_message_limit=TEMPORARY_MESSAGE_LIMIT,
+            pipelined_absorption=self.agent_config.get('pipelined_absorption', PIPELINED_ABSORPTION),
+            max_in_flight_absorptions=self.agent_config.get('max_in_flight_absorptions', ABSORPTION_MAX_IN_FLIGHT),
+        )
+        temp_message_accumulator.uri_to_create_time = self.uri_to_create_time
+        temp_message_accumulator.flush_callback = partial(self._flush_user_context, user_id)
+        return UserAgentContext(user_id, client, message_queue, temp_message_accumulator)
+
+    @contextmanager
+    def use_user_context(self, user_id):
+        """
+        Run the enclosed code on behalf of `user_id`: `client`, `message_queue` and `temp_message_accumulator`
+        resolve to the user's own ones, so requests of different users proceed concurrently without
+        sharing queues, buffers or the client's actor.
+        """
+        with self._user_contexts.acquire(user_id) as context:
+            token = current_user_context.set(context)
+            try:
+                yield context
+            finally:
+                current_user_context.reset(token)
+
+    def run_as_user(self, user_id, fn, /, *args, **kwargs):
+        """Call `fn(*args, **kwargs)` inside the user context of `user_id` (`kwargs` may include a `user_id` of its own)."""
+        with self.use_user_context(user_id):
+            return fn(*args, **kwargs)
+
+    async def run_as_user_async(self, user_id, fn, /, *args, **kwargs):
+        """
+        Await `fn(*args, **kwargs)` inside the user context of `user_id`. The context is checked out and
+        returned on the DB executor, since creating a user's context reads the database.
+        """
+        contexts = ExitStack()
+        context = await run_in_db_executor(contexts.enter_context, self._user_contexts.acquire(user_id))
+        token = current_user_context.set(context)
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            current_user_context.reset(token)
+            await run_in_db_executor(contexts.close)
+
+    def _flush_user_context(self, user_id):
+        with self.use_user_context(user_id):
+            self._flush_buffered_content()
+
     def update_chat_agent_system_prompt(self, is_screen_monitoring: bool):
         '''
         Update chat agent system prompt based on screen monitoring status
@@ -449,11 +556,11 @@ class AgentWrapper():
             existing_image_names = set([file.name for file in existing_files])
 
             # update the database, delete the files that are in the database but got deleted somehow (potentially due to the calls unrelated to Mirix) in the cloud
-            for file_name in self.client.server.cloud_file_mapping_manager.list_all_cloud_file_ids():
-                if file_name not in existing_image_names:
-                    self.client.server.cloud_file_mapping_manager.delete_mapping(cloud_file_id=file_name)
-                else:
-                    assert file_name in existing_image_names
+            stale_file_names = [
+                file_name for file_name in self.client.server.cloud_file_mapping_manager.list_all_cloud_file_ids()
+                if file_name not in existing_image_names
+            ]
+            self.client.server.cloud_file_mapping_manager.delete_many_mappings(cloud_file_ids=stale_file_names)
 
             # after this: every file in database, we can find it in the cloud
             # i.e., local database <= cloud
@@ -647,7 +754,9 @@ class AgentWrapper():
 
         count = 0
         for mapping in uploaded_mappings:
-            file_ref = [file for file in self.existing_files if file.name == mapping.cloud_file_id][0]
+            file_ref = self.upload_manager.file_registry.get(mapping.cloud_file_id)
+            if file_ref is None:
+                continue
 
             self.temp_message_accumulator.temporary_messages.append(
                 (mapping.timestamp, {'image_uris': [file_ref],
@@ -660,12 +769,15 @@ class AgentWrapper():
                 count = 0
 
     def delete_files(self, file_names, google_client):
+        deleted_file_names = []
         for file_name in file_names:
             try:
                 google_client.files.delete(name=file_name)
-                self.client.server.cloud_file_mapping_manager.delete_mapping(cloud_file_id=file_name)
+                deleted_file_names.append(file_name)
             except:
                 continue
+        if deleted_file_names:
+            self.client.server.cloud_file_mapping_manager.delete_many_mappings(cloud_file_ids=deleted_file_names)
 
     def set_timezone(self, timezone_str):
         """
@@ -901,6 +1013,8 @@ class AgentWrapper():
         # Update temp_message_accumulator needs_upload based on the new model
         if hasattr(self, 'temp_message_accumulator'):
             self.temp_message_accumulator.update_model(new_model)
+        for context in self._user_contexts.contexts():
+            context.temp_message_accumulator.update_model(new_model)
         
         # Determine required keys based on model type
         required_keys = []
@@ -1017,6 +1131,8 @@ class AgentWrapper():
 
             for x in files_to_delete:
                 del self.uri_to_create_time[x[0]]
+                if self.upload_manager is not None:
+                    self.upload_manager.file_registry.remove(x[0])
 
             self.logger.info(f"Deleting files: {file_names_to_delete}")
             # Only attempt to delete if google_client is initialized
@@ -1025,23 +1141,28 @@ class AgentWrapper():
             else:
                 self.logger.warning("Warning: Cannot delete files from Google Cloud - Gemini client not initialized")
 
-    def reflexion_on_memory(self):
+    def reflexion_on_memory(self, user_id=None, progress_callback=None):
         """
         Run the reflexion process with comprehensive memory analysis:
         1. Call specific agents to remove redundancy in each memory type (episodic, semantic, core, resource, procedural, knowledge vault)
         2. Call reflexion agent to identify and resolve potential conflicts between memories
         3. Call agents to identify patterns and analyze new memories
+
+        Args:
+            user_id: The user whose memories are reorganized (default: the client's user)
+            progress_callback: Called with the phase and agent before each agent call; a background job's
+                callback raises when the job was cancelled, which stops the process between agent calls
         """
         
         self.logger.info("Starting comprehensive reflexion on memory...")
         
         # Step 1: Call specific memory agents to remove redundancy
         self.logger.info("Step 1: Calling memory agents to remove redundancy...")
-        redundancy_results = self._call_agents_to_remove_redundancy()
+        redundancy_results = self._call_agents_to_remove_redundancy(user_id, progress_callback)
         
         # Step 2: Call reflexion agent to identify and resolve conflicts
         self.logger.info("Step 2: Calling reflexion agent to resolve conflicts...")
-        conflict_results = self._call_reflexion_agent_for_conflicts()
+        conflict_results = self._call_reflexion_agent_for_conflicts(user_id, progress_callback)
         
         # Step 3: Call agents to connect memories. 
         # connect("epi_id", "sem_id")
@@ -1049,7 +1170,7 @@ class AgentWrapper():
 
         # Step 4: Call agents to identify patterns and create new memories
         self.logger.info("Step 3: Calling agents to analyze patterns and create insights...")
-        pattern_results = self._call_agents_for_pattern_analysis()
+        pattern_results = self._call_agents_for_pattern_analysis(user_id, progress_callback)
         
         # Final summary
         final_summary = {
@@ -1061,11 +1182,16 @@ class AgentWrapper():
         self.logger.info("Reflexion process completed with actual agent actions.")
         return final_summary
 
-    def _call_agents_to_remove_redundancy(self):
+    def _report_reflexion_progress(self, progress_callback, phase, step):
+        if progress_callback is not None:
+            progress_callback({'phase': phase, 'step': step})
+
+    def _call_agents_to_remove_redundancy(self, user_id=None, progress_callback=None):
         """Call specific memory agents to actually remove redundancy in their respective memory types"""
         redundancy_results = {}
         
         # Call episodic memory agent to remove redundancy
+        self._report_reflexion_progress(progress_callback, 'redundancy', 'episodic')
         self.logger.info("Calling episodic memory agent to remove redundancy...")
         try:
             message = "Please review your episodic memories and remove any redundant or duplicate entries. Look for similar events, overlapping timeframes, or repeated information. Merge similar memories where appropriate and delete exact duplicates. Focus on maintaining the most informative and comprehensive version of each memory."
@@ -1073,7 +1199,7 @@ class AgentWrapper():
             response, _ = self.message_queue.send_message_in_queue(
                 self.client,
                 self.agent_states.episodic_memory_agent_state.id,
-                {'message': message},
+                {'message': message, 'user_id': user_id},
                 agent_type='episodic_memory',
             )
             redundancy_results['episodic'] = response
@@ -1082,6 +1208,7 @@ class AgentWrapper():
             redundancy_results['episodic'] = f"Error: {e}"
         
         # Call semantic memory agent to remove redundancy
+        self._report_reflexion_progress(progress_callback, 'redundancy', 'semantic')
         self.logger.info("Calling semantic memory agent to remove redundancy...")
         try:
             message = "Please review your semantic memories and eliminate redundancy. Look for duplicate concepts, overlapping knowledge entries, or repetitive information. Consolidate similar semantic items and remove exact duplicates while preserving the most complete and accurate information."
@@ -1089,7 +1216,7 @@ class AgentWrapper():
             response, _ = self.message_queue.send_message_in_queue(
                 self.client,
                 self.agent_states.semantic_memory_agent_state.id,
-                {'message': message},
+                {'message': message, 'user_id': user_id},
                 agent_type='semantic_memory',
             )
             redundancy_results['semantic'] = response
@@ -1098,6 +1225,7 @@ class AgentWrapper():
             redundancy_results['semantic'] = f"Error: {e}"
         
         # Call core memory agent to remove redundancy
+        self._report_reflexion_progress(progress_callback, 'redundancy', 'core')
         self.logger.info("Calling core memory agent to remove redundancy...")
         try:
             message = "Please review the core memory blocks and remove any redundant or overlapping content. Look for duplicate information across different blocks, consolidate related content, and ensure each block contains unique and essential information without unnecessary repetition."
@@ -1105,7 +1233,7 @@ class AgentWrapper():
             response, _ = self.message_queue.send_message_in_queue(
                 self.client,
                 self.agent_states.core_memory_agent_state.id,
-                {'message': message},
+                {'message': message, 'user_id': user_id},
                 agent_type='core_memory',
             )
             redundancy_results['core'] = response
@@ -1114,6 +1242,7 @@ class AgentWrapper():
             redundancy_results['core'] = f"Error: {e}"
         
         # Call resource memory agent to remove redundancy
+        self._report_reflexion_progress(progress_callback, 'redundancy', 'resource')
         self.logger.info("Calling resource memory agent to remove redundancy...")
         try:
             message = "Please review your resource memories and remove redundant entries. Look for duplicate files, similar documents, or repeated resource information. Consolidate similar resources and remove exact duplicates while maintaining the most useful and comprehensive versions."
@@ -1121,7 +1250,7 @@ class AgentWrapper():
             response, _ = self.message_queue.send_message_in_queue(
                 self.client,
                 self.agent_states.resource_memory_agent_state.id,
-                {'message': message},
+                {'message': message, 'user_id': user_id},
                 agent_type='resource_memory',
             )
             redundancy_results['resource'] = response
@@ -1130,6 +1259,7 @@ class AgentWrapper():
             redundancy_results['resource'] = f"Error: {e}"
         
         # Call procedural memory agent to remove redundancy
+        self._report_reflexion_progress(progress_callback, 'redundancy', 'procedural')
         self.logger.info("Calling procedural memory agent to remove redundancy...")
         try:
             message = "Please review your procedural memories and eliminate redundancy. Look for duplicate procedures, overlapping step sequences, or repetitive process information. Merge similar procedures and remove exact duplicates while preserving the most accurate and complete procedural knowledge."
@@ -1137,7 +1267,7 @@ class AgentWrapper():
             response, _ = self.message_queue.send_message_in_queue(
                 self.client,
                 self.agent_states.procedural_memory_agent_state.id,
-                {'message': message},
+                {'message': message, 'user_id': user_id},
                 agent_type='procedural_memory',
             )
             redundancy_results['procedural'] = response
@@ -1146,6 +1276,7 @@ class AgentWrapper():
             redundancy_results['procedural'] = f"Error: {e}"
         
         # Call knowledge vault agent to remove redundancy
+        self._report_reflexion_progress(progress_callback, 'redundancy', 'knowledge_vault')
         self.logger.info("Calling knowledge vault agent to remove redundancy...")
         try:
             message = "Please review your knowledge vault entries and remove redundant information. Look for duplicate credentials, repeated sensitive information, or overlapping security-related data. Consolidate similar entries and remove exact duplicates while maintaining security and completeness."
@@ -1153,7 +1284,7 @@ class AgentWrapper():
             response, _ = self.message_queue.send_message_in_queue(
                 self.client,
                 self.agent_states.knowledge_vault_agent_state.id,
-                {'message': message},
+                {'message': message, 'user_id': user_id},
                 agent_type='knowledge_vault',
             )
             redundancy_results['knowledge_vault'] = response
@@ -1163,8 +1294,9 @@ class AgentWrapper():
         
         return redundancy_results
 
-    def _call_reflexion_agent_for_conflicts(self):
+    def _call_reflexion_agent_for_conflicts(self, user_id=None, progress_callback=None):
         """Call reflexion agent to identify and resolve conflicts between memories"""
+        self._report_reflexion_progress(progress_callback, 'conflicts', 'reflexion')
         self.logger.info("Calling reflexion agent to resolve memory conflicts...")
         
         try:
@@ -1192,7 +1324,7 @@ Please perform these actions and provide a comprehensive report of all conflict
             response, _ = self.message_queue.send_message_in_queue(
                 self.client,
                 self.agent_states.reflexion_agent_state.id,
-                {'message': message},
+                {'message': message, 'user_id': user_id},
                 agent_type='reflexion',
             )
             return response
@@ -1201,11 +1333,12 @@ Please perform these actions and provide a comprehensive report of all conflict
             self.logger.error(f"Error calling reflexion agent for conflicts: {e}")
             return f"Error: {e}"
 
-    def _call_agents_for_pattern_analysis(self):
+    def _call_agents_for_pattern_analysis(self, user_id=None, progress_callback=None):
         """Call agents to identify patterns and create new insights"""
         pattern_results = {}
         
         # Call reflexion agent for overall pattern analysis
+        self._report_reflexion_progress(progress_callback, 'patterns', 'reflexion_patterns')
         self.logger.info("Calling reflexion agent for pattern analysis...")
         try:
             message = """Please analyze patterns across all memory types and generate new insights:
@@ -1233,7 +1366,7 @@ Please perform this analysis and create new memories as appropriate. Provide a d
             response, _ = self.message_queue.send_message_in_queue(
                 self.client,
                 self.agent_states.reflexion_agent_state.id,
-                {'message': message},
+                {'message': message, 'user_id': user_id},
                 agent_type='reflexion',
             )
             pattern_results['reflexion_patterns'] = response
@@ -1243,6 +1376,7 @@ Please perform this analysis and create new memories as appropriate. Provide a d
             pattern_results['reflexion_patterns'] = f"Error: {e}"
         
         # Call semantic memory agent for new connections
+        self._report_reflexion_progress(progress_callback, 'patterns', 'semantic_connections')
         self.logger.info("Calling semantic memory agent for new connections...")
         try:
             message = "Based on recent episodic memories and existing semantic knowledge, please identify new semantic connections and create new semantic memories that capture emerging patterns, relationships, or insights. Look for connections between concepts that weren't previously linked."
@@ -1250,7 +1384,7 @@ Please perform this analysis and create new memories as appropriate. Provide a d
             response, _ = self.message_queue.send_message_in_queue(
                 self.client,
                 self.agent_states.semantic_memory_agent_state.id,
-                {'message': message},
+                {'message': message, 'user_id': user_id},
                 agent_type='semantic_memory',
             )
             pattern_results['semantic_connections'] = response
@@ -1260,6 +1394,7 @@ Please perform this analysis and create new memories as appropriate. Provide a d
             pattern_results['semantic_connections'] = f"Error: {e}"
         
         # Call meta memory agent for high-level insights
+        self._report_reflexion_progress(progress_callback, 'patterns', 'meta_insights')
         self.logger.info("Calling meta memory agent for high-level insights...")
         try:
             message = "Please analyze the overall memory system and generate meta-insights about memory usage patterns, knowledge gaps, and opportunities for memory optimization. Create new meta-memories that capture these high-level observations about the memory system itself."
@@ -1267,7 +1402,7 @@ Please perform this analysis and create new memories as appropriate. Provide a d
             response, _ = self.message_queue.send_message_in_queue(
                 self.client,
                 self.agent_states.meta_memory_agent_state.id,
-                {'message': message},
+                {'message': message, 'user_id': user_id},
                 agent_type='meta_memory',
             )
             pattern_results['meta_insights'] = response
@@ -1637,16 +1772,13 @@ Please perform this analysis and create new memories as appropriate. Provide a d
                       force_absorb_content=False,
                       async_upload=True,
                       is_screen_monitoring=False,
-                      user_id=None):
+                      user_id=None,
+                      token_callback=None):
 
         # Check if Gemini features are required but not available
-        if self.model_name in GEMINI_MODELS and not self.is_gemini_client_initialized():
-            if images is not None or image_uris is not None or voice_files is not None:
-                self.logger.warning("Warning: Gemini API key not configured. Image and voice features are unavailable.")
-                self.logger.warning("Please provide a Gemini API key through the frontend to enable these features.")
-                # For now, proceed with text-only message if available
-                if message is None:
-                    return "Error: Gemini API key required for image/voice features. Please configure it in the settings."
+        error = self._check_gemini_features(message, images, image_uris, voice_files)
+        if error is not None:
+            return error
         
         if memorizing:
             
@@ -1678,152 +1810,213 @@ Please perform this analysis and create new memories as appropriate. Provide a d
                 },
                 timestamp,
                 delete_after_upload=delete_after_upload,
-                async_upload=async_upload
+                async_upload=async_upload,
+                user_id=user_id,
             )
             
-            # Check if we should trigger memory absorption
-            ready_messages = self.temp_message_accumulator.should_absorb_content()
-            if force_absorb_content or ready_messages:
-                t1 = time.time()
-                # Pass the ready messages to absorb_content_into_memory if availabl, user_id=user_ide
-                if ready_messages:
-                    self.temp_message_accumulator.absorb_content_into_memory(self.agent_states, ready_messages, user_id=user_id)
-                else:
-                    # Force absorb with whatever is available
-                    self.temp_message_accumulator.absorb_content_into_memory(self.agent_states, user_id=user_id)
+            # Check if we should trigger memory absorption (count, token budget, age or idle gap)
+            t1 = time.time()
+            absorbed = self.temp_message_accumulator.absorb_if_ready(
+                self.agent_states, force=force_absorb_content, user_id=user_id
+            )
+            if absorbed:
                 t2 = time.time()
                 self.logger.info(f"Time taken to absorb content into memory: {t2 - t1} seconds")
                 self.clear_old_screenshots()
 
         else:
 
-            if image_uris is not None:
-                if isinstance(message, str):
-                    message = [{'type': 'text', 'text': message}]
-                for image_uri in image_uris:
-                    mime_type = get_image_mime_type(image_uri)
-                    message.append({'type': 'image_data', 'image_data': {'data': f"data:{mime_type};base64,{encode_image(image_uri)}", 'detail': 'auto'}})
+            message, extra_messages = self._build_chat_input(message, image_uris)
 
-            # Only get recent images for chat context if user has enabled this feature
-            if self.include_recent_screenshots:
+            # get the response according to the message
+            response, _ = self.message_queue.send_message_in_queue(
+                self.client,
+                self.agent_states.agent_state.id,
+                self._chat_payload(message, extra_messages, display_intermediate_message, request_user_confirmation, user_id, token_callback),
+                agent_type='chat',
+            )
 
-                if isinstance(message, str):
-                    message = [{'type': 'text', 'text': message}]
+            return self._handle_chat_response(message, response, is_screen_monitoring, user_id)
 
-                extra_messages = []
+    async def send_message_async(self,
+                                 message=None,
+                                 image_uris=None,
+                                 display_intermediate_message=None,
+                                 request_user_confirmation=None,
+                                 is_screen_monitoring=False,
+                                 user_id=None,
+                                 token_callback=None):
+        """
+        Async counterpart of `send_message` for chat messages, used by the HTTP server: the chat agent steps on
+        the caller's event loop instead of holding a worker thread, and the blocking preparation (encoding
+        images, reading the accumulator) runs on the DB executor. Content to memorize goes through `send_message`.
+        """
+        error = self._check_gemini_features(message, None, image_uris, None)
+        if error is not None:
+            return error
+
+        message, extra_messages = await run_in_db_executor(self._build_chat_input, message, image_uris)
+
+        # get the response according to the message
+        response, _ = await self.message_queue.send_message_in_queue_async(
+            self.client,
+            self.agent_states.agent_state.id,
+            self._chat_payload(message, extra_messages, display_intermediate_message, request_user_confirmation, user_id, token_callback),
+            agent_type='chat',
+        )
 
-                most_recent_images = self.temp_message_accumulator.get_recent_images_for_chat(current_timestamp=datetime.now(self.timezone))
+        return await run_in_db_executor(self._handle_chat_response, message, response, is_screen_monitoring, user_id)
 
-                if len(most_recent_images) > 0:
+    def _check_gemini_features(self, message, images, image_uris, voice_files):
+        """An error message when the request needs Gemini features that are not configured, otherwise None."""
+        if self.model_name in GEMINI_MODELS and not self.is_gemini_client_initialized():
+            if images is not None or image_uris is not None or voice_files is not None:
+                self.logger.warning("Warning: Gemini API key not configured. Image and voice features are unavailable.")
+                self.logger.warning("Please provide a Gemini API key through the frontend to enable these features.")
+                # For now, proceed with text-only message if available
+                if message is None:
+                    return "Error: Gemini API key required for image/voice features. Please configure it in the settings."
+        return None
 
-                    extra_messages.append({
-                        'type': 'text',
-                        'text': f"Additional images (screenshots) from the system start here:"
-                    })
+    def _build_chat_input(self, message, image_uris):
+        """Attach the uploaded images to a chat message, and build the extra messages with the recent screenshots."""
+        if image_uris is not None:
+            if isinstance(message, str):
+                message = [{'type': 'text', 'text': message}]
+            for image_uri in image_uris:
+                mime_type = get_image_mime_type(image_uri)
+                message.append({'type': 'image_data', 'image_data': {'data': f"data:{mime_type};base64,{encode_image(image_uri)}", 'detail': 'auto'}})
 
-                    for idx, (timestamp, file_ref, source) in enumerate(most_recent_images):
-                        
-                        if hasattr(file_ref, 'uri'):
+        # Only get recent images for chat context if user has enabled this feature
+        if self.include_recent_screenshots:
+
+            if isinstance(message, str):
+                message = [{'type': 'text', 'text': message}]
+
+            extra_messages = []
+
+            most_recent_images = self.temp_message_accumulator.get_recent_images_for_chat(current_timestamp=datetime.now(self.timezone))
+
+            if len(most_recent_images) > 0:
+
+                extra_messages.append({
+                    'type': 'text',
+                    'text': f"Additional images (screenshots) from the system start here:"
+                })
+
+                for idx, (timestamp, file_ref, source) in enumerate(most_recent_images):
+                    
+                    if hasattr(file_ref, 'uri'):
+                        source_text = f"; Screenshot from App: {source}" if source else ""
+                        extra_messages.append({
+                            'type': 'text',
+                            'text': f"Timestamp: {timestamp}; Image Index {idx}" + source_text
+                        })
+                        extra_messages.append({
+                            'type': 'google_cloud_file_uri',
+                            'google_cloud_file_uri': file_ref.uri
+                        })
+                    else:
+                        # For non-GEMINI models, convert local file paths to base64
+                        try:
                             source_text = f"; Screenshot from App: {source}" if source else ""
                             extra_messages.append({
                                 'type': 'text',
                                 'text': f"Timestamp: {timestamp}; Image Index {idx}" + source_text
                             })
+                            mime_type = get_image_mime_type(file_ref)
+                            base64_data = encode_image(file_ref)
                             extra_messages.append({
-                                'type': 'google_cloud_file_uri',
-                                'google_cloud_file_uri': file_ref.uri
+                                'type': 'image_data',
+                                'image_data': {
+                                    'data': f"data:{mime_type};base64,{base64_data}",
+                                    'detail': 'auto'
+                                }
                             })
-                        else:
-                            # For non-GEMINI models, convert local file paths to base64
-                            try:
-                                source_text = f"; Screenshot from App: {source}" if source else ""
-                                extra_messages.append({
-                                    'type': 'text',
-                                    'text': f"Timestamp: {timestamp}; Image Index {idx}" + source_text
-                                })
-                                mime_type = get_image_mime_type(file_ref)
-                                base64_data = encode_image(file_ref)
-                                extra_messages.append({
-                                    'type': 'image_data',
-                                    'image_data': {
-                                        'data': f"data:{mime_type};base64,{base64_data}",
-                                        'detail': 'auto'
-                                    }
-                                })
-                            except Exception as e:
-                                self.logger.error(f"Failed to encode image for chat context: {file_ref}, error: {e}")
-                                # Skip this image if encoding fails
-                                continue
-                    
-                    extra_messages.append({
-                        'type': 'text',
-                        'text': f"Additional images (screenshots) from the system end here."
-                    })
+                        except Exception as e:
+                            self.logger.error(f"Failed to encode image for chat context: {file_ref}, error: {e}")
+                            # Skip this image if encoding fails
+                            continue
+                
+                extra_messages.append({
+                    'type': 'text',
+                    'text': f"Additional images (screenshots) from the system end here."
+                })
 
-                extra_messages = None if len(extra_messages) == 0 else extra_messages
+            extra_messages = None if len(extra_messages) == 0 else extra_messages
 
-            else:
-                extra_messages = None
+        else:
+            extra_messages = None
 
-            # get the response according to the message
-            response, _ = self.message_queue.send_message_in_queue(
-                self.client,
-                self.agent_states.agent_state.id,
-                {
-                    'user_id': user_id,
-                    'message': message,
-                    'display_intermediate_message': display_intermediate_message,
-                    'request_user_confirmation': request_user_confirmation,
-                    'force_response': True,
-                    'existing_file_uris': set(list(self.uri_to_create_time.keys())),
-                    'extra_messages': extra_messages,
-                }, 
-                agent_type='chat',
-            )
+        return message, extra_messages
 
-            # Check if response is an error string
-            if response == "ERROR":
-                return "ERROR_RESPONSE_FAILED"
-            
-            # Check if response has the expected structure
-            if not hasattr(response, 'messages') or len(response.messages) < 2:
-                return "ERROR_INVALID_RESPONSE_STRUCTURE"
-            
-            try:
+    def _chat_payload(self, message, extra_messages, display_intermediate_message, request_user_confirmation, user_id, token_callback):
+        return {
+            'user_id': user_id,
+            'message': message,
+            'display_intermediate_message': display_intermediate_message,
+            'request_user_confirmation': request_user_confirmation,
+            'stream_tokens': token_callback is not None,
+            'token_callback': token_callback,
+            'force_response': True,
+            'existing_file_uris': set(list(self.uri_to_create_time.keys())),
+            'extra_messages': extra_messages,
+        }
 
-                # find how many tools are called
-                num_tools_called = 0
-                for message in response.messages[::-1]:
-                    if message.message_type == MessageType.tool_return_message:
-                        num_tools_called += 1
-                    else:
-                        break
+    def _handle_chat_response(self, message, response, is_screen_monitoring, user_id):
+        """The reply text of the chat agent (or an error code), after recording the exchange for memory absorption."""
+        # Check if response is an error string
+        if response == "ERROR":
+            return "ERROR_RESPONSE_FAILED"
+        
+        # Check if response has the expected structure
+        if not hasattr(response, 'messages') or len(response.messages) < 2:
+            return "ERROR_INVALID_RESPONSE_STRUCTURE"
+        
+        try:
 
-                # Check if the message has tool_call attribute
-                # 1->3; 2->5
-                if not hasattr(response.messages[-(num_tools_called * 2 + 1)], 'tool_call'):
-                    return "ERROR_NO_TOOL_CALL"
-                
-                tool_call = response.messages[-(num_tools_called * 2 + 1)].tool_call
-                
-                parsed_args = parse_json(tool_call.arguments)
-                
-                if 'message' not in parsed_args:
-                    return "ERROR_NO_MESSAGE_IN_ARGS"
-                    
-                response_text = parsed_args['message']
+            # find how many tools are called
+            num_tools_called = 0
+            for message in response.messages[::-1]:
+                if message.message_type == MessageType.tool_return_message:
+                    num_tools_called += 1
+                else:
+                    break
+
+            # Check if the message has tool_call attribute
+            # 1->3; 2->5
+            if not hasattr(response.messages[-(num_tools_called * 2 + 1)], 'tool_call'):
+                return "ERROR_NO_TOOL_CALL"
+            
+            tool_call = response.messages[-(num_tools_called * 2 + 1)].tool_call
+            
+            parsed_args = parse_json(tool_call.arguments)
+            
+            if 'message' not in parsed_args:
+                return "ERROR_NO_MESSAGE_IN_ARGS"
                 
-            except (AttributeError, KeyError, IndexError, json.JSONDecodeError) as e:
-                return "ERROR_PARSING_EXCEPTION"
+            response_text = parsed_args['message']
             
-            # Add conversation to accumulator
-            self.temp_message_accumulator.add_user_conversation(message, response_text)
+        except (AttributeError, KeyError, IndexError, json.JSONDecodeError) as e:
+            return "ERROR_PARSING_EXCEPTION"
+        
+        # Add conversation to accumulator
+        self.temp_message_accumulator.add_user_conversation(message, response_text)
 
-            if not is_screen_monitoring:
-                # we need to call meta memory manager to update the memory
-                self.temp_message_accumulator.absorb_content_into_memory(self.agent_states, user_id=user_id)
-            
-            return response_text
+        if not is_screen_monitoring:
+            # we need to call meta memory manager to update the memory
+            self.temp_message_accumulator.absorb_content_into_memory(self.agent_states, user_id=user_id)
+        
+        return response_text
+
+    def _flush_buffered_content(self):
+        """Called by the accumulator's timer when buffered content has aged out or gone idle."""
+        try:
+            # Each buffered item carries the user it was added for
+            if self.temp_message_accumulator.absorb_if_ready(self.agent_states):
+                self.clear_old_screenshots()
+        except Exception as e:
+            self.logger.error(f"Background absorption failed: {e}")
 
     def cleanup_upload_workers(self):
         """Delegate to UploadManager for cleanup."""
@@ -2001,9 +2194,11 @@ Please perform this analysis and create new memories as appropriate. Provide a d
             self.logger.info(f"# of Existing files in Google Clouds: {len(existing_image_names)}")
 
             # Sync database with cloud files
-            for file_name in self.client.server.cloud_file_mapping_manager.list_all_cloud_file_ids():
-                if file_name not in existing_image_names:
-                    self.client.server.cloud_file_mapping_manager.delete_mapping(cloud_file_id=file_name)
+            stale_file_names = [
+                file_name for file_name in self.client.server.cloud_file_mapping_manager.list_all_cloud_file_ids()
+                if file_name not in existing_image_names
+            ]
+            self.client.server.cloud_file_mapping_manager.delete_many_mappings(cloud_file_ids=stale_file_names)
 
             cloud_file_names_in_database_set = set(self.client.server.cloud_file_mapping_manager.list_all_cloud_file_ids())
 
@@ -2023,9 +2218,10 @@ Please perform this analysis and create new memories as appropriate. Provide a d
             self.upload_manager = UploadManager(self.google_client, self.client, self.existing_files, self.uri_to_create_time)
             
             # Update temporary message accumulator
-            self.temp_message_accumulator.google_client = self.google_client
-            self.temp_message_accumulator.upload_manager = self.upload_manager
-            self.temp_message_accumulator.uri_to_create_time = self.uri_to_create_time
+            for accumulator in [self._temp_message_accumulator] + [context.temp_message_accumulator for context in self._user_contexts.contexts()]:
+                accumulator.google_client = self.google_client
+                accumulator.upload_manager = self.upload_manager
+                accumulator.uri_to_create_time = self.uri_to_create_time
             
             # Process existing uploaded files
             self._process_existing_uploaded_files()
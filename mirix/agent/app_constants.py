@@ -1,4 +1,23 @@
 TEMPORARY_MESSAGE_LIMIT = 20
+
+# Adaptive absorption: besides TEMPORARY_MESSAGE_LIMIT, absorb once buffered content reaches
+# the token budget, the oldest item reaches the max age, or no new content arrives for the idle gap
+ABSORPTION_TOKEN_BUDGET = 32000
+ABSORPTION_MAX_AGE_SECONDS = 300
+ABSORPTION_IDLE_GAP_SECONDS = 60
+ABSORPTION_IMAGE_TOKEN_ESTIMATE = 1000
+ABSORPTION_AUDIO_TOKENS_PER_SECOND = 32
+# How soon to re-check when a trigger fired but the buffered content was still waiting on uploads
+ABSORPTION_RECHECK_SECONDS = 5
+
+# Pipelined absorption: overlap preprocessing, dispatch and cleanup of consecutive batches,
+# with at most ABSORPTION_MAX_IN_FLIGHT batches in the pipeline at once
+PIPELINED_ABSORPTION = False
+ABSORPTION_MAX_IN_FLIGHT = 2
+
+# Concurrent users: each user gets its own client, message queue and accumulator; at most
+# MAX_USER_CONTEXTS of them are kept, least recently used idle ones are dropped first
+MAX_USER_CONTEXTS = 32
 MAXIMUM_NUM_IMAGES_IN_CLOUD = 600
 
 GEMINI_MODELS = ['gemini-2.0-flash', 'gemini-2.5-flash-lite', 'gemini-1.5-pro', 'gemini-2.0-flash-lite', 'gemini-2.5-flash']
@@ -8,6 +27,9 @@ STUCK_TIMEOUT = 10
 RUNNING_TIMEOUT = 30
 TOTAL_TIMEOUT = 60
 
+# Seconds before a pending Gemini file upload is marked as failed
+UPLOAD_TIMEOUT = 10
+
 SKIP_META_MEMORY_MANAGER = False
 
 # Whether to use the reflexion agent
@@ -0,0 +1,91 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+
+class DeadlineScheduler:
+    """
+    Single-threaded, heap-based scheduler for deadline callbacks.
+    One daemon thread sleeps until the earliest deadline instead of one sleeping thread per deadline.
+    """
+
+    def __init__(self, name="deadline_scheduler"):
+        self.name = name
+        self.logger = logging.getLogger(f"Mirix.DeadlineScheduler.{name}")
+
+        # Heap of (deadline, seq) and seq -> callback for pending deadlines
+        self._heap = []
+        self._callbacks = {}
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def schedule(self, delay, callback):
+        """Run `callback()` after `delay` seconds. Returns a handle usable with `cancel`."""
+        deadline = time.monotonic() + delay
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError(f"DeadlineScheduler {self.name} has been shut down")
+            handle = next(self._counter)
+            self._callbacks[handle] = callback
+            heapq.heappush(self._heap, (deadline, handle))
+            self._ensure_thread()
+            # Wake the worker only if this became the earliest deadline
+            if self._heap[0][1] == handle:
+                self._condition.notify()
+        return handle
+
+    def cancel(self, handle):
+        """Cancel a pending deadline. Returns True if it had not fired yet."""
+        with self._condition:
+            # The heap entry is dropped lazily when it reaches the top
+            return self._callbacks.pop(handle, None) is not None
+
+    def pending_count(self):
+        """Number of deadlines that are scheduled and not yet fired or cancelled."""
+        with self._condition:
+            return len(self._callbacks)
+
+    def shutdown(self):
+        """Stop the worker thread; pending deadlines are discarded."""
+        with self._condition:
+            self._stopped = True
+            self._callbacks.clear()
+            self._heap.clear()
+            self._condition.notify()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                callback = None
+                while callback is None:
+                    if self._stopped:
+                        return
+                    # Drop cancelled entries from the top of the heap
+                    while self._heap and self._heap[0][1] not in self._callbacks:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+                    deadline, handle = self._heap[0]
+                    remaining = deadline - time.monotonic()
+                    if remaining > 0:
+                        self._condition.wait(timeout=remaining)
+                        continue
+                    heapq.heappop(self._heap)
+                    callback = self._callbacks.pop(handle, None)
+
+            try:
+                callback()
+            except Exception as e:
+                self.logger.error(f"Deadline callback failed: {e}")
@@ -1,8 +1,12 @@
+import asyncio
 import uuid
 import time
 import threading
 import traceback
 
+from mirix.llm_api.anthropic_batch import get_anthropic_batch_coordinator
+from mirix.services.db_executor import MEMORY_AGENT_POOL, use_db_pool
+
 
 class MessageQueue:
     """
@@ -27,15 +31,7 @@ class MessageQueue:
         Returns:
             Tuple of (response, agent_type)
         """
-        message_uuid = uuid.uuid4()
-
-        with self._message_queue_lock:
-            self.message_queue[message_uuid] = {
-                'kwargs': kwargs,
-                'started': False,
-                'finished': False,
-                'type': agent_type,
-            }
+        message_uuid = self._enqueue(kwargs, agent_type)
 
         # Wait for earlier requests of the same type to finish
         while not self._check_if_earlier_requests_are_finished(message_uuid):
@@ -51,16 +47,94 @@ class MessageQueue:
                 **self.message_queue[message_uuid]['kwargs']
             )
         except Exception as e:
-            print(f"Error sending message: {e}")
-            print(traceback.format_exc())
-            print("agent_type: ", agent_type, "gets error. agent_id: ", agent_id, "ERROR")
-            response = "ERROR"
+            response = self._report_error(e, agent_type, agent_id)
+
+        self._finish(message_uuid)
+        return response, agent_type
+
+    async def send_message_in_queue_async(self, client, agent_id, kwargs, agent_type='chat'):
+        """
+        Async counterpart of `send_message_in_queue`: waits for its turn and for the response on the
+        caller's event loop, using `client.send_message_async`.
+
+        Returns:
+            Tuple of (response, agent_type)
+        """
+        message_uuid = self._enqueue(kwargs, agent_type)
+
+        try:
+            # Wait for earlier requests of the same type to finish
+            while not self._check_if_earlier_requests_are_finished(message_uuid):
+                await asyncio.sleep(0.1)
+
+            with self._message_queue_lock:
+                self.message_queue[message_uuid]['started'] = True
+
+            try:
+                response = await client.send_message_async(
+                    agent_id=agent_id,
+                    role='user',
+                    **self.message_queue[message_uuid]['kwargs']
+                )
+            except Exception as e:
+                response = self._report_error(e, agent_type, agent_id)
+        finally:
+            # Also when the caller is cancelled, so that later requests of the same type are not held up
+            self._finish(message_uuid)
+
+        return response, agent_type
 
+    def send_to_memory_agents(self, client, agent_ids, kwargs):
+        """
+        Send the same message to several memory agents and wait until all of them have processed it.
+
+        The agents step concurrently on one event loop, with their database work on the memory-agent DB
+        pool (see mirix/services/db_executor.py), and in Anthropic batch mode the agents share one message
+        batch per step. Must not be called from a running event loop.
+
+        Args:
+            client: The mirix client instance
+            agent_ids: Maps the agent type of each memory agent to its ID
+            kwargs: Arguments to pass to client.send_message_async
+
+        Returns:
+            List of (response, agent_type) tuples, in the order of `agent_ids`
+        """
+        batch_group = get_anthropic_batch_coordinator().group(len(agent_ids))
+
+        async def send_all():
+            return await asyncio.gather(*[
+                batch_group.run_async(self.send_message_in_queue_async, client, agent_id, kwargs, agent_type)
+                for agent_type, agent_id in agent_ids.items()
+            ])
+
+        with use_db_pool(MEMORY_AGENT_POOL):
+            return asyncio.run(send_all())
+
+    def _enqueue(self, kwargs, agent_type):
+        """Add a request at the end of the queue and return its ID."""
+        message_uuid = uuid.uuid4()
+
+        with self._message_queue_lock:
+            self.message_queue[message_uuid] = {
+                'kwargs': kwargs,
+                'started': False,
+                'finished': False,
+                'type': agent_type,
+            }
+        return message_uuid
+
+    def _finish(self, message_uuid):
         with self._message_queue_lock:
             self.message_queue[message_uuid]['finished'] = True
             del self.message_queue[message_uuid]
-        
-        return response, agent_type
+
+    @staticmethod
+    def _report_error(e, agent_type, agent_id):
+        print(f"Error sending message: {e}")
+        print(traceback.format_exc())
+        print("agent_type: ", agent_type, "gets error. agent_id: ", agent_id, "ERROR")
+        return "ERROR"
     
     def _check_if_earlier_requests_are_finished(self, message_uuid):
         """Check if all earlier requests of the same type have finished."""
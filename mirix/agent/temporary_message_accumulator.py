@@ -7,10 +7,14 @@ import logging
 from datetime import datetime, timedelta
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
-from mirix.agent.app_constants import TEMPORARY_MESSAGE_LIMIT, GEMINI_MODELS, SKIP_META_MEMORY_MANAGER
-from mirix.constants import CHAINING_FOR_MEMORY_UPDATE
+from mirix.agent.app_constants import TEMPORARY_MESSAGE_LIMIT, GEMINI_MODELS, SKIP_META_MEMORY_MANAGER, PIPELINED_ABSORPTION, ABSORPTION_MAX_IN_FLIGHT, ABSORPTION_RECHECK_SECONDS
+from mirix.constants import CHAINING_FOR_MEMORY_UPDATE, GEMINI_CONTEXT_CACHING
 from mirix.voice_utils import process_voice_files, convert_base64_to_audio_segment
 from mirix.agent.app_utils import encode_image
+from mirix.agent.absorption_pipeline import AbsorptionPipeline
+from mirix.agent.absorption_scheduler import AdaptiveAbsorptionScheduler
+from mirix.agent.deadline_scheduler import DeadlineScheduler
+from mirix.llm_api.gemini_context_cache import get_gemini_context_cache
 
 def get_image_mime_type(image_path):
     """Get MIME type for image files."""
@@ -32,7 +36,8 @@ class TemporaryMessageAccumulator:
     """
     
     def __init__(self, client, google_client, timezone, upload_manager, message_queue, 
-                 model_name, temporary_message_limit=TEMPORARY_MESSAGE_LIMIT):
+                 model_name, temporary_message_limit=TEMPORARY_MESSAGE_LIMIT,
+                 pipelined_absorption=PIPELINED_ABSORPTION, max_in_flight_absorptions=ABSORPTION_MAX_IN_FLIGHT):
         self.client = client
         self.google_client = google_client
         self.timezone = timezone
@@ -60,16 +65,38 @@ class TemporaryMessageAccumulator:
         
         # Upload tracking for cleanup
         self.upload_start_times = {}  # Track when uploads started for cleanup purposes
+
+        # Adaptive absorption: decides when to flush, and a timer re-checks during quiet periods.
+        # `flush_callback` is set by the owner (AgentWrapper) and is called when the timer fires.
+        self.absorption_scheduler = AdaptiveAbsorptionScheduler(message_limit=temporary_message_limit)
+        self.flush_callback = None
+        self._flush_timer = DeadlineScheduler(name="absorption_flush")
+        self._flush_handle = None
+        # Flushes run one at a time on a single worker, off the timer thread since absorption is slow
+        self._flush_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="absorption_flush")
+        self._flush_running = threading.Lock()
+        # Serializes absorption so the timer and incoming messages never absorb the same batch twice
+        self._absorption_lock = threading.RLock()
+
+        # Optional pipelined absorption: preprocess, dispatch and cleanup of consecutive batches overlap
+        self.absorption_pipeline = None
+        if pipelined_absorption:
+            self.absorption_pipeline = AbsorptionPipeline(
+                preprocess_fn=self._preprocess_batch,
+                dispatch_fn=self._dispatch_batch,
+                cleanup_fn=self._cleanup_batch,
+                max_in_flight=max_in_flight_absorptions,
+            )
     
-    def add_message(self, full_message, timestamp, delete_after_upload=True, async_upload=True):
-        """Add a message to temporary storage."""
+    def add_message(self, full_message, timestamp, delete_after_upload=True, async_upload=True, user_id=None):
+        """Add a message to temporary storage. `user_id` is the user the content is absorbed for."""
         if self.needs_upload and self.upload_manager is not None:
             if 'image_uris' in full_message and full_message['image_uris']:
                 # Handle image uploads with optional sources information
                 if async_upload:
-                    image_file_ref_placeholders = [self.upload_manager.upload_file_async(image_uri, timestamp) for image_uri in full_message['image_uris']]
+                    image_file_ref_placeholders = self.upload_manager.upload_files_async(full_message['image_uris'], timestamp)
                 else:
-                    image_file_ref_placeholders = [self.upload_manager.upload_file(image_uri, timestamp) for image_uri in full_message['image_uris']]
+                    image_file_ref_placeholders = self.upload_manager.upload_files(full_message['image_uris'], timestamp)
                 # Track upload start times for timeout detection
                 current_time = time.time()
                 for placeholder in image_file_ref_placeholders:
@@ -102,7 +129,9 @@ class TemporaryMessageAccumulator:
                     (timestamp, {'image_uris': image_file_ref_placeholders,
                                  'sources': sources,
                                  'audio_segments': audio_segment,
-                                 'message': full_message['message']})
+                                 'message': full_message['message'],
+                                 'user_id': user_id,
+                                 'received_at': time.monotonic()})
                 )
                 
                 # Print accumulation statistics
@@ -137,7 +166,9 @@ class TemporaryMessageAccumulator:
                         'sources': sources,
                         'audio_segments': full_message.get('voice_files', []),
                         'message': full_message['message'],
-                        'delete_after_upload': delete_after_upload  # Store delete flag for OpenAI models
+                        'delete_after_upload': delete_after_upload,  # Store delete flag for OpenAI models
+                        'user_id': user_id,
+                        'received_at': time.monotonic()
                     })
                 )
                 
@@ -145,6 +176,9 @@ class TemporaryMessageAccumulator:
                 # total_messages = len(self.temporary_messages)
                 # total_images = sum(len(item.get('image_uris', []) or []) for _, item in self.temporary_messages)
                 # total_voice_files = sum(len(item.get('audio_segments', []) or []) for _, item in self.temporary_messages)
+
+        self.absorption_scheduler.record_arrival()
+        self._schedule_flush_check()
         
     def add_user_conversation(self, user_message, assistant_response):
         """Add user conversation to temporary storage."""
@@ -213,16 +247,16 @@ class TemporaryMessageAccumulator:
                         # No images or already processed, add to ready list
                         ready_messages.append((timestamp, item_copy))
 
-                # Check if we have enough ready messages to process
-                if len(ready_messages) >= self.temporary_message_limit:
+                # Check if the ready messages hit the count, token budget, age or idle trigger
+                if self.absorption_scheduler.evaluate(ready_messages, self._oldest_received_at()):
                     return ready_messages
                 else:
                     return []
         else:
-            # For non-GEMINI models: no uploads needed, just check message count
+            # For non-GEMINI models: no uploads needed, all messages are ready
             with self._temporary_messages_lock:
                 # Since there are no pending uploads to wait for, all messages are ready
-                if len(self.temporary_messages) >= self.temporary_message_limit:
+                if self.absorption_scheduler.evaluate(self.temporary_messages, self._oldest_received_at()):
                     # Return all messages as ready for processing
                     ready_messages = []
                     for timestamp, item in self.temporary_messages:
@@ -232,6 +266,80 @@ class TemporaryMessageAccumulator:
                 else:
                     return []
     
+    def _oldest_received_at(self):
+        """Arrival time of the oldest buffered item. Items restored from the database have none and count as oldest."""
+        if not self.temporary_messages:
+            return None
+        return self.temporary_messages[0][1].get('received_at', float('-inf'))
+
+    def _schedule_flush_check(self, min_delay=0.0):
+        """(Re)arm the timer that re-evaluates the age and idle triggers when no new content arrives."""
+        if self.flush_callback is None:
+            return
+        with self._temporary_messages_lock:
+            if not self.temporary_messages:
+                return
+            oldest_received_at = self._oldest_received_at()
+        delay = self.absorption_scheduler.seconds_until_next_check(
+            None if oldest_received_at == float('-inf') else oldest_received_at
+        )
+        if delay is None:
+            return
+        delay = max(delay, min_delay)
+        if self._flush_handle is not None:
+            self._flush_timer.cancel(self._flush_handle)
+        self._flush_handle = self._flush_timer.schedule(delay, self._on_flush_deadline)
+
+    def _on_flush_deadline(self):
+        """Timer callback: hand the owner's flush to the flush worker, unless a flush is already running."""
+        self._flush_handle = None
+        flush_callback = self.flush_callback
+        if flush_callback is None or self.get_message_count() == 0:
+            return
+        if not self._flush_running.acquire(blocking=False):
+            # The running flush re-arms the timer when it finishes
+            return
+        try:
+            self._flush_executor.submit(self._run_flush, flush_callback)
+        except RuntimeError:
+            # Closed in the meantime
+            self._flush_running.release()
+
+    def _run_flush(self, flush_callback):
+        try:
+            flush_callback()
+        except Exception as e:
+            self.logger.error(f"Timed absorption flush failed: {e}")
+        finally:
+            self._flush_running.release()
+        # A deadline that fired while this flush ran was skipped: check the buffer again
+        self._schedule_flush_check()
+
+    def absorb_if_ready(self, agent_states, force=False, user_id=None):
+        """
+        Absorb buffered content if the adaptive scheduler says so (or if `force` is set).
+        Buffered items are absorbed for the user they were added for; `user_id` covers items without one.
+        Returns True if an absorption ran.
+        """
+        with self._absorption_lock:
+            ready_messages = self.should_absorb_content()
+            if ready_messages:
+                self.absorb_content_into_memory(agent_states, ready_messages, user_id=user_id)
+            elif force:
+                # Force absorb with whatever is available; callers forcing absorption expect it to be done
+                self.absorption_scheduler.record_forced(self.get_message_count())
+                pending = self.absorb_content_into_memory(agent_states, user_id=user_id)
+                if pending is not None:
+                    pending.result()
+            else:
+                # Nothing is ready (e.g. a trigger fired while items wait on uploads): check again later
+                self._schedule_flush_check(min_delay=ABSORPTION_RECHECK_SECONDS)
+                return False
+
+        # Re-arm the timer for anything left in the buffer (e.g. items waiting on uploads)
+        self._schedule_flush_check()
+        return True
+
     def get_recent_images_for_chat(self, current_timestamp):
         """Get the most recent images for chat context (non-blocking).
         
@@ -306,8 +414,42 @@ class TemporaryMessageAccumulator:
             return most_recent_images
     
     def absorb_content_into_memory(self, agent_states, ready_messages=None, user_id=None):
-        """Process accumulated content and send to memory agents."""
+        """
+        Process accumulated content and send to memory agents.
+
+        With pipelined absorption the batch is handed to the pipeline and a Future for its
+        completion is returned; otherwise the batch is processed inline and None is returned.
+        """
+        with self._absorption_lock:
+            ready_to_process = self._take_ready_content(ready_messages)
+            batches = self._split_by_user(ready_to_process, user_id)
+            if self.absorption_pipeline is not None:
+                pending = None
+                for batch_user_id, content in batches:
+                    pending = self.absorption_pipeline.submit(content, agent_states, batch_user_id)
+                return pending
+
+        for batch_user_id, content in batches:
+            batch = self._preprocess_batch(content, agent_states, batch_user_id)
+            batch = self._dispatch_batch(batch)
+            self._cleanup_batch(batch)
+        return None
 
+    @staticmethod
+    def _split_by_user(ready_to_process, default_user_id=None):
+        """Split content into consecutive runs added for the same user, as (user_id, content) pairs."""
+        batches = []
+        for timestamp, item in ready_to_process:
+            item_user_id = item.get('user_id') or default_user_id
+            if batches and batches[-1][0] == item_user_id:
+                batches[-1][1].append((timestamp, item))
+            else:
+                batches.append((item_user_id, [(timestamp, item)]))
+        # An empty absorption still sends the buffered user conversation
+        return batches or [(default_user_id, [])]
+
+    def _take_ready_content(self, ready_messages=None):
+        """Remove the content to absorb from the buffer and return it as (timestamp, item) tuples."""
         if ready_messages is not None:
             # Use the pre-processed ready messages
             ready_to_process = ready_messages
@@ -395,6 +537,10 @@ class TemporaryMessageAccumulator:
                 # Keep only items that are still pending (for GEMINI models) or clear all (for non-GEMINI models)
                 self.temporary_messages = pending_items
 
+        return ready_to_process
+
+    def _preprocess_batch(self, ready_to_process, agent_states, user_id=None):
+        """Pipeline stage 1: save voice content and build the message for the memory agents."""
         # Extract voice content from ready_to_process messages
         voice_content = []
         for _, item in ready_to_process:
@@ -463,6 +609,18 @@ class TemporaryMessageAccumulator:
             'text': system_message
         })
 
+        return {
+            'ready_to_process': ready_to_process,
+            'message': message,
+            'user_message_added': user_message_added,
+            'agent_states': agent_states,
+            'user_id': user_id,
+        }
+
+    def _dispatch_batch(self, batch):
+        """Pipeline stage 2: send the built message to the memory agents."""
+        message, agent_states, user_id = batch['message'], batch['agent_states'], batch['user_id']
+
         t1 = time.time()
         if SKIP_META_MEMORY_MANAGER:
             # Send to memory agents in parallel
@@ -488,9 +646,12 @@ class TemporaryMessageAccumulator:
         #         payloads,
         #         agent_type
         #     )
-        
-        # Clean up processed content
-        self._cleanup_processed_content(ready_to_process, user_message_added)
+
+        return batch
+
+    def _cleanup_batch(self, batch):
+        """Pipeline stage 3: clean up processed content."""
+        self._cleanup_processed_content(batch['ready_to_process'], batch['user_message_added'])
     
     def _build_memory_message(self, ready_to_process, voice_content):
         """Build the message content for memory agents."""
@@ -665,16 +826,12 @@ class TemporaryMessageAccumulator:
         
         overall_start = time.time()
         
-        with ThreadPoolExecutor(max_workers=6) as pool:
-            futures = [
-                pool.submit(self.message_queue.send_message_in_queue, 
-                           self.client, self.message_queue._get_agent_id_for_type(agent_states, agent_type), payloads, agent_type) 
-                for agent_type in memory_agent_types
-            ]
-            
-            for future in tqdm(as_completed(futures), total=len(futures)):
-                response, agent_type = future.result()
-                responses.append(response)
+        agent_ids = {
+            agent_type: self.message_queue._get_agent_id_for_type(agent_states, agent_type)
+            for agent_type in memory_agent_types
+        }
+        for response, agent_type in self.message_queue.send_to_memory_agents(self.client, agent_ids, payloads):
+            responses.append(response)
         
         overall_end = time.time()
   
@@ -682,14 +839,25 @@ class TemporaryMessageAccumulator:
         """Clean up processed content and mark files as processed."""
         # Mark processed files as processed in database and cleanup upload results (only for GEMINI models)
         if self.needs_upload and self.upload_manager is not None:
+            # Collect every processed file first and mark them in a single transaction.
+            # Mappings may be keyed by either the file name or its URI, so match on both.
+            processed_cloud_file_ids = set()
             for timestamp, item in ready_to_process:
                 if 'image_uris' in item and item['image_uris']:
                     for file_ref in item['image_uris']:
                         if hasattr(file_ref, 'name'):
-                            try:
-                                self.client.server.cloud_file_mapping_manager.set_processed(cloud_file_id=file_ref.name)
-                            except Exception as e:
-                                pass
+                            processed_cloud_file_ids.add(file_ref.name)
+                            if getattr(file_ref, 'uri', None):
+                                processed_cloud_file_ids.add(file_ref.uri)
+            if processed_cloud_file_ids:
+                try:
+                    self.client.server.cloud_file_mapping_manager.set_many_processed(cloud_file_ids=processed_cloud_file_ids)
+                except Exception as e:
+                    self.logger.error(f"Failed to mark {len(processed_cloud_file_ids)} cloud files as processed: {e}")
+
+            # The batch has been absorbed, so its Gemini cached-content entries are no longer needed
+            if GEMINI_CONTEXT_CACHING and processed_cloud_file_ids:
+                get_gemini_context_cache().release_files(processed_cloud_file_ids)
             
             # Clean up upload results from memory now that they've been processed
             # We need to track which placeholders were originally used to get these file_refs
@@ -790,6 +958,23 @@ class TemporaryMessageAccumulator:
         """Get the current count of temporary messages."""
         with self._temporary_messages_lock:
             return len(self.temporary_messages)
+
+    def is_idle(self):
+        """True when nothing is buffered, no conversation awaits absorption and no absorption is in flight."""
+        with self._temporary_messages_lock:
+            if self.temporary_messages or self.temporary_user_messages[-1]:
+                return False
+        if self.absorption_pipeline is not None and self.absorption_pipeline.get_metrics()['in_flight'] > 0:
+            return False
+        return True
+
+    def close(self):
+        """Stop the flush timer and let in-flight absorptions finish. The accumulator must not be used afterwards."""
+        self.flush_callback = None
+        self._flush_timer.shutdown()
+        self._flush_executor.shutdown(wait=True)
+        if self.absorption_pipeline is not None:
+            self.absorption_pipeline.shutdown(wait=True)
     
     def get_upload_status_summary(self):
         """Get a summary of current upload statuses for debugging."""
@@ -800,6 +985,14 @@ class TemporaryMessageAccumulator:
         # Get upload manager status if available
         if self.upload_manager and hasattr(self.upload_manager, 'get_upload_status_summary'):
             summary['upload_manager_status'] = self.upload_manager.get_upload_status_summary()
+        if self.upload_manager and hasattr(self.upload_manager, 'get_upload_metrics'):
+            summary['upload_metrics'] = self.upload_manager.get_upload_metrics()
+
+        summary['absorption_metrics'] = self.absorption_scheduler.get_metrics()
+        if self.absorption_pipeline is not None:
+            summary['absorption_pipeline'] = self.absorption_pipeline.get_metrics()
+        if GEMINI_CONTEXT_CACHING and self.needs_upload:
+            summary['gemini_context_cache'] = get_gemini_context_cache().get_metrics()
         
         return summary
     
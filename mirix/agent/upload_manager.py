@@ -3,20 +3,61 @@ import time
 import uuid
 import threading
 import logging
+from collections import deque
 from PIL import Image
 from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from mirix.agent.app_constants import UPLOAD_TIMEOUT
+from mirix.agent.deadline_scheduler import DeadlineScheduler
+
+
+class CloudFileRegistry:
+    """
+    Index of uploaded Google Cloud file references by both file name and URI,
+    so dedup lookups stay O(1) no matter how many files have been uploaded.
+    """
+
+    def __init__(self, files=None):
+        self._files = {}
+        self._lock = threading.Lock()
+        for file_ref in files or []:
+            self.register(file_ref)
+
+    def register(self, file_ref):
+        """Add or replace a file reference"""
+        with self._lock:
+            self._files[file_ref.name] = file_ref
+            if getattr(file_ref, 'uri', None):
+                self._files[file_ref.uri] = file_ref
+
+    def get(self, name_or_uri):
+        """Look up a file reference by name or URI, or None if unknown"""
+        with self._lock:
+            return self._files.get(name_or_uri)
+
+    def remove(self, name_or_uri):
+        """Drop a file reference (both of its keys)"""
+        with self._lock:
+            file_ref = self._files.pop(name_or_uri, None)
+            if file_ref is not None:
+                self._files.pop(file_ref.name, None)
+                self._files.pop(getattr(file_ref, 'uri', None), None)
+
+    def __contains__(self, name_or_uri):
+        return self.get(name_or_uri) is not None
 
 
 class UploadManager:
     """
     Simplified upload manager that handles each image upload independently.
     Each upload gets a 10-second timeout and either succeeds or fails immediately.
+    Timeouts are tracked by a single shared DeadlineScheduler rather than a thread per upload.
     """
     
     def __init__(self, google_client, client, existing_files, uri_to_create_time):
         self.google_client = google_client
         self.client = client
         self.existing_files = existing_files
+        self.file_registry = CloudFileRegistry(existing_files)
         self.uri_to_create_time = uri_to_create_time
         
         # Initialize logger
@@ -29,6 +70,14 @@ class UploadManager:
         
         # Thread pool for concurrent uploads (max 4 simultaneous uploads)
         self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="upload_worker")
+
+        # One scheduler thread watches all upload deadlines: upload_uuid -> (deadline handle, start time)
+        self._deadline_scheduler = DeadlineScheduler(name="upload_deadline")
+        self._upload_deadlines = {}
+
+        # Metrics: latencies (seconds) of the most recent finished uploads and outcome counters
+        self._upload_latencies = deque(maxlen=1000)
+        self._upload_outcomes = {'completed': 0, 'failed': 0, 'timed_out': 0}
     
     def _compress_image(self, image_path, quality=85, max_size=(1920, 1080)):
         """Compress image to reduce upload time while maintaining reasonable quality"""
@@ -52,18 +101,22 @@ class UploadManager:
             self.logger.error(f"Image compression failed for {image_path}: {e}")
             return None
     
-    def _upload_single_file(self, upload_uuid, filename, timestamp, compressed_file):
+    def _upload_single_file(self, upload_uuid, filename, timestamp, compressed_file, check_existing=True):
         """Upload a single file with 5-second timeout"""
         try:
 
-            # Check if file already exists in cloud
-            if self.client.server.cloud_file_mapping_manager.check_if_existing(local_file_id=filename):
-                cloud_file_name = self.client.server.cloud_file_mapping_manager.get_cloud_file(local_file_id=filename)
-                file_ref = [x for x in self.existing_files if x.name == cloud_file_name][0]
-                
-                with self._upload_lock:
-                    self._upload_status[upload_uuid] = {'status': 'completed', 'result': file_ref}
-                return
+            # Check if file already exists in cloud (single lookup, then an O(1) registry hit);
+            # skipped when the caller already knows it has no mapping
+            mapping = self.client.server.cloud_file_mapping_manager.get_mapping(local_file_id=filename) if check_existing else None
+            if mapping is not None:
+                file_ref = self.file_registry.get(mapping.cloud_file_id)
+                if file_ref is not None:
+                    with self._upload_lock:
+                        self._upload_status[upload_uuid] = {'status': 'completed', 'result': file_ref}
+                    self._finish_upload(upload_uuid, 'completed')
+                    return
+                # Mapping points at a file we no longer know about; upload again and replace the mapping
+                self.logger.info(f"Stale cloud mapping for {filename}, re-uploading")
             
             # Choose file to upload (compressed if available, otherwise original)
             upload_file = compressed_file if compressed_file and os.path.exists(compressed_file) else filename
@@ -76,6 +129,7 @@ class UploadManager:
             self.logger.info(f"Upload completed in {upload_duration:.2f} seconds for file {upload_file}")
             
             # Update tracking and database
+            self.file_registry.register(file_ref)
             self.uri_to_create_time[file_ref.uri] = {'create_time': file_ref.create_time, 'filename': file_ref.name}
             self.client.server.cloud_file_mapping_manager.add_mapping(
                 local_file_id=filename, 
@@ -95,12 +149,14 @@ class UploadManager:
             # Mark as completed
             with self._upload_lock:
                 self._upload_status[upload_uuid] = {'status': 'completed', 'result': file_ref}
+            self._finish_upload(upload_uuid, 'completed')
                 
         except Exception as e:
             self.logger.error(f"Upload failed for {filename}: {e}")
             # Mark as failed
             with self._upload_lock:
                 self._upload_status[upload_uuid] = {'status': 'failed', 'result': None}
+            self._finish_upload(upload_uuid, 'failed')
             
             # Clean up compressed file on failure too
             if compressed_file and compressed_file != filename and os.path.exists(compressed_file):
@@ -109,8 +165,11 @@ class UploadManager:
                 except:
                     pass
     
-    def upload_file_async(self, filename, timestamp, compress=True):
-        """Start an async upload and return immediately with a placeholder"""
+    def upload_file_async(self, filename, timestamp, compress=True, check_existing=True):
+        """
+        Start an async upload and return immediately with a placeholder. Pass check_existing=False for a
+        file known to have no cloud mapping (see `upload_files_async`) to skip the lookup.
+        """
         upload_uuid = str(uuid.uuid4())
         
         # Compress image if requested
@@ -122,25 +181,52 @@ class UploadManager:
         with self._upload_lock:
             self._upload_status[upload_uuid] = {'status': 'pending', 'result': None}
         
-        # Submit upload task with 5-second timeout
-        future = self._executor.submit(self._upload_single_file, upload_uuid, filename, timestamp, compressed_file)
-        
-        # Set up automatic timeout handling
-        def timeout_handler():
-            time.sleep(10.0)  # Wait 10 seconds
-            with self._upload_lock:
-                if self._upload_status.get(upload_uuid, {}).get('status') == 'pending':
-                    self.logger.info(f"Upload timeout (5s) for {filename}, marking as failed")
-                    self._upload_status[upload_uuid] = {'status': 'failed', 'result': None}
-                    future.cancel()  # Try to cancel the upload
+        # Register the deadline before submitting so a fast upload can always cancel it
+        future_holder = {}
+        with self._upload_lock:
+            handle = self._deadline_scheduler.schedule(
+                UPLOAD_TIMEOUT,
+                lambda: self._handle_upload_timeout(upload_uuid, filename, future_holder.get('future'))
+            )
+            self._upload_deadlines[upload_uuid] = (handle, time.monotonic())
         
-        # Start timeout handler in separate thread
-        timeout_thread = threading.Thread(target=timeout_handler, daemon=True)
-        timeout_thread.start()
+        future_holder['future'] = self._executor.submit(self._upload_single_file, upload_uuid, filename, timestamp, compressed_file, check_existing)
         
         # Return placeholder
         return {'upload_uuid': upload_uuid, 'filename': filename, 'pending': True}
+
+    def upload_files_async(self, filenames, timestamp, compress=True):
+        """Start async uploads of several files, looking up which ones are already uploaded in one query"""
+        existing = self.client.server.cloud_file_mapping_manager.check_many_existing(local_file_ids=filenames)
+        return [
+            self.upload_file_async(filename, timestamp, compress=compress, check_existing=filename in existing)
+            for filename in filenames
+        ]
     
+    def _handle_upload_timeout(self, upload_uuid, filename, future):
+        """Deadline callback: mark a still-pending upload as failed"""
+        with self._upload_lock:
+            if self._upload_status.get(upload_uuid, {}).get('status') != 'pending':
+                return
+            self.logger.info(f"Upload timeout ({UPLOAD_TIMEOUT}s) for {filename}, marking as failed")
+            self._upload_status[upload_uuid] = {'status': 'failed', 'result': None}
+            self._upload_deadlines.pop(upload_uuid, None)
+            self._upload_outcomes['timed_out'] += 1
+        if future is not None:
+            future.cancel()  # Try to cancel the upload
+
+    def _finish_upload(self, upload_uuid, outcome):
+        """Cancel the upload's deadline and record its latency and outcome"""
+        with self._upload_lock:
+            deadline = self._upload_deadlines.pop(upload_uuid, None)
+            if deadline is None:
+                # Already timed out; the late result is kept but not counted twice
+                return
+            handle, start_time = deadline
+            self._upload_latencies.append(time.monotonic() - start_time)
+            self._upload_outcomes[outcome] += 1
+        self._deadline_scheduler.cancel(handle)
+
     def get_upload_status(self, placeholder):
         """Get upload status and result in one call"""
         if not isinstance(placeholder, dict) or not placeholder.get('pending'):
@@ -187,10 +273,15 @@ class UploadManager:
         
         raise TimeoutError(f"Upload timeout after {timeout}s for {placeholder['filename']}")
     
-    def upload_file(self, filename, timestamp):
+    def upload_file(self, filename, timestamp, check_existing=True):
         """Legacy synchronous upload method"""
-        placeholder = self.upload_file_async(filename, timestamp)
+        placeholder = self.upload_file_async(filename, timestamp, check_existing=check_existing)
         return self.wait_for_upload(placeholder, timeout=10)  # Reduced timeout since individual uploads timeout at 5s
+
+    def upload_files(self, filenames, timestamp):
+        """Synchronous counterpart of `upload_files_async`"""
+        existing = self.client.server.cloud_file_mapping_manager.check_many_existing(local_file_ids=filenames)
+        return [self.upload_file(filename, timestamp, check_existing=filename in existing) for filename in filenames]
     
     def cleanup_resolved_upload(self, placeholder):
         """Clean up resolved upload from tracking"""
@@ -207,6 +298,7 @@ class UploadManager:
             self._executor.shutdown(wait=True, timeout=10)
         except:
             pass  # Ignore shutdown errors
+        self._deadline_scheduler.shutdown()
     
     def get_upload_status_summary(self):
         """Get a summary of current upload statuses (for debugging)"""
@@ -215,4 +307,31 @@ class UploadManager:
             for uuid, info in self._upload_status.items():
                 status = info.get('status', 'unknown')
                 summary[status] = summary.get(status, 0) + 1
-            return summary 
\ No newline at end of file
+            return summary
+
+    def get_upload_metrics(self):
+        """Get upload latency percentiles (seconds) and outcome rates over recent uploads"""
+        with self._upload_lock:
+            latencies = sorted(self._upload_latencies)
+            outcomes = dict(self._upload_outcomes)
+            in_flight = len(self._upload_deadlines)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            index = min(len(latencies) - 1, max(0, int(round(p / 100.0 * len(latencies))) - 1))
+            return latencies[index]
+
+        total = sum(outcomes.values())
+        return {
+            'in_flight': in_flight,
+            'pending_deadlines': self._deadline_scheduler.pending_count(),
+            'total_finished': total,
+            **outcomes,
+            'timeout_rate': outcomes['timed_out'] / total if total else 0.0,
+            'failure_rate': (outcomes['failed'] + outcomes['timed_out']) / total if total else 0.0,
+            'latency_p50': percentile(50),
+            'latency_p90': percentile(90),
+            'latency_p99': percentile(99),
+            'latency_max': latencies[-1] if latencies else None,
+        }
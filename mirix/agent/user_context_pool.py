@@ -0,0 +1,156 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from mirix.agent.app_constants import MAX_USER_CONTEXTS
+
+# The user context the current request runs in (set by `AgentWrapper.use_user_context`)
+current_user_context = ContextVar("mirix_user_context", default=None)
+
+
+class UserAgentContext:
+    """
+    The per-user half of an AgentWrapper: a client acting as the user, the user's message queue and
+    the accumulator buffering the user's content for absorption. The agents themselves (and their
+    in-context message lists, which are filtered per user) are shared by all users.
+    """
+
+    def __init__(self, user_id, client, message_queue, temp_message_accumulator):
+        self.user_id = user_id
+        self.client = client
+        self.message_queue = message_queue
+        self.temp_message_accumulator = temp_message_accumulator
+        self.pool = None
+
+        # Guarded by the owning pool's lock
+        self.active_requests = 0
+        self.last_used = time.monotonic()
+
+    def is_idle(self):
+        """True when the context can be dropped without losing work."""
+        return (
+            self.active_requests == 0
+            and self.message_queue.get_queue_length() == 0
+            and self.temp_message_accumulator.is_idle()
+        )
+
+    def close(self):
+        self.temp_message_accumulator.close()
+
+
+class UserContextPool:
+    """
+    LRU pool of UserAgentContexts, created on first use by `factory(user_id)`.
+
+    The pool holds at most `max_contexts` contexts; beyond that the least recently used idle ones are
+    closed. Contexts that are serving a request or still have content to absorb are never evicted, so
+    the limit is soft under load.
+    """
+
+    def __init__(self, factory, max_contexts=MAX_USER_CONTEXTS, name="user_contexts"):
+        self._factory = factory
+        self.max_contexts = max_contexts
+        self.logger = logging.getLogger(f"Mirix.UserContextPool.{name}")
+
+        self._contexts = OrderedDict()
+        # user id -> set once the context being built for that user is in the pool
+        self._building = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self, user_id):
+        """Check out the context of `user_id` for the duration of a request."""
+        context, evicted = self._checkout(user_id)
+        while context is None:
+            context, evicted = self._create(user_id)
+        self._close_all(evicted)
+        try:
+            yield context
+        finally:
+            self._close_all(self._release(context))
+
+    def contexts(self):
+        """Snapshot of the pooled contexts, least recently used first."""
+        with self._lock:
+            return list(self._contexts.values())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._contexts)
+
+    def close(self):
+        """Close every pooled context."""
+        with self._lock:
+            contexts = list(self._contexts.values())
+            self._contexts.clear()
+        self._close_all(contexts)
+
+    def _checkout(self, user_id, new_context=None):
+        """
+        Take the pooled context of `user_id`, adding `new_context` if there is none yet. Returns the
+        context (None if there is none and no `new_context`) and the contexts to close.
+        """
+        with self._lock:
+            context = self._contexts.get(user_id)
+            if context is None:
+                if new_context is None:
+                    return None, []
+                context = new_context
+                context.pool = self
+                self._contexts[user_id] = context
+            self._contexts.move_to_end(user_id)
+            context.active_requests += 1
+            context.last_used = time.monotonic()
+            return context, self._evict_locked()
+
+    def _create(self, user_id):
+        """
+        Build the context of `user_id` outside the lock (the factory reads the database) and check it out.
+        Concurrent first requests of the user wait for one of them to build it.
+        """
+        with self._lock:
+            building = self._building.get(user_id)
+            if building is None:
+                building = self._building[user_id] = threading.Event()
+                builder = True
+            else:
+                builder = False
+        if not builder:
+            building.wait()
+            # None if the build failed; the caller then tries itself
+            return self._checkout(user_id)
+        try:
+            return self._checkout(user_id, self._factory(user_id))
+        finally:
+            with self._lock:
+                del self._building[user_id]
+            building.set()
+
+    def _release(self, context):
+        with self._lock:
+            context.active_requests -= 1
+            context.last_used = time.monotonic()
+            return self._evict_locked()
+
+    def _evict_locked(self):
+        evicted = []
+        if len(self._contexts) <= self.max_contexts:
+            return evicted
+        for user_id, context in list(self._contexts.items()):
+            if len(self._contexts) <= self.max_contexts:
+                break
+            if context.is_idle():
+                del self._contexts[user_id]
+                evicted.append(context)
+        return evicted
+
+    def _close_all(self, contexts):
+        # Outside the lock: closing waits for the context's in-flight absorptions
+        for context in contexts:
+            try:
+                context.close()
+            except Exception as e:
+                self.logger.error(f"Failed to close context of user {context.user_id}: {e}")
@@ -2,6 +2,7 @@ import logging
 import time
 import os
 import base64
+import copy
 import hashlib
 import shutil
 from pathlib import Path
@@ -40,8 +41,10 @@ from mirix.schemas.organization import Organization
 from mirix.schemas.sandbox_config import E2BSandboxConfig, LocalSandboxConfig, SandboxConfig, SandboxConfigCreate, SandboxConfigUpdate
 from mirix.schemas.tool import Tool, ToolCreate, ToolUpdate
 from mirix.schemas.tool_rule import BaseToolRule
+from mirix.schemas.user import User
 from mirix.interface import QueuingInterface
 from mirix.prompts import gpt_persona
+from mirix.services.db_executor import run_in_db_executor
 
 
 def create_client():
@@ -413,6 +416,16 @@ class LocalClient(AbstractClient):
         self.images_dir = Path(settings.images_dir)
         self.images_dir.mkdir(parents=True, exist_ok=True)
 
+    def for_user(self, user: User) -> "LocalClient":
+        """
+        A client acting as `user` that shares this client's server (and its managers and connection pool).
+        """
+        user_client = copy.copy(self)
+        user_client.interface = QueuingInterface(debug=self.interface.debug)
+        user_client.user_id = user.id
+        user_client.user = user
+        return user_client
+
     def _generate_file_hash(self, content: bytes) -> str:
         """Generate a unique hash for file content to avoid duplicates."""
         return hashlib.sha256(content).hexdigest()[:16]
@@ -1099,6 +1112,7 @@ class LocalClient(AbstractClient):
         message_queue: Optional[any] = None,
         retrieved_memories: Optional[dict] = None,
         user_id: Optional[str] = None,
+        token_callback: Optional[Callable[[str], None]] = None,
     ) -> MirixResponse:
         """
         Send a message to an agent
@@ -1108,24 +1122,108 @@ class LocalClient(AbstractClient):
             role (str): Role of the message
             agent_id (str): ID of the agent
             name(str): Name of the sender
-            stream (bool): Stream the response (default: `False`)
+            stream_tokens (bool): Stream the text of the agent's reply to `token_callback` as it is generated
             extra_message (str): Extra message to send. It will be inserted before the last message
             chaining (bool): Whether to enable chaining for this message
+            token_callback (Callable[[str], None]): Receives each new piece of reply text when `stream_tokens` is set
 
         Returns:
             response (MirixResponse): Response from the agent
         """
 
+        agent_id, input_messages, extra_messages = self._prepare_message_input(
+            message, role, name, agent_id, agent_name, stream_steps, stream_tokens, token_callback, extra_messages
+        )
+
+        # Each call collects its responses in its own interface, so that concurrent calls (e.g. the
+        # memory agents of one absorption, or the chats of different users) do not mix their messages
+        interface = QueuingInterface(debug=self.interface.debug)
+
+        usage = self.server.send_messages(
+            actor=self.server.user_manager.get_user_by_id(self.user.id),
+            agent_id=agent_id,
+            input_messages=input_messages,
+            interface=interface,
+            force_response=force_response,
+            display_intermediate_message=display_intermediate_message,
+            request_user_confirmation=request_user_confirmation,
+            chaining=chaining,
+            existing_file_uris=existing_file_uris,
+            extra_messages=extra_messages,
+            message_queue=message_queue,
+            user_id=user_id,
+            token_callback=token_callback if stream_tokens else None,
+        )
+
+        return self._format_response(interface, usage)
+
+    async def send_message_async(
+        self,
+        message: str | list[dict],
+        role: str,
+        name: Optional[str] = None,
+        agent_id: Optional[str] = None,
+        agent_name: Optional[str] = None,
+        stream_steps: bool = False,
+        stream_tokens: bool = False,
+        force_response: bool = False,
+        existing_file_uris: Optional[List[str]] = None,
+        extra_messages: Optional[List[dict]] = None,
+        display_intermediate_message: any = None,
+        request_user_confirmation: any = None,
+        chaining: Optional[bool] = None,
+        message_queue: Optional[any] = None,
+        retrieved_memories: Optional[dict] = None,
+        user_id: Optional[str] = None,
+        token_callback: Optional[Callable[[str], None]] = None,
+    ) -> MirixResponse:
+        """
+        Async counterpart of `send_message`: the agent's LLM calls are awaited on the caller's event loop,
+        and its database work runs on the DB executor. Takes the same arguments as `send_message`.
+
+        Returns:
+            response (MirixResponse): Response from the agent
+        """
+        agent_id, input_messages, extra_messages = await run_in_db_executor(
+            self._prepare_message_input,
+            message, role, name, agent_id, agent_name, stream_steps, stream_tokens, token_callback, extra_messages,
+        )
+
+        # Each call collects its responses in its own interface, so that concurrent calls (e.g. the
+        # memory agents of one absorption, or the chats of different users) do not mix their messages
+        interface = QueuingInterface(debug=self.interface.debug)
+
+        usage = await self.server.send_messages_async(
+            actor=await run_in_db_executor(self.server.user_manager.get_user_by_id, self.user.id),
+            agent_id=agent_id,
+            input_messages=input_messages,
+            interface=interface,
+            force_response=force_response,
+            display_intermediate_message=display_intermediate_message,
+            request_user_confirmation=request_user_confirmation,
+            chaining=chaining,
+            existing_file_uris=existing_file_uris,
+            extra_messages=extra_messages,
+            message_queue=message_queue,
+            user_id=user_id,
+            token_callback=token_callback if stream_tokens else None,
+        )
+
+        return self._format_response(interface, usage)
+
+    def _prepare_message_input(self, message, role, name, agent_id, agent_name, stream_steps, stream_tokens, token_callback, extra_messages):
+        """Resolve the agent and convert `message` (and `extra_messages`) into MessageCreate inputs; shared by `send_message` and `send_message_async`."""
         if not agent_id:
             # lookup agent by name
             assert agent_name, f"Either agent_id or agent_name must be provided"
             agent_id = self.get_agent_id(agent_name=agent_name)
             assert agent_id, f"Agent with name {agent_name} not found"
 
-        if stream_steps or stream_tokens:
-            # TODO: implement streaming with stream=True/False
+        if stream_steps:
+            # TODO: implement step streaming (intermediate steps are reported via `display_intermediate_message`)
             raise NotImplementedError
-        self.interface.clear()
+        if stream_tokens and token_callback is None:
+            raise ValueError("stream_tokens requires a token_callback to receive the streamed text")
 
         if isinstance(message, str):
             content = [TextContent(text=message)]
@@ -1230,22 +1328,12 @@ class LocalClient(AbstractClient):
         else:
             raise ValueError(f"Invalid message type: {type(message)}")
 
-        usage = self.server.send_messages(
-            actor=self.server.user_manager.get_user_by_id(self.user.id),
-            agent_id=agent_id,
-            input_messages=input_messages,
-            force_response=force_response,
-            display_intermediate_message=display_intermediate_message,
-            request_user_confirmation=request_user_confirmation,
-            chaining=chaining,
-            existing_file_uris=existing_file_uris,
-            extra_messages=extra_messages,
-            message_queue=message_queue,
-            user_id=user_id
-        )
+        return agent_id, input_messages, extra_messages
 
+    @staticmethod
+    def _format_response(interface: QueuingInterface, usage) -> MirixResponse:
         # format messages
-        messages = self.interface.to_list()
+        messages = interface.to_list()
 
         mirix_messages = []
         for m in messages:
@@ -194,4 +194,38 @@ CALL_MEMORY_AGENT_IN_PARALLEL = False
 CHAINING_FOR_MEMORY_UPDATE = False
 
 LOAD_IMAGE_CONTENT_FOR_LAST_MESSAGE_ONLY = False
+# Mark the tools and the stable system prompt prefix (raw system + core memory) as cacheable on Anthropic
+ANTHROPIC_PROMPT_CACHING = True
+# Client-side LLM rate limits applied before requests are sent (see mirix/llm_api/rate_limiter.py).
+# Keys are "<model_endpoint_type>" or "<model_endpoint_type>/<model>" (the latter wins); set these
+# to the limits of your provider tier. Providers without an entry are not limited.
+LLM_RATE_LIMITS = {
+    "openai": {"requests_per_minute": 5000, "tokens_per_minute": 450000, "max_concurrent": 16},
+    "azure_openai": {"requests_per_minute": 1000, "tokens_per_minute": 150000, "max_concurrent": 16},
+    "anthropic": {"requests_per_minute": 1000, "tokens_per_minute": 450000, "max_concurrent": 16},
+    "google_ai": {"requests_per_minute": 1000, "tokens_per_minute": 1000000, "max_concurrent": 16},
+}
+# Move each absorption batch's screenshots into a Gemini cached-content entry shared by that batch's requests
+GEMINI_CONTEXT_CACHING = False
+GEMINI_CONTEXT_CACHE_TTL_SECONDS = 600
+# Batches estimated below this many tokens are sent uncached (Gemini rejects small cache entries)
+GEMINI_CONTEXT_CACHE_MIN_TOKENS = 4096
+GEMINI_IMAGE_TOKEN_ESTIMATE = 258
+# Upper bounds (bytes of base64 text, and entries) on encoded images cached across LLM requests
+IMAGE_ENCODING_CACHE_MAX_BYTES = 128 * 1024 * 1024
+IMAGE_ENCODING_CACHE_MAX_ENTRIES = 512
+# Seconds to wait for a remote image referenced by URL (connect and read)
+IMAGE_DOWNLOAD_TIMEOUT_SECONDS = 30
+# Number of provider-formatted tool payloads kept across LLM requests (see mirix/llm_api/tool_schema_cache.py)
+TOOL_SCHEMA_CACHE_MAX_ENTRIES = 256
+# Page sizes of the cursor-paginated memory listing API (see mirix/services/memory_listing_manager.py)
+MEMORY_LIST_DEFAULT_LIMIT = 50
+MEMORY_LIST_MAX_LIMIT = 500
+# Rows fetched and written per chunk by the streaming memory export (see mirix/services/memory_export_manager.py)
+MEMORY_EXPORT_BATCH_SIZE = 256
+# Bulk memory import (see mirix/services/memory_import_manager.py): records committed per batch, texts per
+# embedding request, and embedding requests in flight at once
+MEMORY_IMPORT_BATCH_SIZE = 1000
+MEMORY_IMPORT_EMBEDDING_BATCH_SIZE = 64
+MEMORY_IMPORT_EMBEDDING_CONCURRENCY = 4
 BUILD_EMBEDDINGS_FOR_MEMORY = True
\ No newline at end of file
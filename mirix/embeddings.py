@@ -1,3 +1,5 @@
+import hashlib
+import re
 import uuid
 from typing import Any, List, Optional
 
@@ -167,6 +169,29 @@ class OllamaEmbeddings:
         return response_json["embedding"]
 
 
+class StandInEmbedding:
+    """
+    Deterministic, offline stand-in for an embedding provider (`settings.embedding_stand_in`).
+    Hashes word unigrams and bigrams into a fixed-size, L2-normalized vector, so texts sharing
+    words still land close together; used for benchmarks and record/replay test runs.
+    """
+
+    def __init__(self, embedding_dim: int):
+        self.embedding_dim = embedding_dim
+
+    def get_text_embedding(self, text: str) -> List[float]:
+        vector = np.zeros(self.embedding_dim)
+        words = re.findall(r"\w+", text.lower())
+        for feature in words + [" ".join(pair) for pair in zip(words, words[1:])]:
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.embedding_dim
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+
 def query_embedding(embedding_model, query_text: str):
     """Generate padded embedding for querying database"""
     query_vec = embedding_model.get_text_embedding(query_text)
@@ -180,6 +205,11 @@ def embedding_model(config: EmbeddingConfig, user_id: Optional[uuid.UUID] = None
 
     endpoint_type = config.embedding_endpoint_type
 
+    from mirix.settings import settings
+
+    if settings.embedding_stand_in:
+        return StandInEmbedding(embedding_dim=config.embedding_dim)
+
     # TODO: refactor to pass in settings from server
     from mirix.settings import model_settings
 
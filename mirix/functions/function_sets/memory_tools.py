@@ -483,11 +483,9 @@ def trigger_memory_update(self: "Agent", user_message: object, memory_types: Lis
 
     if 'message_queue' in user_message:
         
-        from concurrent.futures import ThreadPoolExecutor, as_completed
-        from tqdm import tqdm
         import time
 
-        # Use multi-processing approach similar to _send_to_memory_agents_separately
+        # Dispatch the memory agents together, like _send_to_memory_agents_separately
         message_queue = user_message['message_queue']
         
         # Map memory types to agent types
@@ -524,21 +522,15 @@ def trigger_memory_update(self: "Agent", user_message: object, memory_types: Lis
         responses = []
         overall_start = time.time()
 
-        # Use ThreadPoolExecutor for parallel processing
-        with ThreadPoolExecutor(max_workers=len(valid_agent_types)) as pool:
-            futures = []
-            for agent_type in valid_agent_types:
-                matching_agents = [agent for agent in agents if agent.agent_type == agent_type]
-                if not matching_agents:
-                    raise ValueError(f"No agent found with type '{agent_type}'")
-                futures.append(
-                    pool.submit(message_queue.send_message_in_queue, 
-                               client, matching_agents[0].id, payloads, agent_type)
-                )
-            
-            for future in tqdm(as_completed(futures), total=len(futures)):
-                response, agent_type = future.result()
-                responses.append(response)
+        agent_ids = {}
+        for agent_type in valid_agent_types:
+            matching_agents = [agent for agent in agents if agent.agent_type == agent_type]
+            if not matching_agents:
+                raise ValueError(f"No agent found with type '{agent_type}'")
+            agent_ids[agent_type] = matching_agents[0].id
+
+        for response, agent_type in message_queue.send_to_memory_agents(client, agent_ids, payloads):
+            responses.append(response)
 
         overall_end = time.time()
         response_message = f'[System Message] {len(valid_agent_types)} memory agents have been triggered in parallel to update the memory. Total time: {overall_end - overall_start:.2f} seconds.'
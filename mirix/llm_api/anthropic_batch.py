@@ -0,0 +1,277 @@
+"""
+Runs background memory-agent LLM calls through the Anthropic Message Batches API.
+
+In batch mode each memory-agent call to `AnthropicClient.send_llm_request` (or its async counterpart)
+is handed to the process-wide `AnthropicBatchCoordinator` instead, which submits it with
+`AnthropicClient.send_llm_batch_request_async`, polls the batch until it ends, and resumes every
+waiting agent with its own result so its step continues as if the call had been made directly.
+
+Memory agents are dispatched together (see `MessageQueue.send_to_memory_agents`, used by
+`_send_to_memory_agents_separately` and `trigger_memory_update`). Each fan-out runs its members in a
+`BatchGroup`: a member's request is held until every other member that is still running has queued
+its own request (or is already waiting on a batch), so all agents of a fan-out share one batch per
+step instead of one batch each.
+Requests made outside a group are submitted right away, together with whatever else is ready.
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from mirix.log import get_logger
+from mirix.settings import settings
+
+if TYPE_CHECKING:
+    from mirix.llm_api.anthropic_client import AnthropicClient
+    from mirix.schemas.message import Message
+
+logger = get_logger(__name__)
+
+_current_group: ContextVar[Optional["BatchGroup"]] = ContextVar("anthropic_batch_group", default=None)
+
+
+class BatchGroup:
+    """A set of agents dispatched together whose requests are submitted in the same batch."""
+
+    def __init__(self, coordinator: "AnthropicBatchCoordinator", size: int):
+        self._coordinator = coordinator
+        # Members that have not finished yet, and how many of them are queued / waiting on a batch
+        self.active = size
+        self.queued = 0
+        self.in_flight = 0
+
+    def run(self, func, *args, **kwargs):
+        """Run `func` in the calling (worker) thread as one member of this group."""
+        token = _current_group.set(self)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _current_group.reset(token)
+            self._coordinator._leave(self)
+
+    async def run_async(self, func, *args, **kwargs):
+        """Await `func(*args, **kwargs)` as one member of this group; run each member in its own task."""
+        token = _current_group.set(self)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _current_group.reset(token)
+            self._coordinator._leave(self)
+
+    def is_complete(self) -> bool:
+        return self.queued + self.in_flight >= self.active
+
+
+class _BatchRequest:
+    def __init__(self, client: "AnthropicClient", messages: List["Message"], tools: Optional[List[dict]], force_tool_call: Optional[str], api_key: Optional[str]):
+        self.custom_id = uuid.uuid4().hex
+        self.client = client
+        self.messages = messages
+        self.tools = tools
+        self.force_tool_call = force_tool_call
+        self.api_key = api_key
+        self.group = _current_group.get()
+        self.queued_at = time.monotonic()
+        self.future = Future()
+
+
+class AnthropicBatchCoordinator:
+    """Collects Anthropic requests into message batches and fans the results back out."""
+
+    def __init__(
+        self,
+        collect_window_seconds: float = settings.anthropic_batch_collect_window_seconds,
+        max_batch_size: int = settings.anthropic_batch_max_requests,
+        poll_interval_seconds: float = settings.anthropic_batch_poll_interval_seconds,
+        timeout_seconds: float = settings.anthropic_batch_timeout_seconds,
+    ):
+        # Longest a grouped request waits for the rest of its group before it is submitted anyway
+        self.collect_window_seconds = collect_window_seconds
+        self.max_batch_size = max_batch_size
+        self.poll_interval_seconds = poll_interval_seconds
+        self.timeout_seconds = timeout_seconds
+
+        self._pending: List[_BatchRequest] = []
+        self._condition = threading.Condition()
+        self._collector = None
+
+        self._batches_submitted = 0
+        self._requests_submitted = 0
+        self._requests_failed = 0
+        self._active_batches = 0
+
+    def group(self, size: int) -> BatchGroup:
+        """A group for `size` agents about to be dispatched together; run each of them with `group.run`."""
+        return BatchGroup(self, size)
+
+    def submit(
+        self,
+        client: "AnthropicClient",
+        messages: List["Message"],
+        tools: Optional[List[dict]] = None,
+        force_tool_call: Optional[str] = None,
+        api_key: Optional[str] = None,
+    ) -> dict:
+        """Queue one Messages API request and block until its batch result is available."""
+        request = self._enqueue(_BatchRequest(client, messages, tools, force_tool_call, api_key))
+        try:
+            return request.future.result()
+        finally:
+            self._finish(request)
+
+    async def submit_async(
+        self,
+        client: "AnthropicClient",
+        messages: List["Message"],
+        tools: Optional[List[dict]] = None,
+        force_tool_call: Optional[str] = None,
+        api_key: Optional[str] = None,
+    ) -> dict:
+        """Queue one Messages API request and await its batch result without holding a thread."""
+        request = self._enqueue(_BatchRequest(client, messages, tools, force_tool_call, api_key))
+        try:
+            return await asyncio.wrap_future(request.future)
+        finally:
+            self._finish(request)
+
+    def _enqueue(self, request: _BatchRequest) -> _BatchRequest:
+        with self._condition:
+            self._pending.append(request)
+            if request.group is not None:
+                request.group.queued += 1
+            if self._collector is None or not self._collector.is_alive():
+                self._collector = threading.Thread(target=self._collect_loop, name="anthropic_batch_collector", daemon=True)
+                self._collector.start()
+            self._condition.notify_all()
+        return request
+
+    def _finish(self, request: _BatchRequest):
+        if request.group is not None:
+            with self._condition:
+                request.group.in_flight -= 1
+
+    def _leave(self, group: BatchGroup):
+        with self._condition:
+            group.active -= 1
+            self._condition.notify_all()
+
+    def _is_ready(self, request: _BatchRequest, now: float) -> bool:
+        return (
+            request.group is None
+            or request.group.is_complete()
+            or now - request.queued_at >= self.collect_window_seconds
+        )
+
+    def _collect_loop(self):
+        while True:
+            with self._condition:
+                while True:
+                    if not self._pending:
+                        # Exit when idle; `submit` starts a new collector on demand
+                        self._collector = None
+                        return
+                    now = time.monotonic()
+                    ready = [request for request in self._pending if self._is_ready(request, now)]
+                    if ready:
+                        break
+                    oldest = min(request.queued_at for request in self._pending)
+                    self._condition.wait(timeout=max(oldest + self.collect_window_seconds - now, 0.01))
+
+                self._pending = [request for request in self._pending if request not in ready]
+                for request in ready:
+                    if request.group is not None:
+                        request.group.queued -= 1
+                        request.group.in_flight += 1
+
+            # Requests with different keys go to different batches
+            by_key: Dict[Optional[str], List[_BatchRequest]] = {}
+            for request in ready:
+                by_key.setdefault(request.api_key, []).append(request)
+            for requests in by_key.values():
+                for start in range(0, len(requests), self.max_batch_size):
+                    threading.Thread(
+                        target=self._run_batch,
+                        args=(requests[start : start + self.max_batch_size],),
+                        name="anthropic_batch_poller",
+                        daemon=True,
+                    ).start()
+
+    def _run_batch(self, requests: List[_BatchRequest]):
+        futures = {request.custom_id: request.future for request in requests}
+        with self._condition:
+            self._active_batches += 1
+        try:
+            client = requests[0].client
+            batch = asyncio.run(
+                client.send_llm_batch_request_async(
+                    agent_messages_mapping={request.custom_id: request.messages for request in requests},
+                    agent_tools_mapping={request.custom_id: request.tools for request in requests},
+                    agent_llm_config_mapping={request.custom_id: request.client.llm_config for request in requests},
+                    agent_force_tool_call_mapping={request.custom_id: request.force_tool_call for request in requests},
+                )
+            )
+            with self._condition:
+                self._batches_submitted += 1
+                self._requests_submitted += len(requests)
+            logger.info(f"Submitted Anthropic message batch {batch.id} with {len(requests)} requests")
+
+            sync_client = client._get_anthropic_client(async_client=False)
+            started = time.monotonic()
+            while batch.processing_status != "ended":
+                if time.monotonic() - started > self.timeout_seconds:
+                    sync_client.beta.messages.batches.cancel(batch.id)
+                    raise TimeoutError(f"Anthropic message batch {batch.id} did not finish within {self.timeout_seconds} seconds")
+                time.sleep(self.poll_interval_seconds)
+                batch = sync_client.beta.messages.batches.retrieve(batch.id)
+
+            for entry in sync_client.beta.messages.batches.results(batch.id):
+                future = futures.pop(entry.custom_id, None)
+                if future is None:
+                    continue
+                if entry.result.type == "succeeded":
+                    future.set_result(entry.result.message.model_dump())
+                else:
+                    error = getattr(entry.result, "error", None)
+                    future.set_exception(RuntimeError(f"Anthropic batch request {entry.result.type}: {error}"))
+                    with self._condition:
+                        self._requests_failed += 1
+
+            if futures:
+                raise RuntimeError(f"Anthropic message batch {batch.id} returned no result for {len(futures)} requests")
+        except Exception as e:
+            logger.error(f"Anthropic message batch failed: {e}")
+            with self._condition:
+                self._requests_failed += len(futures)
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            with self._condition:
+                self._active_batches -= 1
+
+    def get_metrics(self) -> dict:
+        with self._condition:
+            return {
+                "pending_requests": len(self._pending),
+                "active_batches": self._active_batches,
+                "batches_submitted": self._batches_submitted,
+                "requests_submitted": self._requests_submitted,
+                "requests_failed": self._requests_failed,
+            }
+
+
+_coordinator = None
+_coordinator_lock = threading.Lock()
+
+
+def get_anthropic_batch_coordinator() -> AnthropicBatchCoordinator:
+    """The process-wide batch coordinator, created on first use."""
+    global _coordinator
+    with _coordinator_lock:
+        if _coordinator is None:
+            _coordinator = AnthropicBatchCoordinator()
+        return _coordinator
@@ -23,9 +23,14 @@ from mirix.errors import (
     LLMUnprocessableEntityError,
 )
 from mirix.helpers.datetime_helpers import get_utc_time
+from mirix.llm_api.anthropic_batch import get_anthropic_batch_coordinator
+from mirix.llm_api.client_pool import get_anthropic_client
 from mirix.llm_api.helpers import add_inner_thoughts_to_functions, unpack_all_inner_thoughts_from_kwargs
+from mirix.llm_api.image_cache import encode_file_base64
 from mirix.llm_api.llm_client_base import LLMClientBase
-from mirix.constants import INNER_THOUGHTS_KWARG, INNER_THOUGHTS_KWARG_DESCRIPTION
+from mirix.llm_api.streaming import SendMessageStreamParser
+from mirix.llm_api.tool_schema_cache import get_tool_schema_cache
+from mirix.constants import ANTHROPIC_PROMPT_CACHING, INNER_THOUGHTS_KWARG, INNER_THOUGHTS_KWARG_DESCRIPTION
 from mirix.log import get_logger
 from mirix.schemas.llm_config import LLMConfig
 from mirix.schemas.message import Message as PydanticMessage
@@ -33,16 +38,111 @@ from mirix.schemas.openai.chat_completion_request import Tool
 from mirix.schemas.openai.chat_completion_response import ChatCompletionResponse, Choice, FunctionCall
 from mirix.schemas.openai.chat_completion_response import Message as ChoiceMessage
 from mirix.schemas.openai.chat_completion_response import ToolCall, UsageStatistics
+from mirix.services.db_executor import run_in_db_executor
 from mirix.services.provider_manager import ProviderManager
 from mirix.tracing import trace_method
 
 DUMMY_FIRST_USER_MESSAGE = "User initializing bootup sequence."
+CORE_MEMORY_END_TAG = "</core_memory>"
 
 logger = get_logger(__name__)
 
 
 class AnthropicClient(LLMClientBase):
 
+    def __init__(self, *args, use_batch_api: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Route requests through the Message Batches API (see mirix/llm_api/anthropic_batch.py)
+        self.use_batch_api = use_batch_api
+
+    def uses_rate_limiter(self) -> bool:
+        # Batched requests are queued by the provider; holding a rate limit permit for minutes would starve others
+        return not self.use_batch_api
+
+    def send_llm_request(
+        self,
+        messages: List[PydanticMessage],
+        tools: Optional[List[dict]] = None,
+        stream: bool = False,
+        force_tool_call: Optional[str] = None,
+        get_input_data_for_debugging: bool = False,
+        existing_file_uris: Optional[List[str]] = None,
+    ) -> ChatCompletionResponse:
+        if self.use_batch_api and not get_input_data_for_debugging:
+            return self._send_batched(messages, tools, force_tool_call)
+        return super().send_llm_request(
+            messages,
+            tools=tools,
+            stream=stream,
+            force_tool_call=force_tool_call,
+            get_input_data_for_debugging=get_input_data_for_debugging,
+            existing_file_uris=existing_file_uris,
+        )
+
+    def send_llm_request_stream(
+        self,
+        messages: List[PydanticMessage],
+        stream_handler: SendMessageStreamParser,
+        tools: Optional[List[dict]] = None,
+        force_tool_call: Optional[str] = None,
+        existing_file_uris: Optional[List[str]] = None,
+    ) -> ChatCompletionResponse:
+        if self.use_batch_api:
+            # Batched requests have no streaming counterpart
+            return self._send_batched(messages, tools, force_tool_call)
+        return super().send_llm_request_stream(
+            messages, stream_handler, tools=tools, force_tool_call=force_tool_call, existing_file_uris=existing_file_uris
+        )
+
+    async def send_llm_request_async(
+        self,
+        messages: List[PydanticMessage],
+        tools: Optional[List[dict]] = None,
+        force_tool_call: Optional[str] = None,
+        existing_file_uris: Optional[List[str]] = None,
+    ) -> ChatCompletionResponse:
+        if self.use_batch_api:
+            return await self._send_batched_async(messages, tools, force_tool_call)
+        return await super().send_llm_request_async(
+            messages, tools=tools, force_tool_call=force_tool_call, existing_file_uris=existing_file_uris
+        )
+
+    async def send_llm_request_stream_async(
+        self,
+        messages: List[PydanticMessage],
+        stream_handler: SendMessageStreamParser,
+        tools: Optional[List[dict]] = None,
+        force_tool_call: Optional[str] = None,
+        existing_file_uris: Optional[List[str]] = None,
+    ) -> ChatCompletionResponse:
+        if self.use_batch_api:
+            return await self._send_batched_async(messages, tools, force_tool_call)
+        return await super().send_llm_request_stream_async(
+            messages, stream_handler, tools=tools, force_tool_call=force_tool_call, existing_file_uris=existing_file_uris
+        )
+
+    def _send_batched(self, messages: List[PydanticMessage], tools: Optional[List[dict]], force_tool_call: Optional[str]) -> ChatCompletionResponse:
+        """Hand the request to the batch coordinator, which submits it via `send_llm_batch_request_async`."""
+        override_key = ProviderManager().get_anthropic_override_key()
+        try:
+            response_data = get_anthropic_batch_coordinator().submit(
+                self, messages, tools=tools, force_tool_call=force_tool_call, api_key=override_key
+            )
+        except Exception as e:
+            raise self.handle_llm_error(e)
+        return self.convert_response_to_chat_completion(response_data, messages)
+
+    async def _send_batched_async(self, messages: List[PydanticMessage], tools: Optional[List[dict]], force_tool_call: Optional[str]) -> ChatCompletionResponse:
+        """Async counterpart of `_send_batched`; the agent awaits its batch result without holding a thread."""
+        override_key = await run_in_db_executor(ProviderManager().get_anthropic_override_key)
+        try:
+            response_data = await get_anthropic_batch_coordinator().submit_async(
+                self, messages, tools=tools, force_tool_call=force_tool_call, api_key=override_key
+            )
+        except Exception as e:
+            raise self.handle_llm_error(e)
+        return self.convert_response_to_chat_completion(response_data, messages)
+
     def request(self, request_data: dict) -> dict:
         client = self._get_anthropic_client(async_client=False)
         response = client.beta.messages.create(**request_data, betas=["tools-2024-04-04"])
@@ -53,6 +153,26 @@ class AnthropicClient(LLMClientBase):
         response = await client.beta.messages.create(**request_data, betas=["tools-2024-04-04"])
         return response.model_dump()
 
+    def request_stream(self, request_data: dict, stream_handler: SendMessageStreamParser) -> dict:
+        client = self._get_anthropic_client(async_client=False)
+        with client.beta.messages.stream(**request_data, betas=["tools-2024-04-04"]) as stream:
+            for event in stream:
+                if event.type == "content_block_start" and event.content_block.type == "tool_use":
+                    stream_handler.on_tool_call_delta(event.index, name=event.content_block.name)
+                elif event.type == "content_block_delta" and event.delta.type == "input_json_delta":
+                    stream_handler.on_tool_call_delta(event.index, arguments=event.delta.partial_json)
+            return stream.get_final_message().model_dump()
+
+    async def request_stream_async(self, request_data: dict, stream_handler: SendMessageStreamParser) -> dict:
+        client = self._get_anthropic_client(async_client=True)
+        async with client.beta.messages.stream(**request_data, betas=["tools-2024-04-04"]) as stream:
+            async for event in stream:
+                if event.type == "content_block_start" and event.content_block.type == "tool_use":
+                    stream_handler.on_tool_call_delta(event.index, name=event.content_block.name)
+                elif event.type == "content_block_delta" and event.delta.type == "input_json_delta":
+                    stream_handler.on_tool_call_delta(event.index, arguments=event.delta.partial_json)
+            return (await stream.get_final_message()).model_dump()
+
     @trace_method
     async def stream_async(self, request_data: dict) -> AsyncStream[BetaRawMessageStreamEvent]:
         client = self._get_anthropic_client(async_client=True)
@@ -65,6 +185,7 @@ class AnthropicClient(LLMClientBase):
         agent_messages_mapping: Dict[str, List[PydanticMessage]],
         agent_tools_mapping: Dict[str, List[dict]],
         agent_llm_config_mapping: Dict[str, LLMConfig],
+        agent_force_tool_call_mapping: Optional[Dict[str, Optional[str]]] = None,
     ) -> BetaMessageBatch:
         """
         Sends a batch request to the Anthropic API using the provided agent messages and tools mappings.
@@ -73,6 +194,7 @@ class AnthropicClient(LLMClientBase):
             agent_messages_mapping: A dict mapping agent_id to their list of PydanticMessages.
             agent_tools_mapping: A dict mapping agent_id to their list of tool dicts.
             agent_llm_config_mapping: A dict mapping agent_id to their LLM config
+            agent_force_tool_call_mapping: An optional dict mapping agent_id to the tool the request must call
 
         Returns:
             BetaMessageBatch: The batch response from the Anthropic API.
@@ -91,6 +213,7 @@ class AnthropicClient(LLMClientBase):
                     messages=agent_messages_mapping[agent_id],
                     llm_config=agent_llm_config_mapping[agent_id],
                     tools=agent_tools_mapping[agent_id],
+                    force_tool_call=(agent_force_tool_call_mapping or {}).get(agent_id),
                 )
                 for agent_id in agent_messages_mapping
             }
@@ -113,9 +236,7 @@ class AnthropicClient(LLMClientBase):
     @trace_method
     def _get_anthropic_client(self, async_client: bool = False) -> Union[anthropic.AsyncAnthropic, anthropic.Anthropic]:
         override_key = ProviderManager().get_anthropic_override_key()
-        if async_client:
-            return anthropic.AsyncAnthropic(api_key=override_key) if override_key else anthropic.AsyncAnthropic()
-        return anthropic.Anthropic(api_key=override_key) if override_key else anthropic.Anthropic()
+        return get_anthropic_client(api_key=override_key, async_client=async_client)
 
     @trace_method
     def build_request_data(
@@ -156,17 +277,16 @@ class AnthropicClient(LLMClientBase):
         # Tools
         # For an overview on tool choice:
         # https://docs.anthropic.com/en/docs/build-with-claude/tool-use/overview
+        forced_tool_name = None
         if not tools:
             # Special case for summarization path
-            tools_for_request = None
             tool_choice = None
         elif llm_config.enable_reasoner:
             # NOTE: reasoning models currently do not allow for `any`
             tool_choice = {"type": "auto", "disable_parallel_tool_use": True}
-            tools_for_request = [Tool(function=f) for f in tools]
         elif force_tool_call is not None:
             tool_choice = {"type": "tool", "name": force_tool_call}
-            tools_for_request = [Tool(function=f) for f in tools if f["name"] == force_tool_call]
+            forced_tool_name = force_tool_call
 
             # need to have this setting to be able to put inner thoughts in kwargs
             if not llm_config.put_inner_thoughts_in_kwargs:
@@ -180,25 +300,21 @@ class AnthropicClient(LLMClientBase):
                 tool_choice = {"type": "any", "disable_parallel_tool_use": True}
             else:
                 tool_choice = {"type": "auto", "disable_parallel_tool_use": True}
-            tools_for_request = [Tool(function=f) for f in tools] if tools is not None else None
 
         # Add tool choice
         if tool_choice:
             data["tool_choice"] = tool_choice
 
-        # Add inner thoughts kwarg
-        # TODO: Can probably make this more efficient
-        if tools_for_request and len(tools_for_request) > 0 and llm_config.put_inner_thoughts_in_kwargs:
-            tools_with_inner_thoughts = add_inner_thoughts_to_functions(
-                functions=[t.function.model_dump() for t in tools_for_request],
-                inner_thoughts_key=INNER_THOUGHTS_KWARG,
-                inner_thoughts_description=INNER_THOUGHTS_KWARG_DESCRIPTION,
+        if tools:
+            put_inner_thoughts_in_kwargs = llm_config.put_inner_thoughts_in_kwargs
+            compiled_tools = get_tool_schema_cache().get_or_compile(
+                ("anthropic", forced_tool_name, put_inner_thoughts_in_kwargs, ANTHROPIC_PROMPT_CACHING),
+                tools,
+                lambda functions: self.compile_tools(functions, forced_tool_name, put_inner_thoughts_in_kwargs),
             )
-            tools_for_request = [Tool(function=f) for f in tools_with_inner_thoughts]
-
-        if tools_for_request and len(tools_for_request) > 0:
-            # TODO eventually enable parallel tool use
-            data["tools"] = convert_tools_to_anthropic_format(tools_for_request)
+            if compiled_tools:
+                # TODO eventually enable parallel tool use
+                data["tools"] = compiled_tools
 
         # Messages
         inner_thoughts_xml_tag = "thinking"
@@ -207,6 +323,8 @@ class AnthropicClient(LLMClientBase):
         if messages[0].role != "system":
             raise RuntimeError(f"First message is not a system message, instead has role {messages[0].role}")
         data["system"] = messages[0].content if isinstance(messages[0].content, str) else messages[0].content[0].text
+        if ANTHROPIC_PROMPT_CACHING:
+            data["system"] = build_cacheable_system_blocks(data["system"])
         data["messages"] = [
             m.to_anthropic_dict(
                 inner_thoughts_xml_tag=inner_thoughts_xml_tag,
@@ -236,6 +354,31 @@ class AnthropicClient(LLMClientBase):
 
         return data
 
+    def compile_tools(self, functions: List[dict], forced_tool_name: Optional[str], put_inner_thoughts_in_kwargs: bool) -> List[dict]:
+        """
+        Convert tool JSON schemas into the request's `tools` payload. The result is cached across
+        requests (see mirix/llm_api/tool_schema_cache.py), so it must only depend on the arguments.
+        """
+        if forced_tool_name is not None:
+            functions = [f for f in functions if f["name"] == forced_tool_name]
+        if not functions:
+            return []
+
+        # Add inner thoughts kwarg
+        if put_inner_thoughts_in_kwargs:
+            functions = add_inner_thoughts_to_functions(
+                functions=[Tool(function=f).function.model_dump() for f in functions],
+                inner_thoughts_key=INNER_THOUGHTS_KWARG,
+                inner_thoughts_description=INNER_THOUGHTS_KWARG_DESCRIPTION,
+            )
+
+        compiled = convert_tools_to_anthropic_format([Tool(function=f) for f in functions])
+        if ANTHROPIC_PROMPT_CACHING:
+            # Tools come first in the prompt, so keep their order stable and cache them as one block
+            compiled = sorted(compiled, key=lambda t: t["name"])
+            compiled[-1]["cache_control"] = {"type": "ephemeral"}
+        return compiled
+
     def fill_image_content_in_messages(self, messages: List[dict]) -> List[dict]:
         """
         Converts image URIs in the message to base64 format.
@@ -248,6 +391,12 @@ class AnthropicClient(LLMClientBase):
 
         image_content_loaded = False # it will always be false if `LOAD_IMAGE_CONTENT_FOR_LAST_MESSAGE_ONLY` is False
 
+        files = self._load_file_metadata([
+            m.get('image_id') or m.get('cloud_file_uri')
+            for message in messages if message['role'] == 'user' and isinstance(message["content"], list)
+            for m in message["content"] if m['type'] in ('image_url', 'cloud_file_uri')
+        ])
+
         for message_idx, message in enumerate(messages[::-1]):
 
             if message['role'] != 'user':
@@ -272,7 +421,7 @@ class AnthropicClient(LLMClientBase):
                         })
 
                     else:
-                        file = self.file_manager.get_file_metadata_by_id(m['image_id'])
+                        file = self._get_file_metadata(files, m['image_id'])
                         if file.source_url is not None:
                             message_content.append({
                                 'type': 'image',
@@ -283,47 +432,43 @@ class AnthropicClient(LLMClientBase):
                             })
                         elif file.file_path is not None:
                             import mimetypes
-                            import base64
                             mime_type, _ = mimetypes.guess_type(file.file_path)
                             if mime_type is None or not mime_type.startswith('image/'):
                                 mime_type = 'image/jpeg'  # Default fallback
                             
-                            with open(file.file_path, "rb") as img_file:
-                                base64_data = base64.b64encode(img_file.read()).decode("utf-8")
-                                message_content.append({
-                                    'type': 'image',
-                                    'source': {
-                                        'type': 'base64',
-                                        'media_type': mime_type,
-                                        'data': base64_data,
-                                    }
-                                })
+                            base64_data = encode_file_base64(file.file_path, file_id=file.id)
+                            message_content.append({
+                                'type': 'image',
+                                'source': {
+                                    'type': 'base64',
+                                    'media_type': mime_type,
+                                    'data': base64_data,
+                                }
+                            })
                         else:
                             raise ValueError(f"File {file.file_path} has no source_url or file_path")
                         # global_image_idx += 1
                         has_image = True
                 elif m['type'] == 'cloud_file_uri':
-                    file = self.file_manager.get_file_metadata_by_id(m['cloud_file_uri'])
+                    file = self._get_file_metadata(files, m['cloud_file_uri'])
                     local_path = self.cloud_file_mapping_manager.get_local_file(file.google_cloud_url)
                     
                     import mimetypes
-                    import base64
                     
                     # Get the MIME type of the image
                     mime_type, _ = mimetypes.guess_type(local_path)
                     if mime_type is None or not mime_type.startswith('image/'):
                         mime_type = 'image/jpeg'  # Default fallback
                     
-                    with open(local_path, "rb") as img_file:
-                        base64_data = base64.b64encode(img_file.read()).decode("utf-8")
-                        message_content.append({
-                            'type': 'image',
-                            'source': {
-                                'type': 'base64',
-                                'media_type': mime_type,
-                                'data': base64_data,
-                            }
-                        })
+                    base64_data = encode_file_base64(local_path)
+                    message_content.append({
+                        'type': 'image',
+                        'source': {
+                            'type': 'base64',
+                            'media_type': mime_type,
+                            'data': base64_data,
+                        }
+                    })
                 else:
                     message_content.append(m)
             message["content"] = message_content
@@ -451,7 +596,10 @@ class AnthropicClient(LLMClientBase):
         }
         """
         response = AnthropicMessage(**response_data)
-        prompt_tokens = response.usage.input_tokens
+        # `input_tokens` only counts the uncached part of the prompt
+        cache_creation_input_tokens = response.usage.cache_creation_input_tokens or 0
+        cache_read_input_tokens = response.usage.cache_read_input_tokens or 0
+        prompt_tokens = response.usage.input_tokens + cache_creation_input_tokens + cache_read_input_tokens
         completion_tokens = response.usage.output_tokens
         finish_reason = remap_finish_reason(str(response.stop_reason))
 
@@ -514,6 +662,8 @@ class AnthropicClient(LLMClientBase):
                 prompt_tokens=prompt_tokens,
                 completion_tokens=completion_tokens,
                 total_tokens=prompt_tokens + completion_tokens,
+                cache_creation_input_tokens=cache_creation_input_tokens,
+                cache_read_input_tokens=cache_read_input_tokens,
             ),
         )
         if self.llm_config.put_inner_thoughts_in_kwargs:
@@ -524,6 +674,25 @@ class AnthropicClient(LLMClientBase):
         return chat_completion_response
 
 
+def build_cacheable_system_blocks(system: str) -> List[dict]:
+    """
+    Split the system prompt into Anthropic text blocks with a cache breakpoint after the stable prefix.
+
+    The memory-augmented system prompt is the raw system prompt, then core memory, then the volatile
+    part (current time, keywords and retrieved memories). Only the prefix up to the end of core memory
+    is marked cacheable; without core memory the whole prompt is treated as stable.
+    """
+    boundary = system.find(CORE_MEMORY_END_TAG)
+    if boundary == -1:
+        return [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+
+    boundary += len(CORE_MEMORY_END_TAG)
+    blocks = [{"type": "text", "text": system[:boundary], "cache_control": {"type": "ephemeral"}}]
+    if system[boundary:].strip():
+        blocks.append({"type": "text", "text": system[boundary:]})
+    return blocks
+
+
 def convert_tools_to_anthropic_format(tools: List[Tool]) -> List[dict]:
     """See: https://docs.anthropic.com/claude/docs/tool-use
 
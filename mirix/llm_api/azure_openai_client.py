@@ -1,10 +1,11 @@
 import os
-from typing import List, Optional
+from typing import List, Optional, Union
 
 from openai import AsyncAzureOpenAI, AsyncStream, AzureOpenAI, Stream
 from openai.types.chat.chat_completion import ChatCompletion
 from openai.types.chat.chat_completion_chunk import ChatCompletionChunk
 
+from mirix.llm_api.client_pool import get_azure_openai_client
 from mirix.llm_api.openai_client import OpenAIClient
 from mirix.log import get_logger
 from mirix.schemas.llm_config import LLMConfig
@@ -57,6 +58,10 @@ class AzureOpenAIClient(OpenAIClient):
         logger.debug(f"Azure OpenAI client initialized with endpoint: {azure_endpoint}, deployment: {azure_deployment}")
         return kwargs
 
+    def _get_client(self, async_client: bool = False) -> Union[AzureOpenAI, AsyncAzureOpenAI]:
+        """Get a pooled Azure client so HTTP connections are reused across requests."""
+        return get_azure_openai_client(self._prepare_client_kwargs(), async_client=async_client)
+
     def build_request_data(
         self,
         messages: List[PydanticMessage],
@@ -90,7 +95,7 @@ class AzureOpenAIClient(OpenAIClient):
         """
         Performs synchronous request to Azure OpenAI API.
         """
-        client = AzureOpenAI(**self._prepare_client_kwargs())
+        client = self._get_client()
         response: ChatCompletion = client.chat.completions.create(**request_data)
         return response.model_dump()
 
@@ -98,7 +103,7 @@ class AzureOpenAIClient(OpenAIClient):
         """
         Performs asynchronous request to Azure OpenAI API.
         """
-        client = AsyncAzureOpenAI(**self._prepare_client_kwargs())
+        client = self._get_client(async_client=True)
         response: ChatCompletion = await client.chat.completions.create(**request_data)
         return response.model_dump()
 
@@ -106,7 +111,7 @@ class AzureOpenAIClient(OpenAIClient):
         """
         Performs streaming request to Azure OpenAI API.
         """
-        client = AzureOpenAI(**self._prepare_client_kwargs())
+        client = self._get_client()
         response_stream: Stream[ChatCompletionChunk] = client.chat.completions.create(**request_data, stream=True)
         return response_stream
 
@@ -114,6 +119,6 @@ class AzureOpenAIClient(OpenAIClient):
         """
         Performs asynchronous streaming request to Azure OpenAI API.
         """
-        client = AsyncAzureOpenAI(**self._prepare_client_kwargs())
+        client = self._get_client(async_client=True)
         response_stream: AsyncStream[ChatCompletionChunk] = await client.chat.completions.create(**request_data, stream=True)
         return response_stream 
\ No newline at end of file
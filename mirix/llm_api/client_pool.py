@@ -0,0 +1,177 @@
+"""
+Per-process pool of long-lived LLM provider clients.
+
+Constructing a provider SDK client (or a bare `requests.post`) per call throws away the
+underlying HTTP connection pool, so every LLM call pays for a fresh TCP/TLS handshake.
+The pool hands out one client per (endpoint type, endpoint, api key) so keep-alive
+connections are reused across the many calls of an absorption cycle.
+"""
+
+import asyncio
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from mirix.log import get_logger
+from mirix.settings import settings
+
+logger = get_logger(__name__)
+
+# Upper bound on pooled clients; least recently used clients are dropped beyond this
+MAX_POOLED_CLIENTS = 64
+# Connections kept alive per host by pooled `requests` sessions
+HTTP_POOL_MAXSIZE = 32
+
+
+class ProviderClientPool:
+    """Thread-safe LRU pool of provider clients keyed by (endpoint type, endpoint, key, variant)."""
+
+    def __init__(self, max_size: int = MAX_POOLED_CLIENTS):
+        self.max_size = max_size
+        self._clients: "OrderedDict[Tuple[Hashable, ...], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get_or_create(self, key: Tuple[Hashable, ...], factory: Callable[[], Any]) -> Any:
+        """Return the pooled client for `key`, creating it with `factory` on first use."""
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                self._hits += 1
+                return client
+            self._misses += 1
+
+        # Build outside the lock; if two threads race, the first one stored wins
+        client = factory()
+        with self._lock:
+            existing = self._clients.get(key)
+            if existing is not None:
+                return existing
+            self._clients[key] = client
+            while len(self._clients) > self.max_size:
+                _, evicted = self._clients.popitem(last=False)
+                self._close_quietly(evicted)
+        return client
+
+    def drop_closed_loops(self):
+        """Drop the async clients of event loops that were closed or garbage collected."""
+        with self._lock:
+            for key in list(self._clients):
+                loop_ref = key[-1]
+                if isinstance(loop_ref, weakref.ref):
+                    loop = loop_ref()
+                    if loop is None or loop.is_closed():
+                        # Their connections died with the loop; nothing is left to close
+                        del self._clients[key]
+
+    def clear(self):
+        """Drop all pooled clients (e.g. after credentials change)."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            self._close_quietly(client)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._clients), "hits": self._hits, "misses": self._misses}
+
+    @staticmethod
+    def _close_quietly(client: Any):
+        # Async clients must be closed on their own loop; let them be garbage collected instead
+        close = getattr(client, "close", None)
+        if close is None or asyncio.iscoroutinefunction(close):
+            return
+        try:
+            close()
+        except Exception as e:
+            logger.debug(f"Failed to close pooled client: {e}")
+
+
+_pool = ProviderClientPool()
+
+
+def get_client_pool() -> ProviderClientPool:
+    """The process-wide provider client pool."""
+    return _pool
+
+
+def _loop_key() -> Optional[weakref.ref]:
+    # Async HTTP connections are bound to the event loop that opened them. Key by a weak reference to the
+    # loop rather than its id, which a later loop can reuse, and forget the clients of finished loops.
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    _pool.drop_closed_loops()
+    return weakref.ref(loop)
+
+
+def get_openai_client(client_kwargs: dict, async_client: bool = False):
+    """Pooled `OpenAI` / `AsyncOpenAI` client for the given constructor kwargs."""
+    from openai import AsyncOpenAI, OpenAI
+
+    key = ("openai", client_kwargs.get("base_url"), client_kwargs.get("api_key"), "async" if async_client else "sync")
+    if async_client:
+        key += (_loop_key(),)
+        return _pool.get_or_create(key, lambda: AsyncOpenAI(**client_kwargs))
+    return _pool.get_or_create(key, lambda: OpenAI(**client_kwargs))
+
+
+def get_azure_openai_client(client_kwargs: dict, async_client: bool = False):
+    """Pooled `AzureOpenAI` / `AsyncAzureOpenAI` client for the given constructor kwargs."""
+    from openai import AsyncAzureOpenAI, AzureOpenAI
+
+    key = (
+        "azure_openai",
+        client_kwargs.get("azure_endpoint"),
+        client_kwargs.get("api_key"),
+        client_kwargs.get("api_version"),
+        "async" if async_client else "sync",
+    )
+    if async_client:
+        key += (_loop_key(),)
+        return _pool.get_or_create(key, lambda: AsyncAzureOpenAI(**client_kwargs))
+    return _pool.get_or_create(key, lambda: AzureOpenAI(**client_kwargs))
+
+
+def get_anthropic_client(api_key: Optional[str] = None, async_client: bool = False):
+    """Pooled `Anthropic` / `AsyncAnthropic` client; `api_key=None` uses the SDK's environment lookup."""
+    import anthropic
+
+    kwargs = {"api_key": api_key} if api_key else {}
+    key = ("anthropic", None, api_key, "async" if async_client else "sync")
+    if async_client:
+        key += (_loop_key(),)
+        return _pool.get_or_create(key, lambda: anthropic.AsyncAnthropic(**kwargs))
+    return _pool.get_or_create(key, lambda: anthropic.Anthropic(**kwargs))
+
+
+def get_http_session(endpoint_type: str, base_url: Optional[str] = None) -> requests.Session:
+    """Pooled keep-alive `requests.Session` for raw HTTP providers (e.g. the Gemini REST API)."""
+
+    def _create_session() -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_MAXSIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    return _pool.get_or_create(("http", endpoint_type, base_url), _create_session)
+
+
+def get_async_http_client(endpoint_type: str, base_url: Optional[str] = None):
+    """Pooled `httpx.AsyncClient` for raw HTTP providers, bound to the running event loop."""
+    import httpx
+
+    def _create_client():
+        limits = httpx.Limits(max_connections=HTTP_POOL_MAXSIZE, max_keepalive_connections=HTTP_POOL_MAXSIZE)
+        return httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(settings.httpx_timeout_read, connect=settings.httpx_timeout_connect))
+
+    return _pool.get_or_create(("async_http", endpoint_type, base_url, _loop_key()), _create_client)
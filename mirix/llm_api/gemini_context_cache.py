@@ -0,0 +1,204 @@
+"""
+Gemini context caching for absorption batches.
+
+During an absorption cycle the memory agents all receive the same batch of screenshot file URIs.
+Instead of re-sending the files with every generateContent call, the screenshots are moved into a
+Gemini `cachedContents` entry and the request references it by name. The entry lives until the
+batch is cleaned up (`release_files`) or its TTL runs out, whichever comes first.
+
+Gemini does not allow `tools` / `tool_config` on a request that uses cached content, so they are
+stored in the cache entry too; entries are therefore keyed by (model, tool set, screenshot URIs)
+and shared by every request of that agent for the batch, including chained steps.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from mirix.constants import (
+    GEMINI_CONTEXT_CACHE_MIN_TOKENS,
+    GEMINI_CONTEXT_CACHE_TTL_SECONDS,
+    GEMINI_IMAGE_TOKEN_ESTIMATE,
+)
+from mirix.log import get_logger
+
+logger = get_logger(__name__)
+
+SCREENSHOT_LABEL = "[Screenshot {idx}]"
+SCREENSHOT_REFERENCE = "[Screenshot {idx}: provided at the beginning of the conversation]"
+
+
+class _CacheEntry:
+    def __init__(self, name: Optional[str], file_uris: Tuple[str, ...], base_url: str, api_key: str, expires_at: float):
+        # `name` is None for batches where cache creation failed, so it is not retried every call
+        self.name = name
+        self.file_uris = file_uris
+        self.base_url = base_url
+        self.api_key = api_key
+        self.expires_at = expires_at
+
+
+class GeminiContextCacheManager:
+    """Creates, reuses and releases Gemini cached-content entries for screenshot batches."""
+
+    def __init__(self, ttl_seconds: int = GEMINI_CONTEXT_CACHE_TTL_SECONDS, min_tokens: int = GEMINI_CONTEXT_CACHE_MIN_TOKENS):
+        self.ttl_seconds = ttl_seconds
+        self.min_tokens = min_tokens
+        self._entries: Dict[Tuple, _CacheEntry] = {}
+        self._lock = threading.Lock()
+        self._created = 0
+        self._reused = 0
+        self._failed = 0
+        self._released = 0
+
+    def prepare_request(
+        self,
+        request_data: dict,
+        model: str,
+        base_url: str,
+        api_key: str,
+        session: Optional[requests.Session] = None,
+    ) -> dict:
+        """
+        Return `request_data` rewritten to use a cached-content entry holding its screenshots,
+        or `request_data` unchanged when the batch is too small or caching is unavailable.
+        """
+        file_uris = tuple(
+            part["file_data"]["file_uri"]
+            for content in request_data.get("contents", [])
+            for part in content.get("parts", [])
+            if "file_data" in part
+        )
+        if not file_uris or self._estimate_tokens(request_data, len(file_uris)) < self.min_tokens:
+            return request_data
+
+        tools_fingerprint = hashlib.sha256(
+            json.dumps([request_data.get("tools"), request_data.get("tool_config")], sort_keys=True, default=str).encode()
+        ).hexdigest()
+        key = (base_url, model, tools_fingerprint, file_uris)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.time():
+                self._entries.pop(key)
+                entry = None
+            if entry is not None:
+                if entry.name is None:
+                    return request_data
+                self._reused += 1
+
+        if entry is None:
+            entry = self._create_entry(key, request_data, model, base_url, api_key, session)
+            if entry.name is None:
+                return request_data
+
+        return self._rewrite_request(request_data, entry.name)
+
+    def release_files(self, file_uris: List[str]):
+        """Delete every cache entry that holds any of `file_uris` (called once a batch is absorbed)."""
+        file_uris = set(file_uris)
+        with self._lock:
+            released = [key for key, entry in self._entries.items() if file_uris.intersection(entry.file_uris)]
+            entries = [self._entries.pop(key) for key in released]
+
+        for entry in entries:
+            if entry.name is None:
+                continue
+            try:
+                requests.delete(f"{entry.base_url}/v1beta/{entry.name}", headers={"x-goog-api-key": entry.api_key})
+                with self._lock:
+                    self._released += 1
+            except Exception as e:
+                # The entry still expires on its own via its TTL
+                logger.debug(f"Failed to delete Gemini cached content {entry.name}: {e}")
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            return {
+                "active_entries": sum(1 for entry in self._entries.values() if entry.name is not None),
+                "created": self._created,
+                "reused": self._reused,
+                "failed": self._failed,
+                "released": self._released,
+            }
+
+    @staticmethod
+    def _estimate_tokens(request_data: dict, num_files: int) -> int:
+        tools = json.dumps(request_data.get("tools") or [], default=str)
+        return num_files * GEMINI_IMAGE_TOKEN_ESTIMATE + len(tools) // 4
+
+    def _create_entry(self, key, request_data, model, base_url, api_key, session) -> _CacheEntry:
+        _, _, _, file_uris = key
+        file_parts = [
+            part
+            for content in request_data.get("contents", [])
+            for part in content.get("parts", [])
+            if "file_data" in part
+        ]
+        cached_parts = []
+        for idx, part in enumerate(file_parts):
+            cached_parts.append({"text": SCREENSHOT_LABEL.format(idx=idx)})
+            cached_parts.append(part)
+
+        body = {
+            "model": f"models/{model}",
+            "contents": [{"role": "user", "parts": cached_parts}],
+            "ttl": f"{self.ttl_seconds}s",
+        }
+        if request_data.get("tools"):
+            body["tools"] = request_data["tools"]
+        if request_data.get("tool_config"):
+            body["tool_config"] = request_data["tool_config"]
+
+        name = None
+        try:
+            response = (session or requests).post(
+                f"{base_url}/v1beta/cachedContents",
+                headers={"Content-Type": "application/json", "x-goog-api-key": api_key},
+                json=body,
+            )
+            response.raise_for_status()
+            name = response.json()["name"]
+        except Exception as e:
+            # Typically the batch is below the model's minimum cacheable size; send it uncached
+            logger.info(f"Gemini context cache not created for {len(file_uris)} screenshots: {e}")
+
+        entry = _CacheEntry(name, file_uris, base_url, api_key, time.time() + self.ttl_seconds)
+        with self._lock:
+            if name is None:
+                self._failed += 1
+            else:
+                self._created += 1
+            self._entries[key] = entry
+        return entry
+
+    @staticmethod
+    def _rewrite_request(request_data: dict, cache_name: str) -> dict:
+        idx = 0
+        contents = []
+        for content in request_data["contents"]:
+            parts = []
+            for part in content.get("parts", []):
+                if "file_data" in part:
+                    parts.append({"text": SCREENSHOT_REFERENCE.format(idx=idx)})
+                    idx += 1
+                else:
+                    parts.append(part)
+            contents.append({**content, "parts": parts})
+
+        rewritten = {k: v for k, v in request_data.items() if k not in ("tools", "tool_config")}
+        rewritten["contents"] = contents
+        rewritten["cached_content"] = cache_name
+        return rewritten
+
+
+_manager = GeminiContextCacheManager()
+
+
+def get_gemini_context_cache() -> GeminiContextCacheManager:
+    """The process-wide Gemini context cache manager."""
+    return _manager
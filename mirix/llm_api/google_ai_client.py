@@ -1,3 +1,4 @@
+import asyncio
 import os
 import json
 import uuid
@@ -6,11 +7,16 @@ from typing import List, Optional, Tuple
 import requests
 from google.genai.types import FunctionCallingConfig, FunctionCallingConfigMode, ToolConfig
 
-from mirix.constants import NON_USER_MSG_PREFIX
+from mirix.constants import GEMINI_CONTEXT_CACHING, NON_USER_MSG_PREFIX
 from mirix.helpers.datetime_helpers import get_utc_time
 from mirix.helpers.json_helpers import json_dumps
+from mirix.llm_api.client_pool import get_async_http_client, get_http_session
+from mirix.llm_api.gemini_context_cache import get_gemini_context_cache
 from mirix.llm_api.helpers import make_post_request
+from mirix.llm_api.image_cache import encode_file_base64, encode_url_base64
 from mirix.llm_api.llm_client_base import LLMClientBase
+from mirix.llm_api.streaming import SendMessageStreamParser
+from mirix.llm_api.tool_schema_cache import get_tool_schema_cache
 from mirix.utils import clean_json_string_extra_backslash, count_tokens
 from mirix.log import get_logger
 from mirix.schemas.llm_config import LLMConfig
@@ -18,6 +24,7 @@ from mirix.schemas.message import Message as PydanticMessage
 from mirix.schemas.openai.chat_completion_request import Tool
 from mirix.schemas.openai.chat_completion_response import ChatCompletionResponse, Choice, FunctionCall, Message, ToolCall, UsageStatistics
 from mirix.settings import model_settings
+from mirix.services.db_executor import run_in_db_executor
 from mirix.services.provider_manager import ProviderManager
 from mirix.utils import get_tool_call_id
 
@@ -26,16 +33,42 @@ logger = get_logger(__name__)
 
 class GoogleAIClient(LLMClientBase):
 
+    def _get_api_key(self) -> str:
+        # Check for database-stored API key first, fall back to model_settings
+        override_key = ProviderManager().get_gemini_override_key()
+        return str(override_key) if override_key else str(model_settings.gemini_api_key)
+
     def request(self, request_data: dict) -> dict:
         """
         Performs underlying request to llm and returns raw response.
         """
         # print("[google_ai request]", json.dumps(request_data, indent=2))
 
-        # Check for database-stored API key first, fall back to model_settings
-        override_key = ProviderManager().get_gemini_override_key()
-        api_key = str(override_key) if override_key else str(model_settings.gemini_api_key)
+        api_key = self._get_api_key()
+        url, headers = get_gemini_endpoint_and_headers(
+            base_url=str(self.llm_config.model_endpoint),
+            model=self.llm_config.model,
+            api_key=api_key,
+            key_in_header=True,
+            generate_content=True,
+        )
+        session = get_http_session("google_ai", str(self.llm_config.model_endpoint))
+        if GEMINI_CONTEXT_CACHING:
+            request_data = get_gemini_context_cache().prepare_request(
+                request_data,
+                model=self.llm_config.model,
+                base_url=str(self.llm_config.model_endpoint),
+                api_key=api_key,
+                session=session,
+            )
+        return make_post_request(url, headers, request_data, session=session)
 
+    def request_stream(self, request_data: dict, stream_handler: SendMessageStreamParser) -> dict:
+        """
+        Performs a streamGenerateContent request and returns the chunks merged into one generateContent response.
+        Gemini emits each function call whole, so `stream_handler` receives one fragment per call.
+        """
+        api_key = self._get_api_key()
         url, headers = get_gemini_endpoint_and_headers(
             base_url=str(self.llm_config.model_endpoint),
             model=self.llm_config.model,
@@ -43,7 +76,72 @@ class GoogleAIClient(LLMClientBase):
             key_in_header=True,
             generate_content=True,
         )
-        return make_post_request(url, headers, request_data)
+        url = url.replace(":generateContent", ":streamGenerateContent") + "?alt=sse"
+        session = get_http_session("google_ai", str(self.llm_config.model_endpoint))
+        if GEMINI_CONTEXT_CACHING:
+            request_data = get_gemini_context_cache().prepare_request(
+                request_data,
+                model=self.llm_config.model,
+                base_url=str(self.llm_config.model_endpoint),
+                api_key=api_key,
+                session=session,
+            )
+
+        parts = []
+        response_data = {}
+        finish_reason = None
+        with session.post(url, headers=headers, json=request_data, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                chunk = json.loads(line[len("data:"):])
+                for key in ("usageMetadata", "modelVersion"):
+                    if key in chunk:
+                        response_data[key] = chunk[key]
+                for candidate in chunk.get("candidates", [])[:1]:
+                    finish_reason = candidate.get("finishReason", finish_reason)
+                    for part in candidate.get("content", {}).get("parts", []):
+                        if "functionCall" in part:
+                            stream_handler.on_tool_call_delta(
+                                len(parts), name=part["functionCall"]["name"], arguments=json_dumps(part["functionCall"].get("args", {}))
+                            )
+                            parts.append(part)
+                        elif set(part) == {"text"} and parts and set(parts[-1]) == {"text"}:
+                            # Text arrives in pieces; merge it back into a single part
+                            parts[-1] = {"text": parts[-1]["text"] + part["text"]}
+                        else:
+                            parts.append(part)
+
+        response_data["candidates"] = [{"content": {"role": "model", "parts": parts}, "finishReason": finish_reason}]
+        return response_data
+
+    async def request_async(self, request_data: dict) -> dict:
+        """
+        Performs underlying request to llm on the event loop and returns raw response.
+        """
+        api_key = await run_in_db_executor(self._get_api_key)
+        url, headers = get_gemini_endpoint_and_headers(
+            base_url=str(self.llm_config.model_endpoint),
+            model=self.llm_config.model,
+            api_key=api_key,
+            key_in_header=True,
+            generate_content=True,
+        )
+        if GEMINI_CONTEXT_CACHING:
+            # Cache entries are created rarely (once per batch and agent), so the blocking call is kept off the loop
+            request_data = await asyncio.to_thread(
+                get_gemini_context_cache().prepare_request,
+                request_data,
+                model=self.llm_config.model,
+                base_url=str(self.llm_config.model_endpoint),
+                api_key=api_key,
+                session=get_http_session("google_ai", str(self.llm_config.model_endpoint)),
+            )
+        client = get_async_http_client("google_ai", str(self.llm_config.model_endpoint))
+        response = await client.post(url, headers=headers, json=request_data)
+        response.raise_for_status()
+        return response.json()
 
     def build_request_data(
         self,
@@ -56,14 +154,11 @@ class GoogleAIClient(LLMClientBase):
         """
         Constructs a request object in the expected data format for this client.
         """
-        if tools:
-            tools = [{"type": "function", "function": f} for f in tools]
-            tool_objs = [Tool(**t) for t in tools]
-            tool_names = [t.function.name for t in tool_objs]
-            # Convert to the exact payload style Google expects
-            tools = self.convert_tools_to_google_ai_format(tool_objs)
-        else:
-            tool_names = []
+        tools, tool_config = get_tool_schema_cache().get_or_compile(
+            ("google_ai", self.llm_config.put_inner_thoughts_in_kwargs),
+            tools or [],
+            self.compile_tools,
+        )
 
         contents = self.add_dummy_model_messages(
             [m.to_google_ai_dict() for m in messages],
@@ -85,7 +180,24 @@ class GoogleAIClient(LLMClientBase):
             "contents": self.fill_image_content_in_messages(contents, existing_file_uris=existing_file_uris),
             "tools": tools,
             "generation_config": generation_config,
+            "tool_config": tool_config,
         }
+        return request_data
+
+    def compile_tools(self, functions: List[dict]) -> Tuple[Optional[List[dict]], dict]:
+        """
+        Convert tool JSON schemas into the request's `tools` and `tool_config` payloads. The result is
+        cached across requests (see mirix/llm_api/tool_schema_cache.py), so it must only depend on the
+        arguments and `llm_config.put_inner_thoughts_in_kwargs`.
+        """
+        if functions:
+            tool_objs = [Tool(type="function", function=f) for f in functions]
+            tool_names = [t.function.name for t in tool_objs]
+            # Convert to the exact payload style Google expects
+            tools = self.convert_tools_to_google_ai_format(tool_objs)
+        else:
+            tools = None
+            tool_names = []
 
         # write tool config
         tool_config = ToolConfig(
@@ -96,8 +208,7 @@ class GoogleAIClient(LLMClientBase):
                 allowed_function_names=tool_names,
             )
         )
-        request_data["tool_config"] = tool_config.model_dump()
-        return request_data
+        return tools, tool_config.model_dump()
 
     def combine_tool_responses(self, contents: List[dict]) -> List[dict]:
         idx = 0
@@ -142,6 +253,12 @@ class GoogleAIClient(LLMClientBase):
 
         image_content_loaded = False  # it will always be false if `LOAD_IMAGE_CONTENT_FOR_LAST_MESSAGE_ONLY` is False
 
+        files = self._load_file_metadata([
+            part.get('image_id') or part.get('cloud_file_uri')
+            for message in google_ai_message_list if message['role'] == 'user' and isinstance(message['parts'], list)
+            for part in message['parts'] if 'text' not in part
+        ])
+
         for message_idx, message in enumerate(google_ai_message_list[::-1]):
 
             if message['role'] != 'user':
@@ -167,13 +284,10 @@ class GoogleAIClient(LLMClientBase):
                         })
                     else:
                         message_parts.append({'text': f"<image {global_image_idx}>"})
-                        file = self.file_manager.get_file_metadata_by_id(part['image_id'])
+                        file = self._get_file_metadata(files, part['image_id'])
                         if file.source_url is not None:
                             # For Google AI, we need to convert URL to base64
-                            import requests
-                            response = requests.get(file.source_url)
-                            import base64
-                            base64_data = base64.b64encode(response.content).decode('utf-8')
+                            base64_data = encode_url_base64(file.source_url)
                             # Determine mime type from URL or default to jpeg
                             mime_type = file.file_type
                             message_parts.append({
@@ -184,10 +298,8 @@ class GoogleAIClient(LLMClientBase):
                             })
                         elif file.file_path is not None:
                             # Read from file path and convert to base64
-                            import base64
                             mime_type = file.file_type
-                            with open(file.file_path, "rb") as img_file:
-                                base64_data = base64.b64encode(img_file.read()).decode("utf-8")
+                            base64_data = encode_file_base64(file.file_path, file_id=file.id)
                             message_parts.append({
                                 "inline_data": {
                                     "mime_type": mime_type,
@@ -199,7 +311,7 @@ class GoogleAIClient(LLMClientBase):
                         global_image_idx += 1
                         has_image = True
                 elif 'cloud_file_uri' in part:
-                    file = self.file_manager.get_file_metadata_by_id(part['cloud_file_uri'])
+                    file = self._get_file_metadata(files, part['cloud_file_uri'])
                     if existing_file_uris is not None and file.google_cloud_url not in existing_file_uris:
                         message_parts.append({
                             'text': f"[System Message] There was an image here but now the image has been deleted to save space."
@@ -385,6 +497,7 @@ class GoogleAIClient(LLMClientBase):
                     prompt_tokens=prompt_tokens,
                     completion_tokens=completion_tokens,
                     total_tokens=total_tokens,
+                    cache_read_input_tokens=usage_data.get("cachedContentTokenCount", 0),
                 )
             else:
                 # Count it ourselves
@@ -396,6 +509,7 @@ class GoogleAIClient(LLMClientBase):
                     prompt_tokens=prompt_tokens,
                     completion_tokens=completion_tokens,
                     total_tokens=total_tokens,
+                    cache_read_input_tokens=usage_data.get("cachedContentTokenCount", 0),
                 )
 
             response_id = str(uuid.uuid4())
@@ -2,7 +2,7 @@ import copy
 import json
 import warnings
 from collections import OrderedDict
-from typing import Any, List, Union
+from typing import Any, List, Optional, Union
 
 import requests
 
@@ -134,11 +134,14 @@ def convert_to_structured_output(openai_function: dict, allow_optional: bool = F
     return structured_output
 
 
-def make_post_request(url: str, headers: dict[str, str], data: dict[str, Any]) -> dict[str, Any]:
+def make_post_request(
+    url: str, headers: dict[str, str], data: dict[str, Any], session: Optional[requests.Session] = None
+) -> dict[str, Any]:
     printd(f"Sending request to {url}")
     try:
 
-        response = requests.post(url, headers=headers, json=data)
+        # A shared session reuses keep-alive connections; fall back to a one-off request otherwise
+        response = (session or requests).post(url, headers=headers, json=data)
         printd(f"Response status code: {response.status_code}")
 
         # Raise for 4XX/5XX HTTP errors
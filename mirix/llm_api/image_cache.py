@@ -0,0 +1,108 @@
+"""
+Process-wide cache of base64-encoded image payloads for LLM requests.
+
+The same screenshot is typically sent in several consecutive chaining steps and to several
+memory agents; without a cache every request re-reads and re-encodes it. Entries for local
+files are keyed by (file id or path, mtime, size), so a file rewritten in place is re-encoded.
+The cache is bounded by the total size of the encoded payloads and by its number of entries,
+evicting least recently used.
+"""
+
+import base64
+import os
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+import requests
+
+from mirix.constants import IMAGE_DOWNLOAD_TIMEOUT_SECONDS, IMAGE_ENCODING_CACHE_MAX_BYTES, IMAGE_ENCODING_CACHE_MAX_ENTRIES
+from mirix.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class ImageEncodingCache:
+    """Thread-safe LRU of base64 strings, bounded by their total size in bytes and their count."""
+
+    def __init__(self, max_bytes: int = IMAGE_ENCODING_CACHE_MAX_BYTES, max_entries: int = IMAGE_ENCODING_CACHE_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Hashable, ...], str]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[str]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return data
+
+    def put(self, key: Tuple[Hashable, ...], data: str):
+        size = len(data)
+        if size > self.max_bytes:
+            # Never worth evicting the whole cache for a single oversized payload
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= len(previous)
+            self._entries[key] = data
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+
+_cache = ImageEncodingCache()
+
+
+def get_image_cache() -> ImageEncodingCache:
+    """The process-wide image encoding cache."""
+    return _cache
+
+
+def encode_file_base64(file_path: str, file_id: Optional[str] = None) -> str:
+    """Base64-encode a local file, reusing the cached payload while the file is unchanged."""
+    stat = os.stat(file_path)
+    key = ("file", file_id or os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+    data = _cache.get(key)
+    if data is None:
+        with open(file_path, "rb") as img_file:
+            data = base64.b64encode(img_file.read()).decode("utf-8")
+        _cache.put(key, data)
+    return data
+
+
+def encode_url_base64(url: str) -> str:
+    """Download and base64-encode a remote image, caching the payload by URL."""
+    key = ("url", url)
+    data = _cache.get(key)
+    if data is None:
+        response = requests.get(url, timeout=IMAGE_DOWNLOAD_TIMEOUT_SECONDS)
+        data = base64.b64encode(response.content).decode("utf-8")
+        if response.ok:
+            _cache.put(key, data)
+    return data
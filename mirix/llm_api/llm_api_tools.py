@@ -16,6 +16,7 @@ from mirix.llm_api.openai import (
     openai_chat_completions_process_stream,
     openai_chat_completions_request,
 )
+from mirix.llm_api.rate_limiter import estimate_request_tokens, get_llm_rate_limiter
 from mirix.constants import INNER_THOUGHTS_KWARG, INNER_THOUGHTS_KWARG_DESCRIPTION
 from mirix.utils import num_tokens_from_functions, num_tokens_from_messages
 from mirix.schemas.llm_config import LLMConfig
@@ -46,10 +47,22 @@ def retry_with_exponential_backoff(
         num_retries = 0
         delay = initial_delay
 
+        llm_config = kwargs.get("llm_config", args[0] if args else None)
+        rate_limiter = get_llm_rate_limiter()
+
         # Loop until a successful response or max_retries is hit or an exception is raised
         while True:
             try:
-                return func(*args, **kwargs)
+                if not isinstance(llm_config, LLMConfig):
+                    return func(*args, **kwargs)
+                estimated_tokens = estimate_request_tokens(
+                    [m.to_openai_dict() for m in kwargs.get("messages") or []] + (kwargs.get("functions") or [])
+                )
+                with rate_limiter.limit(llm_config, estimated_tokens) as usage:
+                    response = func(*args, **kwargs)
+                    if isinstance(response, ChatCompletionResponse):
+                        usage["actual_tokens"] = response.usage.total_tokens
+                    return response
 
             except requests.exceptions.HTTPError as http_err:
 
@@ -58,6 +71,8 @@ def retry_with_exponential_backoff(
 
                 # Retry on specified errors
                 if http_err.response.status_code in error_codes:
+                    if isinstance(llm_config, LLMConfig):
+                        rate_limiter.record_rate_limited(llm_config)
                     # Increment retries
                     num_retries += 1
 
@@ -2,6 +2,7 @@ from typing import Optional
 
 from mirix.llm_api.llm_client_base import LLMClientBase
 from mirix.schemas.llm_config import LLMConfig
+from mirix.settings import settings
 
 
 class LLMClient:
@@ -11,13 +12,17 @@ class LLMClient:
     def create(
         llm_config: LLMConfig,
         put_inner_thoughts_first: bool = True,
+        use_batch_api: bool = False,
     ) -> Optional[LLMClientBase]:
         """
         Create an LLM client based on the model endpoint type.
+        When `settings.llm_record_replay_mode` is set, the provider client is wrapped in a
+        `RecordReplayLLMClient` that records or replays its responses.
 
         Args:
             llm_config: Configuration for the LLM model
             put_inner_thoughts_first: Whether to put inner thoughts first in the response
+            use_batch_api: Send requests through the provider's batch API where supported (Anthropic only)
 
         Returns:
             An instance of LLMClientBase subclass
@@ -25,6 +30,19 @@ class LLMClient:
         Raises:
             ValueError: If the model endpoint type is not supported
         """
+        client = LLMClient._create_provider_client(llm_config, put_inner_thoughts_first, use_batch_api)
+        if client is not None and settings.llm_record_replay_mode:
+            from mirix.llm_api.record_replay_client import RecordReplayLLMClient
+
+            return RecordReplayLLMClient(client, mode=settings.llm_record_replay_mode)
+        return client
+
+    @staticmethod
+    def _create_provider_client(
+        llm_config: LLMConfig,
+        put_inner_thoughts_first: bool,
+        use_batch_api: bool,
+    ) -> Optional[LLMClientBase]:
         match llm_config.model_endpoint_type:
             case "openai":
                 from mirix.llm_api.openai_client import OpenAIClient
@@ -46,6 +64,7 @@ class LLMClient:
                 return AnthropicClient(
                     llm_config=llm_config,
                     put_inner_thoughts_first=put_inner_thoughts_first,
+                    use_batch_api=use_batch_api,
                 )
             case "google_ai":
                 from mirix.llm_api.google_ai_client import GoogleAIClient
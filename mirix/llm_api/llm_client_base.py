@@ -1,11 +1,16 @@
+import asyncio
 from abc import abstractmethod
-from typing import Dict, List, Optional, Union
+from typing import Callable, Dict, List, Optional, Union
 
-from mirix.errors import LLMError
+from mirix.errors import LLMError, LLMRateLimitError
+from mirix.llm_api.rate_limiter import estimate_request_tokens, get_llm_rate_limiter
+from mirix.llm_api.streaming import SendMessageStreamParser
+from mirix.schemas.file import FileMetadata
 from mirix.schemas.llm_config import LLMConfig
 from mirix.schemas.message import Message
 from mirix.schemas.openai.chat_completion_response import ChatCompletionResponse
 from mirix.services.cloud_file_mapping_manager import CloudFileMappingManager
+from mirix.services.db_executor import run_in_db_executor
 from mirix.services.file_manager import FileManager
 
 class LLMClientBase:
@@ -26,6 +31,22 @@ class LLMClientBase:
         self.file_manager = FileManager()
         self.cloud_file_mapping_manager = CloudFileMappingManager()
 
+    def _load_file_metadata(self, file_ids: List[str]) -> Dict[str, FileMetadata]:
+        """
+        Fetch metadata for every file referenced in a request with a single query.
+        Callers fall back to `file_manager.get_file_metadata_by_id` for IDs missing from the result.
+        """
+        file_ids = [file_id for file_id in file_ids if file_id]
+        if not file_ids:
+            return {}
+        return self.file_manager.get_files_metadata_by_ids(file_ids)
+
+    def _get_file_metadata(self, files: Dict[str, FileMetadata], file_id: str) -> FileMetadata:
+        file = files.get(file_id)
+        if file is None:
+            file = self.file_manager.get_file_metadata_by_id(file_id)
+        return file
+
     def send_llm_request(
         self,
         messages: List[Message],
@@ -43,15 +64,104 @@ class LLMClientBase:
         if get_input_data_for_debugging:
             return request_data
 
-        try:
-            response_data = self.request(request_data)
-        except Exception as e:
-            raise self.handle_llm_error(e)
+        return self._send_request_data(request_data, messages, self.request)
+
+    def send_llm_request_stream(
+        self,
+        messages: List[Message],
+        stream_handler: SendMessageStreamParser,
+        tools: Optional[List[dict]] = None,
+        force_tool_call: Optional[str] = None,
+        existing_file_uris: Optional[List[str]] = None,
+    ) -> ChatCompletionResponse:
+        """
+        Like `send_llm_request`, but streams the response from the provider. Tool-call fragments are
+        reported to `stream_handler` as they arrive; the assembled response is returned at the end.
+        """
+        request_data = self.build_request_data(messages, self.llm_config, tools, force_tool_call, existing_file_uris=existing_file_uris)
+        return self._send_request_data(request_data, messages, lambda data: self.request_stream(data, stream_handler))
+
+    def _send_request_data(self, request_data: dict, messages: List[Message], send: Callable[[dict], dict]) -> ChatCompletionResponse:
+        if not self.uses_rate_limiter():
+            try:
+                response_data = send(request_data)
+            except Exception as e:
+                raise self.handle_llm_error(e)
+            return self.convert_response_to_chat_completion(response_data, messages)
 
-        chat_completion_data = self.convert_response_to_chat_completion(response_data, messages)
+        rate_limiter = get_llm_rate_limiter()
+        with rate_limiter.limit(self.llm_config, estimate_request_tokens(request_data)) as usage:
+            try:
+                response_data = send(request_data)
+            except Exception as e:
+                raise self._handle_request_error(e, rate_limiter)
+
+            chat_completion_data = self.convert_response_to_chat_completion(response_data, messages)
+            usage["actual_tokens"] = chat_completion_data.usage.total_tokens
         
         return chat_completion_data
 
+    async def send_llm_request_async(
+        self,
+        messages: List[Message],
+        tools: Optional[List[dict]] = None,
+        force_tool_call: Optional[str] = None,
+        existing_file_uris: Optional[List[str]] = None,
+    ) -> ChatCompletionResponse:
+        """
+        Async counterpart of `send_llm_request`: the provider call is awaited on the event loop, and
+        building the request (which reads file metadata from the DB) runs on the DB executor.
+        """
+        request_data = await run_in_db_executor(
+            self.build_request_data, messages, self.llm_config, tools, force_tool_call, existing_file_uris=existing_file_uris
+        )
+        return await self._send_request_data_async(request_data, messages, self.request_async)
+
+    async def send_llm_request_stream_async(
+        self,
+        messages: List[Message],
+        stream_handler: SendMessageStreamParser,
+        tools: Optional[List[dict]] = None,
+        force_tool_call: Optional[str] = None,
+        existing_file_uris: Optional[List[str]] = None,
+    ) -> ChatCompletionResponse:
+        """Async counterpart of `send_llm_request_stream`."""
+        request_data = await run_in_db_executor(
+            self.build_request_data, messages, self.llm_config, tools, force_tool_call, existing_file_uris=existing_file_uris
+        )
+        return await self._send_request_data_async(request_data, messages, lambda data: self.request_stream_async(data, stream_handler))
+
+    async def _send_request_data_async(self, request_data: dict, messages: List[Message], send) -> ChatCompletionResponse:
+        if not self.uses_rate_limiter():
+            try:
+                response_data = await send(request_data)
+            except Exception as e:
+                raise self.handle_llm_error(e)
+            return self.convert_response_to_chat_completion(response_data, messages)
+
+        rate_limiter = get_llm_rate_limiter()
+        async with rate_limiter.limit_async(self.llm_config, estimate_request_tokens(request_data)) as usage:
+            try:
+                response_data = await send(request_data)
+            except Exception as e:
+                raise self._handle_request_error(e, rate_limiter)
+
+            chat_completion_data = self.convert_response_to_chat_completion(response_data, messages)
+            usage["actual_tokens"] = chat_completion_data.usage.total_tokens
+
+        return chat_completion_data
+
+    def _handle_request_error(self, e: Exception, rate_limiter) -> Exception:
+        error = self.handle_llm_error(e)
+        # Raw HTTP clients (e.g. Gemini) surface 429s as HTTP errors rather than LLMRateLimitError
+        if isinstance(error, LLMRateLimitError) or getattr(getattr(e, "response", None), "status_code", None) == 429:
+            rate_limiter.record_rate_limited(self.llm_config)
+        return error
+
+    def uses_rate_limiter(self) -> bool:
+        """Whether requests from this client go through the process-wide LLM rate limiter."""
+        return True
+
     @abstractmethod
     def build_request_data(
         self,
@@ -73,6 +183,28 @@ class LLMClientBase:
         """
         raise NotImplementedError
 
+    def request_stream(self, request_data: dict, stream_handler: SendMessageStreamParser) -> dict:
+        """
+        Performs underlying streaming request to llm, reporting tool-call fragments to `stream_handler`,
+        and returns the assembled raw response in the same format as `request`.
+        Clients without streaming support fall back to a regular request (no fragments are reported).
+        """
+        return self.request(request_data)
+
+    async def request_async(self, request_data: dict) -> dict:
+        """
+        Performs underlying request to llm without blocking the event loop.
+        Clients with a native async transport override this; the default runs `request` in a thread.
+        """
+        return await asyncio.to_thread(self.request, request_data)
+
+    async def request_stream_async(self, request_data: dict, stream_handler: SendMessageStreamParser) -> dict:
+        """
+        Async counterpart of `request_stream`.
+        Clients with a native async stream override this; the default runs `request_stream` in a thread.
+        """
+        return await asyncio.to_thread(self.request_stream, request_data, stream_handler)
+
     @abstractmethod
     def convert_response_to_chat_completion(
         self,
@@ -1,7 +1,6 @@
 import os
 import json
-import base64
-from typing import List, Optional
+from typing import List, Optional, Union
 from mirix.utils import parse_json
 
 import openai
@@ -20,8 +19,12 @@ from mirix.errors import (
     LLMServerError,
     LLMUnprocessableEntityError,
 )
+from mirix.llm_api.client_pool import get_openai_client
 from mirix.llm_api.helpers import add_inner_thoughts_to_functions, convert_to_structured_output, unpack_all_inner_thoughts_from_kwargs
+from mirix.llm_api.image_cache import encode_file_base64
 from mirix.llm_api.llm_client_base import LLMClientBase
+from mirix.llm_api.streaming import SendMessageStreamParser
+from mirix.llm_api.tool_schema_cache import get_tool_schema_cache
 from mirix.constants import INNER_THOUGHTS_KWARG, INNER_THOUGHTS_KWARG_DESCRIPTION, INNER_THOUGHTS_KWARG_DESCRIPTION_GO_FIRST
 from mirix.log import get_logger
 from mirix.schemas.llm_config import LLMConfig
@@ -57,9 +60,8 @@ def encode_image(image_path: str) -> str:
         # Default to jpeg if we can't determine the type
         mime_type = 'image/jpeg'
     
-    with open(image_path, "rb") as img_file:
-        base64_string = base64.b64encode(img_file.read()).decode("utf-8")
-        return f"data:{mime_type};base64,{base64_string}"
+    base64_string = encode_file_base64(image_path)
+    return f"data:{mime_type};base64,{base64_string}"
 
 
 class OpenAIClient(LLMClientBase):
@@ -77,6 +79,10 @@ class OpenAIClient(LLMClientBase):
         kwargs = {"api_key": api_key, "base_url": self.llm_config.model_endpoint}
         return kwargs
 
+    def _get_client(self, async_client: bool = False) -> Union[OpenAI, AsyncOpenAI]:
+        """Get a pooled client so HTTP connections are reused across requests."""
+        return get_openai_client(self._prepare_client_kwargs(), async_client=async_client)
+
     def build_request_data(
         self,
         messages: List[PydanticMessage],
@@ -88,17 +94,19 @@ class OpenAIClient(LLMClientBase):
         """
         Constructs a request object in the expected data format for the OpenAI API.
         """
-        if tools and llm_config.put_inner_thoughts_in_kwargs:
-            # Special case for LM Studio backend since it needs extra guidance to force out the thoughts first
-            # TODO(fix)
-            inner_thoughts_desc = (
-                INNER_THOUGHTS_KWARG_DESCRIPTION_GO_FIRST if ":1234" in llm_config.model_endpoint else INNER_THOUGHTS_KWARG_DESCRIPTION
-            )
-            tools = add_inner_thoughts_to_functions(
-                functions=tools,
-                inner_thoughts_key=INNER_THOUGHTS_KWARG,
-                inner_thoughts_description=inner_thoughts_desc,
-                put_inner_thoughts_first=True,
+        compiled_tools = None
+        if tools:
+            inner_thoughts_desc = None
+            if llm_config.put_inner_thoughts_in_kwargs:
+                # Special case for LM Studio backend since it needs extra guidance to force out the thoughts first
+                # TODO(fix)
+                inner_thoughts_desc = (
+                    INNER_THOUGHTS_KWARG_DESCRIPTION_GO_FIRST if ":1234" in llm_config.model_endpoint else INNER_THOUGHTS_KWARG_DESCRIPTION
+                )
+            compiled_tools = get_tool_schema_cache().get_or_compile(
+                ("openai", inner_thoughts_desc),
+                tools,
+                lambda functions: self.compile_tools(functions, inner_thoughts_desc),
             )
 
         use_developer_message = llm_config.model.startswith("o1") or llm_config.model.startswith("o3")  # o-series models
@@ -135,7 +143,6 @@ class OpenAIClient(LLMClientBase):
         data = ChatCompletionRequest(
             model=model,
             messages=self.fill_image_content_in_messages(openai_message_list),
-            tools=[OpenAITool(type="function", function=f) for f in tools] if tools else None,
             tool_choice=tool_choice,
             user=str(),
             max_completion_tokens=llm_config.max_tokens,
@@ -149,16 +156,33 @@ class OpenAIClient(LLMClientBase):
             data.user = str(uuid.UUID(int=0))
             data.model = "memgpt-openai"
 
-        if data.tools is not None and len(data.tools) > 0:
-            # Convert to structured output style (which has 'strict' and no optionals)
-            for tool in data.tools:
-                try:
-                    structured_output_version = convert_to_structured_output(tool.function.model_dump())
-                    tool.function = FunctionSchema(**structured_output_version)
-                except ValueError as e:
-                    logger.warning(f"Failed to convert tool function to structured output, tool={tool}, error={e}")
+        request_data = data.model_dump(exclude_unset=True)
+        if compiled_tools:
+            request_data["tools"] = compiled_tools
+        return request_data
 
-        return data.model_dump(exclude_unset=True)
+    def compile_tools(self, functions: List[dict], inner_thoughts_desc: Optional[str] = None) -> List[dict]:
+        """
+        Convert tool JSON schemas into the request's `tools` payload. The result is cached across
+        requests (see mirix/llm_api/tool_schema_cache.py), so it must only depend on the arguments.
+        """
+        if inner_thoughts_desc is not None:
+            functions = add_inner_thoughts_to_functions(
+                functions=functions,
+                inner_thoughts_key=INNER_THOUGHTS_KWARG,
+                inner_thoughts_description=inner_thoughts_desc,
+                put_inner_thoughts_first=True,
+            )
+
+        compiled = []
+        for function in functions:
+            # Convert to structured output style (which has 'strict' and no optionals)
+            try:
+                function = convert_to_structured_output(FunctionSchema(**function).model_dump())
+            except ValueError as e:
+                logger.warning(f"Failed to convert tool function to structured output, tool={function}, error={e}")
+            compiled.append(OpenAITool(type="function", function=FunctionSchema(**function)).model_dump(exclude_unset=True))
+        return compiled
 
     def fill_image_content_in_messages(self, openai_message_list):
         """
@@ -172,6 +196,12 @@ class OpenAIClient(LLMClientBase):
 
         image_content_loaded = False # it will always be false if `LOAD_IMAGE_CONTENT_FOR_LAST_MESSAGE_ONLY` is False
 
+        files = self._load_file_metadata([
+            m.get('image_id') or m.get('cloud_file_uri')
+            for message in openai_message_list if message.role == 'user' and isinstance(message.content, list)
+            for m in message.content if m['type'] in ('image_url', 'google_cloud_file_uri')
+        ])
+
         for message_idx, message in enumerate(openai_message_list[::-1]):
 
             if message.role != 'user':
@@ -200,7 +230,7 @@ class OpenAIClient(LLMClientBase):
                             'type': 'text',
                             'text': f"<image {global_image_idx}>",
                         })
-                        file = self.file_manager.get_file_metadata_by_id(m['image_id'])
+                        file = self._get_file_metadata(files, m['image_id'])
                         if file.source_url is not None:
                             message_content.append({
                                 'type': 'image_url',
@@ -216,7 +246,7 @@ class OpenAIClient(LLMClientBase):
                         global_image_idx += 1
                         has_image = True
                 elif m['type'] == 'google_cloud_file_uri':
-                    file = self.file_manager.get_file_metadata_by_id(m['cloud_file_uri'])
+                    file = self._get_file_metadata(files, m['cloud_file_uri'])
                     try:
                         local_path = self.cloud_file_mapping_manager.get_local_file(file.google_cloud_url)
                     except Exception as e:
@@ -253,7 +283,7 @@ class OpenAIClient(LLMClientBase):
         """
         Performs underlying synchronous request to OpenAI API and returns raw response dict.
         """
-        client = OpenAI(**self._prepare_client_kwargs())
+        client = self._get_client()
         response: ChatCompletion = client.chat.completions.create(**request_data)
         if not response.object:
             response.object = 'chat.completion'
@@ -263,7 +293,7 @@ class OpenAIClient(LLMClientBase):
         """
         Performs underlying asynchronous request to OpenAI API and returns raw response dict.
         """
-        client = AsyncOpenAI(**self._prepare_client_kwargs())
+        client = self._get_client(async_client=True)
         response: ChatCompletion = await client.chat.completions.create(**request_data)
         return response.model_dump()
 
@@ -292,15 +322,31 @@ class OpenAIClient(LLMClientBase):
         """
         Performs underlying streaming request to OpenAI and returns the stream iterator.
         """
-        client = OpenAI(**self._prepare_client_kwargs())
+        client = self._get_client()
         response_stream: Stream[ChatCompletionChunk] = client.chat.completions.create(**request_data, stream=True)
         return response_stream
 
+    def request_stream(self, request_data: dict, stream_handler: SendMessageStreamParser) -> dict:
+        """
+        Streams the completion, reporting tool-call argument fragments to `stream_handler`,
+        and returns the chunks assembled into a raw ChatCompletion dict.
+        """
+        completion = _StreamedCompletion(stream_handler)
+        for chunk in self.stream({**request_data, "stream_options": {"include_usage": True}}):
+            completion.add(chunk)
+        return completion.to_response_data()
+
+    async def request_stream_async(self, request_data: dict, stream_handler: SendMessageStreamParser) -> dict:
+        completion = _StreamedCompletion(stream_handler)
+        async for chunk in await self.stream_async({**request_data, "stream_options": {"include_usage": True}}):
+            completion.add(chunk)
+        return completion.to_response_data()
+
     async def stream_async(self, request_data: dict) -> AsyncStream[ChatCompletionChunk]:
         """
         Performs underlying asynchronous streaming request to OpenAI and returns the async stream iterator.
         """
-        client = AsyncOpenAI(**self._prepare_client_kwargs())
+        client = self._get_client(async_client=True)
         response_stream: AsyncStream[ChatCompletionChunk] = await client.chat.completions.create(**request_data, stream=True)
         return response_stream
 
@@ -384,3 +430,64 @@ class OpenAIClient(LLMClientBase):
 
         # Fallback for unexpected errors
         return super().handle_llm_error(e)
+
+
+class _StreamedCompletion:
+    """Assembles streamed ChatCompletion chunks into a raw ChatCompletion dict."""
+
+    def __init__(self, stream_handler: SendMessageStreamParser):
+        self.stream_handler = stream_handler
+        self.response_data = None
+        self.content = []
+        self.tool_calls = {}
+        self.finish_reason = None
+        self.usage = None
+
+    def add(self, chunk: ChatCompletionChunk):
+        if self.response_data is None:
+            self.response_data = {
+                "id": chunk.id,
+                "created": chunk.created,
+                "model": chunk.model,
+                "system_fingerprint": chunk.system_fingerprint,
+            }
+        if chunk.usage is not None:
+            self.usage = chunk.usage.model_dump()
+        for choice in chunk.choices:
+            delta = choice.delta
+            if delta.content:
+                self.content.append(delta.content)
+            for tool_call_delta in delta.tool_calls or []:
+                tool_call = self.tool_calls.setdefault(
+                    tool_call_delta.index, {"id": None, "type": "function", "function": {"name": "", "arguments": ""}}
+                )
+                name = tool_call_delta.function.name if tool_call_delta.function else None
+                arguments = tool_call_delta.function.arguments if tool_call_delta.function else None
+                if tool_call_delta.id:
+                    tool_call["id"] = tool_call_delta.id
+                if name:
+                    tool_call["function"]["name"] = name
+                if arguments:
+                    tool_call["function"]["arguments"] += arguments
+                self.stream_handler.on_tool_call_delta(tool_call_delta.index, name=name, arguments=arguments)
+            if choice.finish_reason:
+                self.finish_reason = choice.finish_reason
+
+    def to_response_data(self) -> dict:
+        if self.response_data is None:
+            raise ValueError("OpenAI stream ended without any chunks")
+
+        response_data = dict(self.response_data)
+        response_data["choices"] = [
+            {
+                "index": 0,
+                "finish_reason": self.finish_reason,
+                "message": {
+                    "role": "assistant",
+                    "content": "".join(self.content) or None,
+                    "tool_calls": [self.tool_calls[index] for index in sorted(self.tool_calls)] or None,
+                },
+            }
+        ]
+        response_data["usage"] = self.usage or {}
+        return response_data
@@ -0,0 +1,311 @@
+"""
+Provider-aware rate limiting for LLM calls.
+
+Every LLM request acquires a permit from the limiter for its (model endpoint type, model) before
+it is sent. Each limiter enforces a requests/minute and a tokens/minute token bucket plus a cap on
+concurrent requests, so bursts (six memory agents and the chat agent firing at once) queue locally
+instead of producing 429s. Waiting requests are admitted by priority: interactive (chat) requests
+go ahead of background (memory agent) requests. When the provider still answers with a rate limit
+error, `record_rate_limited` drains the buckets so queued requests back off together.
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional, Tuple
+
+from mirix.constants import LLM_RATE_LIMITS
+from mirix.log import get_logger
+
+logger = get_logger(__name__)
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+_PRIORITY_RANK = {INTERACTIVE: 0, BACKGROUND: 1}
+
+# Priority of LLM requests issued from the current thread / task; agents set it around their steps
+_request_priority = contextvars.ContextVar("llm_request_priority", default=INTERACTIVE)
+
+# Rough token cost charged for an inline (base64) image when estimating request size
+_IMAGE_TOKEN_ESTIMATE = 1000
+_INLINE_DATA_MIN_LENGTH = 2000
+# Upper bound on how long a queued coroutine sleeps before re-checking admission
+_ASYNC_POLL_SECONDS = 0.05
+
+
+@contextmanager
+def llm_request_priority(priority: str):
+    """Run the enclosed LLM calls with the given priority (`INTERACTIVE` or `BACKGROUND`)."""
+    if priority not in _PRIORITY_RANK:
+        raise ValueError(f"Unknown LLM request priority: {priority}")
+    token = _request_priority.set(priority)
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+
+def get_request_priority() -> str:
+    return _request_priority.get()
+
+
+def estimate_request_tokens(payload) -> int:
+    """Estimate prompt tokens of a request payload; inline images count as a fixed cost, not their base64 size."""
+    if isinstance(payload, str):
+        if payload.startswith("data:") or (len(payload) >= _INLINE_DATA_MIN_LENGTH and " " not in payload):
+            return _IMAGE_TOKEN_ESTIMATE
+        return len(payload) // 4
+    if isinstance(payload, dict):
+        return sum(estimate_request_tokens(value) for value in payload.values())
+    if isinstance(payload, (list, tuple)):
+        return sum(estimate_request_tokens(value) for value in payload)
+    if hasattr(payload, "model_dump"):
+        return estimate_request_tokens(payload.model_dump())
+    return 0
+
+
+class TokenBucket:
+    """Continuously refilling bucket holding at most `per_minute` units. Not thread-safe on its own."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if available now)."""
+        self._refill(time.monotonic())
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float):
+        """Give back (positive) or charge (negative) units once the real cost of a request is known."""
+        self._refill(time.monotonic())
+        self.tokens = min(self.capacity, self.tokens + delta)
+
+    def drain(self):
+        self._refill(time.monotonic())
+        self.tokens = min(self.tokens, 0.0)
+
+
+class ProviderRateLimiter:
+    """Requests/minute, tokens/minute and concurrency limits for one (endpoint type, model)."""
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        max_concurrent: Optional[int] = None,
+    ):
+        self.name = name
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_concurrent = max_concurrent
+
+        self._condition = threading.Condition()
+        self._waiters = []  # heap of (priority rank, sequence)
+        self._sequence = itertools.count()
+        self._in_flight = 0
+
+        # Metrics
+        self._admitted = {priority: 0 for priority in _PRIORITY_RANK}
+        self._throttled = {priority: 0 for priority in _PRIORITY_RANK}
+        self._wait_seconds = {priority: 0.0 for priority in _PRIORITY_RANK}
+        self._max_wait_seconds = {priority: 0.0 for priority in _PRIORITY_RANK}
+        self._rate_limit_errors = 0
+
+    def acquire(self, estimated_tokens: int, priority: str = INTERACTIVE) -> float:
+        """Block until the request may be sent; returns the seconds spent waiting."""
+        start = time.monotonic()
+        me = (_PRIORITY_RANK[priority], next(self._sequence))
+        with self._condition:
+            heapq.heappush(self._waiters, me)
+            self._condition.notify_all()
+            try:
+                while True:
+                    wait = self._admission_wait(me, estimated_tokens)
+                    if wait == 0:
+                        break
+                    # Woken early when the head of the queue changes or a request finishes
+                    self._condition.wait(timeout=wait)
+            except BaseException:
+                # Interrupted while queued (e.g. KeyboardInterrupt): leave the queue so the requests behind us proceed
+                self._waiters.remove(me)
+                heapq.heapify(self._waiters)
+                self._condition.notify_all()
+                raise
+            return self._admit(estimated_tokens, priority, start)
+
+    async def acquire_async(self, estimated_tokens: int, priority: str = INTERACTIVE) -> float:
+        """Like `acquire`, but waits on the event loop instead of blocking a thread."""
+        start = time.monotonic()
+        me = (_PRIORITY_RANK[priority], next(self._sequence))
+        with self._condition:
+            heapq.heappush(self._waiters, me)
+            self._condition.notify_all()
+        try:
+            while True:
+                with self._condition:
+                    wait = self._admission_wait(me, estimated_tokens)
+                    if wait == 0:
+                        return self._admit(estimated_tokens, priority, start)
+                await asyncio.sleep(min(wait, _ASYNC_POLL_SECONDS))
+        except BaseException:
+            # Cancelled while queued: leave the queue so later requests are not blocked behind us
+            with self._condition:
+                if me in self._waiters:
+                    self._waiters.remove(me)
+                    heapq.heapify(self._waiters)
+                    self._condition.notify_all()
+            raise
+
+    def _admission_wait(self, me, estimated_tokens: int) -> float:
+        """Seconds `me` should wait before re-checking, or 0 if it may be admitted now. Caller holds the lock."""
+        if self._waiters[0] != me or (self.max_concurrent is not None and self._in_flight >= self.max_concurrent):
+            return 1.0
+        return max(
+            self.request_bucket.wait_time(1) if self.request_bucket else 0.0,
+            self.token_bucket.wait_time(estimated_tokens) if self.token_bucket else 0.0,
+        )
+
+    def _admit(self, estimated_tokens: int, priority: str, start: float) -> float:
+        """Take the head of the queue and charge the buckets. Caller holds the lock."""
+        heapq.heappop(self._waiters)
+        if self.request_bucket:
+            self.request_bucket.consume(1)
+        if self.token_bucket:
+            self.token_bucket.consume(estimated_tokens)
+        self._in_flight += 1
+
+        waited = time.monotonic() - start
+        self._admitted[priority] += 1
+        self._wait_seconds[priority] += waited
+        self._max_wait_seconds[priority] = max(self._max_wait_seconds[priority], waited)
+        if waited > 0.001:
+            self._throttled[priority] += 1
+        self._condition.notify_all()
+        return waited
+
+    def release(self, estimated_tokens: int, actual_tokens: Optional[int] = None):
+        """Mark a request as finished and correct the token bucket with its real usage if known."""
+        with self._condition:
+            self._in_flight -= 1
+            if self.token_bucket and actual_tokens is not None:
+                self.token_bucket.adjust(estimated_tokens - actual_tokens)
+            self._condition.notify_all()
+
+    def record_rate_limited(self):
+        """The provider rejected a request despite the local limits: make everyone queued back off."""
+        with self._condition:
+            self._rate_limit_errors += 1
+            if self.request_bucket:
+                self.request_bucket.drain()
+            if self.token_bucket:
+                self.token_bucket.drain()
+        logger.warning(f"Rate limited by provider for {self.name}; draining local rate limit buckets")
+
+    def get_metrics(self) -> dict:
+        with self._condition:
+            queued = {priority: 0 for priority in _PRIORITY_RANK}
+            ranks = {rank: priority for priority, rank in _PRIORITY_RANK.items()}
+            for rank, _ in self._waiters:
+                queued[ranks[rank]] += 1
+            return {
+                "in_flight": self._in_flight,
+                "queued": queued,
+                "admitted": dict(self._admitted),
+                "throttled": dict(self._throttled),
+                "avg_wait_seconds": {
+                    priority: (self._wait_seconds[priority] / count if count else 0.0)
+                    for priority, count in self._admitted.items()
+                },
+                "max_wait_seconds": dict(self._max_wait_seconds),
+                "rate_limit_errors": self._rate_limit_errors,
+            }
+
+
+class LLMRateLimiter:
+    """Registry of per-(endpoint type, model) limiters configured from `LLM_RATE_LIMITS`."""
+
+    def __init__(self, limits: Dict[str, dict] = LLM_RATE_LIMITS):
+        self.limits = limits
+        self._limiters: Dict[Tuple[str, str], Optional[ProviderRateLimiter]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, llm_config) -> Optional[ProviderRateLimiter]:
+        """The limiter for `llm_config`, or None if its provider has no configured limits."""
+        key = (llm_config.model_endpoint_type, llm_config.model)
+        with self._lock:
+            if key not in self._limiters:
+                # A "<endpoint type>/<model>" entry overrides the endpoint type's defaults
+                config = self.limits.get(f"{key[0]}/{key[1]}", self.limits.get(key[0]))
+                self._limiters[key] = ProviderRateLimiter(f"{key[0]}/{key[1]}", **config) if config else None
+            return self._limiters[key]
+
+    @contextmanager
+    def limit(self, llm_config, estimated_tokens: int):
+        """
+        Hold a permit for one request. The yielded dict may be given the request's real token usage
+        under "actual_tokens" before the block exits, to correct the tokens/minute bucket.
+        """
+        limiter = self.get(llm_config)
+        usage = {"actual_tokens": None}
+        if limiter is None:
+            yield usage
+            return
+
+        estimated_tokens += llm_config.max_tokens or 0
+        limiter.acquire(estimated_tokens, priority=get_request_priority())
+        try:
+            yield usage
+        finally:
+            limiter.release(estimated_tokens, usage["actual_tokens"])
+
+    @asynccontextmanager
+    async def limit_async(self, llm_config, estimated_tokens: int):
+        """Async counterpart of `limit`; queued coroutines do not hold a thread."""
+        limiter = self.get(llm_config)
+        usage = {"actual_tokens": None}
+        if limiter is None:
+            yield usage
+            return
+
+        estimated_tokens += llm_config.max_tokens or 0
+        await limiter.acquire_async(estimated_tokens, priority=get_request_priority())
+        try:
+            yield usage
+        finally:
+            limiter.release(estimated_tokens, usage["actual_tokens"])
+
+    def record_rate_limited(self, llm_config):
+        limiter = self.get(llm_config)
+        if limiter is not None:
+            limiter.record_rate_limited()
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            limiters = {limiter.name: limiter for limiter in self._limiters.values() if limiter is not None}
+        return {name: limiter.get_metrics() for name, limiter in limiters.items()}
+
+
+_rate_limiter = LLMRateLimiter()
+
+
+def get_llm_rate_limiter() -> LLMRateLimiter:
+    """The process-wide LLM rate limiter."""
+    return _rate_limiter
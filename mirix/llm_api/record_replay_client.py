@@ -0,0 +1,222 @@
+"""
+Deterministic record/replay of LLM calls, for benchmarks and offline test runs.
+
+`RecordReplayLLMClient` wraps the provider client returned by `LLMClient.create` when
+`settings.llm_record_replay_mode` is set:
+
+- "record": requests go to the provider as usual; each raw response is stored on disk together
+  with its latency (and, for streamed calls, the tool-call fragments that were reported).
+- "replay": no provider is contacted; responses are served from the recordings after a simulated
+  latency (the recorded one, or `settings.llm_replay_latency_seconds`, scaled by
+  `settings.llm_replay_latency_scale`).
+
+Recordings are keyed by a hash of the provider-formatted request (`build_request_data` output) plus
+the model. Values that change between otherwise identical runs - UUID-based ids, timestamps
+rendered into prompts and the URIs of files uploaded to Gemini - are normalized out of the key, so a recorded scenario replays as long as
+the conversation itself is the same. Run the scenario with `settings.embedding_stand_in` enabled
+in both modes so that embedding-based retrieval (and hence the prompts) is reproducible offline.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from mirix.errors import LLMError
+from mirix.llm_api.llm_client_base import LLMClientBase
+from mirix.llm_api.streaming import SendMessageStreamParser
+from mirix.log import get_logger
+from mirix.schemas.llm_config import LLMConfig
+from mirix.schemas.message import Message
+from mirix.schemas.openai.chat_completion_response import ChatCompletionResponse
+from mirix.settings import settings
+
+logger = get_logger(__name__)
+
+RECORD_MODE = "record"
+REPLAY_MODE = "replay"
+
+# Applied in order to the serialized request before hashing
+_KEY_NORMALIZERS = [
+    # message-/agent-/file- ids, tool call ids (uuid4 truncated to TOOL_CALL_ID_MAX_LEN), request ids
+    (re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{1,12}"), "<id>"),
+    # provider-generated tool call ids echoed back in the history
+    (re.compile(r"\b(call|toolu)_[A-Za-z0-9]{8,}"), "<tool_call_id>"),
+    # Gemini File API uploads, e.g. "https://generativelanguage.googleapis.com/v1beta/files/abc123"; a new
+    # name is assigned every time a screenshot is uploaded
+    (re.compile(r"https://generativelanguage\.googleapis\.com/[A-Za-z0-9_.]+/files/[A-Za-z0-9_-]+"), "<gemini_file>"),
+    # "2025-01-31 09:15:02 PM PST-0800", "2025-01-31T17:15:02.123456+00:00", "2025-01-31 17:15:02", ...
+    (
+        re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?( ?[AP]M)?( ?[A-Z]{2,5})?( ?(Z|[+-]\d{2}:?\d{2}))?"),
+        "<time>",
+    ),
+    # datetimes rendered with repr(), e.g. "datetime.datetime(2025, 1, 31, 17, 15, 2, 123456, tzinfo=datetime.timezone.utc)"
+    (re.compile(r"datetime\.datetime\(\d{4}(, \d+)+(, tzinfo=[\w.<>]+)?\)"), "<time>"),
+]
+
+
+def recording_key(request_data: dict, llm_config: LLMConfig) -> str:
+    """The recording key of a provider-formatted request."""
+    payload = json.dumps(
+        {
+            "endpoint_type": llm_config.model_endpoint_type,
+            "model": llm_config.model,
+            "request": request_data,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    for pattern, replacement in _KEY_NORMALIZERS:
+        payload = pattern.sub(replacement, payload)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class _RecordingStreamHandler:
+    """Forwards tool-call fragments to the real stream handler while keeping a copy for the recording."""
+
+    def __init__(self, stream_handler: SendMessageStreamParser):
+        self.stream_handler = stream_handler
+        self.deltas: List[Tuple[int, Optional[str], Optional[str]]] = []
+
+    def on_tool_call_delta(self, index: int, name: Optional[str] = None, arguments: Optional[str] = None):
+        self.deltas.append((index, name, arguments))
+        self.stream_handler.on_tool_call_delta(index, name=name, arguments=arguments)
+
+
+class RecordReplayLLMClient(LLMClientBase):
+    """
+    Records the responses of a provider client to disk, or replays them without contacting the provider.
+    Request building and response parsing are delegated to the wrapped client.
+    """
+
+    def __init__(
+        self,
+        client: LLMClientBase,
+        mode: str,
+        recordings_dir: Optional[Path] = None,
+        latency_seconds: Optional[float] = None,
+        latency_scale: Optional[float] = None,
+    ):
+        if mode not in (RECORD_MODE, REPLAY_MODE):
+            raise ValueError(f"Unknown LLM record/replay mode '{mode}', expected '{RECORD_MODE}' or '{REPLAY_MODE}'")
+        super().__init__(
+            llm_config=client.llm_config,
+            put_inner_thoughts_first=client.put_inner_thoughts_first,
+            use_tool_naming=client.use_tool_naming,
+        )
+        self.client = client
+        self.mode = mode
+        self.recordings_dir = Path(recordings_dir or settings.llm_recordings_dir)
+        self.latency_seconds = latency_seconds if latency_seconds is not None else settings.llm_replay_latency_seconds
+        self.latency_scale = latency_scale if latency_scale is not None else settings.llm_replay_latency_scale
+
+    def build_request_data(
+        self,
+        messages: List[Message],
+        llm_config: LLMConfig,
+        tools: Optional[List[dict]] = None,
+        force_tool_call: Optional[str] = None,
+        existing_file_uris: Optional[List[str]] = None,
+    ) -> dict:
+        return self.client.build_request_data(messages, llm_config, tools, force_tool_call, existing_file_uris=existing_file_uris)
+
+    def convert_response_to_chat_completion(self, response_data: dict, input_messages: List[Message]) -> ChatCompletionResponse:
+        return self.client.convert_response_to_chat_completion(response_data, input_messages)
+
+    def handle_llm_error(self, e: Exception) -> Exception:
+        if isinstance(e, LLMError):
+            return e
+        return self.client.handle_llm_error(e)
+
+    def uses_rate_limiter(self) -> bool:
+        # Replayed responses never reach the provider
+        return self.mode == RECORD_MODE and self.client.uses_rate_limiter()
+
+    def request(self, request_data: dict) -> dict:
+        key = recording_key(request_data, self.llm_config)
+        if self.mode == REPLAY_MODE:
+            recording = self._load(key)
+            time.sleep(self._replay_latency(recording))
+            return recording["response"]
+
+        start = time.perf_counter()
+        response = self.client.request(request_data)
+        self._save(key, response, time.perf_counter() - start)
+        return response
+
+    async def request_async(self, request_data: dict) -> dict:
+        key = recording_key(request_data, self.llm_config)
+        if self.mode == REPLAY_MODE:
+            recording = self._load(key)
+            await asyncio.sleep(self._replay_latency(recording))
+            return recording["response"]
+
+        start = time.perf_counter()
+        response = await self.client.request_async(request_data)
+        self._save(key, response, time.perf_counter() - start)
+        return response
+
+    def request_stream(self, request_data: dict, stream_handler: SendMessageStreamParser) -> dict:
+        key = recording_key(request_data, self.llm_config)
+        if self.mode == REPLAY_MODE:
+            recording = self._load(key)
+            deltas = recording.get("stream_deltas") or []
+            # Spread the simulated latency over the recorded fragments, like a live stream
+            delay = self._replay_latency(recording) / (len(deltas) + 1)
+            for index, name, arguments in deltas:
+                time.sleep(delay)
+                stream_handler.on_tool_call_delta(index, name=name, arguments=arguments)
+            time.sleep(delay)
+            return recording["response"]
+
+        recorder = _RecordingStreamHandler(stream_handler)
+        start = time.perf_counter()
+        response = self.client.request_stream(request_data, recorder)
+        self._save(key, response, time.perf_counter() - start, stream_deltas=recorder.deltas)
+        return response
+
+    def _replay_latency(self, recording: dict) -> float:
+        latency = self.latency_seconds if self.latency_seconds is not None else recording.get("latency_seconds", 0.0)
+        return max(0.0, latency * self.latency_scale)
+
+    def _path(self, key: str) -> Path:
+        return self.recordings_dir / key[:2] / f"{key}.json"
+
+    def _load(self, key: str) -> dict:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise LLMError(
+                f"No recorded LLM response for request {key} ({self.llm_config.model_endpoint_type}/{self.llm_config.model}) "
+                f"in {self.recordings_dir}; record the scenario first with MIRIX_LLM_RECORD_REPLAY_MODE=record"
+            )
+
+    def _save(self, key: str, response: dict, latency_seconds: float, stream_deltas: Optional[list] = None):
+        recording = {
+            "key": key,
+            "endpoint_type": self.llm_config.model_endpoint_type,
+            "model": self.llm_config.model,
+            "latency_seconds": latency_seconds,
+            "response": response,
+        }
+        if stream_deltas is not None:
+            recording["stream_deltas"] = stream_deltas
+
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write-then-rename so concurrent agents never observe a partial recording
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(recording, f, default=str)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # Losing a recording must not fail the live call
+            logger.warning(f"Failed to record LLM response {key}: {e}")
@@ -0,0 +1,142 @@
+"""
+Token-level streaming of chat replies.
+
+The chat agent answers the user through the `send_message` tool, so the text the user reads is
+the `message` argument of that call. Providers stream tool-call arguments as raw JSON fragments;
+`SendMessageStreamParser` decodes the `message` string as the fragments arrive and hands each new
+piece of text to a callback, so the reply starts rendering at the first token instead of after
+the whole completion.
+"""
+
+from typing import Callable, Dict, List, Optional
+
+from mirix.log import get_logger
+
+logger = get_logger(__name__)
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class StreamedJSONFieldParser:
+    """Decodes one top-level string field of a JSON object that is received in arbitrary fragments."""
+
+    def __init__(self, field: str):
+        self.field = field
+        self.value = ""
+        self.done = False
+
+        self._depth = 0
+        self._expect_key = False
+        self._in_string = False
+        self._string_is_key = False
+        self._capturing = False
+        self._key: List[str] = []
+        self._last_key: Optional[str] = None
+        # None outside an escape sequence, "" right after a backslash, "u..." while reading a \uXXXX escape
+        self._escape: Optional[str] = None
+        self._high_surrogate: Optional[int] = None
+
+    def feed(self, fragment: str) -> str:
+        """Consume the next fragment of the JSON text; returns the newly decoded part of the field value."""
+        out = []
+        for ch in fragment:
+            if self._in_string:
+                self._feed_string_char(ch, out)
+            elif ch == '"':
+                self._in_string = True
+                self._string_is_key = self._depth == 1 and self._expect_key
+                self._capturing = self._depth == 1 and not self._string_is_key and self._last_key == self.field
+                self._key = []
+            elif ch in "{[":
+                self._depth += 1
+                self._expect_key = ch == "{" and self._depth == 1
+            elif ch in "}]":
+                self._depth -= 1
+            elif self._depth == 1 and ch == ",":
+                self._expect_key = True
+            elif self._depth == 1 and ch == ":":
+                self._expect_key = False
+
+        text = "".join(out)
+        self.value += text
+        return text
+
+    def _feed_string_char(self, ch: str, out: List[str]):
+        if self._escape is None:
+            if ch == "\\":
+                self._escape = ""
+            elif ch == '"':
+                self._in_string = False
+                if self._string_is_key:
+                    self._last_key = "".join(self._key)
+                elif self._capturing:
+                    self._capturing = False
+                    self.done = True
+            else:
+                self._emit(ch, out)
+            return
+
+        if self._escape == "":
+            if ch == "u":
+                self._escape = "u"
+                return
+            self._escape = None
+            self._emit(_ESCAPES.get(ch, ch), out)
+            return
+
+        self._escape += ch
+        if len(self._escape) < 5:
+            return
+        code = int(self._escape[1:], 16)
+        self._escape = None
+        if 0xD800 <= code < 0xDC00:
+            # High surrogate: wait for the low half of the pair
+            self._high_surrogate = code
+            return
+        if 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+            code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+        self._high_surrogate = None
+        self._emit(chr(code), out)
+
+    def _emit(self, text: str, out: List[str]):
+        if self._string_is_key:
+            self._key.append(text)
+        elif self._capturing:
+            out.append(text)
+
+
+class SendMessageStreamParser:
+    """
+    Stream handler passed to `LLMClientBase.send_llm_request_stream`. Clients report tool-call
+    fragments through `on_tool_call_delta`; the user-visible text of `send_message` calls is
+    forwarded to `token_callback` as it is decoded.
+    """
+
+    def __init__(self, token_callback: Callable[[str], None], tool_name: str = "send_message", field: str = "message"):
+        self.token_callback = token_callback
+        self.tool_name = tool_name
+        self.field = field
+        self._names: Dict[int, str] = {}
+        self._parsers: Dict[int, StreamedJSONFieldParser] = {}
+
+    def on_tool_call_delta(self, index: int, name: Optional[str] = None, arguments: Optional[str] = None):
+        """Receive the name and/or the next arguments fragment of the tool call at `index` in the response."""
+        if name:
+            self._names[index] = name
+        if not arguments or self._names.get(index) != self.tool_name:
+            return
+
+        parser = self._parsers.get(index)
+        if parser is None:
+            parser = self._parsers[index] = StreamedJSONFieldParser(self.field)
+        text = parser.feed(arguments)
+        if text:
+            try:
+                self.token_callback(text)
+            except Exception as e:
+                # A broken consumer (e.g. a closed SSE connection) must not fail the LLM call
+                logger.warning(f"Token callback failed: {e}")
+
+    @property
+    def streamed_text(self) -> str:
+        return "".join(parser.value for parser in self._parsers.values())
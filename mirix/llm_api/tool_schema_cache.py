@@ -0,0 +1,96 @@
+"""
+Process-wide cache of provider-formatted tool payloads.
+
+Every LLM request re-sends the agent's tool schemas, and each client converts them into its
+provider's format (inner-thoughts kwarg, structured-output rewriting, Anthropic / Gemini tool
+declarations). The tool set only changes when the agent's tools or its tool-rule state change, so
+the converted payload is compiled once per (provider format, tool set) and reused across steps,
+attempts and agents sharing the same tools.
+
+Cached payloads are shared between requests and must be treated as read-only.
+"""
+
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Tuple
+
+from mirix.constants import TOOL_SCHEMA_CACHE_MAX_ENTRIES
+
+
+def fingerprint_tools(tools: List[dict]) -> str:
+    """A content hash of a list of tool JSON schemas."""
+    return hashlib.sha256(json.dumps(tools, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class CompiledToolSchemaCache:
+    """Thread-safe LRU of compiled tool payloads keyed by (provider format key, tool set fingerprint)."""
+
+    def __init__(self, max_entries: int = TOOL_SCHEMA_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._compiled: "OrderedDict[Tuple[Hashable, ...], Any]" = OrderedDict()
+        # id(tools) -> (tools, fingerprint); agents pass the same list object on every step, so the
+        # fingerprint is only computed once per tool set. The list is kept alive so its id is not reused.
+        self._fingerprints: "OrderedDict[int, Tuple[List[dict], str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get_or_compile(self, key: Tuple[Hashable, ...], tools: List[dict], compile_fn: Callable[[List[dict]], Any]) -> Any:
+        """
+        Return the payload compiled from `tools` for the provider format `key`, calling
+        `compile_fn` (with a private copy of `tools`) on a miss.
+        """
+        cache_key = key + (self._fingerprint(tools),)
+        with self._lock:
+            if cache_key in self._compiled:
+                self._compiled.move_to_end(cache_key)
+                self._hits += 1
+                return self._compiled[cache_key]
+            self._misses += 1
+
+        # Converters may mutate their input; never let them touch the agent's schemas
+        compiled = compile_fn(copy.deepcopy(tools))
+        with self._lock:
+            self._compiled[cache_key] = compiled
+            while len(self._compiled) > self.max_entries:
+                self._compiled.popitem(last=False)
+        return compiled
+
+    def _fingerprint(self, tools: List[dict]) -> str:
+        with self._lock:
+            entry = self._fingerprints.get(id(tools))
+            if entry is not None and entry[0] is tools:
+                self._fingerprints.move_to_end(id(tools))
+                return entry[1]
+
+        fingerprint = fingerprint_tools(tools)
+        with self._lock:
+            self._fingerprints[id(tools)] = (tools, fingerprint)
+            while len(self._fingerprints) > self.max_entries:
+                self._fingerprints.popitem(last=False)
+        return fingerprint
+
+    def clear(self):
+        with self._lock:
+            self._compiled.clear()
+            self._fingerprints.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._compiled),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+
+_cache = CompiledToolSchemaCache()
+
+
+def get_tool_schema_cache() -> CompiledToolSchemaCache:
+    """The process-wide compiled tool schema cache."""
+    return _cache
@@ -4,6 +4,7 @@ from mirix.orm.base import Base
 from mirix.orm.block import Block
 from mirix.orm.blocks_agents import BlocksAgents
 from mirix.orm.file import FileMetadata
+from mirix.orm.job import Job
 from mirix.orm.message import Message
 from mirix.orm.organization import Organization
 from mirix.orm.provider import Provider
@@ -73,8 +73,12 @@ class Agent(SqlalchemyBase, OrganizationMixin):
         lazy="selectin",
         doc="Environment variables associated with this agent.",
     )
-    tools: Mapped[List["Tool"]] = relationship("Tool", secondary="tools_agents", lazy="selectin", passive_deletes=True)
-    core_memory: Mapped[List["Block"]] = relationship("Block", secondary="blocks_agents", lazy="selectin")
+    # Loaded in a fixed order so the tool list and the core memory rendered into the prompt are identical from run
+    # to run (keeps the provider's prompt cache warm and recorded LLM calls replayable)
+    tools: Mapped[List["Tool"]] = relationship(
+        "Tool", secondary="tools_agents", lazy="selectin", passive_deletes=True, order_by="Tool.name"
+    )
+    core_memory: Mapped[List["Block"]] = relationship("Block", secondary="blocks_agents", lazy="selectin", order_by="Block.label")
     messages: Mapped[List["Message"]] = relationship(
         "Message",
         back_populates="agent",
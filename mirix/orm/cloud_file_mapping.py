@@ -2,7 +2,7 @@ from typing import TYPE_CHECKING
 from mirix.orm.sqlalchemy_base import SqlalchemyBase
 from mirix.orm.mixins import OrganizationMixin, UserMixin
 
-from sqlalchemy import Column, DateTime, String, JSON
+from sqlalchemy import Column, DateTime, String, JSON, Index
 from sqlalchemy.orm import Mapped, mapped_column, declared_attr, relationship
 
 from mirix.schemas.cloud_file_mapping import CloudFileMapping as PydanticCloudFileMapping
@@ -17,6 +17,10 @@ class CloudFileMapping(SqlalchemyBase, OrganizationMixin, UserMixin):
     """
 
     __tablename__ = "cloud_file_mapping"
+    __table_args__ = (
+        Index("ix_cloud_file_mapping_cloud_file_id", "cloud_file_id"),
+        Index("ix_cloud_file_mapping_local_file_id", "local_file_id"),
+    )
     __pydantic_model__ = PydanticCloudFileMapping
 
     # Primary key
@@ -133,6 +133,9 @@ class EpisodicEvent(SqlalchemyBase, OrganizationMixin, UserMixin):
             # Standard indexes for SQLite (FTS5 virtual table handled separately)
             Index('ix_episodic_memory_summary_sqlite', 'summary') if not settings.mirix_pg_uri_no_default else None,
             Index('ix_episodic_memory_details_sqlite', 'details') if not settings.mirix_pg_uri_no_default else None,
+
+            # Keyset pagination of a user's events (see MemoryListingManager)
+            Index('ix_episodic_memory_user_occurred_at_id', 'user_id', 'occurred_at', 'id'),
         ])
     )
 
@@ -0,0 +1,34 @@
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import JSON, DateTime, Index, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from mirix.orm.mixins import OrganizationMixin, UserMixin
+from mirix.orm.sqlalchemy_base import SqlalchemyBase
+from mirix.schemas.enums import JobStatus
+from mirix.schemas.job import Job as PydanticJob
+
+
+class Job(SqlalchemyBase, OrganizationMixin, UserMixin):
+    """Background work (reflexion, memory export/import, ...) and its status, progress and result."""
+
+    __tablename__ = "jobs"
+    __pydantic_model__ = PydanticJob
+
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: f"job-{uuid.uuid4()}")
+    job_type: Mapped[str] = mapped_column(String, doc="The kind of work the job runs")
+    status: Mapped[JobStatus] = mapped_column(String, default=JobStatus.pending, doc="The status of the job")
+    params: Mapped[dict] = mapped_column(JSON, default=dict, doc="The parameters the job was submitted with")
+    progress: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True, doc="The latest progress reported by the job")
+    result: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True, doc="The result of a completed job")
+    error: Mapped[Optional[str]] = mapped_column(String, nullable=True, doc="Why the job failed")
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    owner: Mapped[Optional[str]] = mapped_column(String, nullable=True, doc="The job runner (server process) that runs the job")
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True, doc="Last time the owning runner reported the job alive"
+    )
+
+    __table_args__ = (Index("ix_jobs_user_id_created_at", "user_id", "created_at"),)
@@ -2,7 +2,7 @@ from typing import TYPE_CHECKING, Optional
 from datetime import datetime
 import datetime as dt
 
-from sqlalchemy import Column, JSON, String
+from sqlalchemy import Column, JSON, String, Index
 from sqlalchemy.orm import Mapped, mapped_column, declared_attr, relationship
 
 from mirix.orm.sqlalchemy_base import SqlalchemyBase
@@ -29,6 +29,8 @@ class ProceduralMemoryItem(SqlalchemyBase, OrganizationMixin, UserMixin):
     """
 
     __tablename__ = "procedural_memory"
+    # Keyset pagination of a user's items (see MemoryListingManager)
+    __table_args__ = (Index("ix_procedural_memory_user_created_at_id", "user_id", "created_at", "id"),)
     __pydantic_model__ = PydanticProceduralMemoryItem
 
     # Primary key
@@ -2,7 +2,7 @@ from typing import TYPE_CHECKING, Optional
 from datetime import datetime
 import datetime as dt
 
-from sqlalchemy import Column, JSON, String
+from sqlalchemy import Column, JSON, String, Index
 from sqlalchemy.orm import Mapped, mapped_column, declared_attr, relationship
 
 from mirix.orm.sqlalchemy_base import SqlalchemyBase
@@ -30,6 +30,8 @@ class ResourceMemoryItem(SqlalchemyBase, OrganizationMixin, UserMixin):
     """
 
     __tablename__ = "resource_memory"
+    # Keyset pagination of a user's items (see MemoryListingManager)
+    __table_args__ = (Index("ix_resource_memory_user_created_at_id", "user_id", "created_at", "id"),)
     __pydantic_model__ = PydanticResourceMemoryItem
 
     # Primary key
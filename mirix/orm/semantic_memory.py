@@ -1,5 +1,5 @@
 from typing import TYPE_CHECKING, Optional
-from sqlalchemy import Column, JSON, String, DateTime
+from sqlalchemy import Column, JSON, String, DateTime, Index
 from sqlalchemy.orm import Mapped, mapped_column, declared_attr, relationship
 from mirix.orm.sqlalchemy_base import SqlalchemyBase
 from mirix.orm.mixins import OrganizationMixin, UserMixin
@@ -32,6 +32,8 @@ class SemanticMemoryItem(SqlalchemyBase, OrganizationMixin, UserMixin):
     """
 
     __tablename__ = "semantic_memory"
+    # Keyset pagination of a user's items (see MemoryListingManager)
+    __table_args__ = (Index("ix_semantic_memory_user_created_at_id", "user_id", "created_at", "id"),)
     __pydantic_model__ = PydanticSemanticMemoryItem
 
     # Primary key
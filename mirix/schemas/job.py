@@ -0,0 +1,40 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from pydantic import Field
+
+from mirix.schemas.enums import JobStatus
+from mirix.schemas.mirix_base import MirixBase
+
+
+class JobBase(MirixBase):
+    __id_prefix__ = "job"
+
+    job_type: str = Field(..., description="The kind of work the job runs (e.g. reflexion, export_memories).")
+    status: JobStatus = Field(JobStatus.pending, description="The status of the job.")
+    params: Dict[str, Any] = Field(default_factory=dict, description="The parameters the job was submitted with.")
+    progress: Optional[Dict[str, Any]] = Field(None, description="The latest progress reported by the job.")
+    result: Optional[Dict[str, Any]] = Field(None, description="The result of a completed job.")
+    error: Optional[str] = Field(None, description="Why the job failed.")
+
+
+class Job(JobBase):
+    """
+    A unit of background work run by the server's job runner.
+
+    Parameters:
+        id (str): The unique identifier of the job.
+        job_type (str): The kind of work the job runs.
+        status (JobStatus): pending, running, completed, failed or cancelled.
+        progress (Dict): The latest progress reported by the job.
+        result (Dict): The result of a completed job.
+    """
+
+    id: str = JobBase.generate_id_field()
+    user_id: Optional[str] = Field(None, description="The user the job runs for.")
+    organization_id: Optional[str] = Field(None, description="The organization of the user.")
+    created_at: Optional[datetime] = Field(None, description="When the job was submitted.")
+    started_at: Optional[datetime] = Field(None, description="When a worker started the job.")
+    completed_at: Optional[datetime] = Field(None, description="When the job completed, failed or was cancelled.")
+    owner: Optional[str] = Field(None, description="The job runner (server process) that runs the job.")
+    heartbeat_at: Optional[datetime] = Field(None, description="Last time the owning runner reported the job alive.")
@@ -55,12 +55,17 @@ class UsageStatistics(BaseModel):
     total_tokens: int = 0
     last_prompt_tokens: int = 0
     last_completion_tokens: int = 0
+    # Prompt-cache accounting (Anthropic): tokens written to / served from the prompt cache
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
 
     def __add__(self, other: "UsageStatistics") -> "UsageStatistics":
         return UsageStatistics(
             completion_tokens=self.completion_tokens + other.completion_tokens,
             prompt_tokens=self.prompt_tokens + other.prompt_tokens,
             total_tokens=self.total_tokens + other.total_tokens,
+            cache_creation_input_tokens=self.cache_creation_input_tokens + other.cache_creation_input_tokens,
+            cache_read_input_tokens=self.cache_read_input_tokens + other.cache_read_input_tokens,
         )
 
 
@@ -11,6 +11,8 @@ class MirixUsageStatistics(BaseModel):
         completion_tokens (int): The number of tokens generated by the agent.
         prompt_tokens (int): The number of tokens in the prompt.
         total_tokens (int): The total number of tokens processed by the agent.
+        cache_creation_input_tokens (int): The number of prompt tokens written to the provider's prompt cache.
+        cache_read_input_tokens (int): The number of prompt tokens served from the provider's prompt cache.
         step_count (int): The number of steps taken by the agent.
     """
 
@@ -20,4 +22,6 @@ class MirixUsageStatistics(BaseModel):
     last_prompt_tokens: int = Field(0, description="The number of tokens in the last prompt.")
     last_completion_tokens: int = Field(0, description="The number of tokens in the last completion.")
     total_tokens: int = Field(0, description="The total number of tokens processed by the agent.")
+    cache_creation_input_tokens: int = Field(0, description="The number of prompt tokens written to the provider's prompt cache.")
+    cache_read_input_tokens: int = Field(0, description="The number of prompt tokens served from the provider's prompt cache.")
     step_count: int = Field(0, description="The number of steps taken by the agent.")
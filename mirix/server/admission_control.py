@@ -0,0 +1,290 @@
+"""
+Admission control for the blocking work behind the HTTP endpoints.
+
+Each workload class runs on its own bounded thread pool, so a flood of one kind of request cannot take
+the threads (and DB connections) another needs:
+
+- "chat": /send_message and /send_streaming_message conversations
+- "memorizing": the same endpoints with memorizing=True (screen monitoring uploads)
+- "admin": reflexion, bulk memory import and other maintenance run from a request
+
+A class admits at most `max_workers` running plus `max_queued` waiting requests. Beyond that a request is
+rejected straight away with OverloadedError (a 429 with Retry-After at the HTTP layer), instead of queueing
+until every client times out. The suggested retry delay is the time the queue ahead would take to drain
+at the recently observed run time.
+
+Chat requests run on the event loop instead (`Admission.run_async`): they wait on the LLM without a
+thread and hand their blocking work to the DB executors, so their class only caps how many of them are
+in progress at once.
+
+Every worker may hold a DB connection, so the classes are sized together with the server's other pools
+(DB executors, job workers): if their configured workers would not fit in the engine's connection pool,
+they are scaled down to fit.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+
+from mirix.log import get_logger
+from mirix.settings import settings
+
+logger = get_logger(__name__)
+
+CHAT_WORKLOAD = "chat"
+MEMORIZING_WORKLOAD = "memorizing"
+ADMIN_WORKLOAD = "admin"
+
+# workload -> (settings field for its worker count, settings field for its queue length)
+_WORKLOAD_SETTINGS = {
+    CHAT_WORKLOAD: ("chat_executor_max_workers", "chat_queue_max_length"),
+    MEMORIZING_WORKLOAD: ("memorizing_executor_max_workers", "memorizing_queue_max_length"),
+    ADMIN_WORKLOAD: ("admin_executor_max_workers", "admin_queue_max_length"),
+}
+
+# Weight of the latest run in the moving average of run times
+_RUN_TIME_SMOOTHING = 0.2
+_MIN_RETRY_AFTER_SECONDS = 1
+_MAX_RETRY_AFTER_SECONDS = 120
+
+
+class OverloadedError(Exception):
+    """A workload class is at capacity; retry after `retry_after` seconds."""
+
+    def __init__(self, workload: str, retry_after: int):
+        self.workload = workload
+        self.retry_after = retry_after
+        super().__init__(f"The server is busy with {workload} requests, please retry in {retry_after}s")
+
+
+class Admission:
+    """A request's admitted slot in a workload class. Run its work with `run` or `run_async`, or `release` it unused."""
+
+    def __init__(self, workload: "WorkloadExecutor"):
+        self._workload = workload
+        self._lock = threading.Lock()
+        self._started = False
+        self._released = False
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Run `func(*args, **kwargs)` on the workload's pool, preserving the caller's context variables.
+
+        The slot is given back when `func` finishes, not when the caller stops waiting: a request whose
+        client went away keeps its slot for as long as its work occupies a worker.
+        """
+        self._start()
+        try:
+            future = self._workload.submit(func, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return await asyncio.wrap_future(future)
+
+    async def run_async(self, func, *args, **kwargs):
+        """
+        Await `func(*args, **kwargs)`, a coroutine function, on the caller's event loop.
+
+        The request keeps its slot while the coroutine runs, so the class still caps how many of its requests
+        are in progress, but it takes none of the workload's worker threads: its blocking work goes to the DB
+        executors. A request cancelled with its client stops its work and gives the slot back.
+        """
+        self._start()
+        try:
+            return await self._workload.run_coroutine(func, *args, **kwargs)
+        finally:
+            self._release()
+
+    def release(self):
+        """Give the slot back unused; once `run` has been called this is a no-op (the work releases it)."""
+        with self._lock:
+            if self._started:
+                return
+        self._release()
+
+    def _start(self):
+        with self._lock:
+            if self._released:
+                raise RuntimeError(f"The {self._workload.name} admission was already released")
+            self._started = True
+
+    def _release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._workload.release()
+
+
+class WorkloadExecutor:
+    """The bounded pool and admission counters of one workload class."""
+
+    def __init__(self, name: str, max_workers: int, max_queued: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"mirix_{name}")
+        self._lock = threading.Lock()
+
+        # Requests admitted and not yet finished (running or waiting for a worker)
+        self.admitted = 0
+        self.running = 0
+
+        # Metrics
+        self.total_admitted = 0
+        self.total_rejected = 0
+        self.total_completed = 0
+        self.avg_queue_wait_seconds = 0.0
+        self.avg_run_seconds = 0.0
+
+    def admit(self) -> Admission:
+        """Take a slot, or raise OverloadedError if the workers are busy and the queue is full."""
+        with self._lock:
+            if self.admitted >= self.max_workers + self.max_queued:
+                self.total_rejected += 1
+                raise OverloadedError(self.name, self._retry_after_locked())
+            self.admitted += 1
+            self.total_admitted += 1
+        return Admission(self)
+
+    def release(self):
+        with self._lock:
+            self.admitted -= 1
+
+    def submit(self, func, *args, **kwargs) -> Future:
+        context = contextvars.copy_context()
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            with self._lock:
+                self.running += 1
+                self.avg_queue_wait_seconds = _smooth(self.avg_queue_wait_seconds, started - submitted)
+            try:
+                return context.run(func, *args, **kwargs)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.total_completed += 1
+                    self.avg_run_seconds = _smooth(self.avg_run_seconds, time.perf_counter() - started)
+
+        return self._executor.submit(timed)
+
+    async def run_coroutine(self, func, *args, **kwargs):
+        """Await `func(*args, **kwargs)` on the caller's event loop, counted and timed like the pool's work."""
+        with self._lock:
+            self.running += 1
+            self.avg_queue_wait_seconds = _smooth(self.avg_queue_wait_seconds, 0.0)
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.total_completed += 1
+                self.avg_run_seconds = _smooth(self.avg_run_seconds, time.perf_counter() - started)
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queued": self.max_queued,
+                "running": self.running,
+                "queued": max(0, self.admitted - self.running),
+                "admitted": self.total_admitted,
+                "rejected": self.total_rejected,
+                "completed": self.total_completed,
+                "avg_queue_wait_seconds": round(self.avg_queue_wait_seconds, 3),
+                "avg_run_seconds": round(self.avg_run_seconds, 3),
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _retry_after_locked(self) -> int:
+        # Time for the queue ahead to drain through the workers at the recent run time
+        backlog = self.admitted - self.max_workers + 1
+        estimate = backlog * (self.avg_run_seconds or 1.0) / self.max_workers
+        return int(min(_MAX_RETRY_AFTER_SECONDS, max(_MIN_RETRY_AFTER_SECONDS, round(estimate))))
+
+
+class AdmissionController:
+    """The workload classes of the server, sized from settings and fitted into `connection_budget` workers."""
+
+    def __init__(self, connection_budget: Optional[int] = None):
+        workers = {name: getattr(settings, workers_field) for name, (workers_field, _) in _WORKLOAD_SETTINGS.items()}
+        total = sum(workers.values())
+        if connection_budget is not None and total > connection_budget:
+            scale = max(connection_budget, len(workers)) / total
+            fitted = {name: max(1, int(count * scale)) for name, count in workers.items()}
+            logger.warning(
+                f"Workload pools ({workers}) need more DB connections than the {connection_budget} available; using {fitted}"
+            )
+            workers = fitted
+
+        self.workloads: Dict[str, WorkloadExecutor] = {
+            name: WorkloadExecutor(name, workers[name], getattr(settings, queue_field))
+            for name, (_, queue_field) in _WORKLOAD_SETTINGS.items()
+        }
+
+    def admit(self, workload: str) -> Admission:
+        """Admit a request of `workload`, raising OverloadedError when the class is at capacity."""
+        if workload not in self.workloads:
+            raise ValueError(f"Unknown workload class '{workload}'")
+        return self.workloads[workload].admit()
+
+    async def run(self, workload: str, func, *args, **kwargs):
+        """Admit a request of `workload` and run `func(*args, **kwargs)` on its pool."""
+        return await self.admit(workload).run(func, *args, **kwargs)
+
+    async def run_async(self, workload: str, func, *args, **kwargs):
+        """Admit a request of `workload` and await the coroutine function `func(*args, **kwargs)`."""
+        return await self.admit(workload).run_async(func, *args, **kwargs)
+
+    def get_metrics(self) -> dict:
+        return {name: workload.get_metrics() for name, workload in self.workloads.items()}
+
+    def shutdown(self):
+        for workload in self.workloads.values():
+            workload.shutdown()
+
+
+def _smooth(average: float, sample: float) -> float:
+    return sample if average == 0.0 else average + _RUN_TIME_SMOOTHING * (sample - average)
+
+
+def _connection_budget() -> Optional[int]:
+    """
+    DB connections left for the workload classes once the other pools that hold connections are counted,
+    or None when the engine's pool size is unknown.
+    """
+    from mirix.server.server import engine
+
+    pool = getattr(engine, "pool", None)
+    if pool is None or not hasattr(pool, "size"):
+        return None
+    capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+    others = (
+        settings.db_executor_max_workers
+        + settings.memory_read_executor_max_workers
+        + settings.memory_agent_executor_max_workers
+        + settings.job_worker_max_workers
+    )
+    return capacity - others
+
+
+_admission_controller = None
+_admission_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """The process-wide admission controller, created on first use."""
+    global _admission_controller
+    with _admission_controller_lock:
+        if _admission_controller is None:
+            _admission_controller = AdmissionController(connection_budget=_connection_budget())
+        return _admission_controller
@@ -7,17 +7,28 @@ import yaml
 from pathlib import Path
 from datetime import datetime
 from typing import List, Optional, Dict, Any
-from fastapi import FastAPI, HTTPException, File, UploadFile, Form
+from fastapi import FastAPI, HTTPException, File, UploadFile, Form, Query
 from fastapi.responses import StreamingResponse, HTMLResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import asyncio
 import queue
 import threading
+from contextlib import AsyncExitStack, asynccontextmanager
 from ..agent.agent_wrapper import AgentWrapper
 from ..functions.mcp_client import get_mcp_client_manager, StdioServerConfig
 from ..services.mcp_tool_registry import get_mcp_tool_registry
 from ..services.mcp_marketplace import get_mcp_marketplace
+from ..services.db_executor import MEMORY_READ_POOL, run_in_db_executor, run_in_db_pool
+from ..settings import settings
+from ..constants import MEMORY_LIST_DEFAULT_LIMIT
+from ..services.memory_export_manager import EXPORT_MEDIA_TYPES
+from ..services.job_runner import JobQueueFullError
+from .stream_channel import StreamChannel
+from .admission_control import ADMIN_WORKLOAD, CHAT_WORKLOAD, MEMORIZING_WORKLOAD, OverloadedError, get_admission_controller
+from ..schemas.enums import JobStatus
+from ..schemas.job import Job
+from ..orm.errors import NoResultFound
 import logging
 
 logger = logging.getLogger(__name__)
@@ -26,20 +37,28 @@ logger = logging.getLogger(__name__)
 def switch_user_context(agent_wrapper, user_id: str):
     """Switch agent's user context and manage user status"""
     if agent_wrapper and agent_wrapper.client:
-        from mirix.schemas.user import User as PydanticUser
-        
-        # Set current user to inactive
-        if agent_wrapper.client.user:
-            current_user = agent_wrapper.client.user
-            agent_wrapper.client.server.user_manager.update_user_status(current_user.id, "inactive")
-        
-        # Get and set new user to active
-        user = agent_wrapper.client.server.user_manager.get_user_by_id(user_id)
-        agent_wrapper.client.server.user_manager.update_user_status(user_id, "active")
+        # No-op (no status writes) when the user is already the active one
+        user = agent_wrapper.client.server.user_manager.set_active_user(user_id)
         agent_wrapper.client.user = user
         return user
     return None
 
+def get_active_user(agent_wrapper):
+    """Get the active user, falling back to the first user if none is marked active"""
+    user_manager = agent_wrapper.client.server.user_manager
+    active_user = user_manager.get_active_user()
+    if active_user is None:
+        users = user_manager.list_users(limit=1)
+        active_user = users[0] if users else None
+    return active_user
+
+def get_active_user_id(agent_wrapper) -> str:
+    """ID of the active user, or of the default user if there are no users yet"""
+    active_user = get_active_user(agent_wrapper)
+    if active_user is None:
+        return agent_wrapper.client.server.user_manager.DEFAULT_USER_ID
+    return active_user.id
+
 def get_user_or_default(agent_wrapper, user_id: Optional[str] = None):
     """Get user by ID or return current user"""
     if user_id:
@@ -49,6 +68,30 @@ def get_user_or_default(agent_wrapper, user_id: Optional[str] = None):
     else:
         return agent_wrapper.client.server.user_manager.get_default_user()
 
+def admit_request(workload: str):
+    """Admit a request into its workload class, or reject it with a 429 when the class is at capacity"""
+    try:
+        return get_admission_controller().admit(workload)
+    except OverloadedError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """
+    A StreamingResponse whose body runs admitted work. The slot is given back if the response ends without
+    the work having started, including when the client went away before the body was ever iterated; once
+    started, the work keeps the slot until it finishes.
+    """
+
+    def __init__(self, admission, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.admission = admission
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.admission.release()
+
 async def handle_gmail_connection(client_id: str, client_secret: str, server_name: str) -> bool:
     """
     Handle Gmail OAuth2 authentication and MCP connection
@@ -297,6 +340,7 @@ class MessageRequest(BaseModel):
     voice_files: Optional[List[str]] = None  # Base64 encoded voice files
     memorizing: bool = False
     is_screen_monitoring: Optional[bool] = False
+    user_id: Optional[str] = None  # Default: the active user
 
 class MessageResponse(BaseModel):
     response: str
@@ -458,6 +502,10 @@ class CredentialItem(BaseModel):
     tags: Optional[List[str]] = None
     last_used: Optional[str] = None
 
+class MemoryPageResponse(BaseModel):
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
 class ClearConversationResponse(BaseModel):
     success: bool
     message: str
@@ -473,6 +521,8 @@ class ExportMemoriesRequest(BaseModel):
     memory_types: List[str]
     include_embeddings: bool = False
     user_id: Optional[str] = None
+    # Only used by export jobs: csv, jsonl, parquet or xlsx (default: the file's extension)
+    format: Optional[str] = None
 
 class ExportMemoriesResponse(BaseModel):
     success: bool
@@ -481,6 +531,30 @@ class ExportMemoriesResponse(BaseModel):
     total_exported: int
     file_path: str
 
+class ImportMemoriesRequest(BaseModel):
+    file_path: str
+    format: Optional[str] = None
+    user_id: Optional[str] = None
+    preserve_ids: bool = True
+    build_embeddings: bool = True
+    checkpoint_path: Optional[str] = None
+
+class ImportMemoriesResponse(BaseModel):
+    success: bool
+    message: str
+    imported_counts: Dict[str, int]
+    total_imported: int
+    records_read: int
+    skipped: int
+    failed: int
+    embedded: int
+    errors: List[str]
+
+class SubmitJobRequest(BaseModel):
+    job_type: str
+    params: Dict[str, Any] = {}
+    user_id: Optional[str] = None
+
 class ReflexionRequest(BaseModel):
     pass  # No parameters needed for now
 
@@ -512,6 +586,18 @@ async def startup_event():
     agent = AgentWrapper(str(config_path))
     print("Agent initialized successfully")
 
+    # Jobs left pending or running by a stopped server process will never finish
+    interrupted_jobs = agent.client.server.job_runner.start()
+    if interrupted_jobs:
+        logger.info(f"Marked {interrupted_jobs} interrupted background jobs as failed")
+
+@app.on_event("shutdown")
+async def shutdown_job_runner():
+    """Cancel the running background jobs and stop the request workers"""
+    if agent is not None:
+        agent.client.server.job_runner.shutdown()
+    get_admission_controller().shutdown()
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint for monitoring server status"""
@@ -521,6 +607,14 @@ async def health_check():
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/admission/metrics")
+async def get_admission_metrics():
+    """Per-workload admission metrics (running, queued, admitted, rejected, average wait and run time) and background job load"""
+    metrics = {"workloads": get_admission_controller().get_metrics()}
+    if agent is not None:
+        metrics["jobs"] = agent.client.server.job_runner.get_metrics()
+    return metrics
+
 @app.post("/send_message")
 async def send_message_endpoint(request: MessageRequest):
     """Send a message to the agent and get the response"""
@@ -545,26 +639,37 @@ async def send_message_endpoint(request: MessageRequest):
             status="missing_api_keys"
         )
     
+    admission = admit_request(MEMORIZING_WORKLOAD if request.memorizing else CHAT_WORKLOAD)
     try:
-        # Handle user context switching if user_id is provided
-        if request.user_id:
-            switch_user_context(agent, request.user_id)
-        
-        print(f"Starting agent.send_message (non-streaming) with: message='{request.message}', memorizing={request.memorizing}, user_id={request.user_id}")
-        
-        # Run the blocking agent.send_message() in a background thread to avoid blocking other requests
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            None,  # Use default ThreadPoolExecutor
-            lambda: agent.send_message(
+        user_id = request.user_id or get_active_user_id(agent)
+
+        print(f"Starting agent.send_message (non-streaming) with: message='{request.message}', memorizing={request.memorizing}, user_id={user_id}")
+        
+        # Requests run in the user's own context so that requests of different users run concurrently
+        if request.memorizing:
+            # Run the blocking agent.send_message() on the workload's bounded pool to avoid blocking other requests
+            response = await admission.run(
+                lambda: agent.run_as_user(
+                    user_id,
+                    agent.send_message,
+                    message=request.message,
+                    image_uris=request.image_uris,
+                    sources=request.sources,  # Pass sources to agent
+                    voice_files=request.voice_files,  # Pass voice files to agent
+                    memorizing=True,
+                    user_id=user_id
+                )
+            )
+        else:
+            # The chat agent steps on the event loop; its blocking work goes to the DB executors
+            response = await admission.run_async(
+                agent.run_as_user_async,
+                user_id,
+                agent.send_message_async,
                 message=request.message,
                 image_uris=request.image_uris,
-                sources=request.sources,  # Pass sources to agent
-                voice_files=request.voice_files,  # Pass voice files to agent
-                memorizing=request.memorizing,
-                user_id=request.user_id
+                user_id=user_id
             )
-        )
         
         print(f"Agent response (non-streaming): {response}")
         
@@ -583,6 +688,7 @@ async def send_message_endpoint(request: MessageRequest):
         return MessageResponse(response=response)
     
     except Exception as e:
+        admission.release()
         print(f"Error in send_message_endpoint: {str(e)}")
         print(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
@@ -621,16 +727,26 @@ async def send_streaming_message_endpoint(request: MessageRequest):
     
     agent.update_chat_agent_system_prompt(request.is_screen_monitoring)
 
-    # Create a queue to collect intermediate messagess
-    message_queue = queue.Queue()
+    # Admitted before the response starts, so an overloaded server can still answer with a 429
+    admission = admit_request(MEMORIZING_WORKLOAD if request.memorizing else CHAT_WORKLOAD)
+
+    # Carries intermediate messages (put from the agent's task or its worker threads) and the final result to the stream
+    channel = StreamChannel()
     
     def display_intermediate_message(message_type: str, message: str):
         """Callback function to capture intermediate messages"""
-        message_queue.put({
+        channel.put({
             "type": "intermediate",
             "message_type": message_type,
             "content": message
         })
+
+    def stream_token(text: str):
+        """Callback function to capture the chat reply text as it is generated"""
+        channel.put({
+            "type": "token",
+            "content": text
+        })
     
     def request_user_confirmation(confirmation_type: str, details: dict) -> bool:
         """Request confirmation from user and wait for response"""
@@ -641,8 +757,8 @@ async def send_streaming_message_endpoint(request: MessageRequest):
         confirmation_result_queue = queue.Queue()
         confirmation_queues[confirmation_id] = confirmation_result_queue
         
-        # Put confirmation request in message queue
-        message_queue.put({
+        # Send the confirmation request to the stream
+        channel.put({
             "type": "confirmation_request",
             "confirmation_type": confirmation_type,
             "confirmation_id": confirmation_id,
@@ -663,121 +779,111 @@ async def send_streaming_message_endpoint(request: MessageRequest):
     async def generate_stream():
         """Generator function for streaming responses"""
         try:
-            # Start the agent processing in a separate thread
-            result_queue = queue.Queue()
-            
             async def run_agent():
                 try:
                     
-                    # find the current active user
-                    users = agent.client.server.user_manager.list_users()
-                    active_user = next((user for user in users if user.status == 'active'), None)
-                    current_user_id = active_user.id if active_user else None
-
-                    # Run agent.send_message in a background thread to avoid blocking
-                    loop = asyncio.get_event_loop()
-                    response = await loop.run_in_executor(
-                        None,  # Use default ThreadPoolExecutor
-                        lambda: agent.send_message(
+                    # the requested user, or the current active user
+                    current_user_id = request.user_id or get_active_user_id(agent)
+
+                    if request.memorizing:
+                        # Run agent.send_message on the workload's bounded pool to avoid blocking, in the user's own context
+                        response = await admission.run(
+                            lambda: agent.run_as_user(
+                                current_user_id,
+                                agent.send_message,
+                                message=request.message,
+                                image_uris=request.image_uris,
+                                sources=request.sources,  # Pass sources to agent
+                                voice_files=request.voice_files,  # Pass raw voice files
+                                memorizing=True,
+                                display_intermediate_message=display_intermediate_message,
+                                request_user_confirmation=request_user_confirmation,
+                                is_screen_monitoring=request.is_screen_monitoring,
+                                user_id=current_user_id,
+                            )
+                        )
+                    else:
+                        # The chat agent steps on the event loop, in the user's own context
+                        response = await admission.run_async(
+                            agent.run_as_user_async,
+                            current_user_id,
+                            agent.send_message_async,
                             message=request.message,
                             image_uris=request.image_uris,
-                            sources=request.sources,  # Pass sources to agent
-                            voice_files=request.voice_files,  # Pass raw voice files
-                            memorizing=request.memorizing,
                             display_intermediate_message=display_intermediate_message,
                             request_user_confirmation=request_user_confirmation,
                             is_screen_monitoring=request.is_screen_monitoring,
-                            user_id=current_user_id
+                            user_id=current_user_id,
+                            token_callback=stream_token,
                         )
-                    )
                     # Handle various response cases
                     if response is None:
                         if request.memorizing:
-                            result_queue.put({"type": "final", "response": ""})
+                            channel.put({"type": "final", "response": ""})
                         else:
                             print("[DEBUG] Agent returned None response")
-                            result_queue.put({"type": "error", "error": "Agent returned no response"})
+                            channel.put({"type": "error", "error": "Agent returned no response"})
                     elif isinstance(response, str) and response.startswith("ERROR_"):
                         # Handle specific error types from agent wrapper
                         print(f"[DEBUG] Agent returned specific error: {response}")
                         if response == "ERROR_RESPONSE_FAILED":
                             print("[DEBUG] - Message queue response failed")
-                            result_queue.put({"type": "error", "error": "Message processing failed in agent queue"})
+                            channel.put({"type": "error", "error": "Message processing failed in agent queue"})
                         elif response == "ERROR_INVALID_RESPONSE_STRUCTURE":
                             print("[DEBUG] - Response structure invalid (missing messages or insufficient count)")
-                            result_queue.put({"type": "error", "error": "Invalid response structure from agent"})
+                            channel.put({"type": "error", "error": "Invalid response structure from agent"})
                         elif response == "ERROR_NO_TOOL_CALL":
                             print("[DEBUG] - Expected message missing tool_call attribute")
-                            result_queue.put({"type": "error", "error": "Agent response missing required tool call"})
+                            channel.put({"type": "error", "error": "Agent response missing required tool call"})
                         elif response == "ERROR_NO_MESSAGE_IN_ARGS":
                             print("[DEBUG] - Tool call arguments missing 'message' key")
-                            result_queue.put({"type": "error", "error": "Agent tool call missing message content"})
+                            channel.put({"type": "error", "error": "Agent tool call missing message content"})
                         elif response == "ERROR_PARSING_EXCEPTION":
                             print("[DEBUG] - Exception occurred during response parsing")
-                            result_queue.put({"type": "error", "error": "Failed to parse agent response"})
+                            channel.put({"type": "error", "error": "Failed to parse agent response"})
                         else:
                             print(f"[DEBUG] - Unknown error type: {response}")
-                            result_queue.put({"type": "error", "error": f"Unknown agent error: {response}"})
+                            channel.put({"type": "error", "error": f"Unknown agent error: {response}"})
                     elif response == "ERROR":
                         print("[DEBUG] Agent returned generic ERROR string")
-                        result_queue.put({"type": "error", "error": "Agent processing failed"})
+                        channel.put({"type": "error", "error": "Agent processing failed"})
                     elif not response or (isinstance(response, str) and response.strip() == ""):
                         if request.memorizing:
                             print("[DEBUG] Agent returned empty response - expected for memorizing=True")
-                            result_queue.put({"type": "final", "response": ""})
+                            channel.put({"type": "final", "response": ""})
                         else:
                             print("[DEBUG] Agent returned empty response unexpectedly")
-                            result_queue.put({"type": "error", "error": "Agent returned empty response"})
+                            channel.put({"type": "error", "error": "Agent returned empty response"})
                     else:
                         print(f"[DEBUG] Agent returned successful response (length: {len(str(response))})")
-                        result_queue.put({"type": "final", "response": response})
+                        channel.put({"type": "final", "response": response})
                         
                 except Exception as e:
                     print(f"[DEBUG] Exception in run_agent: {str(e)}")
                     print(f"Traceback: {traceback.format_exc()}")
-                    result_queue.put({"type": "error", "error": str(e)})
+                    channel.put({"type": "error", "error": str(e)})
             
-            # Start agent processing as async task
+            # Start agent processing as async task; its end is announced on the channel, after its result
             agent_task = asyncio.create_task(run_agent())
+            agent_task.add_done_callback(lambda task: channel.put({"type": "done"}))
             
-            # Keep track of whether we've sent the final result
-            final_result_sent = False
-            
-            # Stream intermediate messages and wait for final result
-            while not final_result_sent:
-                # Check for intermediate messages first
-                try:
-                    intermediate_msg = message_queue.get_nowait()
-                    yield f"data: {json.dumps(intermediate_msg)}\n\n"
-                    continue  # Continue to next iteration to check for more messages
-                except queue.Empty:
-                    pass
-                
-                # Check for final result with timeout
-                try:
-                    # Use a short timeout to allow for intermediate messages
-                    final_result = result_queue.get(timeout=0.1)
-                    if final_result["type"] == "error":
-                        yield f"data: {json.dumps({'type': 'error', 'error': final_result['error']})}\n\n"
+            # Stream intermediate messages as they arrive until the final result
+            while True:
+                event = await channel.get()
+                if event["type"] == "final":
+                    yield f"data: {json.dumps({'type': 'final', 'response': event['response']})}\n\n"
+                    break
+                if event["type"] == "error":
+                    yield f"data: {json.dumps({'type': 'error', 'error': event['error']})}\n\n"
+                    break
+                if event["type"] == "done":
+                    # Task is done but no result - this shouldn't happen, but handle it
+                    if not agent_task.cancelled() and agent_task.exception() is not None:
+                        yield f"data: {json.dumps({'type': 'error', 'error': f'Agent processing failed: {str(agent_task.exception())}'})}\n\n"
                     else:
-                        yield f"data: {json.dumps({'type': 'final', 'response': final_result['response']})}\n\n"
-                    final_result_sent = True
+                        yield f"data: {json.dumps({'type': 'error', 'error': 'Agent processing completed unexpectedly without result'})}\n\n"
                     break
-                except queue.Empty:
-                    # If no result yet, check if task is still running
-                    if agent_task.done():
-                        # Task is done but no result - this shouldn't happen, but handle it
-                        try:
-                            # Check if the task raised an exception
-                            agent_task.result()
-                        except Exception as e:
-                            yield f"data: {json.dumps({'type': 'error', 'error': f'Agent processing failed: {str(e)}'})}\n\n"
-                        else:
-                            yield f"data: {json.dumps({'type': 'error', 'error': 'Agent processing completed unexpectedly without result'})}\n\n"
-                        final_result_sent = True
-                        break
-                    # Otherwise continue the loop to check for more intermediate messages
-                    await asyncio.sleep(0.1)  # Yield control to allow other operations
+                yield f"data: {json.dumps(event)}\n\n"
             
             # Make sure task completes
             if not agent_task.done():
@@ -790,9 +896,13 @@ async def send_streaming_message_endpoint(request: MessageRequest):
         except Exception as e:
             print(f"Traceback: {traceback.format_exc()}")
             yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+        finally:
+            # Events of a run whose client went away are dropped
+            channel.close()
     
     try:
-        return StreamingResponse(
+        return AdmittedStreamingResponse(
+            admission,
             generate_stream(),
             media_type="text/plain",
             headers={
@@ -814,9 +924,7 @@ async def get_personas(user_id: Optional[str] = None):
     
     try:
         # Find the current active user
-        users = agent.client.server.user_manager.list_users()
-        active_user = next((user for user in users if user.status == 'active'), None)
-        target_user = active_user if active_user else (users[0] if users else None)
+        target_user = get_active_user(agent)
         
         persona_details = agent.get_persona_details()
         return PersonaDetailsResponse(personas=persona_details)
@@ -832,9 +940,7 @@ async def update_persona(request: UpdatePersonaRequest):
     
     try:
         # Find the current active user
-        users = agent.client.server.user_manager.list_users()
-        active_user = next((user for user in users if user.status == 'active'), None)
-        target_user = active_user if active_user else (users[0] if users else None)
+        target_user = get_active_user(agent)
         
         agent.update_core_memory_persona(request.text)
         return UpdatePersonaResponse(success=True, message="Core memory persona updated successfully")
@@ -850,9 +956,7 @@ async def apply_persona_template(request: ApplyPersonaTemplateRequest):
     
     try:
         # Find the current active user
-        users = agent.client.server.user_manager.list_users()
-        active_user = next((user for user in users if user.status == 'active'), None)
-        target_user = active_user if active_user else (users[0] if users else None)
+        target_user = get_active_user(agent)
         
         agent.apply_persona_template(request.persona_name)
         return UpdatePersonaResponse(success=True, message=f"Persona template '{request.persona_name}' applied successfully")
@@ -880,9 +984,7 @@ async def get_core_memory_persona(user_id: Optional[str] = None):
     
     try:
         # Find the current active user
-        users = agent.client.server.user_manager.list_users()
-        active_user = next((user for user in users if user.status == 'active'), None)
-        target_user = active_user if active_user else (users[0] if users else None)
+        target_user = get_active_user(agent)
         
         persona_text = agent.get_core_memory_persona()
         return CoreMemoryPersonaResponse(text=persona_text)
@@ -1088,9 +1190,7 @@ async def get_current_timezone():
     
     try:
         # Find the current active user
-        users = agent.client.server.user_manager.list_users()
-        active_user = next((user for user in users if user.status == 'active'), None)
-        target_user = active_user if active_user else (users[0] if users else None)
+        target_user = get_active_user(agent)
         
         if not target_user:
             raise HTTPException(status_code=404, detail="No user found")
@@ -1109,9 +1209,7 @@ async def set_timezone(request: SetTimezoneRequest):
     
     try:
         # Find the current active user
-        users = agent.client.server.user_manager.list_users()
-        active_user = next((user for user in users if user.status == 'active'), None)
-        target_user = active_user if active_user else (users[0] if users else None)
+        target_user = get_active_user(agent)
         
         if not target_user:
             return SetTimezoneResponse(success=False, message="No user found")
@@ -1260,17 +1358,45 @@ def _save_api_key_to_env_file(key_name: str, api_key: str):
     print(f"API key {key_name} saved to {env_file_path}")
 
 # Memory endpoints
+#
+# The memory managers are synchronous. Each endpoint loads its items on the memory-read DB pool, so
+# dashboard refreshes never block the event loop (and with it the /send_streaming_message stream),
+# and admits at most `settings.memory_endpoint_max_concurrency` requests at a time.
+_memory_endpoint_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+@asynccontextmanager
+async def _memory_endpoint_slot(endpoint: str):
+    semaphore = _memory_endpoint_semaphores.get(endpoint)
+    if semaphore is None:
+        semaphore = _memory_endpoint_semaphores[endpoint] = asyncio.Semaphore(settings.memory_endpoint_max_concurrency)
+    try:
+        await asyncio.wait_for(semaphore.acquire(), timeout=settings.memory_endpoint_queue_timeout_seconds)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail=f"Too many concurrent /memory/{endpoint} requests, please retry")
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+
+async def _read_memory(endpoint: str, load_fn):
+    """Run the blocking `load_fn` for a /memory/* endpoint off the event loop, within the endpoint's concurrency limit."""
+    if agent is None:
+        raise HTTPException(status_code=500, detail="Agent not initialized")
+
+    async with _memory_endpoint_slot(endpoint):
+        return await run_in_db_pool(MEMORY_READ_POOL, load_fn)
+
 @app.get("/memory/episodic")
 async def get_episodic_memory(user_id: Optional[str] = None):
     """Get episodic memory (past events)"""
-    if agent is None:
-        raise HTTPException(status_code=500, detail="Agent not initialized")
-    
+    return await _read_memory("episodic", _load_episodic_memory)
+
+def _load_episodic_memory():
     try:
         # Find the current active user
-        users = agent.client.server.user_manager.list_users()
-        active_user = next((user for user in users if user.status == 'active'), None)
-        target_user = active_user if active_user else (users[0] if users else None)
+        target_user = get_active_user(agent)
         
         # Access the episodic memory manager through the client
         client = agent.client
@@ -1305,14 +1431,12 @@ async def get_episodic_memory(user_id: Optional[str] = None):
 @app.get("/memory/semantic")
 async def get_semantic_memory(user_id: Optional[str] = None):
     """Get semantic memory (knowledge)"""
-    if agent is None:
-        raise HTTPException(status_code=500, detail="Agent not initialized")
-    
+    return await _read_memory("semantic", _load_semantic_memory)
+
+def _load_semantic_memory():
     try:
         # Find the current active user
-        users = agent.client.server.user_manager.list_users()
-        active_user = next((user for user in users if user.status == 'active'), None)
-        target_user = active_user if active_user else (users[0] if users else None)
+        target_user = get_active_user(agent)
             
         client = agent.client
         semantic_items_list = []
@@ -1347,14 +1471,12 @@ async def get_semantic_memory(user_id: Optional[str] = None):
 @app.get("/memory/procedural")
 async def get_procedural_memory(user_id: Optional[str] = None):
     """Get procedural memory (skills and procedures)"""
-    if agent is None:
-        raise HTTPException(status_code=500, detail="Agent not initialized")
-    
+    return await _read_memory("procedural", _load_procedural_memory)
+
+def _load_procedural_memory():
     try:
         # Find the current active user
-        users = agent.client.server.user_manager.list_users()
-        active_user = next((user for user in users if user.status == 'active'), None)
-        target_user = active_user if active_user else (users[0] if users else None)
+        target_user = get_active_user(agent)
             
         client = agent.client
         procedural_items_list = []
@@ -1405,14 +1527,12 @@ async def get_procedural_memory(user_id: Optional[str] = None):
 @app.get("/memory/resources")
 async def get_resource_memory(user_id: Optional[str] = None):
     """Get resource memory (docs and files)"""
-    if agent is None:
-        raise HTTPException(status_code=500, detail="Agent not initialized")
-    
+    return await _read_memory("resources", _load_resource_memory)
+
+def _load_resource_memory():
     try:
         # Find the current active user
-        users = agent.client.server.user_manager.list_users()
-        active_user = next((user for user in users if user.status == 'active'), None)
-        target_user = active_user if active_user else (users[0] if users else None)
+        target_user = get_active_user(agent)
         
         client = agent.client
         resource_manager = client.server.resource_memory_manager
@@ -1446,9 +1566,9 @@ async def get_resource_memory(user_id: Optional[str] = None):
 @app.get("/memory/core")
 async def get_core_memory():
     """Get core memory (understanding of user)"""
-    if agent is None:
-        raise HTTPException(status_code=500, detail="Agent not initialized")
-    
+    return await _read_memory("core", _load_core_memory)
+
+def _load_core_memory():
     try:
         # Get core memory from the main agent
         core_memory = agent.client.get_in_context_memory(agent.agent_states.agent_state.id)
@@ -1482,9 +1602,9 @@ async def get_core_memory():
 @app.get("/memory/credentials")
 async def get_credentials_memory():
     """Get credentials memory (knowledge vault with masked content)"""
-    if agent is None:
-        raise HTTPException(status_code=500, detail="Agent not initialized")
-    
+    return await _read_memory("credentials", _load_credentials_memory)
+
+def _load_credentials_memory():
     try:
         client = agent.client
         knowledge_vault_manager = client.server.knowledge_vault_manager
@@ -1514,44 +1634,91 @@ async def get_credentials_memory():
         print(f"Error retrieving credentials memory: {str(e)}")
         return []
 
+@app.get("/memory/list/{memory_type}", response_model=MemoryPageResponse)
+async def list_memory_page(
+    memory_type: str,
+    user_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = MEMORY_LIST_DEFAULT_LIMIT,
+    fields: Optional[str] = None,
+    tree_path_prefix: Optional[List[str]] = Query(None),
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+):
+    """
+    Page through a user's memories (episodic, semantic, procedural, resource or knowledge_vault), newest first.
+    Pass the returned `next_cursor` back as `cursor` to get the next page. `fields` is a comma-separated
+    projection (embeddings are never returned), and `tree_path_prefix` is repeated once per path segment.
+    """
+    field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    # Same masking as /memory/credentials; sensitivity is needed to decide what to mask
+    mask_secrets = memory_type == "knowledge_vault" and (field_list is None or "secret_value" in field_list)
+    if mask_secrets and field_list is not None and "sensitivity" not in field_list:
+        field_list.append("sensitivity")
+
+    def load_page():
+        items, next_cursor = agent.client.server.memory_listing_manager.list_memories(
+            memory_type=memory_type,
+            actor=get_user_or_default(agent, user_id),
+            fields=field_list,
+            cursor=cursor,
+            limit=limit,
+            tree_path_prefix=tree_path_prefix,
+            start_time=start_time,
+            end_time=end_time,
+        )
+        if mask_secrets:
+            for item in items:
+                if item.get("sensitivity") == "high":
+                    item["secret_value"] = "••••••••••••"
+        return MemoryPageResponse(items=items, next_cursor=next_cursor)
+
+    try:
+        return await _read_memory("list", load_page)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/conversation/clear", response_model=ClearConversationResponse)
 async def clear_conversation_history():
     """Permanently clear all conversation history for the current agent (memories are preserved)"""
+    if agent is None:
+        raise HTTPException(status_code=400, detail="Agent not initialized")
+
     try:
-        if agent is None:
-            raise HTTPException(status_code=400, detail="Agent not initialized")
-        
         # Find the current active user
-        users = agent.client.server.user_manager.list_users()
-        active_user = next((user for user in users if user.status == 'active'), None)
-        target_user = active_user if active_user else (users[0] if users else None)
-        
-        # Get current message count for this specific actor for reporting
-        current_messages = agent.client.server.agent_manager.get_in_context_messages(
-            agent_id=agent.agent_states.agent_state.id,
-            actor=target_user
-        )
-        # Count messages belonging to this actor (excluding system messages)
-        actor_messages_count = len([msg for msg in current_messages if msg.role != 'system' and msg.user_id == target_user.id])
-        
-        # Clear conversation history using the agent manager reset_messages method
-        agent.client.server.agent_manager.reset_messages(
-            agent_id=agent.agent_states.agent_state.id,
-            actor=target_user,
-            add_default_initial_messages=True  # Keep system message and initial setup
-        )
-        
-        return ClearConversationResponse(
-            success=True,
-            message=f"Successfully cleared conversation history for {target_user.name}. Messages from other users and system messages preserved.",
-            messages_deleted=actor_messages_count
-        )
+        target_user = await run_in_db_executor(get_active_user, agent)
+        return await run_in_db_executor(_clear_conversation, target_user)
         
     except Exception as e:
         print(f"Error clearing conversation history: {str(e)}")
         print(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Error clearing conversation: {str(e)}")
 
+def _clear_conversation(target_user, check_cancelled=None) -> ClearConversationResponse:
+    # Get current message count for this specific actor for reporting
+    current_messages = agent.client.server.agent_manager.get_in_context_messages(
+        agent_id=agent.agent_states.agent_state.id,
+        actor=target_user
+    )
+    # Count messages belonging to this actor (excluding system messages)
+    actor_messages_count = len([msg for msg in current_messages if msg.role != 'system' and msg.user_id == target_user.id])
+    # Last point at which a clear_conversation job can still be cancelled
+    if check_cancelled is not None:
+        check_cancelled()
+    
+    # Clear conversation history using the agent manager reset_messages method
+    agent.client.server.agent_manager.reset_messages(
+        agent_id=agent.agent_states.agent_state.id,
+        actor=target_user,
+        add_default_initial_messages=True  # Keep system message and initial setup
+    )
+    
+    return ClearConversationResponse(
+        success=True,
+        message=f"Successfully cleared conversation history for {target_user.name}. Messages from other users and system messages preserved.",
+        messages_deleted=actor_messages_count
+    )
+
 @app.post("/export/memories", response_model=ExportMemoriesResponse)
 async def export_memories(request: ExportMemoriesRequest):
     """Export memories to Excel file with separate sheets for each memory type"""
@@ -1560,9 +1727,7 @@ async def export_memories(request: ExportMemoriesRequest):
     
     try:
         # Find the current active user
-        users = agent.client.server.user_manager.list_users()
-        active_user = next((user for user in users if user.status == 'active'), None)
-        target_user = active_user if active_user else (users[0] if users else None)
+        target_user = get_active_user(agent)
         result = agent.export_memories_to_excel(
             actor=target_user,
             file_path=request.file_path,
@@ -1586,23 +1751,116 @@ async def export_memories(request: ExportMemoriesRequest):
         print(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Failed to export memories: {str(e)}")
 
+@app.get("/export/memories/stream")
+async def stream_memory_export(
+    format: str = "jsonl",
+    memory_types: Optional[List[str]] = Query(None),
+    include_embeddings: bool = False,
+    user_id: Optional[str] = None,
+):
+    """
+    Download a user's memories as a CSV, JSONL or Parquet file streamed straight from the database.
+    `memory_types` is repeated once per type (default: all types). The export runs in bounded memory:
+    rows are read and sent in batches, and each batch is fetched on the memory-read DB pool.
+    """
+    if agent is None:
+        raise HTTPException(status_code=500, detail="Agent not initialized")
+
+    # The slot is held until the download finishes or the client goes away
+    stack = AsyncExitStack()
+    await stack.enter_async_context(_memory_endpoint_slot("export"))
+    try:
+        target_user = await run_in_db_pool(MEMORY_READ_POOL, get_user_or_default, agent, user_id)
+        chunks = agent.client.server.memory_export_manager.stream_export(
+            actor=target_user,
+            format=format,
+            memory_types=memory_types,
+            include_embeddings=include_embeddings,
+        )
+    except (ValueError, ImportError) as e:
+        await stack.aclose()
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        await stack.aclose()
+        raise
+
+    async def body():
+        try:
+            while True:
+                chunk = await run_in_db_pool(MEMORY_READ_POOL, next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            await run_in_db_pool(MEMORY_READ_POOL, chunks.close)
+            await stack.aclose()
+
+    media_type, extension = EXPORT_MEDIA_TYPES[format]
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="mirix_memories_{target_user.id}.{extension}"'},
+    )
+
+@app.post("/import/memories", response_model=ImportMemoriesResponse)
+async def import_memories(request: ImportMemoriesRequest):
+    """
+    Bulk-import a JSONL or Parquet memory export (as written by /export/memories/stream) from a file on the server.
+    Missing embeddings are computed with the memory agents' embedding model. Pass `checkpoint_path` to make a
+    large import resumable: rerunning the same request continues after the last committed batch.
+    """
+    if agent is None:
+        raise HTTPException(status_code=500, detail="Agent not initialized")
+
+    admission = admit_request(ADMIN_WORKLOAD)
+    try:
+        # Like /reflexion, a long import runs on the admin pool rather than the agent step pool
+        return await admission.run(lambda: _import_memories(get_user_or_default(agent, request.user_id), request))
+    except (ValueError, ImportError, FileNotFoundError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Error importing memories: {str(e)}")
+        print(f"Traceback: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"Failed to import memories: {str(e)}")
+
+def _import_memories(target_user, request: ImportMemoriesRequest, progress_callback=None) -> ImportMemoriesResponse:
+    embedding_config = agent.agent_states.episodic_memory_agent_state.embedding_config if request.build_embeddings else None
+    progress = agent.client.server.memory_import_manager.import_from_file(
+        actor=target_user,
+        file_path=request.file_path,
+        format=request.format,
+        embedding_config=embedding_config,
+        preserve_ids=request.preserve_ids,
+        checkpoint_path=request.checkpoint_path,
+        progress_callback=progress_callback,
+    )
+
+    total_imported = sum(progress["imported"].values())
+    return ImportMemoriesResponse(
+        success=True,
+        message=f"Imported {total_imported} memories from {request.file_path}",
+        imported_counts=progress["imported"],
+        total_imported=total_imported,
+        records_read=progress["records_read"],
+        skipped=progress["skipped"],
+        failed=progress["failed"],
+        embedded=progress["embedded"],
+        errors=progress["errors"],
+    )
+
 @app.post("/reflexion", response_model=ReflexionResponse)
 async def trigger_reflexion(request: ReflexionRequest):
     """Trigger reflexion agent to reorganize memory - runs in separate thread to not block other requests"""
     if agent is None:
         raise HTTPException(status_code=500, detail="Agent not initialized")
     
+    admission = admit_request(ADMIN_WORKLOAD)
     try:
         print("Starting reflexion process...")
         start_time = datetime.now()
         
-        # Run reflexion in a separate thread to avoid blocking other requests
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None,  # Use default ThreadPoolExecutor
-            _run_reflexion_process,
-            agent
-        )
+        # Run reflexion on the admin pool to avoid blocking other requests
+        result = await admission.run(_run_reflexion_process, agent)
         
         end_time = datetime.now()
         processing_time = (end_time - start_time).total_seconds()
@@ -1620,6 +1878,139 @@ async def trigger_reflexion(request: ReflexionRequest):
         print(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Reflexion process failed: {str(e)}")
 
+# Background jobs: long maintenance work runs on the server's job runner and is polled via /jobs/{job_id}
+def _reflexion_job(context, target_user, params):
+    # Reflexion runs nine agent calls; a cancelled job stops before the next one
+    agent.reflexion_on_memory(
+        user_id=target_user.id,
+        progress_callback=lambda progress: context.report_progress(progress, force=True),
+    )
+    return {
+        'success': True,
+        'message': 'Memory reorganization completed successfully. Reflexion agent has optimized memory structure and connections.'
+    }
+
+def _export_memories_job(context, target_user, params: ExportMemoriesRequest):
+    export_format = params.format or Path(params.file_path).suffix.lstrip(".").lower()
+    if export_format in ("xlsx", "excel"):
+        result = agent.export_memories_to_excel(
+            actor=target_user,
+            file_path=params.file_path,
+            memory_types=params.memory_types,
+            include_embeddings=params.include_embeddings
+        )
+        if not result['success']:
+            raise RuntimeError(result['message'])
+        exported_counts = result['exported_counts']
+    else:
+        exported_counts = agent.client.server.memory_export_manager.export_to_file(
+            actor=target_user,
+            file_path=params.file_path,
+            format=export_format,
+            memory_types=params.memory_types,
+            include_embeddings=params.include_embeddings,
+            progress_callback=lambda counts: context.report_progress({"exported_counts": counts}),
+        )
+    total_exported = sum(exported_counts.values())
+    return {
+        "message": result['message'] if export_format in ("xlsx", "excel") else f"Exported {total_exported} memories to {params.file_path}",
+        "exported_counts": exported_counts,
+        "total_exported": total_exported,
+        "file_path": params.file_path,
+    }
+
+def _import_memories_job(context, target_user, params: ImportMemoriesRequest):
+    return _import_memories(target_user, params, progress_callback=context.report_progress).model_dump()
+
+def _clear_conversation_job(context, target_user, params):
+    return _clear_conversation(target_user, check_cancelled=context.check_cancelled).model_dump()
+
+# job type -> (model validating the job's params, or None if it takes none; handler)
+_JOB_HANDLERS = {
+    "reflexion": (None, _reflexion_job),
+    "export_memories": (ExportMemoriesRequest, _export_memories_job),
+    "import_memories": (ImportMemoriesRequest, _import_memories_job),
+    "clear_conversation": (None, _clear_conversation_job),
+}
+
+@app.post("/jobs", response_model=Job, status_code=202)
+async def submit_job(request: SubmitJobRequest):
+    """
+    Queue a background job (reflexion, export_memories, import_memories or clear_conversation) and return it
+    right away. `params` takes the fields of the matching synchronous endpoint's request. Poll GET /jobs/{job_id}
+    for its status, progress and result.
+    """
+    if agent is None:
+        raise HTTPException(status_code=500, detail="Agent not initialized")
+    if request.job_type not in _JOB_HANDLERS:
+        raise HTTPException(status_code=400, detail=f"Unknown job type '{request.job_type}', expected one of {', '.join(_JOB_HANDLERS)}")
+
+    params_model, handler = _JOB_HANDLERS[request.job_type]
+    try:
+        params = params_model(**request.params) if params_model is not None else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def submit():
+        target_user = get_user_or_default(agent, request.user_id)
+        return agent.client.server.job_runner.submit(
+            job_type=request.job_type,
+            fn=lambda context: handler(context, target_user, params),
+            actor=target_user,
+            params=request.params,
+        )
+
+    try:
+        return await run_in_db_executor(submit)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+
+@app.get("/jobs", response_model=List[Job])
+async def list_jobs(
+    user_id: Optional[str] = None,
+    status: Optional[JobStatus] = None,
+    job_type: Optional[str] = None,
+    limit: int = 50,
+):
+    """List a user's jobs, most recently submitted first"""
+    if agent is None:
+        raise HTTPException(status_code=500, detail="Agent not initialized")
+
+    def load_jobs():
+        return agent.client.server.job_manager.list_jobs(
+            actor=get_user_or_default(agent, user_id), status=status, job_type=job_type, limit=limit
+        )
+
+    return await run_in_db_pool(MEMORY_READ_POOL, load_jobs)
+
+@app.get("/jobs/{job_id}", response_model=Job)
+async def get_job(job_id: str, user_id: Optional[str] = None):
+    """Poll a job's status, progress and result"""
+    if agent is None:
+        raise HTTPException(status_code=500, detail="Agent not initialized")
+
+    def load_job():
+        return agent.client.server.job_manager.get_job(job_id, actor=get_user_or_default(agent, user_id))
+
+    try:
+        return await run_in_db_pool(MEMORY_READ_POOL, load_job)
+    except NoResultFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.post("/jobs/{job_id}/cancel", response_model=Job)
+async def cancel_job(job_id: str, user_id: Optional[str] = None):
+    """Cancel a job. A running job stops at its next progress report; jobs that report none run to completion."""
+    if agent is None:
+        raise HTTPException(status_code=500, detail="Agent not initialized")
+
+    def cancel():
+        return agent.client.server.job_runner.cancel(job_id, actor=get_user_or_default(agent, user_id))
+
+    try:
+        return await run_in_db_executor(cancel)
+    except NoResultFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
 # MCP Marketplace endpoints
 @app.get("/mcp/marketplace")
 async def get_marketplace():
@@ -1856,7 +2247,7 @@ async def disconnect_mcp_server(request: dict):
         }
     
 
-def _run_reflexion_process(agent):
+def _run_reflexion_process(agent, user_id=None):
     """
     Run the reflexion process - this is the blocking function that runs in a separate thread.
     This function can be replaced with the actual reflexion agent logic.
@@ -1865,7 +2256,7 @@ def _run_reflexion_process(agent):
         # TODO: Replace this with actual reflexion agent logic
         # For now, this is a placeholder that simulates reflexion work
         
-        agent.reflexion_on_memory()
+        agent.reflexion_on_memory(user_id=user_id)
         return {
             'success': True,
             'message': 'Memory reorganization completed successfully. Reflexion agent has optimized memory structure and connections.'
@@ -58,6 +58,7 @@ from mirix.schemas.usage import MirixUsageStatistics
 from mirix.schemas.user import User
 from mirix.services.agent_manager import AgentManager
 from mirix.services.block_manager import BlockManager
+from mirix.services.db_executor import run_in_db_executor
 from mirix.services.message_manager import MessageManager
 from mirix.services.organization_manager import OrganizationManager
 from mirix.services.knowledge_vault_manager import KnowledgeVaultManager
@@ -65,7 +66,13 @@ from mirix.services.episodic_memory_manager import EpisodicMemoryManager
 from mirix.services.procedural_memory_manager import ProceduralMemoryManager
 from mirix.services.resource_memory_manager import ResourceMemoryManager
 from mirix.services.semantic_memory_manager import SemanticMemoryManager
+from mirix.services.job_manager import JobManager
+from mirix.services.job_runner import JobRunner
+from mirix.services.memory_export_manager import MemoryExportManager
+from mirix.services.memory_import_manager import MemoryImportManager
+from mirix.services.memory_listing_manager import MemoryListingManager
 from mirix.services.per_agent_lock_manager import PerAgentLockManager
+from mirix.services.loaded_agent_cache import LoadedAgentCache
 from mirix.services.cloud_file_mapping_manager import CloudFileMappingManager
 from mirix.services.sandbox_config_manager import SandboxConfigManager
 from mirix.services.provider_manager import ProviderManager
@@ -404,6 +411,13 @@ class SyncServer(Server):
         self.procedural_memory_manager = ProceduralMemoryManager()
         self.resource_memory_manager = ResourceMemoryManager()
         self.semantic_memory_manager = SemanticMemoryManager()
+        self.memory_listing_manager = MemoryListingManager()
+        self.memory_export_manager = MemoryExportManager()
+        self.memory_import_manager = MemoryImportManager()
+
+        # Background jobs
+        self.job_manager = JobManager()
+        self.job_runner = JobRunner(self.job_manager)
 
         # API Key Manager
         self.provider_manager = ProviderManager()
@@ -413,6 +427,7 @@ class SyncServer(Server):
 
         # Managers that interface with parallelism
         self.per_agent_lock_manager = PerAgentLockManager()
+        self.loaded_agent_cache = LoadedAgentCache(max_size=settings.loaded_agent_cache_size)
 
         # Make default user and org
         if init_with_default_org_and_user:
@@ -517,11 +532,19 @@ class SyncServer(Server):
 
     def load_agent(self, agent_id: str, actor: User, interface: Union[AgentInterface, None] = None) -> Agent:
         """Updated method to load agents from persisted storage"""
+        interface = interface or self.default_interface_factory()
+
+        # Reuse the agent constructed for an earlier step unless its configuration changed since.
+        # The version is read before the state, so a concurrent update can only make the entry stale.
+        state_version = self.agent_manager.get_state_version(agent_id)
+        agent = self.loaded_agent_cache.checkout(agent_id, actor.id, state_version)
+        if agent is not None and agent.prepare_for_reuse(interface=interface, user=actor):
+            return agent
+
         agent_lock = self.per_agent_lock_manager.get_lock(agent_id)
         with agent_lock:
             agent_state = self.agent_manager.get_agent_by_id(agent_id=agent_id, actor=actor)
 
-            interface = interface or self.default_interface_factory()
             if agent_state.agent_type == AgentType.chat_agent:
                 agent = Agent(agent_state=agent_state, interface=interface, user=actor)
             elif agent_state.agent_type == AgentType.episodic_memory_agent:
@@ -545,8 +568,20 @@ class SyncServer(Server):
             else:
                 raise ValueError(f"Invalid agent type {agent_state.agent_type}")
 
+            agent._state_version = state_version
             return agent
 
+    def release_agent(self, agent: Agent, actor: User):
+        """Hand an agent whose step completed back to the loaded-agent cache for the next step."""
+        self.loaded_agent_cache.checkin(agent.agent_state.id, actor.id, agent._state_version, agent)
+
+    @contextmanager
+    def loaded_agent(self, agent_id: str, actor: User, interface: Union[AgentInterface, None] = None):
+        """Load an agent for one use and hand it back to the loaded-agent cache afterwards, unless the use failed."""
+        agent = self.load_agent(agent_id=agent_id, actor=actor, interface=interface)
+        yield agent
+        self.release_agent(agent, actor=actor)
+
     def _step(
         self,
         actor: User,
@@ -563,6 +598,7 @@ class SyncServer(Server):
         message_queue: Optional[any] = None,
         retrieved_memories: Optional[dict] = None,
         user_id: Optional[str] = None,
+        token_callback: Optional[Callable[[str], None]] = None,
     ) -> MirixUsageStatistics:
         """Send the input message through the agent"""
         logger.debug(f"Got input messages: {input_messages}")
@@ -599,7 +635,8 @@ class SyncServer(Server):
                 put_inner_thoughts_first=put_inner_thoughts_first,
                 extra_messages=extra_messages,
                 message_queue=message_queue,
-                user_id=user_id
+                user_id=user_id,
+                token_callback=token_callback,
             )
 
         except Exception as e:
@@ -611,6 +648,63 @@ class SyncServer(Server):
             if mirix_agent:
                 mirix_agent.interface.step_yield()
 
+        self.release_agent(mirix_agent, actor=actor)
+        return usage_stats
+
+    async def _step_async(
+        self,
+        actor: User,
+        agent_id: str,
+        input_messages: Union[Message, List[Message]],
+        interface: Union[AgentInterface, None] = None,
+        put_inner_thoughts_first: bool = True,
+        existing_file_uris: Optional[List[str]] = None,
+        force_response: bool = False,
+        display_intermediate_message: any = None,
+        request_user_confirmation: any = None,
+        chaining: Optional[bool] = None,
+        extra_messages: Optional[List[dict]] = None,
+        message_queue: Optional[any] = None,
+        retrieved_memories: Optional[dict] = None,
+        user_id: Optional[str] = None,
+        token_callback: Optional[Callable[[str], None]] = None,
+    ) -> MirixUsageStatistics:
+        """Async counterpart of `_step`, driving the agent through `Agent.step_async`"""
+        logger.debug(f"Got input messages: {input_messages}")
+        mirix_agent = None
+        try:
+            mirix_agent = await run_in_db_executor(self.load_agent, agent_id=agent_id, interface=interface, actor=actor)
+
+            if mirix_agent is None:
+                raise KeyError(f"Agent (user={actor.id}, agent={agent_id}) is not loaded")
+
+            # Use provided chaining value or fall back to server default
+            effective_chaining = chaining if chaining is not None else self.chaining
+
+            usage_stats = await mirix_agent.step_async(
+                input_messages=input_messages,
+                chaining=effective_chaining,
+                max_chaining_steps=self.max_chaining_steps,
+                force_response=force_response,
+                existing_file_uris=existing_file_uris,
+                display_intermediate_message=display_intermediate_message,
+                request_user_confirmation=request_user_confirmation,
+                put_inner_thoughts_first=put_inner_thoughts_first,
+                extra_messages=extra_messages,
+                message_queue=message_queue,
+                user_id=user_id,
+                token_callback=token_callback,
+            )
+
+        except Exception as e:
+            logger.error(f"Error in server._step_async: {e}")
+            print(traceback.print_exc())
+            raise
+        finally:
+            if mirix_agent:
+                mirix_agent.interface.step_yield()
+
+        self.release_agent(mirix_agent, actor=actor)
         return usage_stats
 
     def _command(self, user_id: str, agent_id: str, command: str) -> MirixUsageStatistics:
@@ -620,8 +714,10 @@ class SyncServer(Server):
 
         logger.debug(f"Got command: {command}")
 
-        # Get the agent object (loaded in memory)
+        # Get the agent object (loaded in memory). Commands that edit its in-memory messages do not persist
+        # those edits, so the agent is only handed back to the loaded-agent cache after read-only commands.
         mirix_agent = self.load_agent(agent_id=agent_id, actor=actor)
+        reusable = command.lower().split(" ")[0] not in ("pop", "retry", "rethink", "rewrite")
         usage = None
 
         if command.lower() == "exit":
@@ -645,6 +741,7 @@ class SyncServer(Server):
 
         elif command.lower() == "memory":
             ret_str = f"\nDumping memory contents:\n" + f"\n{str(mirix_agent.agent_state.memory)}"
+            self.release_agent(mirix_agent, actor=actor)
             return ret_str
 
         elif command.lower() == "pop" or command.lower().startswith("pop "):
@@ -713,6 +810,8 @@ class SyncServer(Server):
         if not usage:
             usage = MirixUsageStatistics()
 
+        if reusable:
+            self.release_agent(mirix_agent, actor=actor)
         return usage
 
     def user_message(
@@ -848,6 +947,7 @@ class SyncServer(Server):
         message_queue: Optional[any] = None,
         retrieved_memories: Optional[dict] = None,
         user_id: Optional[str] = None,
+        token_callback: Optional[Callable[[str], None]] = None,  # receives reply text as it is generated
     ) -> MirixUsageStatistics:
         """Send a list of messages to the agent."""
 
@@ -870,7 +970,50 @@ class SyncServer(Server):
             extra_messages=extra_messages,
             message_queue=message_queue,
             retrieved_memories=retrieved_memories,
-            user_id=user_id
+            user_id=user_id,
+            token_callback=token_callback,
+        )
+
+    async def send_messages_async(
+        self,
+        actor: User,
+        agent_id: str,
+        input_messages: List[MessageCreate],
+        interface: Union[AgentInterface, None] = None,
+        metadata: Optional[dict] = None,
+        put_inner_thoughts_first: bool = True,
+        display_intermediate_message: callable = None,
+        request_user_confirmation: callable = None,
+        force_response: bool = False,
+        chaining: Optional[bool] = True,
+        existing_file_uris: Optional[List[str]] = None,
+        extra_messages: Optional[List[dict]] = None,
+        message_queue: Optional[any] = None,
+        retrieved_memories: Optional[dict] = None,
+        user_id: Optional[str] = None,
+        token_callback: Optional[Callable[[str], None]] = None,
+    ) -> MirixUsageStatistics:
+        """Send a list of messages to the agent without blocking the event loop."""
+
+        if metadata and hasattr(interface, "metadata"):
+            interface.metadata = metadata
+
+        return await self._step_async(
+            actor=actor,
+            agent_id=agent_id,
+            input_messages=input_messages,
+            interface=interface,
+            force_response=force_response,
+            put_inner_thoughts_first=put_inner_thoughts_first,
+            display_intermediate_message=display_intermediate_message,
+            request_user_confirmation=request_user_confirmation,
+            chaining=chaining,
+            existing_file_uris=existing_file_uris,
+            extra_messages=extra_messages,
+            message_queue=message_queue,
+            retrieved_memories=retrieved_memories,
+            user_id=user_id,
+            token_callback=token_callback,
         )
 
     # @LockingServer.agent_lock_decorator
@@ -1094,8 +1237,8 @@ class SyncServer(Server):
         """Add a new embedding model"""
 
     def get_agent_context_window(self, agent_id: str, actor: User) -> ContextWindowOverview:
-        mirix_agent = self.load_agent(agent_id=agent_id, actor=actor)
-        return mirix_agent.get_context_window()
+        with self.loaded_agent(agent_id=agent_id, actor=actor) as mirix_agent:
+            return mirix_agent.get_context_window()
 
     def run_tool_from_source(
         self,
@@ -1202,19 +1345,19 @@ class SyncServer(Server):
 
             # Get the generator object off of the agent's streaming interface
             # This will be attached to the POST SSE request used under-the-hood
-            mirix_agent = self.load_agent(agent_id=agent_id, actor=actor)
+            with self.loaded_agent(agent_id=agent_id, actor=actor) as mirix_agent:
+                llm_config = mirix_agent.agent_state.llm_config
 
             # Disable token streaming if not OpenAI
             # TODO: cleanup this logic
-            llm_config = mirix_agent.agent_state.llm_config
             if stream_tokens and (llm_config.model_endpoint_type != "openai" or "inference.memgpt.ai" in llm_config.model_endpoint):
                 warnings.warn(
                     "Token streaming is only supported for models with type 'openai' or `inference.memgpt.ai` in the model_endpoint: agent has endpoint type {llm_config.model_endpoint_type} and {llm_config.model_endpoint}. Setting stream_tokens to False."
                 )
                 stream_tokens = False
 
-            # Create a new interface per request
-            mirix_agent.interface = StreamingServerInterface(
+            # Create a new interface per request (send_messages hands it to the agent it loads)
+            streaming_interface = StreamingServerInterface(
                 # multi_step=True,  # would we ever want to disable this?
                 use_assistant_message=use_assistant_message,
                 assistant_message_tool_name=assistant_message_tool_name,
@@ -1224,9 +1367,6 @@ class SyncServer(Server):
                 ),
                 # inner_thoughts_kwarg=INNER_THOUGHTS_KWARG,
             )
-            streaming_interface = mirix_agent.interface
-            if not isinstance(streaming_interface, StreamingServerInterface):
-                raise ValueError(f"Agent has wrong type of interface: {type(streaming_interface)}")
 
             # Enable token-streaming within the request if desired
             streaming_interface.streaming_mode = stream_tokens
@@ -0,0 +1,44 @@
+import asyncio
+
+
+class StreamChannel:
+    """
+    Carries the events of a streamed request from the worker thread running the agent to the response
+    generator on the event loop.
+
+    `put` can be called from any thread: off the loop it hands the event over with
+    `loop.call_soon_threadsafe`, which also wakes the loop, so `get` returns as soon as an event
+    arrives instead of polling. Events put from one thread are received in order.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop = None):
+        self._loop = loop or asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._closed = False
+
+    def put(self, event):
+        """Send `event` to the receiving side; dropped once the channel is closed."""
+        if self._closed:
+            return
+        if self._on_loop():
+            self._queue.put_nowait(event)
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
+        except RuntimeError:
+            # The loop is gone (server shutting down); nobody is left to receive
+            self._closed = True
+
+    async def get(self):
+        """Wait for the next event."""
+        return await self._queue.get()
+
+    def close(self):
+        """Stop accepting events, e.g. once the client has gone away."""
+        self._closed = True
+
+    def _on_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
@@ -1,3 +1,6 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
 from datetime import datetime
 from typing import Dict, List, Optional
 
@@ -44,6 +47,42 @@ from mirix.utils import enforce_types, get_utc_time, united_diff
 
 logger = get_logger(__name__)
 
+# An agent's in-context `message_ids` list is shared by all users talking to it. Every read-modify-write
+# of the list holds the agent's lock, process-wide (managers are instantiated in several places), so
+# concurrent steps of different users cannot drop each other's messages. A lock only exists while
+# someone holds or waits for it: agent id -> [lock, number of holders and waiters].
+_in_context_locks: Dict[str, list] = {}
+_in_context_locks_guard = threading.Lock()
+
+
+@contextmanager
+def _in_context_lock(agent_id: str):
+    with _in_context_locks_guard:
+        entry = _in_context_locks.setdefault(agent_id, [threading.RLock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _in_context_locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _in_context_locks[agent_id]
+
+
+# Bumped (after the commit) whenever an agent's configuration changes - anything but its in-context
+# message list, which agents re-read on every step. Lets the server reuse loaded Agent objects safely.
+_agent_state_versions = defaultdict(int)
+# Fields that do not bump the version: the message list (see above) and the topic, which only the agent
+# itself sets during a step (`Agent.update_topic_if_changed` keeps its loaded state current)
+_UNVERSIONED_FIELDS = {"message_ids", "topic"}
+_agent_state_versions_lock = threading.Lock()
+
+
+def _bump_state_version(agent_id: str):
+    with _agent_state_versions_lock:
+        _agent_state_versions[agent_id] += 1
+
 
 # Agent Manager Class
 class AgentManager:
@@ -371,21 +410,29 @@ class AgentManager:
 
             # Update scalar fields directly
             scalar_fields = {"name", "system", "topic", "llm_config", "embedding_config", "message_ids", "tool_rules", "description", "metadata_", "mcp_tools"}
+            state_changed = False
             for field in scalar_fields:
                 value = getattr(agent_update, field, None)
                 if value is not None:
+                    if field not in _UNVERSIONED_FIELDS and getattr(agent, field) != value:
+                        state_changed = True
                     setattr(agent, field, value)
 
             # Update relationships using _process_relationship and _process_tags
             if agent_update.tool_ids is not None:
+                state_changed = state_changed or {tool.id for tool in agent.tools} != set(agent_update.tool_ids)
                 _process_relationship(session, agent, "tools", ToolModel, agent_update.tool_ids, replace=True)
             if agent_update.block_ids is not None:
+                state_changed = state_changed or {block.id for block in agent.core_memory} != set(agent_update.block_ids)
                 _process_relationship(session, agent, "core_memory", BlockModel, agent_update.block_ids, replace=True)
             if agent_update.tags is not None:
+                state_changed = state_changed or {tag.tag for tag in agent.tags} != set(agent_update.tags)
                 _process_tags(agent, agent_update.tags, replace=True)
 
             # Commit and refresh the agent
             agent.update(session, actor=actor)
+            if state_changed:
+                _bump_state_version(agent_id)
 
             # Convert to PydanticAgentState and return
             return agent.to_pydantic()
@@ -418,6 +465,11 @@ class AgentManager:
 
             return [agent.to_pydantic() for agent in agents]
 
+    def get_state_version(self, agent_id: str) -> int:
+        """The agent's configuration version; it changes whenever anything but the in-context messages is updated."""
+        with _agent_state_versions_lock:
+            return _agent_state_versions[agent_id]
+
     @enforce_types
     def get_agent_by_id(self, agent_id: str, actor: PydanticUser) -> PydanticAgentState:
         """Fetch an agent by its ID."""
@@ -449,6 +501,7 @@ class AgentManager:
             # Retrieve the agent
             agent = AgentModel.read(db_session=session, identifier=agent_id, actor=actor)
             agent.hard_delete(session)
+        _bump_state_version(agent_id)
 
     # ======================================================================================================================
     # Per Agent Environment Variable Management
@@ -539,8 +592,10 @@ class AgentManager:
             openai_message_dict={"role": "system", "content": system_prompt},
         )
         message = self.message_manager.create_message(message, actor=actor)
-        message_ids = [message.id] + agent_state.message_ids[1:]  # swap index 0 (system)
-        return self.set_in_context_messages(agent_id=agent_id, message_ids=message_ids, actor=actor)
+        with _in_context_lock(agent_id):
+            message_ids = self.get_agent_by_id(agent_id=agent_id, actor=actor).message_ids
+            message_ids = [message.id] + message_ids[1:]  # swap index 0 (system)
+            return self.set_in_context_messages(agent_id=agent_id, message_ids=message_ids, actor=actor)
 
     @enforce_types
     def update_topic(self, agent_id: str, topic: str, actor: PydanticUser) -> PydanticAgentState:
@@ -548,52 +603,75 @@ class AgentManager:
 
     @enforce_types
     def set_in_context_messages(self, agent_id: str, message_ids: List[str], actor: PydanticUser) -> PydanticAgentState:
-        return self.update_agent(agent_id=agent_id, agent_update=UpdateAgent(message_ids=message_ids), actor=actor)
+        with _in_context_lock(agent_id):
+            return self.update_agent(agent_id=agent_id, agent_update=UpdateAgent(message_ids=message_ids), actor=actor)
+
+    @enforce_types
+    def set_actor_in_context_messages(self, agent_id: str, message_ids: List[str], actor: PydanticUser) -> PydanticAgentState:
+        """
+        Replace the actor's in-context messages, keeping the other users' messages in place.
+
+        `message_ids` is the actor's view of the context (as returned by `get_in_context_messages`):
+        the system message followed by the actor's own messages.
+        """
+        with _in_context_lock(agent_id):
+            current_ids = self.get_agent_by_id(agent_id=agent_id, actor=actor).message_ids or []
+            other_user_ids = [
+                message.id
+                for message in self.message_manager.get_messages_by_ids(message_ids=current_ids[1:], actor=actor)
+                if message.user_id != actor.id
+            ]
+            new_message_ids = message_ids[:1] + other_user_ids + message_ids[1:]
+            return self.set_in_context_messages(agent_id=agent_id, message_ids=new_message_ids, actor=actor)
 
     @enforce_types
     def trim_older_in_context_messages(self, num: int, agent_id: str, actor: PydanticUser) -> PydanticAgentState:
-        message_ids = self.get_agent_by_id(agent_id=agent_id, actor=actor).message_ids
-        system_message_id = message_ids[0]
-        message_ids = message_ids[1:]
+        with _in_context_lock(agent_id):
+            message_ids = self.get_agent_by_id(agent_id=agent_id, actor=actor).message_ids
+            system_message_id = message_ids[0]
+            message_ids = message_ids[1:]
 
-        message_id_indices_belonging_to_actor = [idx for idx, message_id in enumerate(message_ids) if self.message_manager.get_message_by_id(message_id=message_id, actor=actor).user_id == actor.id]
-        message_ids_belonging_to_actor = [message_ids[idx] for idx in message_id_indices_belonging_to_actor]
-        message_ids_to_keep = [message_ids[idx] for idx in message_id_indices_belonging_to_actor[num-1:]]
+            message_id_indices_belonging_to_actor = [idx for idx, message_id in enumerate(message_ids) if self.message_manager.get_message_by_id(message_id=message_id, actor=actor).user_id == actor.id]
+            message_ids_belonging_to_actor = [message_ids[idx] for idx in message_id_indices_belonging_to_actor]
+            message_ids_to_keep = [message_ids[idx] for idx in message_id_indices_belonging_to_actor[num-1:]]
 
-        message_ids_belonging_to_actor = set(message_ids_belonging_to_actor)
-        message_ids_to_keep = set(message_ids_to_keep)
+            message_ids_belonging_to_actor = set(message_ids_belonging_to_actor)
+            message_ids_to_keep = set(message_ids_to_keep)
 
-        # new_messages = [message_ids[0]] + message_ids[num:]  # 0 is system message
-        new_messages = [system_message_id] + [msg_id for msg_id in message_ids if (msg_id not in message_ids_belonging_to_actor or msg_id in message_ids_to_keep)]
-        return self.set_in_context_messages(agent_id=agent_id, message_ids=new_messages, actor=actor)
+            # new_messages = [message_ids[0]] + message_ids[num:]  # 0 is system message
+            new_messages = [system_message_id] + [msg_id for msg_id in message_ids if (msg_id not in message_ids_belonging_to_actor or msg_id in message_ids_to_keep)]
+            return self.set_in_context_messages(agent_id=agent_id, message_ids=new_messages, actor=actor)
 
     @enforce_types
     def trim_all_in_context_messages_except_system(self, agent_id: str, actor: PydanticUser) -> PydanticAgentState:
-        message_ids = self.get_agent_by_id(agent_id=agent_id, actor=actor).message_ids
-        system_message_id = message_ids[0]  # 0 is system message
+        with _in_context_lock(agent_id):
+            message_ids = self.get_agent_by_id(agent_id=agent_id, actor=actor).message_ids
+            system_message_id = message_ids[0]  # 0 is system message
         
-        # Keep system message and only filter out messages belonging to the current actor
-        new_message_ids = [system_message_id]
-        for message_id in message_ids[1:]:  # Skip system message
-            message = self.message_manager.get_message_by_id(message_id=message_id, actor=actor)
-            if message.user_id != actor.id:
-                new_message_ids.append(message_id)
+            # Keep system message and only filter out messages belonging to the current actor
+            new_message_ids = [system_message_id]
+            for message_id in message_ids[1:]:  # Skip system message
+                message = self.message_manager.get_message_by_id(message_id=message_id, actor=actor)
+                if message.user_id != actor.id:
+                    new_message_ids.append(message_id)
         
-        return self.set_in_context_messages(agent_id=agent_id, message_ids=new_message_ids, actor=actor)
+            return self.set_in_context_messages(agent_id=agent_id, message_ids=new_message_ids, actor=actor)
 
     @enforce_types
     def prepend_to_in_context_messages(self, messages: List[PydanticMessage], agent_id: str, actor: PydanticUser) -> PydanticAgentState:
-        message_ids = self.get_agent_by_id(agent_id=agent_id, actor=actor).message_ids
         new_messages = self.message_manager.create_many_messages(messages, actor=actor)
-        message_ids = [message_ids[0]] + [m.id for m in new_messages] + message_ids[1:]
-        return self.set_in_context_messages(agent_id=agent_id, message_ids=message_ids, actor=actor)
+        with _in_context_lock(agent_id):
+            message_ids = self.get_agent_by_id(agent_id=agent_id, actor=actor).message_ids
+            message_ids = [message_ids[0]] + [m.id for m in new_messages] + message_ids[1:]
+            return self.set_in_context_messages(agent_id=agent_id, message_ids=message_ids, actor=actor)
 
     @enforce_types
     def append_to_in_context_messages(self, messages: List[PydanticMessage], agent_id: str, actor: PydanticUser) -> PydanticAgentState:
         messages = self.message_manager.create_many_messages(messages, actor=actor)
-        message_ids = self.get_agent_by_id(agent_id=agent_id, actor=actor).message_ids or []
-        message_ids += [m.id for m in messages]
-        return self.set_in_context_messages(agent_id=agent_id, message_ids=message_ids, actor=actor)
+        with _in_context_lock(agent_id):
+            message_ids = self.get_agent_by_id(agent_id=agent_id, actor=actor).message_ids or []
+            message_ids += [m.id for m in messages]
+            return self.set_in_context_messages(agent_id=agent_id, message_ids=message_ids, actor=actor)
 
     @enforce_types
     def reset_messages(self, agent_id: str, actor: PydanticUser, add_default_initial_messages: bool = False) -> PydanticAgentState:
@@ -611,7 +689,7 @@ class AgentManager:
         Returns:
             PydanticAgentState: The updated agent state with actor's messages removed.
         """
-        with self.session_maker() as session:
+        with _in_context_lock(agent_id), self.session_maker() as session:
             # Retrieve the existing agent (will raise NoResultFound if invalid)
             agent = AgentModel.read(db_session=session, identifier=agent_id, actor=actor)
 
@@ -697,6 +775,7 @@ class AgentManager:
             # Add new block
             agent.core_memory.append(new_block)
             agent.update(session, actor=actor)
+            _bump_state_version(agent_id)
             return agent.to_pydantic()
 
     @enforce_types
@@ -708,6 +787,7 @@ class AgentManager:
 
             agent.core_memory.append(block)
             agent.update(session, actor=actor)
+            _bump_state_version(agent_id)
             return agent.to_pydantic()
 
     @enforce_types
@@ -728,6 +808,7 @@ class AgentManager:
                 raise NoResultFound(f"No block with id '{block_id}' found for agent '{agent_id}' with actor id: '{actor.id}'")
 
             agent.update(session, actor=actor)
+            _bump_state_version(agent_id)
             return agent.to_pydantic()
 
     @enforce_types
@@ -748,6 +829,7 @@ class AgentManager:
                 raise NoResultFound(f"No block with label '{block_label}' found for agent '{agent_id}' with actor id: '{actor.id}'")
 
             agent.update(session, actor=actor)
+            _bump_state_version(agent_id)
             return agent.to_pydantic()
 
     # ======================================================================================================================
@@ -786,6 +868,7 @@ class AgentManager:
 
             # Commit and refresh the agent
             agent.update(session, actor=actor)
+            _bump_state_version(agent_id)
             return agent.to_pydantic()
 
     @enforce_types
@@ -819,6 +902,7 @@ class AgentManager:
 
             # Commit and refresh the agent
             agent.update(session, actor=actor)
+            _bump_state_version(agent_id)
             return agent.to_pydantic()
 
     # ======================================================================================================================
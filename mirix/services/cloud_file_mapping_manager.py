@@ -1,5 +1,6 @@
 import uuid
-from sqlalchemy import Select, func, literal, select, union_all
+from datetime import datetime
+from sqlalchemy import Select, and_, delete, func, literal, or_, select, union_all, update
 from mirix.orm.cloud_file_mapping import CloudFileMapping
 from mirix.schemas.cloud_file_mapping import CloudFileMapping as PydanticCloudFileMapping
 
@@ -91,6 +92,23 @@ class CloudFileMappingManager:
             else:
                 return None
         
+    def get_mapping(self, cloud_file_id=None, local_file_id=None):
+        """
+        Get the full mapping for a cloud file or a local file in a single query.
+        Returns None if no mapping exists.
+        """
+        if cloud_file_id is None and local_file_id is None:
+            raise ValueError("Either cloud_file_id or local_file_id must be provided")
+
+        with self.session_maker() as session:
+            stmt = select(CloudFileMapping).where(CloudFileMapping.is_deleted == False)
+            if cloud_file_id is not None:
+                stmt = stmt.where(CloudFileMapping.cloud_file_id == cloud_file_id)
+            else:
+                stmt = stmt.where(CloudFileMapping.local_file_id == local_file_id)
+            mapping = session.execute(stmt.limit(1)).scalar()
+            return mapping.to_pydantic() if mapping else None
+
     def delete_mapping(self, cloud_file_id=None, local_file_id=None):
         """
         Delete a mapping between a cloud file and a local file.
@@ -152,6 +170,66 @@ class CloudFileMappingManager:
             mapping.update(session)
             return mapping.to_pydantic()
 
+    def _ids_condition(self, cloud_file_ids=None, local_file_ids=None):
+        """
+        Build a WHERE clause matching the live (not soft-deleted) mappings with any of the given cloud/local
+        file ids, or None if both are empty.
+        """
+        conditions = []
+        if cloud_file_ids:
+            conditions.append(CloudFileMapping.cloud_file_id.in_(list(cloud_file_ids)))
+        if local_file_ids:
+            conditions.append(CloudFileMapping.local_file_id.in_(list(local_file_ids)))
+        if not conditions:
+            return None
+        return and_(or_(*conditions), CloudFileMapping.is_deleted == False)
+
+    def set_many_processed(self, cloud_file_ids=None, local_file_ids=None):
+        """
+        Set the "status" as processed for all mappings matching the given ids, in one transaction.
+        Unknown ids are ignored. Returns the number of updated mappings.
+        """
+        condition = self._ids_condition(cloud_file_ids, local_file_ids)
+        if condition is None:
+            return 0
+        with self.session_maker() as session:
+            result = session.execute(
+                update(CloudFileMapping).where(condition).values(status='processed', updated_at=datetime.utcnow())
+            )
+            session.commit()
+            return result.rowcount
+
+    def delete_many_mappings(self, cloud_file_ids=None, local_file_ids=None):
+        """
+        Delete all mappings matching the given ids, in one transaction.
+        Returns the number of deleted mappings.
+        """
+        condition = self._ids_condition(cloud_file_ids, local_file_ids)
+        if condition is None:
+            return 0
+        with self.session_maker() as session:
+            result = session.execute(delete(CloudFileMapping).where(condition))
+            session.commit()
+            return result.rowcount
+
+    def check_many_existing(self, cloud_file_ids=None, local_file_ids=None):
+        """
+        Return the subset of the given cloud/local file ids that already have a live mapping, in one query.
+        """
+        condition = self._ids_condition(cloud_file_ids, local_file_ids)
+        if condition is None:
+            return set()
+        cloud_file_ids, local_file_ids = set(cloud_file_ids or ()), set(local_file_ids or ())
+        with self.session_maker() as session:
+            rows = session.execute(select(CloudFileMapping.cloud_file_id, CloudFileMapping.local_file_id).where(condition))
+            existing = set()
+            for cloud_file_id, local_file_id in rows:
+                if cloud_file_id in cloud_file_ids:
+                    existing.add(cloud_file_id)
+                if local_file_id in local_file_ids:
+                    existing.add(local_file_id)
+            return existing
+
     def list_files_with_status(self, status):
 
         with self.session_maker() as session:
@@ -0,0 +1,80 @@
+"""
+Bounded thread pools for running blocking service-layer (SQLAlchemy) calls from async code.
+
+The managers use synchronous sessions, so async callers hand their DB work to one of these pools
+instead of blocking the event loop. The pool size caps how many threads hold a DB connection at
+once, no matter how many coroutines are waiting.
+
+The "default" pool serves the agent step path. Read-mostly API traffic (e.g. the dashboard's
+memory browsing) runs on its own smaller pool so a burst of it cannot queue ahead of chat work.
+
+Memory agents dispatched by a fan-out (`MessageQueue.send_to_memory_agents`) run their steps on the
+"memory_agent" pool. The fan-out itself may run in a default-pool worker (the meta memory agent's
+`trigger_memory_update` tool call) and waits there for the memory agents; if they needed default-pool
+workers too, enough concurrent fan-outs would hold every worker and wait forever. Memory agents never
+wait on other agents, so the pools cannot deadlock. Async code picks its pool with `use_db_pool`.
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict
+
+from mirix.settings import settings
+
+DEFAULT_POOL = "default"
+MEMORY_READ_POOL = "memory_read"
+MEMORY_AGENT_POOL = "memory_agent"
+
+_POOL_SIZE_SETTINGS = {
+    DEFAULT_POOL: "db_executor_max_workers",
+    MEMORY_READ_POOL: "memory_read_executor_max_workers",
+    MEMORY_AGENT_POOL: "memory_agent_executor_max_workers",
+}
+
+# The pool `run_in_db_executor` uses in the current task (inherited by the tasks it starts)
+_current_pool: contextvars.ContextVar[str] = contextvars.ContextVar("db_executor_pool", default=DEFAULT_POOL)
+
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executor_lock = threading.Lock()
+
+
+def get_db_executor(pool: str = DEFAULT_POOL) -> ThreadPoolExecutor:
+    """The process-wide DB executor for `pool`, created on first use."""
+    if pool not in _POOL_SIZE_SETTINGS:
+        raise ValueError(f"Unknown DB executor pool '{pool}'")
+    with _executor_lock:
+        executor = _executors.get(pool)
+        if executor is None:
+            executor = _executors[pool] = ThreadPoolExecutor(
+                max_workers=getattr(settings, _POOL_SIZE_SETTINGS[pool]),
+                thread_name_prefix=f"mirix_db_{pool}",
+            )
+        return executor
+
+
+@contextmanager
+def use_db_pool(pool: str):
+    """Make `run_in_db_executor` use the DB executor for `pool` in the enclosed code and the tasks it starts."""
+    if pool not in _POOL_SIZE_SETTINGS:
+        raise ValueError(f"Unknown DB executor pool '{pool}'")
+    token = _current_pool.set(pool)
+    try:
+        yield
+    finally:
+        _current_pool.reset(token)
+
+
+async def run_in_db_executor(func, *args, **kwargs):
+    """Run `func(*args, **kwargs)` on the current task's DB executor (see `use_db_pool`), preserving the caller's context variables."""
+    return await run_in_db_pool(_current_pool.get(), func, *args, **kwargs)
+
+
+async def run_in_db_pool(pool: str, func, *args, **kwargs):
+    """Run `func(*args, **kwargs)` on the DB executor for `pool`, preserving the caller's context variables."""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_db_executor(pool), functools.partial(context.run, func, *args, **kwargs))
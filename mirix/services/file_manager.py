@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 import os
 from datetime import datetime
 
@@ -30,6 +30,18 @@ class FileManager:
             file_metadata = FileMetadataModel.read(db_session=session, identifier=file_id)
             return file_metadata.to_pydantic()
 
+    @enforce_types
+    def get_files_metadata_by_ids(self, file_ids: List[str]) -> Dict[str, PydanticFileMetadata]:
+        """Fetch metadata for several files in one query, keyed by file ID. Unknown IDs are omitted."""
+        if not file_ids:
+            return {}
+        with self.session_maker() as session:
+            results = session.query(FileMetadataModel).filter(
+                FileMetadataModel.id.in_(set(file_ids)),
+                FileMetadataModel.is_deleted == False,
+            ).all()
+            return {file_metadata.id: file_metadata.to_pydantic() for file_metadata in results}
+
     @enforce_types
     def get_files_by_organization_id(self, organization_id: str, cursor: Optional[str] = None, limit: Optional[int] = 50) -> List[PydanticFileMetadata]:
         """Get all files for a specific organization."""
@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import or_, select, update
+
+from mirix.orm.errors import NoResultFound
+from mirix.orm.job import Job as JobModel
+from mirix.schemas.enums import JobStatus
+from mirix.schemas.job import Job as PydanticJob
+from mirix.schemas.user import User as PydanticUser
+from mirix.utils import enforce_types
+
+# Jobs in these states have not finished yet
+ACTIVE_JOB_STATUSES = (JobStatus.pending, JobStatus.running)
+
+
+class JobManager:
+    """Persists background jobs: their parameters, status, latest progress and result."""
+
+    def __init__(self):
+        from mirix.server.server import db_context
+
+        self.session_maker = db_context
+
+    @enforce_types
+    def create_job(self, job_type: str, actor: PydanticUser, params: Optional[dict] = None, owner: Optional[str] = None) -> PydanticJob:
+        """Record a newly submitted (pending) job, owned by the job runner `owner`."""
+        with self.session_maker() as session:
+            job = JobModel(
+                job_type=job_type,
+                status=JobStatus.pending,
+                params=params or {},
+                owner=owner,
+                heartbeat_at=datetime.now(timezone.utc),
+                user_id=actor.id,
+                organization_id=actor.organization_id,
+            )
+            job.create(session, actor=actor)
+            return job.to_pydantic()
+
+    @enforce_types
+    def get_job(self, job_id: str, actor: Optional[PydanticUser] = None) -> PydanticJob:
+        """Fetch a job, raising NoResultFound if it does not exist (or belongs to another user than `actor`)."""
+        with self.session_maker() as session:
+            job = session.get(JobModel, job_id)
+            if job is None or (actor is not None and job.user_id != actor.id):
+                raise NoResultFound(f"Job with id {job_id} not found")
+            return job.to_pydantic()
+
+    @enforce_types
+    def list_jobs(
+        self,
+        actor: PydanticUser,
+        status: Optional[JobStatus] = None,
+        job_type: Optional[str] = None,
+        limit: int = 50,
+    ) -> List[PydanticJob]:
+        """The user's jobs, most recently submitted first."""
+        query = select(JobModel).where(JobModel.user_id == actor.id)
+        if status is not None:
+            query = query.where(JobModel.status == status)
+        if job_type is not None:
+            query = query.where(JobModel.job_type == job_type)
+        query = query.order_by(JobModel.created_at.desc(), JobModel.id.desc()).limit(limit)
+        with self.session_maker() as session:
+            return [job.to_pydantic() for job in session.execute(query).scalars()]
+
+    def update_job(self, job_id: str, only_if_status: Optional[tuple] = None, **fields) -> bool:
+        """
+        Set `fields` on a job with a single UPDATE (no read-modify-write, so concurrent progress reports and
+        cancellations cannot overwrite each other). With `only_if_status`, the job is only updated while its
+        status is one of those. Returns whether the job was updated.
+        """
+        if fields.get("status") in (JobStatus.completed, JobStatus.failed, JobStatus.cancelled):
+            fields.setdefault("completed_at", datetime.now(timezone.utc))
+        query = update(JobModel).where(JobModel.id == job_id)
+        if only_if_status is not None:
+            query = query.where(JobModel.status.in_(only_if_status))
+        with self.session_maker() as session:
+            updated = session.execute(query.values(**fields)).rowcount
+            session.commit()
+        return updated > 0
+
+    def heartbeat(self, job_ids: List[str], owner: str):
+        """Record that the runner `owner` still has these (unfinished) jobs."""
+        with self.session_maker() as session:
+            session.execute(
+                update(JobModel)
+                .where(JobModel.id.in_(job_ids), JobModel.owner == owner, JobModel.status.in_(ACTIVE_JOB_STATUSES))
+                .values(heartbeat_at=datetime.now(timezone.utc))
+            )
+            session.commit()
+
+    def fail_stale_jobs(self, stale_after_seconds: float) -> int:
+        """
+        Mark unfinished jobs whose runner has not sent a heartbeat for `stale_after_seconds` as failed: their
+        server process stopped or crashed. Jobs of runners that are still alive (in this or another process)
+        are left alone. Returns how many jobs were failed.
+        """
+        now = datetime.now(timezone.utc)
+        with self.session_maker() as session:
+            failed = session.execute(
+                update(JobModel)
+                .where(
+                    JobModel.status.in_(ACTIVE_JOB_STATUSES),
+                    or_(JobModel.heartbeat_at.is_(None), JobModel.heartbeat_at < now - timedelta(seconds=stale_after_seconds)),
+                )
+                .values(status=JobStatus.failed, error="Interrupted: the server running the job stopped", completed_at=now)
+            ).rowcount
+            session.commit()
+        return failed
@@ -0,0 +1,209 @@
+"""
+In-process background jobs.
+
+`JobRunner.submit` records a job (see JobManager) and queues `fn(context)` on a small worker pool, so
+long maintenance work (reflexion, memory export/import, ...) never holds a request open. Clients poll
+the job row for status and progress. At most `settings.job_worker_max_workers` jobs run at once and at
+most `settings.job_queue_max_pending` wait; beyond that `submit` raises JobQueueFullError.
+
+Cancellation is cooperative: a pending job is cancelled outright, a running job stops the next time it
+reports progress (`JobContext.report_progress` raises JobCancelledError). Jobs that never report
+progress run to completion.
+
+Several server processes can share the jobs table. Each runner records itself as the owner of the jobs it
+accepts and refreshes their heartbeat while they are unfinished; only jobs whose heartbeat has gone stale
+(their process stopped or crashed) are failed, at startup and then periodically.
+"""
+
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+
+from mirix.log import get_logger
+from mirix.schemas.enums import JobStatus
+from mirix.schemas.job import Job as PydanticJob
+from mirix.schemas.user import User as PydanticUser
+from mirix.services.job_manager import ACTIVE_JOB_STATUSES, JobManager
+from mirix.settings import settings
+
+logger = get_logger(__name__)
+
+
+class JobQueueFullError(Exception):
+    """Too many jobs are already waiting for a worker."""
+
+
+class JobCancelledError(Exception):
+    """Raised inside a job that was cancelled while running."""
+
+
+class JobContext:
+    """Handed to a running job to report progress and notice cancellation."""
+
+    def __init__(self, job_id: str, job_manager: JobManager, cancel_event: threading.Event, progress_interval: float):
+        self.job_id = job_id
+        self._job_manager = job_manager
+        self._cancel_event = cancel_event
+        self._progress_interval = progress_interval
+        self._last_progress_write = 0.0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise JobCancelledError(f"Job {self.job_id} was cancelled")
+
+    def report_progress(self, progress: Dict, force: bool = False):
+        """Record the job's progress (at most once per progress interval unless `force`), then honour a cancellation."""
+        now = time.monotonic()
+        if force or now - self._last_progress_write >= self._progress_interval:
+            self._last_progress_write = now
+            self._job_manager.update_job(self.job_id, only_if_status=(JobStatus.running,), progress=dict(progress))
+        self.check_cancelled()
+
+
+class JobRunner:
+    def __init__(
+        self,
+        job_manager: JobManager,
+        max_workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        progress_interval: Optional[float] = None,
+        heartbeat_interval: Optional[float] = None,
+        stale_after: Optional[float] = None,
+    ):
+        self.job_manager = job_manager
+        self.max_workers = max_workers or settings.job_worker_max_workers
+        self.max_pending = max_pending if max_pending is not None else settings.job_queue_max_pending
+        self.progress_interval = progress_interval if progress_interval is not None else settings.job_progress_min_interval_seconds
+        self.heartbeat_interval = heartbeat_interval or settings.job_heartbeat_interval_seconds
+        self.stale_after = stale_after or settings.job_stale_after_seconds
+        # Identifies this runner's jobs in the (possibly shared) jobs table
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._executor = None
+        self._heartbeat_thread = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        # job id -> cancel event, for the jobs of this process that have not finished
+        self._cancel_events: Dict[str, threading.Event] = {}
+        self._pending = 0
+
+    def submit(self, job_type: str, fn: Callable[[JobContext], Optional[Dict]], actor: PydanticUser, params: Optional[Dict] = None) -> PydanticJob:
+        """Record a job and queue `fn(context)` to run it; the dict `fn` returns becomes the job's result."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFullError(f"{self._pending} jobs are already waiting, please retry later")
+            self._pending += 1
+        try:
+            job = self.job_manager.create_job(job_type=job_type, actor=actor, params=params, owner=self.owner)
+            cancel_event = threading.Event()
+            with self._lock:
+                self._cancel_events[job.id] = cancel_event
+            self._get_executor().submit(self._run, job.id, job_type, fn, cancel_event)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        logger.info(f"Submitted {job_type} job {job.id}")
+        return job
+
+    def cancel(self, job_id: str, actor: Optional[PydanticUser] = None) -> PydanticJob:
+        """Cancel a job: a pending one right away, a running one the next time it reports progress."""
+        job = self.job_manager.get_job(job_id, actor=actor)
+        if job.status not in ACTIVE_JOB_STATUSES:
+            return job
+        with self._lock:
+            cancel_event = self._cancel_events.get(job_id)
+        if cancel_event is not None:
+            cancel_event.set()
+        # A job still waiting for a worker is cancelled right away (the worker then skips it)
+        self.job_manager.update_job(job_id, only_if_status=(JobStatus.pending,), status=JobStatus.cancelled)
+        return self.job_manager.get_job(job_id)
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            return {"max_workers": self.max_workers, "pending": self._pending, "active": len(self._cancel_events) - self._pending}
+
+    def start(self) -> int:
+        """Fail the jobs that stopped runners left unfinished and start the heartbeat; returns how many were failed."""
+        failed = self.job_manager.fail_stale_jobs(self.stale_after)
+        self._start_heartbeat()
+        return failed
+
+    def shutdown(self, wait: bool = False):
+        """Cancel the running jobs and stop the workers."""
+        self._stopped.set()
+        with self._lock:
+            executor, self._executor = self._executor, None
+            for cancel_event in self._cancel_events.values():
+                cancel_event.set()
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        self._start_heartbeat()
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="mirix_job")
+            return self._executor
+
+    def _start_heartbeat(self):
+        with self._lock:
+            if self._heartbeat_thread is None:
+                self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, name="mirix_job_heartbeat", daemon=True)
+                self._heartbeat_thread.start()
+
+    def _heartbeat_loop(self):
+        while not self._stopped.wait(self.heartbeat_interval):
+            try:
+                with self._lock:
+                    job_ids = list(self._cancel_events)
+                if job_ids:
+                    self.job_manager.heartbeat(job_ids, self.owner)
+                failed = self.job_manager.fail_stale_jobs(self.stale_after)
+                if failed:
+                    logger.info(f"Marked {failed} background jobs of stopped servers as failed")
+            except Exception as e:
+                logger.error(f"Job heartbeat failed: {e}")
+
+    def _run(self, job_id: str, job_type: str, fn, cancel_event: threading.Event):
+        with self._lock:
+            self._pending -= 1
+        try:
+            started = self.job_manager.update_job(
+                job_id,
+                only_if_status=(JobStatus.pending,),
+                status=JobStatus.running,
+                started_at=datetime.now(timezone.utc),
+            )
+            if not started:
+                # Cancelled while it was waiting
+                return
+
+            context = JobContext(job_id, self.job_manager, cancel_event, self.progress_interval)
+            start = time.perf_counter()
+            try:
+                result = fn(context)
+            except JobCancelledError:
+                self.job_manager.update_job(job_id, status=JobStatus.cancelled)
+                logger.info(f"{job_type} job {job_id} cancelled after {time.perf_counter() - start:.1f}s")
+            except Exception as e:
+                logger.error(f"{job_type} job {job_id} failed: {e}\n{traceback.format_exc()}")
+                self.job_manager.update_job(job_id, status=JobStatus.failed, error=str(e))
+            else:
+                self.job_manager.update_job(job_id, status=JobStatus.completed, result=result)
+                logger.info(f"{job_type} job {job_id} completed in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            logger.error(f"Failed to record the outcome of {job_type} job {job_id}: {e}")
+        finally:
+            with self._lock:
+                self._cancel_events.pop(job_id, None)
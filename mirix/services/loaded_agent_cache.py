@@ -0,0 +1,61 @@
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+class LoadedAgentCache:
+    """
+    LRU cache of constructed Agent objects, keyed by (agent_id, actor id).
+
+    An Agent holds per-run state, so cached agents are checked out exclusively: `checkout` removes the
+    agent from the cache and `checkin` puts it back once its step is done. Concurrent steps of the same
+    agent and actor simply miss and construct their own. Each entry remembers the agent's state version
+    at load time and is dropped when the version has moved on.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._agents = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+
+    def checkout(self, agent_id: str, actor_id: str, state_version: int):
+        """Take the cached agent for (agent_id, actor_id) if it was loaded at `state_version`, else None."""
+        with self._lock:
+            entry = self._agents.pop((agent_id, actor_id), None)
+            if entry is None or entry[0] != state_version:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def checkin(self, agent_id: str, actor_id: str, state_version: int, agent):
+        """Return an agent whose step finished, evicting the least recently used agents beyond `max_size`."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            key = (agent_id, actor_id)
+            # Keep the newest state if a concurrent step of the same agent returned first
+            existing = self._agents.get(key)
+            if existing is not None and existing[0] > state_version:
+                return
+            self._agents[key] = (state_version, agent)
+            self._agents.move_to_end(key)
+            while len(self._agents) > self.max_size:
+                self._agents.popitem(last=False)
+
+    def invalidate(self, agent_id: Optional[str] = None):
+        """Drop the cached agents of `agent_id`, or all of them."""
+        with self._lock:
+            if agent_id is None:
+                self._agents.clear()
+                return
+            for key in [key for key in self._agents if key[0] == agent_id]:
+                del self._agents[key]
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            return {"size": len(self._agents), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,314 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from contextlib import closing
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+from pydantic import BaseModel
+from sqlalchemy import Boolean, DateTime, inspect, select
+
+from mirix.constants import MAX_EMBEDDING_DIM, MEMORY_EXPORT_BATCH_SIZE
+from mirix.log import get_logger
+from mirix.schemas.user import User as PydanticUser
+from mirix.services.memory_listing_manager import MEMORY_LISTING_MODELS
+from mirix.utils import enforce_types
+
+logger = get_logger(__name__)
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+
+# format -> (media type, file extension) of the exported file
+EXPORT_MEDIA_TYPES = {
+    "csv": ("text/csv", "csv"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+class MemoryExportManager:
+    """
+    Exports a user's memories as CSV, JSONL or Parquet in bounded memory.
+
+    Each memory table is read with a single streaming query (server-side cursor on PostgreSQL) and
+    written out `batch_size` rows at a time, so neither the rows nor the output file are ever held
+    in full. Soft-deleted memories are not exported. Every record carries a `memory_type` column followed by the table's columns; CSV and
+    Parquet use the union of the exported tables' columns. Embeddings are only exported on request:
+    as arrays in JSONL, JSON-encoded in CSV and as fixed-size float32 list columns in Parquet.
+    """
+
+    def __init__(self):
+        from mirix.server.server import db_context
+
+        self.session_maker = db_context
+
+    @staticmethod
+    def export_fields(memory_type: str, include_embeddings: bool = False) -> List[str]:
+        """The exported columns of `memory_type`, in table order."""
+        model = MemoryExportManager._get_model(memory_type)
+        return [
+            attr.key
+            for attr in inspect(model).column_attrs
+            if not attr.key.startswith("_") and (include_embeddings or not attr.key.endswith("_embedding"))
+        ]
+
+    @enforce_types
+    def stream_export(
+        self,
+        actor: PydanticUser,
+        format: str = "jsonl",
+        memory_types: Optional[List[str]] = None,
+        include_embeddings: bool = False,
+        batch_size: int = MEMORY_EXPORT_BATCH_SIZE,
+        exported_counts: Optional[Dict[str, int]] = None,
+    ) -> Iterator[bytes]:
+        """
+        Export the user's memories as a stream of byte chunks of the exported file.
+
+        The arguments are validated eagerly (ValueError for an unknown format or memory type,
+        ImportError when Parquet is requested without pyarrow); the database is only read as the
+        returned iterator is consumed. Close the iterator to abandon an export early.
+
+        Args:
+            actor: The user whose memories are exported
+            format: One of EXPORT_FORMATS
+            memory_types: Memory types to export (default: all of MEMORY_LISTING_MODELS)
+            include_embeddings: Whether to export the embedding columns
+            batch_size: Rows fetched and written per chunk
+            exported_counts: Filled in with the number of rows exported per memory type as the export progresses
+
+        Returns:
+            An iterator over the file's byte chunks
+        """
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format '{format}', expected one of {', '.join(EXPORT_FORMATS)}")
+        memory_types = list(dict.fromkeys(memory_types or MEMORY_LISTING_MODELS))
+        for memory_type in memory_types:
+            self._get_model(memory_type)
+        if format == "parquet":
+            _import_pyarrow()
+
+        if exported_counts is None:
+            exported_counts = {}
+        batches = self._iter_batches(actor, memory_types, include_embeddings, batch_size, exported_counts)
+        if format == "csv":
+            return self._stream_csv(batches, memory_types, include_embeddings)
+        if format == "jsonl":
+            return self._stream_jsonl(batches)
+        return self._stream_parquet(batches, memory_types, include_embeddings)
+
+    @enforce_types
+    def export_to_file(
+        self,
+        actor: PydanticUser,
+        file_path: str,
+        format: Optional[str] = None,
+        memory_types: Optional[List[str]] = None,
+        include_embeddings: bool = False,
+        batch_size: int = MEMORY_EXPORT_BATCH_SIZE,
+        progress_callback: Optional[Callable[[Dict[str, int]], None]] = None,
+    ) -> Dict[str, int]:
+        """
+        Export the user's memories to `file_path`, returning the number of rows exported per memory type.
+        The format defaults to the file's extension. The file is written next to its destination and
+        renamed into place, so a failed (or, by raising from `progress_callback`, abandoned) export never
+        leaves a partial file behind. `progress_callback` is called with the counts after every chunk.
+        """
+        path = Path(file_path)
+        format = format or path.suffix.lstrip(".").lower()
+        exported_counts = {}
+        chunks = self.stream_export(
+            actor=actor,
+            format=format,
+            memory_types=memory_types,
+            include_embeddings=include_embeddings,
+            batch_size=batch_size,
+            exported_counts=exported_counts,
+        )
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f, closing(chunks):
+                for chunk in chunks:
+                    f.write(chunk)
+                    if progress_callback is not None:
+                        progress_callback(exported_counts)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        logger.info(f"Exported {sum(exported_counts.values())} memories of user {actor.id} to {file_path}")
+        return exported_counts
+
+    def _iter_batches(
+        self,
+        actor: PydanticUser,
+        memory_types: List[str],
+        include_embeddings: bool,
+        batch_size: int,
+        exported_counts: Dict[str, int],
+    ):
+        """Yield (memory_type, rows) batches of the user's memories, reading each table with one streaming query."""
+        for memory_type in memory_types:
+            model, sort_field = MEMORY_LISTING_MODELS[memory_type]
+            fields = self.export_fields(memory_type, include_embeddings)
+            # Ordered like the listing index, so the export is stable between runs
+            query = (
+                select(*[getattr(model, field).label(field) for field in fields])
+                .where(model.user_id == actor.id, model.is_deleted == False)
+                .order_by(getattr(model, sort_field), model.id)
+                .execution_options(stream_results=True, yield_per=batch_size)
+            )
+
+            exported_counts[memory_type] = 0
+            with self.session_maker() as session:
+                for partition in session.execute(query).partitions():
+                    rows = [dict(row._mapping) for row in partition]
+                    exported_counts[memory_type] += len(rows)
+                    yield memory_type, rows
+
+    def _stream_csv(self, batches, memory_types: List[str], include_embeddings: bool) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=self._union_fields(memory_types, include_embeddings))
+        writer.writeheader()
+        with closing(batches):
+            for memory_type, rows in batches:
+                for row in rows:
+                    record = {"memory_type": memory_type}
+                    record.update({field: _to_csv_value(value) for field, value in row.items()})
+                    writer.writerow(record)
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+        # An export without rows still has its header
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+
+    def _stream_jsonl(self, batches) -> Iterator[bytes]:
+        with closing(batches):
+            for memory_type, rows in batches:
+                lines = [json.dumps({"memory_type": memory_type, **row}, default=_json_default) for row in rows]
+                yield ("\n".join(lines) + "\n").encode("utf-8")
+
+    def _stream_parquet(self, batches, memory_types: List[str], include_embeddings: bool) -> Iterator[bytes]:
+        pa, pq = _import_pyarrow()
+        schema = self._parquet_schema(pa, memory_types, include_embeddings)
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema)
+        try:
+            # One row group per batch; the bytes written so far are handed out after each
+            for memory_type, rows in batches:
+                columns = {"memory_type": [memory_type] * len(rows)}
+                for field in schema.names[1:]:
+                    columns[field] = [_to_parquet_value(row.get(field), schema.field(field).type, pa) for row in rows]
+                writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+                yield sink.drain()
+        finally:
+            batches.close()
+            writer.close()
+        yield sink.drain()
+
+    @classmethod
+    def _union_fields(cls, memory_types: List[str], include_embeddings: bool) -> List[str]:
+        fields = {"memory_type": None}
+        for memory_type in memory_types:
+            fields.update(dict.fromkeys(cls.export_fields(memory_type, include_embeddings)))
+        return list(fields)
+
+    @classmethod
+    def _parquet_schema(cls, pa, memory_types: List[str], include_embeddings: bool):
+        column_types = {}
+        for memory_type in memory_types:
+            for attr in inspect(cls._get_model(memory_type)).column_attrs:
+                column_types.setdefault(attr.key, attr.columns[0].type)
+
+        fields = []
+        for field in cls._union_fields(memory_types, include_embeddings):
+            column_type = column_types.get(field)
+            if field.endswith("_embedding"):
+                fields.append(pa.field(field, pa.list_(pa.float32(), MAX_EMBEDDING_DIM)))
+            elif isinstance(column_type, DateTime):
+                fields.append(pa.field(field, pa.timestamp("us", tz="UTC")))
+            elif isinstance(column_type, Boolean):
+                fields.append(pa.field(field, pa.bool_()))
+            else:
+                # Strings as-is, JSON columns JSON-encoded
+                fields.append(pa.field(field, pa.string()))
+        return pa.schema(fields)
+
+    @staticmethod
+    def _get_model(memory_type: str):
+        if memory_type not in MEMORY_LISTING_MODELS:
+            raise ValueError(f"Unknown memory type '{memory_type}', expected one of {', '.join(MEMORY_LISTING_MODELS)}")
+        return MEMORY_LISTING_MODELS[memory_type][0]
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that buffers what the Parquet writer wrote until it is drained."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet export requires pyarrow. Install it with: pip install pyarrow")
+    return pyarrow, pyarrow.parquet
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return str(value)
+
+
+def _to_csv_value(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return json.dumps(value, default=_json_default)
+
+
+def _to_parquet_value(value, field_type, pa):
+    if value is None:
+        return None
+    if pa.types.is_fixed_size_list(field_type):
+        return np.asarray(value, dtype=np.float32)
+    if pa.types.is_timestamp(field_type):
+        # Naive timestamps are stored in UTC
+        return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+    if pa.types.is_string(field_type) and not isinstance(value, str):
+        return json.dumps(value, default=_json_default)
+    return value
@@ -0,0 +1,336 @@
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import JSON, DateTime, insert, inspect, select
+
+from mirix.constants import (
+    BUILD_EMBEDDINGS_FOR_MEMORY,
+    MAX_EMBEDDING_DIM,
+    MEMORY_IMPORT_BATCH_SIZE,
+    MEMORY_IMPORT_EMBEDDING_BATCH_SIZE,
+    MEMORY_IMPORT_EMBEDDING_CONCURRENCY,
+)
+from mirix.embeddings import embedding_model
+from mirix.log import get_logger
+from mirix.orm.custom_columns import EmbeddingConfigColumn
+from mirix.schemas.embedding_config import EmbeddingConfig
+from mirix.schemas.user import User as PydanticUser
+from mirix.services.memory_export_manager import _import_pyarrow
+from mirix.services.memory_listing_manager import MEMORY_LISTING_MODELS
+from mirix.utils import enforce_types, generate_short_id
+
+logger = get_logger(__name__)
+
+IMPORT_FORMATS = ("jsonl", "parquet")
+
+# Prefixes of the ids given to imported memories that have none (same as the managers' create methods)
+MEMORY_ID_PREFIXES = {
+    "episodic": "ep",
+    "semantic": "sem",
+    "procedural": "proc",
+    "resource": "res",
+    "knowledge_vault": "kv",
+}
+
+# Cap on the record errors kept in the progress report
+MAX_REPORTED_ERRORS = 20
+
+
+class MemoryImportManager:
+    """
+    Bulk-loads memories from the files written by MemoryExportManager (JSONL or Parquet).
+
+    The file is read `batch_size` records at a time. For each batch, the embeddings the records lack
+    are computed in sub-batches on a small thread pool, and the rows are inserted with one
+    multi-row INSERT per memory table and committed together. Records are re-owned by the importing
+    user, so an export can be loaded into another user or another deployment.
+
+    Imports are resumable: with `checkpoint_path`, the number of records processed is saved after every
+    committed batch and a rerun skips them. Records whose id already exists are skipped too, so a rerun
+    without a checkpoint (or after a crash between commit and checkpoint) does not duplicate anything.
+    """
+
+    def __init__(self):
+        from mirix.server.server import db_context
+
+        self.session_maker = db_context
+
+    @enforce_types
+    def import_from_file(
+        self,
+        actor: PydanticUser,
+        file_path: str,
+        format: Optional[str] = None,
+        embedding_config: Optional[EmbeddingConfig] = None,
+        preserve_ids: bool = True,
+        checkpoint_path: Optional[str] = None,
+        batch_size: int = MEMORY_IMPORT_BATCH_SIZE,
+        progress_callback: Optional[Callable[[Dict], None]] = None,
+    ) -> Dict:
+        """
+        Import the memories in `file_path` for `actor`.
+
+        Args:
+            actor: The user the memories are imported for
+            file_path: A JSONL or Parquet memory export
+            format: One of IMPORT_FORMATS (default: the file's extension)
+            embedding_config: Embedding model for the vectors the records lack; None imports them without
+                (they are also skipped when BUILD_EMBEDDINGS_FOR_MEMORY is off)
+            preserve_ids: Keep the records' ids (and skip those that already exist) instead of assigning new ones
+            checkpoint_path: File to save progress to and resume from
+            batch_size: Records read, embedded and committed together
+            progress_callback: Called with the progress report after every committed batch
+
+        Returns:
+            The progress report: records read, imported per memory type, skipped (existing ids),
+            failed (invalid records), embeddings computed, and the first errors
+        """
+        format = format or Path(file_path).suffix.lstrip(".").lower()
+        if format not in IMPORT_FORMATS:
+            raise ValueError(f"Unknown import format '{format}', expected one of {', '.join(IMPORT_FORMATS)}")
+        if format == "parquet":
+            _import_pyarrow()
+        if not BUILD_EMBEDDINGS_FOR_MEMORY:
+            embedding_config = None
+
+        progress = self._load_checkpoint(checkpoint_path, file_path)
+        resumed_from = progress["records_read"]
+        if resumed_from:
+            logger.info(f"Resuming import of {file_path} after {resumed_from} records")
+
+        read_records = self._read_jsonl if format == "jsonl" else self._read_parquet
+        embed_model = embedding_model(embedding_config) if embedding_config else None
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(
+            max_workers=MEMORY_IMPORT_EMBEDDING_CONCURRENCY, thread_name_prefix="mirix_memory_import"
+        ) as embedding_executor:
+            for records in read_records(file_path, batch_size, skip=resumed_from):
+                rows_by_type = self._prepare_rows(records, actor, progress)
+                if embed_model is not None:
+                    self._embed_missing(rows_by_type, embed_model, embedding_config, embedding_executor, progress)
+                self._insert_rows(rows_by_type, preserve_ids, progress)
+
+                progress["records_read"] += len(records)
+                self._save_checkpoint(checkpoint_path, progress)
+                elapsed = time.perf_counter() - start
+                logger.info(
+                    f"Imported {sum(progress['imported'].values())} memories from {file_path} "
+                    f"({progress['records_read']} records read, "
+                    f"{(progress['records_read'] - resumed_from) / max(elapsed, 1e-9):.0f} records/s)"
+                )
+                if progress_callback is not None:
+                    progress_callback(progress)
+
+        progress["completed"] = True
+        self._save_checkpoint(checkpoint_path, progress)
+        return progress
+
+    def _prepare_rows(self, records: List, actor: PydanticUser, progress: Dict) -> Dict[str, List[Dict]]:
+        """Turn the batch's records into insertable rows per memory type, owned by `actor`."""
+        rows_by_type = {}
+        for index, record in enumerate(records):
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                if not isinstance(record, dict):
+                    raise ValueError("not a JSON object")
+                memory_type = record.get("memory_type")
+                if memory_type not in MEMORY_LISTING_MODELS:
+                    raise ValueError(f"unknown memory type '{memory_type}'")
+                row = self._to_row(memory_type, record)
+            except (ValueError, TypeError) as e:
+                progress["failed"] += 1
+                if len(progress["errors"]) < MAX_REPORTED_ERRORS:
+                    progress["errors"].append(f"record {progress['records_read'] + index + 1}: {e}")
+                continue
+
+            row.update(
+                user_id=actor.id,
+                organization_id=actor.organization_id,
+                _created_by_id=actor.id,
+                _last_updated_by_id=actor.id,
+            )
+            rows_by_type.setdefault(memory_type, []).append(row)
+        return rows_by_type
+
+    @staticmethod
+    def _to_row(memory_type: str, record: Dict) -> Dict:
+        model, _ = MEMORY_LISTING_MODELS[memory_type]
+        row = {}
+        for attr in inspect(model).column_attrs:
+            field = attr.key
+            value = record.get(field)
+            if field.startswith("_") or field in ("user_id", "organization_id") or value is None:
+                continue
+            column_type = attr.columns[0].type
+            if field.endswith("_embedding"):
+                value = _pad_embedding(value)
+            elif isinstance(column_type, (JSON, EmbeddingConfigColumn)) and isinstance(value, str):
+                # Parquet (and CSV) exports carry JSON columns JSON-encoded
+                value = json.loads(value)
+            elif isinstance(column_type, DateTime) and isinstance(value, str):
+                value = datetime.fromisoformat(value)
+            row[field] = value
+        return row
+
+    def _embed_missing(
+        self,
+        rows_by_type: Dict[str, List[Dict]],
+        embed_model,
+        embedding_config: EmbeddingConfig,
+        executor: ThreadPoolExecutor,
+        progress: Dict,
+    ):
+        """Compute the embeddings the rows lack, in sub-batches spread over `executor`."""
+        missing: List[Tuple[Dict, str, str]] = []
+        for memory_type, rows in rows_by_type.items():
+            embedding_fields = [
+                attr.key for attr in inspect(MEMORY_LISTING_MODELS[memory_type][0]).column_attrs if attr.key.endswith("_embedding")
+            ]
+            for row in rows:
+                for field in embedding_fields:
+                    source = row.get(field[: -len("_embedding")])
+                    if row.get(field) is not None or not source:
+                        continue
+                    # Same text the managers embed on insert (procedural steps are joined by lines)
+                    text = "\n".join(map(str, source)) if isinstance(source, list) else str(source)
+                    missing.append((row, field, text))
+        if not missing:
+            return
+
+        sub_batches = [
+            missing[i : i + MEMORY_IMPORT_EMBEDDING_BATCH_SIZE] for i in range(0, len(missing), MEMORY_IMPORT_EMBEDDING_BATCH_SIZE)
+        ]
+        for sub_batch, vectors in zip(
+            sub_batches, executor.map(lambda batch: _embed_texts(embed_model, [text for _, _, text in batch]), sub_batches)
+        ):
+            for (row, field, _), vector in zip(sub_batch, vectors):
+                row[field] = _pad_embedding(vector)
+                row.setdefault("embedding_config", embedding_config)
+        progress["embedded"] += len(missing)
+
+    def _insert_rows(self, rows_by_type: Dict[str, List[Dict]], preserve_ids: bool, progress: Dict):
+        """Insert the batch in one transaction, one multi-row INSERT per memory table."""
+        with self.session_maker() as session:
+            for memory_type, rows in rows_by_type.items():
+                model, _ = MEMORY_LISTING_MODELS[memory_type]
+                if preserve_ids:
+                    rows = self._drop_existing(session, model, rows, progress)
+                self._assign_ids(session, model, memory_type, rows, keep_existing=preserve_ids)
+                if rows:
+                    session.execute(insert(model), rows)
+                progress["imported"][memory_type] = progress["imported"].get(memory_type, 0) + len(rows)
+            session.commit()
+
+    @staticmethod
+    def _drop_existing(session, model, rows: List[Dict], progress: Dict) -> List[Dict]:
+        # Also drops duplicates within the batch
+        ids = {row["id"] for row in rows if row.get("id")}
+        existing = set(session.execute(select(model.id).where(model.id.in_(ids))).scalars()) if ids else set()
+        kept = []
+        for row in rows:
+            if row.get("id") in existing:
+                progress["skipped"] += 1
+                continue
+            if row.get("id"):
+                existing.add(row["id"])
+            kept.append(row)
+        return kept
+
+    @staticmethod
+    def _assign_ids(session, model, memory_type: str, rows: List[Dict], keep_existing: bool):
+        pending = [row for row in rows if not (keep_existing and row.get("id"))]
+        while pending:
+            for row in pending:
+                row["id"] = generate_short_id(MEMORY_ID_PREFIXES[memory_type], 10)
+            ids = [row["id"] for row in pending]
+            taken = set(session.execute(select(model.id).where(model.id.in_(ids))).scalars())
+            taken.update(row_id for row_id in ids if ids.count(row_id) > 1)
+            pending = [row for row in pending if row["id"] in taken]
+
+    @staticmethod
+    def _read_jsonl(file_path: str, batch_size: int, skip: int = 0) -> Iterator[List]:
+        with open(file_path, "r", encoding="utf-8") as f:
+            lines = (line for line in f if line.strip())
+            # Records of a previous run are counted, not parsed
+            for _ in islice(lines, skip):
+                pass
+            while True:
+                batch = list(islice(lines, batch_size))
+                if not batch:
+                    return
+                records = []
+                for line in batch:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError as e:
+                        records.append(ValueError(f"invalid JSON: {e}"))
+                yield records
+
+    @staticmethod
+    def _read_parquet(file_path: str, batch_size: int, skip: int = 0) -> Iterator[List]:
+        _, pq = _import_pyarrow()
+        parquet_file = pq.ParquetFile(file_path)
+        for record_batch in parquet_file.iter_batches(batch_size=batch_size):
+            if skip >= record_batch.num_rows:
+                skip -= record_batch.num_rows
+                continue
+            if skip:
+                record_batch, skip = record_batch.slice(skip), 0
+            yield record_batch.to_pylist()
+
+    @staticmethod
+    def _load_checkpoint(checkpoint_path: Optional[str], file_path: str) -> Dict:
+        progress = {
+            "file_path": file_path,
+            "records_read": 0,
+            "imported": {},
+            "skipped": 0,
+            "failed": 0,
+            "embedded": 0,
+            "errors": [],
+            "completed": False,
+        }
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            with open(checkpoint_path, "r", encoding="utf-8") as f:
+                checkpoint = json.load(f)
+            if checkpoint.get("file_path") != file_path:
+                raise ValueError(f"Checkpoint {checkpoint_path} belongs to an import of {checkpoint.get('file_path')}")
+            progress.update(checkpoint)
+            progress["completed"] = False
+        return progress
+
+    @staticmethod
+    def _save_checkpoint(checkpoint_path: Optional[str], progress: Dict):
+        if not checkpoint_path:
+            return
+        path = Path(checkpoint_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so a crash never leaves a truncated checkpoint
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(progress, f)
+        os.replace(tmp_path, path)
+
+
+def _embed_texts(embed_model, texts: List[str]) -> List[List[float]]:
+    # LlamaIndex models embed a whole batch per request; the others embed one text at a time
+    if hasattr(embed_model, "get_text_embedding_batch"):
+        return embed_model.get_text_embedding_batch(texts)
+    return [embed_model.get_text_embedding(text) for text in texts]
+
+
+def _pad_embedding(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    if vector.shape[0] > MAX_EMBEDDING_DIM:
+        raise ValueError(f"embedding has {vector.shape[0]} dimensions, more than the supported {MAX_EMBEDDING_DIM}")
+    return np.pad(vector, (0, MAX_EMBEDDING_DIM - vector.shape[0]), mode="constant")
@@ -0,0 +1,151 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import String, and_, cast, inspect, or_, select
+
+from mirix.constants import MEMORY_LIST_DEFAULT_LIMIT, MEMORY_LIST_MAX_LIMIT
+from mirix.orm.episodic_memory import EpisodicEvent
+from mirix.orm.knowledge_vault import KnowledgeVaultItem
+from mirix.orm.procedural_memory import ProceduralMemoryItem
+from mirix.orm.resource_memory import ResourceMemoryItem
+from mirix.orm.semantic_memory import SemanticMemoryItem
+from mirix.schemas.user import User as PydanticUser
+from mirix.utils import enforce_types
+
+# memory type -> (ORM model, timestamp column the listing is ordered by)
+MEMORY_LISTING_MODELS = {
+    "episodic": (EpisodicEvent, "occurred_at"),
+    "semantic": (SemanticMemoryItem, "created_at"),
+    "procedural": (ProceduralMemoryItem, "created_at"),
+    "resource": (ResourceMemoryItem, "created_at"),
+    "knowledge_vault": (KnowledgeVaultItem, "created_at"),
+}
+
+
+class MemoryListingManager:
+    """
+    Browses a user's memories page by page without loading embedding vectors.
+
+    Items are ordered newest first by (timestamp, id) and paginated with keyset cursors, so every
+    page costs one index range scan no matter how deep the user has scrolled. Only the requested
+    columns are selected; embedding columns are never part of a listing. Soft-deleted items and
+    items without a timestamp are not listed.
+    """
+
+    def __init__(self):
+        from mirix.server.server import db_context
+
+        self.session_maker = db_context
+
+    @staticmethod
+    def listable_fields(memory_type: str) -> List[str]:
+        """The fields of `memory_type` that can be projected (every public column except embeddings)."""
+        model, _ = MemoryListingManager._get_model(memory_type)
+        return [
+            attr.key
+            for attr in inspect(model).column_attrs
+            if not attr.key.startswith("_") and not attr.key.endswith("_embedding")
+        ]
+
+    @enforce_types
+    def list_memories(
+        self,
+        memory_type: str,
+        actor: PydanticUser,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = MEMORY_LIST_DEFAULT_LIMIT,
+        tree_path_prefix: Optional[List[str]] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        List one page of the user's memories of `memory_type`.
+
+        Args:
+            memory_type: One of `MEMORY_LISTING_MODELS`
+            actor: The user whose memories are listed
+            fields: Fields to return (default: all listable fields); `id` is always included
+            cursor: `next_cursor` of the previous page, None for the first page
+            limit: Page size, capped at MEMORY_LIST_MAX_LIMIT
+            tree_path_prefix: Only items whose tree_path starts with these path segments
+            start_time: Only items with a timestamp at or after this time
+            end_time: Only items with a timestamp before this time
+
+        Returns:
+            The page's items as dicts, and the cursor of the next page (None on the last page)
+        """
+        model, sort_field = self._get_model(memory_type)
+        listable = self.listable_fields(memory_type)
+        fields = list(dict.fromkeys(["id"] + (fields or listable)))
+        unknown = [field for field in fields if field not in listable]
+        if unknown:
+            raise ValueError(f"Unknown or non-listable {memory_type} memory fields: {', '.join(unknown)}")
+
+        limit = min(limit or MEMORY_LIST_DEFAULT_LIMIT, MEMORY_LIST_MAX_LIMIT)
+        sort_column = getattr(model, sort_field)
+
+        # The sort key is selected even when not projected, to build the next cursor
+        columns = [getattr(model, field).label(field) for field in fields]
+        columns.append(sort_column.label("_sort_key"))
+        query = select(*columns).where(model.user_id == actor.id, model.is_deleted == False, sort_column.isnot(None))
+
+        if start_time is not None:
+            query = query.where(sort_column >= start_time)
+        if end_time is not None:
+            query = query.where(sort_column < end_time)
+        if tree_path_prefix and hasattr(model, "tree_path"):
+            query = query.where(self._tree_path_prefix_clause(model.tree_path, tree_path_prefix))
+        elif tree_path_prefix:
+            raise ValueError(f"{memory_type} memories have no tree_path")
+
+        if cursor:
+            last_sort_key, last_id = self._decode_cursor(cursor)
+            query = query.where(
+                or_(sort_column < last_sort_key, and_(sort_column == last_sort_key, model.id < last_id))
+            )
+
+        query = query.order_by(sort_column.desc(), model.id.desc()).limit(limit + 1)
+
+        with self.session_maker() as session:
+            rows = session.execute(query).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self._encode_cursor(rows[-1]._mapping["_sort_key"], rows[-1]._mapping["id"])
+
+        items = [{field: row._mapping[field] for field in fields} for row in rows]
+        return items, next_cursor
+
+    @staticmethod
+    def _get_model(memory_type: str):
+        if memory_type not in MEMORY_LISTING_MODELS:
+            raise ValueError(f"Unknown memory type '{memory_type}', expected one of {', '.join(MEMORY_LISTING_MODELS)}")
+        return MEMORY_LISTING_MODELS[memory_type]
+
+    @staticmethod
+    def _tree_path_prefix_clause(tree_path_column, prefix: List[str]):
+        # tree_path is a JSON array stored as text; a path starts with `prefix` iff its serialized form is
+        # the serialized prefix itself or continues it with another element. The prefix is serialized
+        # the same way the column is written, so this works on both SQLite and PostgreSQL JSON columns.
+        serialized = json.dumps(list(prefix))
+        escaped = serialized[:-1].replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        tree_path_text = cast(tree_path_column, String)
+        return or_(tree_path_text == serialized, tree_path_text.like(escaped + ", %", escape="\\"))
+
+    @staticmethod
+    def _encode_cursor(sort_key: datetime, item_id: str) -> str:
+        payload = json.dumps([sort_key.isoformat(), item_id])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+        try:
+            sort_key, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            return datetime.fromisoformat(sort_key), item_id
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+            raise ValueError(f"Invalid memory listing cursor: {cursor}")
@@ -221,7 +221,7 @@ class MessageManager:
     @enforce_types
     def delete_detached_messages_for_agent(self, agent_id: str, actor: PydanticUser) -> int:
         """
-        Delete messages that belong to an agent but are not in the agent's current message_ids list.
+        Delete the actor's messages that belong to an agent but are not in the agent's current message_ids list.
         
         This is useful for cleaning up messages that were removed from context during 
         context window management but still exist in the database.
@@ -244,10 +244,12 @@ class MessageManager:
             # Get current message_ids (messages that should be kept)
             current_message_ids = set(agent.message_ids or [])
             
-            # Find all messages for this agent
+            # Find all of the actor's messages for this agent; other users' messages may be created
+            # concurrently and not be in message_ids yet
             all_messages = MessageModel.list(
                 db_session=session, 
                 agent_id=agent_id,
+                user_id=actor.id,
                 organization_id=actor.organization_id,
                 limit=None  # Get all messages
             )
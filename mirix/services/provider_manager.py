@@ -1,4 +1,5 @@
-from typing import List, Optional
+import threading
+from typing import List, Optional, Tuple
 
 from mirix.orm.provider import Provider as ProviderModel
 from mirix.schemas.providers import Provider as PydanticProvider
@@ -7,6 +8,36 @@ from mirix.schemas.user import User as PydanticUser
 from mirix.utils import enforce_types
 
 
+class _OverrideKeyCache:
+    """
+    Process-wide cache of BYOK override keys by provider name. ProviderManager is instantiated on every
+    LLM call, so the cache lives at module level and is invalidated on provider writes; a lookup that
+    raced with an invalidation is not cached.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._generation = 0
+
+    def get(self, provider_name: str) -> Tuple[bool, Optional[str], int]:
+        with self._lock:
+            return provider_name in self._keys, self._keys.get(provider_name), self._generation
+
+    def set(self, provider_name: str, api_key: Optional[str], generation: int):
+        with self._lock:
+            if generation == self._generation:
+                self._keys[provider_name] = api_key
+
+    def invalidate(self):
+        with self._lock:
+            self._keys.clear()
+            self._generation += 1
+
+
+_override_keys = _OverrideKeyCache()
+
+
 class ProviderManager:
 
     def __init__(self):
@@ -61,6 +92,7 @@ class ProviderManager:
 
             new_provider = ProviderModel(**provider.model_dump(exclude_unset=True))
             new_provider.create(session, actor=actor)
+            self.invalidate_override_key_cache()
             return new_provider.to_pydantic()
 
     @enforce_types
@@ -77,6 +109,7 @@ class ProviderManager:
 
             # Commit the updated provider
             existing_provider.update(session, actor=actor)
+            self.invalidate_override_key_cache()
             return existing_provider.to_pydantic()
 
     @enforce_types
@@ -92,6 +125,7 @@ class ProviderManager:
             existing_provider.delete(session, actor=actor)
 
             session.commit()
+        self.invalidate_override_key_cache()
 
     @enforce_types
     def list_providers(self, after: Optional[str] = None, limit: Optional[int] = 50, actor: PydanticUser = None) -> List[PydanticProvider]:
@@ -105,6 +139,20 @@ class ProviderManager:
             )
             return [provider.to_pydantic() for provider in providers]
 
+    def invalidate_override_key_cache(self):
+        """Drop cached override keys so the next lookup reads the providers table again."""
+        _override_keys.invalidate()
+
+    def _get_override_key(self, provider_name: str) -> Optional[str]:
+        """Cached lookup of the override api key stored for `provider_name`."""
+        cached, api_key, generation = _override_keys.get(provider_name)
+        if cached:
+            return api_key
+        providers = [provider for provider in self.list_providers() if provider.name == provider_name]
+        api_key = providers[0].api_key if len(providers) != 0 else None
+        _override_keys.set(provider_name, api_key, generation)
+        return api_key
+
     @enforce_types
     def get_anthropic_override_provider_id(self) -> Optional[str]:
         """Helper function to fetch custom anthropic provider id for v0 BYOK feature"""
@@ -116,10 +164,7 @@ class ProviderManager:
     @enforce_types
     def get_anthropic_override_key(self) -> Optional[str]:
         """Helper function to fetch custom anthropic key for v0 BYOK feature"""
-        anthropic_provider = [provider for provider in self.list_providers() if provider.name == "anthropic"]
-        if len(anthropic_provider) != 0:
-            return anthropic_provider[0].api_key
-        return None
+        return self._get_override_key("anthropic")
 
     @enforce_types
     def get_gemini_override_provider_id(self) -> Optional[str]:
@@ -132,10 +177,7 @@ class ProviderManager:
     @enforce_types
     def get_gemini_override_key(self) -> Optional[str]:
         """Helper function to fetch custom gemini key for v0 BYOK feature"""
-        gemini_provider = [provider for provider in self.list_providers() if provider.name == "google_ai"]
-        if len(gemini_provider) != 0:
-            return gemini_provider[0].api_key
-        return None
+        return self._get_override_key("google_ai")
 
     @enforce_types
     def get_openai_override_provider_id(self) -> Optional[str]:
@@ -148,10 +190,7 @@ class ProviderManager:
     @enforce_types
     def get_openai_override_key(self) -> Optional[str]:
         """Helper function to fetch custom openai key for v0 BYOK feature"""
-        openai_provider = [provider for provider in self.list_providers() if provider.name == "openai"]
-        if len(openai_provider) != 0:
-            return openai_provider[0].api_key
-        return None
+        return self._get_override_key("openai")
 
     @enforce_types
     def get_azure_openai_override_provider_id(self) -> Optional[str]:
@@ -164,7 +203,4 @@ class ProviderManager:
     @enforce_types
     def get_azure_openai_override_key(self) -> Optional[str]:
         """Helper function to fetch custom azure openai key for v0 BYOK feature"""
-        azure_openai_provider = [provider for provider in self.list_providers() if provider.name == "azure_openai"]
-        if len(azure_openai_provider) != 0:
-            return azure_openai_provider[0].api_key
-        return None
\ No newline at end of file
+        return self._get_override_key("azure_openai")
\ No newline at end of file
@@ -2,6 +2,8 @@ import importlib
 import warnings
 from typing import List, Optional
 
+from sqlalchemy import select
+
 from mirix.constants import (
     CORE_MEMORY_TOOLS, BASE_TOOLS, 
     EPISODIC_MEMORY_TOOLS, CHAT_AGENT_TOOLS, EXTRAS_TOOLS,
@@ -14,6 +16,7 @@ from mirix.orm.enums import ToolType
 # TODO: Remove this once we translate all of these to the ORM
 from mirix.orm.errors import NoResultFound
 from mirix.orm.tool import Tool as ToolModel
+from mirix.orm.tools_agents import ToolsAgents
 from mirix.schemas.tool import Tool as PydanticTool
 from mirix.schemas.tool import ToolUpdate
 from mirix.schemas.user import User as PydanticUser
@@ -117,7 +120,9 @@ class ToolManager:
                 tool.json_schema = new_schema
 
             # Save the updated tool to the database
-            return tool.update(db_session=session, actor=actor).to_pydantic()
+            updated_tool = tool.update(db_session=session, actor=actor).to_pydantic()
+            self._invalidate_loaded_agents(self._get_agent_ids_using_tool(session, tool_id))
+            return updated_tool
 
     @enforce_types
     def delete_tool_by_id(self, tool_id: str, actor: PydanticUser) -> None:
@@ -125,9 +130,21 @@ class ToolManager:
         with self.session_maker() as session:
             try:
                 tool = ToolModel.read(db_session=session, identifier=tool_id, actor=actor)
+                agent_ids = self._get_agent_ids_using_tool(session, tool_id)
                 tool.hard_delete(db_session=session, actor=actor)
             except NoResultFound:
                 raise ValueError(f"Tool with id {tool_id} not found.")
+        self._invalidate_loaded_agents(agent_ids)
+
+    def _get_agent_ids_using_tool(self, session, tool_id: str) -> List[str]:
+        return list(session.execute(select(ToolsAgents.agent_id).where(ToolsAgents.tool_id == tool_id)).scalars())
+
+    def _invalidate_loaded_agents(self, agent_ids: List[str]):
+        """Loaded agents keep their tools' source and schemas; make the agents using a changed tool reload."""
+        from mirix.services.agent_manager import _bump_state_version
+
+        for agent_id in agent_ids:
+            _bump_state_version(agent_id)
 
     @enforce_types
     def upsert_base_tools(self, actor: PydanticUser) -> List[PydanticTool]:
@@ -1,5 +1,8 @@
+import threading
 from typing import List, Optional, Tuple
 
+from sqlalchemy import select, update
+
 from mirix.orm.errors import NoResultFound
 from mirix.orm.organization import Organization as OrganizationModel
 from mirix.orm.user import User as UserModel
@@ -9,6 +12,39 @@ from mirix.services.organization_manager import OrganizationManager
 from mirix.utils import enforce_types
 
 
+class _ActiveUserPointer:
+    """
+    Process-wide cache of the active user, shared by every UserManager instance. Any write to the
+    users table through UserManager invalidates it; a lookup that raced with an invalidation is not cached.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._user: Optional[PydanticUser] = None
+        self._generation = 0
+
+    def get(self) -> Tuple[bool, Optional[PydanticUser], int]:
+        with self._lock:
+            return self._loaded, self._user, self._generation
+
+    def set(self, user: Optional[PydanticUser], generation: Optional[int] = None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._loaded = True
+            self._user = user
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded = False
+            self._user = None
+            self._generation += 1
+
+
+_active_user = _ActiveUserPointer()
+
+
 class UserManager:
     """Manager class to handle business logic related to Users."""
 
@@ -39,6 +75,7 @@ class UserManager:
                 # If it doesn't exist, make it
                 user = UserModel(id=self.DEFAULT_USER_ID, name=self.DEFAULT_USER_NAME, status="active", timezone=self.DEFAULT_TIME_ZONE, organization_id=org_id)
                 user.create(session)
+                _active_user.invalidate()
 
             return user.to_pydantic()
 
@@ -48,6 +85,7 @@ class UserManager:
         with self.session_maker() as session:
             new_user = UserModel(**pydantic_user.model_dump())
             new_user.create(session)
+            _active_user.invalidate()
             return new_user.to_pydantic()
 
     @enforce_types
@@ -64,6 +102,7 @@ class UserManager:
 
             # Commit the updated user
             existing_user.update(session)
+            _active_user.invalidate()
             return existing_user.to_pydantic()
 
     @enforce_types
@@ -78,6 +117,7 @@ class UserManager:
 
             # Commit the updated user
             existing_user.update(session)
+            _active_user.invalidate()
             return existing_user.to_pydantic()
 
     @enforce_types
@@ -92,8 +132,49 @@ class UserManager:
 
             # Commit the updated user
             existing_user.update(session)
+            _active_user.invalidate()
             return existing_user.to_pydantic()
 
+    @enforce_types
+    def get_active_user(self) -> Optional[PydanticUser]:
+        """Fetch the user whose status is 'active' (None if there is none), served from a process-wide cache."""
+        loaded, user, generation = _active_user.get()
+        if loaded:
+            return user
+
+        with self.session_maker() as session:
+            query = (
+                select(UserModel)
+                .where(UserModel.status == "active", UserModel.is_deleted == False)
+                .order_by(UserModel.created_at, UserModel.id)
+                .limit(1)
+            )
+            active = session.execute(query).scalar_one_or_none()
+            user = active.to_pydantic() if active else None
+
+        _active_user.set(user, generation)
+        return user
+
+    @enforce_types
+    def set_active_user(self, user_id: str) -> PydanticUser:
+        """Make `user_id` the only active user. Does not touch the database if it already is."""
+        active = self.get_active_user()
+        if active is not None and active.id == user_id:
+            return active
+
+        with self.session_maker() as session:
+            user = UserModel.read(db_session=session, identifier=user_id)
+            session.execute(
+                update(UserModel).where(UserModel.status == "active", UserModel.id != user_id).values(status="inactive")
+            )
+            user.status = "active"
+            user.update(session)
+            user = user.to_pydantic()
+
+        _active_user.invalidate()
+        _active_user.set(user)
+        return user
+
     @enforce_types
     def delete_user_by_id(self, user_id: str):
         """Delete a user and their associated records (agents, sources, mappings)."""
@@ -103,6 +184,7 @@ class UserManager:
             user.hard_delete(session)
 
             session.commit()
+        _active_user.invalidate()
 
     @enforce_types
     def get_user_by_id(self, user_id: str) -> PydanticUser:
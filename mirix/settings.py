@@ -157,6 +157,35 @@ class Settings(BaseSettings):
 
     # event loop parallelism
     event_loop_threadpool_max_workers: int = 43
+    # threads available to async code for blocking DB (service layer) calls
+    db_executor_max_workers: int = 4
+    # separate, smaller pool for the dashboard's /memory/* reads so they never starve chat
+    memory_read_executor_max_workers: int = 4
+    # DB threads for the steps of memory agents dispatched by a fan-out (see mirix/services/db_executor.py)
+    memory_agent_executor_max_workers: int = 6
+    # concurrent requests per /memory/* endpoint; extra requests wait up to the timeout, then get a 503
+    memory_endpoint_max_concurrency: int = 2
+    memory_endpoint_queue_timeout_seconds: float = 10.0
+    # constructed Agent objects kept between steps, per (agent, user); 0 rebuilds the agent on every step
+    loaded_agent_cache_size: int = 64
+    # background jobs (reflexion, memory export/import, ...): jobs run at once, jobs allowed to wait for a
+    # worker (more are rejected), and how often a running job's progress is written to the jobs table
+    job_worker_max_workers: int = 2
+    job_queue_max_pending: int = 32
+    job_progress_min_interval_seconds: float = 1.0
+    # each runner marks its unfinished jobs alive this often; jobs without a heartbeat for the stale period are
+    # failed, since the process running them is gone (other live processes' jobs are never touched)
+    job_heartbeat_interval_seconds: float = 30.0
+    job_stale_after_seconds: float = 120.0
+    # admission control (see mirix/server/admission_control.py): threads per workload class and how many
+    # requests may wait for one; further requests get a 429. The classes are scaled down if, together with the
+    # DB executors and job workers, they need more threads than the DB connection pool has connections.
+    chat_executor_max_workers: int = 8
+    chat_queue_max_length: int = 16
+    memorizing_executor_max_workers: int = 4
+    memorizing_queue_max_length: int = 32
+    admin_executor_max_workers: int = 2
+    admin_queue_max_length: int = 4
 
     # experimental toggle
     use_experimental: bool = False
@@ -175,6 +204,22 @@ class Settings(BaseSettings):
     enable_batch_job_polling: bool = False
     poll_running_llm_batches_interval_seconds: int = 5 * 60
 
+    # Anthropic Message Batches for the background memory agents (trades minutes of latency for cost/throughput)
+    use_anthropic_batch_for_memory_agents: bool = False
+    # Longest a memory agent's request waits for the other agents of its fan-out before being submitted without them
+    anthropic_batch_collect_window_seconds: float = 30.0
+    anthropic_batch_max_requests: int = 100
+    anthropic_batch_poll_interval_seconds: float = 10.0
+    anthropic_batch_timeout_seconds: int = 60 * 60
+
+    # Record/replay of LLM responses for offline benchmarks and tests (see mirix/llm_api/record_replay_client.py)
+    llm_record_replay_mode: Optional[str] = None  # "record" or "replay"
+    llm_recordings_dir: Optional[Path] = Field(Path.home() / ".mirix" / "llm_recordings", env="MIRIX_LLM_RECORDINGS_DIR")
+    llm_replay_latency_seconds: Optional[float] = None  # fixed simulated latency; None replays the recorded latency
+    llm_replay_latency_scale: float = 1.0
+    # Deterministic local embeddings instead of the configured embedding provider
+    embedding_stand_in: bool = False
+
     @property
     def mirix_pg_uri(self) -> str:
         if self.pg_uri:
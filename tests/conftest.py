@@ -0,0 +1,95 @@
+"""
+Shared fixtures for the provider-free unit tests: an in-memory SQLite database with the full schema and a
+user to act as. Managers are bound to it with `bind_manager`, bypassing their server-wide session maker.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+ORGANIZATION_ID = "org-00000000-0000-4000-8000-000000000000"
+USER_ID = "user-00000000-0000-4000-8000-000000000000"
+
+
+@pytest.fixture
+def session_maker():
+    import mirix.orm  # noqa: F401  (registers every model on the metadata)
+    from mirix.orm.sqlalchemy_base import SqlalchemyBase
+
+    # One shared connection, so every session and thread sees the same in-memory database
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SqlalchemyBase.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def actor(session_maker):
+    from mirix.orm.organization import Organization as OrganizationModel
+    from mirix.orm.user import User as UserModel
+    from mirix.schemas.user import User as PydanticUser
+
+    with session_maker() as session:
+        session.add(OrganizationModel(id=ORGANIZATION_ID, name="test_org"))
+        session.flush()
+        session.add(UserModel(id=USER_ID, name="test_user", organization_id=ORGANIZATION_ID, timezone="UTC", status="active"))
+        session.commit()
+    return PydanticUser(id=USER_ID, name="test_user", organization_id=ORGANIZATION_ID, timezone="UTC")
+
+
+@pytest.fixture
+def bind_manager(session_maker):
+    """Build a manager that uses the test database instead of the server's."""
+
+    def bind(manager_class, **attributes):
+        manager = manager_class.__new__(manager_class)
+        manager.session_maker = session_maker
+        for name, value in attributes.items():
+            setattr(manager, name, value)
+        return manager
+
+    return bind
+
+
+@pytest.fixture
+def memories(session_maker, actor):
+    """Three episodic events and two semantic items of `actor`, plus one soft-deleted episodic event."""
+    from mirix.orm.episodic_memory import EpisodicEvent
+    from mirix.orm.semantic_memory import SemanticMemoryItem
+
+    base_time = datetime(2025, 3, 1, 12, 0, 0)
+    owner = dict(organization_id=actor.organization_id, user_id=actor.id)
+    rows = [
+        EpisodicEvent(
+            id=f"ep_mem-{index:08x}",
+            occurred_at=base_time + timedelta(hours=index),
+            actor="user",
+            event_type="activity",
+            summary=f"event {index}",
+            details=f"details of event {index}",
+            tree_path=["work"],
+            metadata_={"index": index},
+            is_deleted=index == 3,
+            **owner,
+        )
+        for index in range(4)
+    ] + [
+        SemanticMemoryItem(
+            id=f"sem_item-{index:08x}",
+            name=f"concept {index}",
+            summary=f"summary of concept {index}",
+            details=f"details of concept {index}",
+            source="test",
+            tree_path=["knowledge", f"topic {index}"],
+            created_at=base_time + timedelta(hours=index),
+            **owner,
+        )
+        for index in range(2)
+    ]
+    with session_maker() as session:
+        session.add_all(rows)
+        session.commit()
+    return {"episodic": [f"ep_mem-{index:08x}" for index in range(3)], "semantic": [f"sem_item-{index:08x}" for index in range(2)]}
@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+
+from mirix.agent.absorption_pipeline import AbsorptionPipeline
+from mirix.agent.temporary_message_accumulator import TemporaryMessageAccumulator
+
+
+def test_batches_overlap_across_stages_but_keep_their_order():
+    order, dispatch_started, release_dispatch = [], threading.Event(), threading.Event()
+    preprocessed_while_dispatching = threading.Event()
+
+    def preprocess(batch):
+        if dispatch_started.is_set():
+            preprocessed_while_dispatching.set()
+        return batch
+
+    def dispatch(batch):
+        dispatch_started.set()
+        release_dispatch.wait(5)
+        return batch
+
+    pipeline = AbsorptionPipeline(preprocess, dispatch, lambda batch: order.append(batch) or batch, max_in_flight=2)
+    try:
+        first, second = pipeline.submit("first"), pipeline.submit("second")
+        # The second batch is preprocessed while the first one is still with the memory agents
+        assert preprocessed_while_dispatching.wait(5)
+        release_dispatch.set()
+        assert first.result(5) == "first" and second.result(5) == "second"
+        assert order == ["first", "second"]
+        assert pipeline.get_metrics()["completed"] == 2
+    finally:
+        release_dispatch.set()
+        pipeline.shutdown()
+
+
+def test_submit_blocks_once_max_in_flight_batches_are_inside():
+    release = threading.Event()
+    pipeline = AbsorptionPipeline(lambda batch: batch, lambda batch: release.wait(5) and batch, lambda batch: batch, max_in_flight=1)
+    second_submitted = threading.Event()
+    try:
+        pipeline.submit("first")
+
+        def submit_another():
+            pipeline.submit("second")
+            second_submitted.set()
+
+        threading.Thread(target=submit_another, daemon=True).start()
+        time.sleep(0.1)
+        assert not second_submitted.is_set()
+        assert pipeline.get_metrics()["in_flight"] == 1
+
+        release.set()
+        assert second_submitted.wait(5)
+    finally:
+        release.set()
+        pipeline.shutdown()
+
+
+def test_a_failed_stage_fails_the_batch_and_frees_its_slot():
+    def dispatch(batch):
+        raise ValueError("memory agent unavailable")
+
+    pipeline = AbsorptionPipeline(lambda batch: batch, dispatch, lambda batch: batch, max_in_flight=1)
+    try:
+        with pytest.raises(ValueError):
+            pipeline.submit("first").result(5)
+        with pytest.raises(ValueError):
+            pipeline.submit("second").result(5)
+        metrics = pipeline.get_metrics()
+        assert metrics["failed"] == 2 and metrics["in_flight"] == 0
+    finally:
+        pipeline.shutdown()
+
+
+def test_content_is_split_into_consecutive_runs_per_user():
+    items = [(1, {"user_id": "a"}), (2, {"user_id": "a"}), (3, {}), (4, {"user_id": "b"}), (5, {"user_id": "a"})]
+
+    batches = TemporaryMessageAccumulator._split_by_user(items, default_user_id="b")
+
+    assert [(user_id, [timestamp for timestamp, _ in content]) for user_id, content in batches] == [
+        ("a", [1, 2]), ("b", [3, 4]), ("a", [5]),
+    ]
+    # An empty absorption still runs once, for the default user
+    assert TemporaryMessageAccumulator._split_by_user([], default_user_id="b") == [("b", [])]
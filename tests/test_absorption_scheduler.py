@@ -0,0 +1,75 @@
+import time
+
+from mirix.agent.absorption_scheduler import AdaptiveAbsorptionScheduler
+
+
+def make_scheduler(**overrides):
+    config = {"message_limit": 3, "token_budget": 1000, "max_age_seconds": 60, "idle_gap_seconds": 10}
+    config.update(overrides)
+    return AdaptiveAbsorptionScheduler(**config)
+
+
+def text_items(*messages):
+    return [(index, {"message": message}) for index, message in enumerate(messages)]
+
+
+def test_each_trigger_fires_in_priority_order():
+    scheduler = make_scheduler()
+    now = time.monotonic()
+
+    assert scheduler.evaluate([]) is None
+    assert scheduler.evaluate(text_items("a")) is None
+    assert scheduler.evaluate(text_items("a", "b", "c")) == "count"
+    assert scheduler.evaluate(text_items("x" * 4000)) == "token_budget"
+    assert scheduler.evaluate(text_items("a"), oldest_received_at=now - 61) == "max_age"
+
+    scheduler.record_arrival()
+    scheduler._last_arrival -= 11
+    assert scheduler.evaluate(text_items("a"), oldest_received_at=now) == "idle_gap"
+    # The count limit wins over the age and idle triggers
+    assert scheduler.evaluate(text_items("a", "b", "c"), oldest_received_at=now - 61) == "count"
+
+
+def test_disabled_triggers_never_fire():
+    scheduler = make_scheduler(token_budget=0, max_age_seconds=0, idle_gap_seconds=0)
+    scheduler.record_arrival()
+    scheduler._last_arrival -= 1000
+
+    assert scheduler.evaluate(text_items("x" * 40000), oldest_received_at=time.monotonic() - 1000) is None
+    assert scheduler.seconds_until_next_check(time.monotonic()) is None
+
+
+def test_token_estimate_counts_images_and_audio():
+    class Segment:
+        duration_seconds = 2
+
+    text_only = AdaptiveAbsorptionScheduler.estimate_item_tokens({"message": "x" * 40})
+    with_media = AdaptiveAbsorptionScheduler.estimate_item_tokens(
+        {"message": "x" * 40, "image_uris": ["a", "b"], "audio_segments": [Segment(), "raw base64"]}
+    )
+    assert text_only == 10
+    assert with_media > text_only
+
+
+def test_next_check_is_the_earliest_age_or_idle_deadline():
+    scheduler = make_scheduler(max_age_seconds=60, idle_gap_seconds=10)
+    assert scheduler.seconds_until_next_check() is None
+
+    scheduler.record_arrival()
+    assert 9 < scheduler.seconds_until_next_check(time.monotonic()) <= 10
+    assert 4 < scheduler.seconds_until_next_check(time.monotonic() - 55) <= 5
+    assert scheduler.seconds_until_next_check(time.monotonic() - 120) == 0.0
+
+
+def test_metrics_record_triggers_and_batch_sizes():
+    scheduler = make_scheduler()
+    scheduler.evaluate(text_items("a", "b", "c"))
+    scheduler.evaluate(text_items("a", "b", "c", "d", "e"))
+    scheduler.evaluate(text_items("a"))
+    scheduler.record_forced(2)
+
+    metrics = scheduler.get_metrics()
+    assert metrics["evaluations"] == 3
+    assert metrics["triggers"]["count"] == 2 and metrics["triggers"]["forced"] == 1
+    assert metrics["avg_batch_size"] == {"count": 4.0, "forced": 2.0}
+    assert metrics["last_decision"]["trigger"] is None and metrics["last_decision"]["ready_messages"] == 1
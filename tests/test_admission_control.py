@@ -0,0 +1,118 @@
+import asyncio
+import contextvars
+import threading
+
+import pytest
+
+from mirix.server.admission_control import AdmissionController, OverloadedError, WorkloadExecutor
+
+
+def test_rejects_beyond_workers_and_queue():
+    workload = WorkloadExecutor("chat", max_workers=1, max_queued=1)
+    try:
+        first = workload.admit()
+        second = workload.admit()
+        with pytest.raises(OverloadedError) as excinfo:
+            workload.admit()
+        assert excinfo.value.retry_after >= 1
+        assert workload.get_metrics()["rejected"] == 1
+
+        first.release()
+        second.release()
+        workload.admit().release()
+        assert workload.admitted == 0
+    finally:
+        workload.shutdown()
+
+
+def test_slot_is_held_until_the_work_finishes():
+    workload = WorkloadExecutor("chat", max_workers=1, max_queued=0)
+    started = threading.Event()
+    finish = threading.Event()
+
+    def work():
+        started.set()
+        finish.wait(5)
+        return "done"
+
+    async def abandon():
+        admission = workload.admit()
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(admission.run(work), timeout=0.1)
+        # The caller stopped waiting, but the worker is still busy with its request
+        assert started.is_set()
+        with pytest.raises(OverloadedError):
+            workload.admit()
+        admission.release()  # no-op once the work was submitted
+        assert workload.admitted == 1
+
+    try:
+        asyncio.run(abandon())
+        finish.set()
+        workload._executor.shutdown(wait=True)
+        assert workload.admitted == 0
+        assert workload.get_metrics()["completed"] == 1
+    finally:
+        finish.set()
+        workload.shutdown()
+
+
+def test_run_returns_the_result_and_preserves_context_variables():
+    request_user = contextvars.ContextVar("request_user", default=None)
+    controller = AdmissionController()
+
+    async def handle():
+        request_user.set("user-1")
+        return await controller.run("admin", lambda: (request_user.get(), threading.current_thread().name))
+
+    try:
+        user, thread_name = asyncio.run(handle())
+        assert user == "user-1"
+        assert thread_name.startswith("mirix_admin")
+        with pytest.raises(ValueError):
+            controller.admit("unknown")
+    finally:
+        controller.shutdown()
+
+
+def test_async_run_holds_the_slot_until_the_coroutine_ends():
+    workload = WorkloadExecutor("chat", max_workers=1, max_queued=0)
+
+    async def step():
+        await asyncio.sleep(0)
+        return threading.current_thread() is threading.main_thread()
+
+    async def handle():
+        admission = workload.admit()
+        task = asyncio.create_task(admission.run_async(step))
+        await asyncio.sleep(0)
+        # The running coroutine counts against the class without taking a worker thread
+        with pytest.raises(OverloadedError):
+            workload.admit()
+        assert workload.get_metrics()["running"] == 1
+        assert await task
+
+        # A cancelled request gives its slot back
+        admission = workload.admit()
+        task = asyncio.create_task(admission.run_async(asyncio.sleep, 5))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    try:
+        asyncio.run(handle())
+        assert workload.admitted == 0 and workload.running == 0
+        assert workload.get_metrics()["completed"] == 2
+    finally:
+        workload.shutdown()
+
+
+def test_pools_are_scaled_into_the_connection_budget():
+    controller = AdmissionController(connection_budget=3)
+    try:
+        workers = {name: workload.max_workers for name, workload in controller.workloads.items()}
+        assert sum(workers.values()) <= 3
+        assert all(count >= 1 for count in workers.values())
+    finally:
+        controller.shutdown()
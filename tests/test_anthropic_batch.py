@@ -0,0 +1,115 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from mirix.llm_api.anthropic_batch import AnthropicBatchCoordinator
+
+
+class FakeBatchClient:
+    """Stands in for AnthropicClient: records each submitted batch and answers every request with its messages."""
+
+    def __init__(self, fail_ids=()):
+        self.llm_config = None
+        self.batches = []
+        self.fail_ids = set(fail_ids)
+        self._results = {}
+        self.beta = SimpleNamespace(messages=SimpleNamespace(batches=self))
+
+    async def send_llm_batch_request_async(self, agent_messages_mapping, agent_tools_mapping, agent_llm_config_mapping, agent_force_tool_call_mapping):
+        batch_id = f"batch-{len(self.batches)}"
+        self.batches.append(sorted(messages for messages in agent_messages_mapping.values()))
+        self._results[batch_id] = agent_messages_mapping
+        return SimpleNamespace(id=batch_id, processing_status="in_progress")
+
+    def _get_anthropic_client(self, async_client):
+        return self
+
+    def retrieve(self, batch_id):
+        return SimpleNamespace(id=batch_id, processing_status="ended")
+
+    def results(self, batch_id):
+        for custom_id, messages in self._results[batch_id].items():
+            if messages in self.fail_ids:
+                yield SimpleNamespace(custom_id=custom_id, result=SimpleNamespace(type="errored", error="overloaded"))
+            else:
+                message = SimpleNamespace(model_dump=lambda messages=messages: {"content": messages})
+                yield SimpleNamespace(custom_id=custom_id, result=SimpleNamespace(type="succeeded", message=message))
+
+    def cancel(self, batch_id):
+        pass
+
+
+def make_coordinator(**overrides):
+    config = {"collect_window_seconds": 5, "max_batch_size": 10, "poll_interval_seconds": 0.01, "timeout_seconds": 5}
+    config.update(overrides)
+    return AnthropicBatchCoordinator(**config)
+
+
+def run_group(coordinator, client, members):
+    """Dispatch `members` (name, delay) as one group; a name of None finishes without calling the model."""
+    group, results, threads = coordinator.group(len(members)), {}, []
+
+    def member(name, delay):
+        time.sleep(delay)
+        if name is not None:
+            results[name] = coordinator.submit(client, name)["content"]
+
+    for name, delay in members:
+        threads.append(threading.Thread(target=group.run, args=(member, name, delay)))
+        threads[-1].start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def test_a_group_shares_one_batch_and_each_member_gets_its_own_result():
+    coordinator, client = make_coordinator(), FakeBatchClient()
+
+    start = time.monotonic()
+    results = run_group(coordinator, client, [("episodic", 0.0), ("semantic", 0.05), ("core", 0.1), (None, 0.02)])
+
+    assert client.batches == [["core", "episodic", "semantic"]]
+    assert results == {"episodic": "episodic", "semantic": "semantic", "core": "core"}
+    # The group was complete well before the collect window ran out
+    assert time.monotonic() - start < 2
+    assert coordinator.get_metrics()["requests_submitted"] == 3
+
+
+def test_requests_outside_a_group_are_submitted_right_away():
+    coordinator, client = make_coordinator(), FakeBatchClient()
+
+    assert coordinator.submit(client, "chat")["content"] == "chat"
+    assert coordinator.submit(client, "chat again")["content"] == "chat again"
+    assert client.batches == [["chat"], ["chat again"]]
+
+
+def test_a_failed_entry_fails_only_its_own_request():
+    coordinator, client = make_coordinator(), FakeBatchClient(fail_ids={"semantic"})
+    group, errors, results = coordinator.group(2), [], {}
+
+    def member(name):
+        try:
+            results[name] = coordinator.submit(client, name)["content"]
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=group.run, args=(member, name)) for name in ("episodic", "semantic")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == {"episodic": "episodic"}
+    assert len(errors) == 1 and "errored" in errors[0]
+    assert coordinator.get_metrics()["requests_failed"] == 1
+
+
+def test_a_batch_that_never_ends_times_out():
+    client = FakeBatchClient()
+    client.retrieve = lambda batch_id: SimpleNamespace(id=batch_id, processing_status="in_progress")
+    coordinator = make_coordinator(timeout_seconds=0.05)
+
+    with pytest.raises(TimeoutError):
+        coordinator.submit(client, "episodic")
@@ -0,0 +1,38 @@
+from mirix.llm_api.anthropic_client import AnthropicClient, build_cacheable_system_blocks
+
+
+def make_tools(*names):
+    return [
+        {"name": name, "description": f"The {name} tool.", "parameters": {"type": "object", "properties": {}, "required": []}}
+        for name in names
+    ]
+
+
+def test_cache_breakpoint_follows_core_memory():
+    system = "You are MIRIX.\n<core_memory>\nhuman: likes tea\n</core_memory>\nCurrent time: 10:42"
+
+    blocks = build_cacheable_system_blocks(system)
+
+    assert blocks == [
+        {"type": "text", "text": "You are MIRIX.\n<core_memory>\nhuman: likes tea\n</core_memory>", "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": "\nCurrent time: 10:42"},
+    ]
+    assert "".join(block["text"] for block in blocks) == system
+
+
+def test_prompt_without_a_volatile_part_is_one_cached_block():
+    with_core_memory = "You are MIRIX.\n<core_memory></core_memory>\n  "
+    assert len(build_cacheable_system_blocks(with_core_memory)) == 1
+    assert build_cacheable_system_blocks("You are MIRIX.") == [
+        {"type": "text", "text": "You are MIRIX.", "cache_control": {"type": "ephemeral"}}
+    ]
+
+
+def test_tools_are_sorted_and_cached_as_one_block():
+    client = AnthropicClient.__new__(AnthropicClient)
+
+    compiled = client.compile_tools(make_tools("search", "answer", "lookup"), None, False)
+
+    assert [tool["name"] for tool in compiled] == ["answer", "lookup", "search"]
+    assert [tool.get("cache_control") for tool in compiled] == [None, None, {"type": "ephemeral"}]
+    assert client.compile_tools(make_tools("search", "answer"), "answer", False)[0]["name"] == "answer"
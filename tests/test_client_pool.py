@@ -0,0 +1,60 @@
+import asyncio
+import threading
+
+from mirix.llm_api import client_pool
+from mirix.llm_api.client_pool import ProviderClientPool
+
+
+class FakeClient:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_clients_are_reused_and_least_recently_used_are_closed():
+    pool = ProviderClientPool(max_size=2)
+    first = pool.get_or_create(("openai", "a"), FakeClient)
+    second = pool.get_or_create(("openai", "b"), FakeClient)
+
+    assert pool.get_or_create(("openai", "a"), FakeClient) is first
+    pool.get_or_create(("openai", "c"), FakeClient)
+    assert second.closed and not first.closed
+    assert pool.stats() == {"size": 2, "hits": 1, "misses": 3}
+
+    pool.clear()
+    assert first.closed and pool.stats()["size"] == 0
+
+
+def test_racing_threads_share_the_first_stored_client():
+    pool = ProviderClientPool()
+    barrier = threading.Barrier(8)
+    results = []
+
+    def get():
+        barrier.wait()
+        results.append(pool.get_or_create(("openai", "a"), FakeClient))
+
+    threads = [threading.Thread(target=get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert len({id(client) for client in results}) == 1
+    assert pool.stats()["size"] == 1
+
+
+def test_async_clients_are_dropped_with_their_loop(monkeypatch):
+    pool = ProviderClientPool()
+    monkeypatch.setattr(client_pool, "_pool", pool)
+
+    async def get():
+        return pool.get_or_create(("openai", "a", "async", client_pool._loop_key()), FakeClient)
+
+    first = asyncio.run(get())
+    assert pool.stats()["size"] == 1
+    # A new loop gets its own client and the closed loop's client is forgotten
+    second = asyncio.run(get())
+    assert second is not first
+    assert pool.stats()["size"] == 1
@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import event
+
+from mirix.agent.upload_manager import UploadManager
+from mirix.orm.cloud_file_mapping import CloudFileMapping
+from mirix.services.cloud_file_mapping_manager import CloudFileMappingManager
+
+
+@pytest.fixture
+def mappings(bind_manager, session_maker, actor):
+    """Mappings of three uploaded screenshots; the last one is soft-deleted."""
+    with session_maker() as session:
+        for index in range(3):
+            session.add(CloudFileMapping(
+                id=f"cloud_map-{index}",
+                cloud_file_id=f"files/cloud-{index}",
+                local_file_id=f"/tmp/screenshot-{index}.png",
+                status="uploaded",
+                timestamp=f"2025-03-01 12:0{index}:00",
+                is_deleted=index == 2,
+                organization_id=actor.organization_id,
+                user_id=actor.id,
+            ))
+        session.commit()
+    return bind_manager(CloudFileMappingManager)
+
+
+def record_statements(manager):
+    engine = manager.session_maker.kw["bind"]
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_check_many_existing_returns_the_known_ids_in_one_query(mappings):
+    statements = record_statements(mappings)
+
+    existing = mappings.check_many_existing(
+        cloud_file_ids=["files/cloud-0", "files/cloud-2", "files/unknown"],
+        local_file_ids=["/tmp/screenshot-1.png", "/tmp/screenshot-2.png", "files/cloud-1"],
+    )
+
+    assert existing == {"files/cloud-0", "/tmp/screenshot-1.png"}
+    assert len(statements) == 1
+    assert mappings.check_many_existing() == set()
+    assert mappings.check_many_existing(local_file_ids=[]) == set()
+
+
+def test_upload_of_several_files_looks_up_their_mappings_once(mappings):
+    server = type("Server", (), {"cloud_file_mapping_manager": mappings})()
+    upload_manager = UploadManager.__new__(UploadManager)
+    upload_manager.client = type("Client", (), {"server": server})()
+    started = []
+    upload_manager.upload_file_async = lambda filename, timestamp, compress=True, check_existing=True: started.append((filename, check_existing))
+
+    upload_manager.upload_files_async(["/tmp/screenshot-0.png", "/tmp/screenshot-new.png"], "2025-03-01 12:00:00")
+
+    assert started == [("/tmp/screenshot-0.png", True), ("/tmp/screenshot-new.png", False)]
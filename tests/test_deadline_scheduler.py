@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+from mirix.agent.deadline_scheduler import DeadlineScheduler
+
+
+def test_deadlines_fire_in_deadline_order_on_one_thread():
+    scheduler = DeadlineScheduler(name="test_order")
+    fired, threads, done = [], set(), threading.Event()
+
+    def record(label):
+        def callback():
+            fired.append(label)
+            threads.add(threading.current_thread().name)
+            if len(fired) == 3:
+                done.set()
+        return callback
+
+    try:
+        scheduler.schedule(0.15, record("late"))
+        scheduler.schedule(0.05, record("early"))
+        # An earlier deadline scheduled later still wakes the worker in time
+        scheduler.schedule(0.0, record("now"))
+        assert done.wait(5)
+        assert fired == ["now", "early", "late"]
+        assert threads == {"test_order"}
+        assert scheduler.pending_count() == 0
+    finally:
+        scheduler.shutdown()
+
+
+def test_cancelled_deadlines_do_not_fire():
+    scheduler = DeadlineScheduler(name="test_cancel")
+    fired, done = [], threading.Event()
+    try:
+        handle = scheduler.schedule(0.05, lambda: fired.append("cancelled"))
+        scheduler.schedule(0.1, done.set)
+        assert scheduler.cancel(handle)
+        assert not scheduler.cancel(handle)
+        assert scheduler.pending_count() == 1
+
+        assert done.wait(5)
+        assert fired == []
+        # A handle that already fired cannot be cancelled
+        fired_handle = scheduler.schedule(0.0, lambda: fired.append("fired"))
+        time.sleep(0.1)
+        assert fired == ["fired"] and not scheduler.cancel(fired_handle)
+    finally:
+        scheduler.shutdown()
+
+
+def test_failing_callback_does_not_stop_the_worker():
+    scheduler = DeadlineScheduler(name="test_errors")
+    done = threading.Event()
+    try:
+        scheduler.schedule(0.0, lambda: 1 / 0)
+        scheduler.schedule(0.02, done.set)
+        assert done.wait(5)
+    finally:
+        scheduler.shutdown()
+
+
+def test_shutdown_discards_pending_deadlines():
+    scheduler = DeadlineScheduler(name="test_shutdown")
+    fired = []
+    scheduler.schedule(0.05, lambda: fired.append("pending"))
+    scheduler.shutdown()
+
+    time.sleep(0.1)
+    assert fired == [] and scheduler.pending_count() == 0
+    with pytest.raises(RuntimeError):
+        scheduler.schedule(0.0, lambda: None)
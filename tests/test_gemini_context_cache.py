@@ -0,0 +1,81 @@
+from mirix.llm_api import gemini_context_cache
+from mirix.llm_api.gemini_context_cache import GeminiContextCacheManager
+
+BASE_URL = "https://generativelanguage.googleapis.com"
+
+
+def file_part(uri):
+    return {"file_data": {"mime_type": "image/png", "file_uri": uri}}
+
+
+def make_request(*uris):
+    return {
+        "contents": [
+            {"role": "user", "parts": [{"text": "Screenshots:"}, *[file_part(uri) for uri in uris]]},
+            {"role": "model", "parts": [{"text": "Noted."}]},
+        ],
+        "tools": [{"function_declarations": [{"name": "episodic_memory_insert"}]}],
+        "tool_config": {"function_calling_config": {"mode": "ANY"}},
+        "generation_config": {"temperature": 0.0},
+    }
+
+
+class FakeSession:
+    def __init__(self):
+        self.bodies = []
+
+    def post(self, url, headers, json):
+        self.bodies.append(json)
+        name = f"cachedContents/entry-{len(self.bodies)}"
+        return type("Response", (), {"raise_for_status": lambda self: None, "json": lambda self: {"name": name}})()
+
+
+def test_request_references_the_cached_screenshots():
+    request = make_request("files/a", "files/b")
+
+    rewritten = GeminiContextCacheManager._rewrite_request(request, "cachedContents/abc")
+
+    assert rewritten["cached_content"] == "cachedContents/abc"
+    assert "tools" not in rewritten and "tool_config" not in rewritten
+    assert rewritten["generation_config"] == {"temperature": 0.0}
+    assert rewritten["contents"][0]["parts"] == [
+        {"text": "Screenshots:"},
+        {"text": "[Screenshot 0: provided at the beginning of the conversation]"},
+        {"text": "[Screenshot 1: provided at the beginning of the conversation]"},
+    ]
+    assert rewritten["contents"][1] == request["contents"][1]
+    # The original request is left untouched
+    assert request["contents"][0]["parts"][1] == file_part("files/a")
+
+
+def test_entries_are_shared_per_batch_and_released_with_their_files(monkeypatch):
+    manager, session, deleted = GeminiContextCacheManager(min_tokens=0), FakeSession(), []
+    monkeypatch.setattr(gemini_context_cache.requests, "delete", lambda url, headers: deleted.append(url))
+
+    first = manager.prepare_request(make_request("files/a", "files/b"), "gemini-2.0-flash", BASE_URL, "key", session)
+    again = manager.prepare_request(make_request("files/a", "files/b"), "gemini-2.0-flash", BASE_URL, "key", session)
+    other = manager.prepare_request(make_request("files/c"), "gemini-2.0-flash", BASE_URL, "key", session)
+
+    assert first["cached_content"] == again["cached_content"] == "cachedContents/entry-1"
+    assert other["cached_content"] == "cachedContents/entry-2"
+    assert session.bodies[0]["tools"] and session.bodies[0]["ttl"] == f"{manager.ttl_seconds}s"
+
+    manager.release_files(["files/b"])
+
+    assert deleted == [f"{BASE_URL}/v1beta/cachedContents/entry-1"]
+    assert manager.get_metrics() == {"active_entries": 1, "created": 2, "reused": 1, "failed": 0, "released": 1}
+
+
+def test_small_or_uncacheable_batches_are_sent_unchanged():
+    class FailingSession:
+        def post(self, url, headers, json):
+            raise RuntimeError("content is below the minimum cacheable size")
+
+    request = make_request("files/a")
+    assert GeminiContextCacheManager(min_tokens=10**6).prepare_request(request, "gemini-2.0-flash", BASE_URL, "key") is request
+
+    manager = GeminiContextCacheManager(min_tokens=0)
+    assert manager.prepare_request(request, "gemini-2.0-flash", BASE_URL, "key", FailingSession()) is request
+    # The failure is remembered for the batch instead of being retried on every call
+    assert manager.prepare_request(request, "gemini-2.0-flash", BASE_URL, "key", FailingSession()) is request
+    assert manager.get_metrics()["failed"] == 1
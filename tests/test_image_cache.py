@@ -0,0 +1,54 @@
+import base64
+import os
+
+from mirix.llm_api import image_cache
+from mirix.llm_api.image_cache import ImageEncodingCache, encode_file_base64
+
+
+def test_least_recently_used_entries_are_evicted_by_count():
+    cache = ImageEncodingCache(max_bytes=1000, max_entries=2)
+    cache.put(("a",), "aaaa")
+    cache.put(("b",), "bbbb")
+    assert cache.get(("a",)) == "aaaa"
+    cache.put(("c",), "cccc")
+
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) == "aaaa" and cache.get(("c",)) == "cccc"
+    assert cache.stats()["entries"] == 2
+
+
+def test_entries_are_evicted_to_stay_within_the_byte_budget():
+    cache = ImageEncodingCache(max_bytes=10, max_entries=10)
+    cache.put(("a",), "a" * 4)
+    cache.put(("b",), "b" * 4)
+    cache.put(("c",), "c" * 4)
+    assert cache.get(("a",)) is None
+    assert cache.stats()["bytes"] == 8
+
+    # Replacing an entry does not count its old payload twice
+    cache.put(("b",), "b" * 6)
+    assert cache.stats()["bytes"] == 10 and cache.stats()["entries"] == 2
+
+    # A payload larger than the whole budget is not cached and evicts nothing
+    cache.put(("huge",), "x" * 11)
+    assert cache.get(("huge",)) is None
+    assert cache.stats()["entries"] == 2
+
+    cache.clear()
+    assert cache.stats()["entries"] == 0 and cache.stats()["bytes"] == 0
+
+
+def test_files_are_encoded_once_until_they_change(monkeypatch, tmp_path):
+    cache = ImageEncodingCache()
+    monkeypatch.setattr(image_cache, "_cache", cache)
+    path = tmp_path / "screenshot.png"
+    path.write_bytes(b"first")
+
+    assert encode_file_base64(str(path)) == base64.b64encode(b"first").decode()
+    assert encode_file_base64(str(path)) == base64.b64encode(b"first").decode()
+    assert cache.stats()["hits"] == 1
+
+    path.write_bytes(b"second!")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert encode_file_base64(str(path)) == base64.b64encode(b"second!").decode()
@@ -0,0 +1,168 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from mirix.orm.job import Job as JobModel
+from mirix.schemas.enums import JobStatus
+from mirix.services.job_manager import JobManager
+from mirix.services.job_runner import JobQueueFullError, JobRunner
+
+
+def wait_for_status(job_manager, job_id, statuses, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = job_manager.get_job(job_id)
+        if job.status in statuses:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"Job {job_id} did not reach {statuses}, last status {job.status}")
+
+
+@pytest.fixture
+def session_maker(tmp_path):
+    import mirix.orm  # noqa: F401  (registers every model on the metadata)
+    from mirix.orm.sqlalchemy_base import SqlalchemyBase
+
+    # A database file rather than the shared in-memory connection: the heartbeat and worker threads write at the
+    # same time as the test, and SQLite cannot interleave transactions on one connection
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False})
+    SqlalchemyBase.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def job_manager(bind_manager):
+    return bind_manager(JobManager)
+
+
+@pytest.fixture
+def runner(job_manager):
+    runner = JobRunner(job_manager, max_workers=1, max_pending=1, progress_interval=0, heartbeat_interval=0.05, stale_after=0.5)
+    yield runner
+    runner.shutdown()
+
+
+def test_job_completes_with_its_result_and_progress(runner, job_manager, actor):
+    def work(context):
+        context.report_progress({"done": 1, "total": 2})
+        return {"exported": 2}
+
+    job = runner.submit("export", work, actor=actor, params={"format": "jsonl"})
+    assert job.owner == runner.owner
+
+    job = wait_for_status(job_manager, job.id, (JobStatus.completed,))
+    assert job.result == {"exported": 2}
+    assert job.progress == {"done": 1, "total": 2}
+    assert job.params == {"format": "jsonl"}
+
+
+def test_failed_job_records_the_error(runner, job_manager, actor):
+    def work(context):
+        raise ValueError("bad input")
+
+    job = wait_for_status(job_manager, runner.submit("import", work, actor=actor).id, (JobStatus.failed,))
+    assert job.error == "bad input"
+
+
+def test_running_job_is_cancelled_at_its_next_progress_report(runner, job_manager, actor):
+    started = threading.Event()
+
+    def work(context):
+        started.set()
+        while True:
+            context.report_progress({"step": "waiting"})
+            time.sleep(0.01)
+
+    job = runner.submit("reflexion", work, actor=actor)
+    assert started.wait(5)
+    runner.cancel(job.id, actor=actor)
+    wait_for_status(job_manager, job.id, (JobStatus.cancelled,))
+
+
+def test_queue_full_and_pending_cancel(runner, job_manager, actor):
+    release = threading.Event()
+    running = runner.submit("reflexion", lambda context: release.wait(5) and None, actor=actor)
+    wait_for_status(job_manager, running.id, (JobStatus.running,))
+
+    waiting = runner.submit("reflexion", lambda context: {"ran": True}, actor=actor)
+    with pytest.raises(JobQueueFullError):
+        runner.submit("reflexion", lambda context: None, actor=actor)
+
+    # A job waiting for a worker is cancelled right away and never runs
+    assert runner.cancel(waiting.id, actor=actor).status == JobStatus.cancelled
+    release.set()
+    wait_for_status(job_manager, running.id, (JobStatus.completed,))
+    time.sleep(0.1)
+    assert job_manager.get_job(waiting.id).status == JobStatus.cancelled
+    assert job_manager.get_job(waiting.id).result is None
+
+
+def test_only_stale_jobs_of_other_runners_are_failed(runner, job_manager, session_maker, actor):
+    release = threading.Event()
+    live = runner.submit("reflexion", lambda context: release.wait(5) and None, actor=actor)
+    wait_for_status(job_manager, live.id, (JobStatus.running,))
+
+    # A job left behind by a runner that stopped heart-beating
+    dead = job_manager.create_job("export", actor=actor, owner="stopped-host:1:deadbeef")
+    with session_maker() as session:
+        session.execute(
+            update(JobModel).where(JobModel.id == dead.id).values(heartbeat_at=datetime.now(timezone.utc) - timedelta(seconds=5))
+        )
+        session.commit()
+
+    other_runner = JobRunner(job_manager, heartbeat_interval=0.05, stale_after=0.5)
+    try:
+        assert other_runner.start() == 1
+        time.sleep(0.7)  # longer than stale_after: the live job is kept fresh by its runner's heartbeat
+        assert job_manager.get_job(dead.id).status == JobStatus.failed
+        assert job_manager.get_job(live.id).status == JobStatus.running
+    finally:
+        other_runner.shutdown()
+        release.set()
+    wait_for_status(job_manager, live.id, (JobStatus.completed,))
+
+
+def test_reflexion_job_stops_between_agent_calls(runner, job_manager, actor):
+    import logging
+    from types import SimpleNamespace
+
+    from mirix.agent.agent_wrapper import AgentWrapper
+
+    calls, submitted = [], {}
+
+    class FakeQueue:
+        def send_message_in_queue(self, client, agent_id, kwargs, agent_type):
+            calls.append(agent_type)
+            if len(calls) == 2:
+                runner.cancel(submitted["job"].id, actor=actor)
+            return "done", None
+
+    wrapper = AgentWrapper.__new__(AgentWrapper)
+    wrapper.logger = logging.getLogger("test_reflexion")
+    wrapper.client = None
+    wrapper.message_queue = FakeQueue()
+    wrapper.agent_states = SimpleNamespace(**{
+        f"{name}_state": SimpleNamespace(id=f"agent-{name}")
+        for name in ("episodic_memory_agent", "semantic_memory_agent", "core_memory_agent", "resource_memory_agent",
+                     "procedural_memory_agent", "knowledge_vault_agent", "reflexion_agent", "meta_memory_agent")
+    })
+
+    release = threading.Event()
+    submitted["job"] = runner.submit(
+        "reflexion",
+        lambda context: release.wait(5) and wrapper.reflexion_on_memory(
+            user_id=actor.id, progress_callback=lambda progress: context.report_progress(progress, force=True)
+        ),
+        actor=actor,
+    )
+    release.set()
+    job = wait_for_status(job_manager, submitted["job"].id, (JobStatus.cancelled, JobStatus.completed, JobStatus.failed))
+
+    assert job.status == JobStatus.cancelled
+    assert calls == ["episodic_memory", "semantic_memory"]
+    assert job.progress == {"phase": "redundancy", "step": "core"}
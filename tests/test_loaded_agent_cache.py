@@ -0,0 +1,144 @@
+import threading
+
+import pytest
+
+from mirix.services.loaded_agent_cache import LoadedAgentCache
+
+
+class FakeAgent:
+    def __init__(self, agent_id, state_version=0):
+        self.agent_state = type("AgentState", (), {"id": agent_id})()
+        self._state_version = state_version
+
+    def prepare_for_reuse(self, interface, user):
+        return True
+
+
+def test_checkout_is_exclusive_and_version_checked():
+    cache = LoadedAgentCache(max_size=4)
+    agent = FakeAgent("agent-1")
+    cache.checkin("agent-1", "user-1", 3, agent)
+
+    assert cache.checkout("agent-1", "user-2", 3) is None
+    assert cache.checkout("agent-1", "user-1", 3) is agent
+    # Checked out agents are not handed to a concurrent step
+    assert cache.checkout("agent-1", "user-1", 3) is None
+
+    cache.checkin("agent-1", "user-1", 3, agent)
+    assert cache.checkout("agent-1", "user-1", 4) is None
+    # A stale entry is dropped, not kept for later
+    assert cache.checkout("agent-1", "user-1", 3) is None
+    assert cache.get_metrics() == {"size": 0, "max_size": 4, "hits": 1, "misses": 4}
+
+
+def test_checkin_keeps_the_newest_version_and_evicts_least_recently_used():
+    cache = LoadedAgentCache(max_size=2)
+    newer, older = FakeAgent("agent-1"), FakeAgent("agent-1")
+    cache.checkin("agent-1", "user-1", 2, newer)
+    cache.checkin("agent-1", "user-1", 1, older)
+    assert cache.checkout("agent-1", "user-1", 2) is newer
+
+    for index in range(3):
+        cache.checkin(f"agent-{index}", "user-1", 0, FakeAgent(f"agent-{index}"))
+    assert cache.checkout("agent-0", "user-1", 0) is None
+    assert cache.get_metrics()["size"] == 2
+
+    disabled = LoadedAgentCache(max_size=0)
+    disabled.checkin("agent-1", "user-1", 0, FakeAgent("agent-1"))
+    assert disabled.get_metrics()["size"] == 0
+
+
+def test_invalidate_one_agent_or_all():
+    cache = LoadedAgentCache(max_size=8)
+    for agent_id in ("agent-1", "agent-2"):
+        for actor_id in ("user-1", "user-2"):
+            cache.checkin(agent_id, actor_id, 0, FakeAgent(agent_id))
+
+    cache.invalidate("agent-1")
+    assert cache.get_metrics()["size"] == 2
+    assert cache.checkout("agent-1", "user-1", 0) is None
+    cache.invalidate()
+    assert cache.get_metrics()["size"] == 0
+
+
+def test_concurrent_checkouts_hand_out_an_agent_once():
+    cache = LoadedAgentCache(max_size=4)
+    agent = FakeAgent("agent-1")
+    cache.checkin("agent-1", "user-1", 0, agent)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def checkout():
+        barrier.wait()
+        results.append(cache.checkout("agent-1", "user-1", 0))
+
+    threads = [threading.Thread(target=checkout) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert results.count(agent) == 1 and results.count(None) == 7
+
+
+def test_server_reuses_agents_until_their_state_changes():
+    from mirix.schemas.user import User
+    from mirix.server.server import SyncServer
+    from mirix.services.agent_manager import AgentManager, _bump_state_version
+
+    server = SyncServer.__new__(SyncServer)
+    server.loaded_agent_cache = LoadedAgentCache(max_size=4)
+    server.agent_manager = AgentManager.__new__(AgentManager)
+    server.default_interface_factory = lambda: None
+    actor = User(id="user-00000000-0000-4000-8000-000000000000", name="test_user", organization_id="org-00000000-0000-4000-8000-000000000000", timezone="UTC")
+    agent_id = "agent-00000000-0000-4000-8000-00000000cafe"
+    agent = FakeAgent(agent_id, server.agent_manager.get_state_version(agent_id))
+    server.release_agent(agent, actor=actor)
+
+    with server.loaded_agent(agent_id, actor) as loaded:
+        assert loaded is agent
+
+    # A failed use does not hand the agent back
+    with pytest.raises(RuntimeError):
+        with server.loaded_agent(agent_id, actor):
+            raise RuntimeError("step failed")
+    assert server.loaded_agent_cache.get_metrics()["size"] == 0
+
+    server.release_agent(agent, actor=actor)
+    _bump_state_version(agent_id)
+    assert server.loaded_agent_cache.checkout(agent_id, actor.id, server.agent_manager.get_state_version(agent_id)) is None
+
+
+def test_topic_updates_keep_the_loaded_agent_cached(bind_manager, session_maker, actor):
+    from mirix.orm.agent import Agent as AgentModel
+    from mirix.schemas.agent import UpdateAgent
+    from mirix.schemas.embedding_config import EmbeddingConfig
+    from mirix.schemas.llm_config import LLMConfig
+    from mirix.services.agent_manager import AgentManager
+
+    agent_id = "agent-00000000-0000-4000-8000-00000000beef"
+    with session_maker() as session:
+        session.add(AgentModel(
+            id=agent_id,
+            name="chat_agent",
+            agent_type="chat_agent",
+            system="You are a helpful assistant.",
+            topic="",
+            message_ids=[],
+            llm_config=LLMConfig.default_config("gpt-4o-mini"),
+            embedding_config=EmbeddingConfig.default_config(provider="openai"),
+            organization_id=actor.organization_id,
+        ))
+        session.commit()
+
+    agent_manager = bind_manager(AgentManager)
+    cache = LoadedAgentCache(max_size=4)
+    agent = FakeAgent(agent_id, agent_manager.get_state_version(agent_id))
+    cache.checkin(agent_id, actor.id, agent._state_version, agent)
+
+    # chat_agent and meta_memory_agent store the topic of their inputs on every first step
+    agent_manager.update_topic(agent_id=agent_id, topic="hiking", actor=actor)
+    assert cache.checkout(agent_id, actor.id, agent_manager.get_state_version(agent_id)) is agent
+
+    cache.checkin(agent_id, actor.id, agent._state_version, agent)
+    agent_manager.update_agent(agent_id=agent_id, agent_update=UpdateAgent(system="You are terse."), actor=actor)
+    assert cache.checkout(agent_id, actor.id, agent_manager.get_state_version(agent_id)) is None
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from mirix.server import fastapi_server
+from mirix.settings import settings
+
+
+@pytest.fixture
+def endpoint_limits(monkeypatch):
+    monkeypatch.setattr(fastapi_server, "_memory_endpoint_semaphores", {})
+    monkeypatch.setattr(settings, "memory_endpoint_max_concurrency", 1)
+    monkeypatch.setattr(settings, "memory_endpoint_queue_timeout_seconds", 0.05)
+
+
+def test_requests_beyond_the_limit_get_a_503_once_their_wait_times_out(endpoint_limits):
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold():
+            async with fastapi_server._memory_endpoint_slot("episodic"):
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as excinfo:
+            async with fastapi_server._memory_endpoint_slot("episodic"):
+                pass
+        assert excinfo.value.status_code == 503
+
+        # Every endpoint has its own limit
+        async with fastapi_server._memory_endpoint_slot("semantic"):
+            pass
+
+        release.set()
+        await holder
+        # The slot is given back once the holder finishes
+        async with fastapi_server._memory_endpoint_slot("episodic"):
+            pass
+
+    asyncio.run(scenario())
+
+
+def test_a_queued_request_runs_when_a_slot_frees_up(endpoint_limits, monkeypatch):
+    monkeypatch.setattr(settings, "memory_endpoint_queue_timeout_seconds", 5)
+
+    async def scenario():
+        order = []
+
+        async def request(name, duration):
+            async with fastapi_server._memory_endpoint_slot("episodic"):
+                order.append(name)
+                await asyncio.sleep(duration)
+
+        await asyncio.gather(request("first", 0.05), request("second", 0))
+        return order
+
+    assert asyncio.run(scenario()) == ["first", "second"]
+
+
+def test_failed_load_releases_the_slot(endpoint_limits):
+    async def failing_load():
+        async with fastapi_server._memory_endpoint_slot("episodic"):
+            raise RuntimeError("database unavailable")
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await failing_load()
+        async with fastapi_server._memory_endpoint_slot("episodic"):
+            pass
+
+    asyncio.run(scenario())
@@ -0,0 +1,68 @@
+import csv
+import io
+import json
+import os
+
+import pytest
+
+from mirix.constants import MAX_EMBEDDING_DIM
+from mirix.services.memory_export_manager import MemoryExportManager
+
+
+@pytest.fixture
+def exporter(bind_manager):
+    return bind_manager(MemoryExportManager)
+
+
+def test_jsonl_export_streams_every_live_memory(exporter, actor, memories):
+    counts = {}
+    chunks = exporter.stream_export(actor, format="jsonl", memory_types=["episodic", "semantic"], batch_size=2, exported_counts=counts)
+    records = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+
+    # The soft-deleted event is left out
+    assert counts == {"episodic": 3, "semantic": 2}
+    assert [record["id"] for record in records] == memories["episodic"] + memories["semantic"]
+    assert records[0]["memory_type"] == "episodic"
+    assert records[0]["metadata_"] == {"index": 0}
+    assert not any(key.endswith("_embedding") for key in records[0])
+
+
+def test_csv_export_uses_the_union_of_columns(exporter, actor, memories):
+    data = b"".join(exporter.stream_export(actor, format="csv", memory_types=["episodic", "semantic"])).decode()
+    rows = list(csv.DictReader(io.StringIO(data)))
+
+    assert len(rows) == 5
+    assert list(rows[0])[0] == "memory_type"
+    assert {"occurred_at", "name"} <= set(rows[0])
+    assert json.loads(rows[3]["tree_path"]) == ["knowledge", "topic 0"]
+
+
+def test_parquet_export_with_embeddings(exporter, actor, memories):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    data = b"".join(exporter.stream_export(actor, format="parquet", memory_types=["episodic"], include_embeddings=True, batch_size=2))
+    table = pq.read_table(io.BytesIO(data))
+
+    assert table.num_rows == 3
+    assert table.schema.field("summary_embedding").type.list_size == MAX_EMBEDDING_DIM
+    assert table.column("id").to_pylist() == memories["episodic"]
+
+
+def test_abandoned_export_leaves_no_file(exporter, actor, memories, tmp_path):
+    def abandon(counts):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        exporter.export_to_file(actor, str(tmp_path / "memories.jsonl"), progress_callback=abandon)
+    assert os.listdir(tmp_path) == []
+
+    counts = exporter.export_to_file(actor, str(tmp_path / "memories.jsonl"))
+    assert counts["episodic"] == 3 and counts["resource"] == 0
+    assert os.listdir(tmp_path) == ["memories.jsonl"]
+
+
+def test_invalid_arguments_are_rejected_before_reading(exporter, actor):
+    with pytest.raises(ValueError):
+        exporter.stream_export(actor, format="xml")
+    with pytest.raises(ValueError):
+        exporter.stream_export(actor, memory_types=["dreams"])
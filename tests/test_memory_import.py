@@ -0,0 +1,104 @@
+import json
+
+import pytest
+from sqlalchemy import delete, select
+
+from mirix.orm.episodic_memory import EpisodicEvent
+from mirix.orm.semantic_memory import SemanticMemoryItem
+from mirix.orm.user import User as UserModel
+from mirix.schemas.user import User as PydanticUser
+from mirix.services.memory_export_manager import MemoryExportManager
+from mirix.services.memory_import_manager import MemoryImportManager
+
+
+@pytest.fixture
+def importer(bind_manager):
+    return bind_manager(MemoryImportManager)
+
+
+@pytest.fixture
+def export_file(bind_manager, actor, memories, tmp_path):
+    def export(format="jsonl"):
+        path = tmp_path / f"memories.{format}"
+        bind_manager(MemoryExportManager).export_to_file(actor, str(path), memory_types=["episodic", "semantic"])
+        return str(path)
+
+    return export
+
+
+@pytest.fixture
+def other_user(session_maker, actor):
+    with session_maker() as session:
+        session.add(UserModel(id="user-00000000-0000-4000-8000-000000000001", name="other_user", organization_id=actor.organization_id, timezone="UTC", status="active"))
+        session.commit()
+    return PydanticUser(id="user-00000000-0000-4000-8000-000000000001", name="other_user", organization_id=actor.organization_id, timezone="UTC")
+
+
+def owned_ids(session_maker, model, user):
+    with session_maker() as session:
+        return set(session.execute(select(model.id).where(model.user_id == user.id, model.is_deleted == False)).scalars())
+
+
+def test_export_import_round_trip_restores_the_memories(importer, export_file, session_maker, actor, memories):
+    path = export_file()
+    with session_maker() as session:
+        session.execute(delete(EpisodicEvent))
+        session.execute(delete(SemanticMemoryItem))
+        session.commit()
+
+    progress = importer.import_from_file(actor, path, batch_size=2)
+
+    assert progress["completed"]
+    assert progress["imported"] == {"episodic": 3, "semantic": 2}
+    assert owned_ids(session_maker, EpisodicEvent, actor) == set(memories["episodic"])
+    with session_maker() as session:
+        event = session.get(EpisodicEvent, memories["episodic"][1])
+        assert event.metadata_ == {"index": 1} and event.tree_path == ["work"]
+
+    # Importing the same file again skips the ids that already exist
+    progress = importer.import_from_file(actor, path)
+    assert progress["skipped"] == 5 and progress["imported"] == {"episodic": 0, "semantic": 0}
+
+
+def test_import_into_another_user_with_new_ids(importer, export_file, session_maker, other_user, memories):
+    pytest.importorskip("pyarrow")
+
+    progress = importer.import_from_file(other_user, export_file("parquet"), preserve_ids=False)
+
+    assert progress["imported"] == {"episodic": 3, "semantic": 2}
+    imported = owned_ids(session_maker, EpisodicEvent, other_user)
+    assert len(imported) == 3 and not imported & set(memories["episodic"])
+
+
+def test_interrupted_import_resumes_from_its_checkpoint(importer, session_maker, actor, tmp_path):
+    path = tmp_path / "memories.jsonl"
+    with open(path, "w") as f:
+        for index in range(10):
+            f.write(json.dumps({"memory_type": "semantic", "name": f"concept {index}", "summary": "s", "details": "d", "source": "test", "tree_path": []}) + "\n")
+        f.write("{not json\n")
+        f.write(json.dumps({"memory_type": "dreams"}) + "\n")
+    checkpoint = str(tmp_path / "import.checkpoint.json")
+
+    def crash_after_first_batch(progress):
+        raise RuntimeError("server stopped")
+
+    with pytest.raises(RuntimeError):
+        importer.import_from_file(actor, str(path), checkpoint_path=checkpoint, batch_size=4, preserve_ids=False, progress_callback=crash_after_first_batch)
+    assert len(owned_ids(session_maker, SemanticMemoryItem, actor)) == 4
+
+    progress = importer.import_from_file(actor, str(path), checkpoint_path=checkpoint, batch_size=4, preserve_ids=False)
+
+    assert progress["completed"]
+    assert progress["records_read"] == 12
+    assert progress["imported"] == {"semantic": 10}
+    assert progress["failed"] == 2 and len(progress["errors"]) == 2
+    assert len(owned_ids(session_maker, SemanticMemoryItem, actor)) == 10
+
+
+def test_checkpoint_of_another_file_is_rejected(importer, actor, tmp_path):
+    checkpoint = tmp_path / "import.checkpoint.json"
+    checkpoint.write_text(json.dumps({"file_path": "other.jsonl", "records_read": 3}))
+    (tmp_path / "memories.jsonl").write_text("")
+
+    with pytest.raises(ValueError):
+        importer.import_from_file(actor, str(tmp_path / "memories.jsonl"), checkpoint_path=str(checkpoint))
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from mirix.orm.episodic_memory import EpisodicEvent
+from mirix.services.memory_listing_manager import MemoryListingManager
+
+BASE_TIME = datetime(2025, 3, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def listing(bind_manager):
+    return bind_manager(MemoryListingManager)
+
+
+@pytest.fixture
+def events(session_maker, actor):
+    """25 episodic events; every fifth one shares its timestamp with the previous one."""
+    ids = []
+    with session_maker() as session:
+        for index in range(25):
+            occurred_at = BASE_TIME + timedelta(minutes=index - (1 if index % 5 == 4 else 0))
+            event_id = f"ep_mem-{index:08x}"
+            session.add(
+                EpisodicEvent(
+                    id=event_id,
+                    occurred_at=occurred_at,
+                    actor="user",
+                    event_type="activity",
+                    summary=f"event {index}",
+                    details=f"details of event {index}",
+                    tree_path=["work", "projects"] if index % 2 else ["personal"],
+                    organization_id=actor.organization_id,
+                    user_id=actor.id,
+                )
+            )
+            ids.append(event_id)
+        session.commit()
+    return ids
+
+
+def list_all(listing, actor, **kwargs):
+    items, cursor, pages = [], None, 0
+    while True:
+        page, cursor = listing.list_memories("episodic", actor, cursor=cursor, **kwargs)
+        items.extend(page)
+        pages += 1
+        if cursor is None:
+            return items, pages
+
+
+def test_pages_cover_every_item_once_newest_first(listing, actor, events):
+    items, pages = list_all(listing, actor, limit=4, fields=["occurred_at"])
+
+    assert pages == 7
+    assert set(items[0]) == {"id", "occurred_at"}
+    # Every item exactly once, newest first, with ties on the timestamp broken by id (descending)
+    keys = [(item["occurred_at"], item["id"]) for item in items]
+    assert len(keys) == len(events) == len(set(keys))
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_filters_and_projection(listing, actor, events):
+    items, _ = list_all(listing, actor, limit=10, fields=["tree_path"], tree_path_prefix=["work"])
+    assert len(items) == 12
+    assert all(item["tree_path"][0] == "work" for item in items)
+
+    items, _ = listing.list_memories(
+        "episodic", actor, start_time=BASE_TIME, end_time=BASE_TIME + timedelta(minutes=3), limit=50
+    )
+    assert {item["id"] for item in items} == set(events[:3])
+    assert "details_embedding" not in items[0]
+
+
+def test_soft_deleted_items_are_not_listed(listing, actor, events, session_maker):
+    with session_maker() as session:
+        session.get(EpisodicEvent, events[0]).is_deleted = True
+        session.commit()
+
+    items, _ = list_all(listing, actor, limit=10)
+    assert events[0] not in {item["id"] for item in items}
+    assert len(items) == 24
+
+
+def test_invalid_requests_are_rejected(listing, actor, events):
+    with pytest.raises(ValueError):
+        listing.list_memories("episodic", actor, cursor="not-a-cursor")
+    with pytest.raises(ValueError):
+        listing.list_memories("episodic", actor, fields=["details_embedding"])
+    with pytest.raises(ValueError):
+        listing.list_memories("dreams", actor)
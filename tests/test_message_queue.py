@@ -0,0 +1,67 @@
+import asyncio
+import threading
+
+from mirix.agent.message_queue import MessageQueue
+from mirix.services import db_executor
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+        self.loops = set()
+
+    async def send_message_async(self, agent_id, role, message, **kwargs):
+        self.loops.add(asyncio.get_running_loop())
+        pool = db_executor._current_pool.get()
+        await asyncio.sleep(0.01)
+        self.calls.append((agent_id, message, pool))
+        if agent_id == "agent-broken":
+            raise RuntimeError("step failed")
+        return f"{agent_id} done"
+
+
+def test_memory_agents_step_together_on_the_memory_agent_pool():
+    queue, client = MessageQueue(), FakeClient()
+    agent_ids = {"episodic_memory": "agent-1", "semantic_memory": "agent-2", "core_memory": "agent-broken"}
+
+    results = queue.send_to_memory_agents(client, agent_ids, {"message": "remember this"})
+
+    assert results == [("agent-1 done", "episodic_memory"), ("agent-2 done", "semantic_memory"), ("ERROR", "core_memory")]
+    assert len(client.loops) == 1
+    assert {pool for _, _, pool in client.calls} == {db_executor.MEMORY_AGENT_POOL}
+    assert db_executor._current_pool.get() == db_executor.DEFAULT_POOL
+    assert queue.get_queue_length() == 0
+
+
+def test_requests_of_one_type_are_answered_in_order():
+    queue, client = MessageQueue(), FakeClient()
+    threads = [
+        threading.Thread(target=queue.send_to_memory_agents, args=(client, {"episodic_memory": f"agent-{index}"}, {"message": index}))
+        for index in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+        # Let each fan-out queue its request before the next one starts
+        while queue.get_queue_length() == 0 and thread.is_alive():
+            pass
+    for thread in threads:
+        thread.join(5)
+
+    assert [message for _, message, _ in client.calls] == [0, 1, 2]
+    assert queue.get_queue_length() == 0
+
+
+def test_cancelled_request_does_not_hold_up_the_queue():
+    queue = MessageQueue()
+
+    class SlowClient(FakeClient):
+        async def send_message_async(self, agent_id, role, message, **kwargs):
+            await asyncio.sleep(5)
+
+    async def cancel_then_send():
+        task = asyncio.create_task(queue.send_message_in_queue_async(SlowClient(), "agent-1", {"message": "slow"}))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        return await asyncio.wait_for(queue.send_message_in_queue_async(FakeClient(), "agent-1", {"message": "next"}), timeout=2)
+
+    assert asyncio.run(cancel_then_send()) == ("agent-1 done", "chat")
@@ -0,0 +1,51 @@
+import pytest
+
+from mirix.schemas.providers import Provider as PydanticProvider
+from mirix.services import provider_manager
+from mirix.services.provider_manager import ProviderManager
+
+
+@pytest.fixture
+def providers(bind_manager, monkeypatch):
+    monkeypatch.setattr(provider_manager, "_override_keys", provider_manager._OverrideKeyCache())
+    manager = bind_manager(ProviderManager)
+    stored = {"anthropic": "key-1"}
+    reads = []
+
+    def list_providers(*args, **kwargs):
+        reads.append(dict(stored))
+        return [PydanticProvider(name=name, api_key=api_key, organization_id="org-1") for name, api_key in stored.items()]
+
+    manager.list_providers = list_providers
+    return manager, stored, reads
+
+
+def test_override_keys_are_cached_until_invalidated(providers):
+    manager, stored, reads = providers
+
+    assert manager.get_anthropic_override_key() == "key-1"
+    assert manager.get_anthropic_override_key() == "key-1"
+    assert manager.get_openai_override_key() is None
+    assert len(reads) == 2
+
+    stored["anthropic"] = "key-2"
+    manager.invalidate_override_key_cache()
+    assert manager.get_anthropic_override_key() == "key-2"
+
+
+def test_lookup_racing_with_an_invalidation_is_not_cached(providers):
+    manager, stored, _ = providers
+    list_providers = manager.list_providers
+
+    def list_then_update(*args, **kwargs):
+        # The key changes after this lookup read the table but before it stores the result
+        result = list_providers(*args, **kwargs)
+        stored["anthropic"] = "key-2"
+        manager.invalidate_override_key_cache()
+        return result
+
+    manager.list_providers = list_then_update
+    assert manager.get_anthropic_override_key() == "key-1"
+
+    manager.list_providers = list_providers
+    assert manager.get_anthropic_override_key() == "key-2"
@@ -0,0 +1,119 @@
+import threading
+import time
+
+import pytest
+
+from mirix.llm_api.rate_limiter import (
+    BACKGROUND,
+    INTERACTIVE,
+    LLMRateLimiter,
+    ProviderRateLimiter,
+    estimate_request_tokens,
+    get_request_priority,
+    llm_request_priority,
+)
+from mirix.schemas.llm_config import LLMConfig
+
+
+def make_llm_config(endpoint_type="openai", model="gpt-4o-mini", max_tokens=None):
+    return LLMConfig(
+        model=model,
+        model_endpoint_type=endpoint_type,
+        model_endpoint="https://api.openai.com/v1",
+        context_window=128000,
+        max_tokens=max_tokens,
+    )
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.01)
+
+
+def test_concurrency_cap_admits_interactive_before_background():
+    limiter = ProviderRateLimiter("test", max_concurrent=1)
+    limiter.acquire(0)
+    admitted = []
+
+    def request(priority):
+        limiter.acquire(0, priority=priority)
+        admitted.append(priority)
+        limiter.release(0)
+
+    background = threading.Thread(target=request, args=(BACKGROUND,))
+    background.start()
+    wait_until(lambda: limiter.get_metrics()["queued"][BACKGROUND] == 1)
+    interactive = threading.Thread(target=request, args=(INTERACTIVE,))
+    interactive.start()
+    wait_until(lambda: limiter.get_metrics()["queued"][INTERACTIVE] == 1)
+
+    limiter.release(0)
+    background.join(5)
+    interactive.join(5)
+    assert admitted == [INTERACTIVE, BACKGROUND]
+    assert limiter.get_metrics()["in_flight"] == 0
+
+
+def test_interrupted_acquire_leaves_the_queue():
+    class InterruptingCondition(type(threading.Condition())):
+        def wait(self, timeout=None):
+            raise KeyboardInterrupt
+
+    limiter = ProviderRateLimiter("test", max_concurrent=1)
+    limiter.acquire(0)
+    limiter._condition = InterruptingCondition()
+
+    with pytest.raises(KeyboardInterrupt):
+        limiter.acquire(0)
+    assert limiter._waiters == []
+
+    # The request holding the permit finishes and the next one goes through without waiting
+    limiter._condition = threading.Condition()
+    limiter.release(0)
+    assert limiter.acquire(0) < 0.1
+
+
+def test_rate_limit_error_drains_the_buckets():
+    limiter = ProviderRateLimiter("test", requests_per_minute=60, tokens_per_minute=6000)
+    assert limiter.request_bucket.wait_time(1) == 0.0
+
+    limiter.record_rate_limited()
+    assert limiter.request_bucket.wait_time(1) > 0.5
+    assert limiter.token_bucket.wait_time(100) > 0.5
+    assert limiter.get_metrics()["rate_limit_errors"] == 1
+
+
+def test_limit_corrects_the_token_bucket_with_actual_usage():
+    rate_limiter = LLMRateLimiter(limits={"openai": {"tokens_per_minute": 10000}})
+    llm_config = make_llm_config(max_tokens=1000)
+
+    with rate_limiter.limit(llm_config, estimated_tokens=2000) as usage:
+        usage["actual_tokens"] = 500
+    # 3000 tokens were reserved (estimate plus max_tokens); only 500 were used
+    assert rate_limiter.get(llm_config).token_bucket.tokens == pytest.approx(9500, abs=5)
+
+
+def test_limits_are_looked_up_per_model_with_endpoint_defaults():
+    rate_limiter = LLMRateLimiter(
+        limits={"openai": {"requests_per_minute": 500}, "openai/gpt-4o": {"requests_per_minute": 50}}
+    )
+    assert rate_limiter.get(make_llm_config(model="gpt-4o")).request_bucket.capacity == 50
+    assert rate_limiter.get(make_llm_config(model="gpt-4o-mini")).request_bucket.capacity == 500
+    assert rate_limiter.get(make_llm_config(endpoint_type="ollama", model="llama3")) is None
+
+    with rate_limiter.limit(make_llm_config(endpoint_type="ollama", model="llama3"), estimated_tokens=10):
+        pass  # providers without limits are not throttled
+
+
+def test_request_priority_and_token_estimate():
+    with llm_request_priority(BACKGROUND):
+        assert get_request_priority() == BACKGROUND
+    with pytest.raises(ValueError):
+        with llm_request_priority("urgent"):
+            pass
+
+    inline_image = "data:image/png;base64," + "A" * 50000
+    assert estimate_request_tokens({"messages": [{"content": "word " * 40}, {"image": inline_image}]}) == 50 + 1000
@@ -0,0 +1,134 @@
+"""
+Replayed Chat Scenario
+
+This script runs a short chat scenario against recorded LLM responses (see mirix/llm_api/record_replay_client.py),
+so it needs no API key or network access and produces the same result on every run.
+
+Scenario:
+1. Starts a fresh Mirix instance (mirix/configs/mirix.yaml) in a temporary home directory, with SQLite storage and
+   stand-in embeddings
+2. Sends one chat message; the chat agent answers and the conversation is handed to the meta memory agent
+3. Checks the chat agent's answer against the recorded one and that every LLM call was found in the recordings
+
+The recordings live in tests/recordings/chat_scenario. Prompt or tool changes change the recording keys, in which
+case the scenario has to be recorded again against a live provider:
+
+    MIRIX_LLM_RECORD_REPLAY_MODE=record GEMINI_API_KEY=... python tests/test_replay.py
+
+Usage:
+    python tests/test_replay.py [--async]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+# Add the project root to Python path so we can import mirix
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recordings', 'chat_scenario')
+CONFIG_PATH = os.path.join(project_root, 'mirix', 'configs', 'mirix.yaml')
+
+USER_MESSAGE = "Hi, my name is Alice and I love hiking."
+EXPECTED_RESPONSE = "Nice to meet you, Alice! Hiking sounds wonderful - do you have a favourite trail?"
+
+
+def test_recording_key_ignores_volatile_values():
+    from mirix.llm_api.record_replay_client import recording_key
+    from mirix.schemas.llm_config import LLMConfig
+
+    llm_config = LLMConfig(
+        model="gemini-2.0-flash",
+        model_endpoint_type="google_ai",
+        model_endpoint="https://generativelanguage.googleapis.com",
+        context_window=1048576,
+    )
+
+    def request(message_id, timestamp, file_uri):
+        return {
+            "contents": [
+                {"role": "user", "parts": [{"text": f"id='{message_id}' date={timestamp}"}, {"file_data": {"file_uri": file_uri}}]},
+            ]
+        }
+
+    first = request(
+        "message-0d5c1a9e-7f0e-4c8e-9a39-2f1bce7a4f10",
+        "datetime.datetime(2025, 1, 31, 17, 15, 2, 123456, tzinfo=datetime.timezone.utc)",
+        "https://generativelanguage.googleapis.com/v1beta/files/abc123xyz",
+    )
+    second = request(
+        "message-6a2e4b71-93c4-4d5e-8f02-b7c3d9e1a5f6",
+        "datetime.datetime(2025, 2, 1, 9, 0, 41, 5, tzinfo=datetime.timezone.utc)",
+        "https://generativelanguage.googleapis.com/v1beta/files/q9w8e7r6t5",
+    )
+    assert recording_key(first, llm_config) == recording_key(second, llm_config)
+
+    different = request(
+        "message-0d5c1a9e-7f0e-4c8e-9a39-2f1bce7a4f10",
+        "datetime.datetime(2025, 1, 31, 17, 15, 2, 123456, tzinfo=datetime.timezone.utc)",
+        "https://example.com/files/abc123xyz",
+    )
+    assert recording_key(first, llm_config) != recording_key(different, llm_config)
+
+
+def test_replayed_chat():
+    # The scenario needs a fresh process: its home directory is fixed when mirix is first imported
+    result = subprocess.run([sys.executable, os.path.abspath(__file__)], cwd=project_root, capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout[-4000:] + result.stderr[-4000:]
+
+
+def test_replayed_chat_async():
+    # The same scenario through the async step path the HTTP server uses
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--async"], cwd=project_root, capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout[-4000:] + result.stderr[-4000:]
+
+
+def run_replayed_chat(use_async=False):
+    # Everything below has to be set before mirix is imported
+    os.environ["HOME"] = tempfile.mkdtemp(prefix="mirix_replay_")
+    os.environ.setdefault("MIRIX_LLM_RECORD_REPLAY_MODE", "replay")
+    os.environ.setdefault("MIRIX_LLM_RECORDINGS_DIR", RECORDINGS_DIR)
+    os.environ.setdefault("MIRIX_LLM_REPLAY_LATENCY_SECONDS", "0")
+    os.environ["MIRIX_EMBEDDING_STAND_IN"] = "true"
+    # Only used to initialize the Gemini client; no request reaches the provider when replaying
+    os.environ.setdefault("GEMINI_API_KEY", "replay")
+
+    from mirix.agent import AgentWrapper
+    from mirix.errors import LLMError
+    from mirix.llm_api.record_replay_client import RecordReplayLLMClient
+
+    # Agents turn LLM errors into error responses, so record the misses to report them
+    missing_keys = []
+    load = RecordReplayLLMClient._load
+
+    def load_and_track(self, key):
+        try:
+            return load(self, key)
+        except LLMError:
+            missing_keys.append(key)
+            raise
+
+    RecordReplayLLMClient._load = load_and_track
+    try:
+        agent = AgentWrapper(CONFIG_PATH)
+        if use_async:
+            import asyncio
+
+            response = asyncio.run(agent.send_message_async(message=USER_MESSAGE))
+        else:
+            response = agent.send_message(message=USER_MESSAGE, memorizing=False)
+    finally:
+        RecordReplayLLMClient._load = load
+
+    print(f"Response: {response}")
+    assert not missing_keys, f"{len(missing_keys)} LLM calls were not recorded in {RECORDINGS_DIR}: {missing_keys}"
+    assert response == EXPECTED_RESPONSE
+
+
+if __name__ == "__main__":
+
+    run_replayed_chat(use_async="--async" in sys.argv)
+    test_recording_key_ignores_volatile_values()
+    print("Replayed chat scenario passed.")
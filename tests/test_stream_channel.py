@@ -0,0 +1,46 @@
+import asyncio
+import threading
+
+from mirix.server.stream_channel import StreamChannel
+
+
+def test_events_from_a_worker_thread_arrive_in_order():
+    async def stream():
+        channel = StreamChannel()
+
+        def worker():
+            for index in range(100):
+                channel.put({"index": index})
+            channel.put(None)
+
+        threading.Thread(target=worker).start()
+        received = []
+        while (event := await asyncio.wait_for(channel.get(), timeout=5)) is not None:
+            received.append(event["index"])
+        return received
+
+    assert asyncio.run(stream()) == list(range(100))
+
+
+def test_put_on_the_loop_and_after_close():
+    async def stream():
+        channel = StreamChannel()
+        channel.put("on loop")
+        first = await channel.get()
+
+        channel.close()
+        threading.Thread(target=channel.put, args=("dropped",)).start()
+        channel.put("dropped")
+        await asyncio.sleep(0.05)
+        return first, channel._queue.empty()
+
+    assert asyncio.run(stream()) == ("on loop", True)
+
+
+def test_put_after_the_loop_is_closed_is_dropped():
+    loop = asyncio.new_event_loop()
+    channel = StreamChannel(loop=loop)
+    loop.close()
+
+    channel.put("late event")  # from a thread that is not running the loop
+    assert channel._closed
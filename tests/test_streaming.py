@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from mirix.llm_api.streaming import SendMessageStreamParser, StreamedJSONFieldParser
+
+MESSAGE = 'Line one\n"quoted" \\ back\tslash, café and \U0001F600 done'
+
+
+def feed_in_pieces(parser, text, size):
+    return "".join(parser.feed(text[start:start + size]) for start in range(0, len(text), size))
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+def test_escapes_and_surrogate_pairs_decode_across_any_split(size):
+    arguments = json.dumps({"inner_thoughts": "say \"hi\"", "message": MESSAGE, "request_heartbeat": False}, ensure_ascii=True)
+    assert "\\ud83d\\ude00" in arguments
+
+    parser = StreamedJSONFieldParser("message")
+    assert feed_in_pieces(parser, arguments, size) == MESSAGE
+    assert parser.value == MESSAGE and parser.done
+
+
+def test_only_the_top_level_field_is_decoded():
+    arguments = json.dumps({"metadata": {"message": "nested"}, "tags": ["message"], "message": "top level"})
+
+    assert StreamedJSONFieldParser("message").feed(arguments) == "top level"
+
+
+def test_send_message_text_reaches_the_callback_token_by_token():
+    tokens = []
+    stream = SendMessageStreamParser(tokens.append)
+    arguments = json.dumps({"message": "Hello there"})
+
+    stream.on_tool_call_delta(0, name="core_memory_append", arguments='{"message": "not for the user"}')
+    stream.on_tool_call_delta(1, name="send_message")
+    for start in range(0, len(arguments), 4):
+        stream.on_tool_call_delta(1, arguments=arguments[start:start + 4])
+
+    assert len(tokens) > 1
+    assert "".join(tokens) == stream.streamed_text == "Hello there"
+
+
+def test_a_failing_callback_does_not_fail_the_stream():
+    def closed_connection(text):
+        raise ConnectionError("client went away")
+
+    stream = SendMessageStreamParser(closed_connection)
+    stream.on_tool_call_delta(0, name="send_message", arguments='{"message": "still decoded"}')
+
+    assert stream.streamed_text == "still decoded"
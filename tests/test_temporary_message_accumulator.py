@@ -0,0 +1,47 @@
+import threading
+import time
+
+from mirix.agent.temporary_message_accumulator import TemporaryMessageAccumulator
+
+
+def make_accumulator():
+    return TemporaryMessageAccumulator(
+        client=None, google_client=None, timezone="UTC", upload_manager=None, message_queue=None,
+        model_name="gpt-4o-mini", pipelined_absorption=False,
+    )
+
+
+def test_timed_flushes_run_one_at_a_time_on_one_worker():
+    accumulator = make_accumulator()
+    accumulator.temporary_messages.append((None, {"received_at": time.monotonic()}))
+    release, threads, running, overlaps = threading.Event(), set(), [], []
+
+    def flush():
+        overlaps.append(len(running))
+        running.append(1)
+        threads.add(threading.current_thread().name)
+        release.wait(5)
+        running.pop()
+
+    accumulator.flush_callback = flush
+    try:
+        accumulator._on_flush_deadline()
+        time.sleep(0.05)
+        # Deadlines that fire while a flush runs are skipped instead of starting another one
+        accumulator._on_flush_deadline()
+        accumulator._on_flush_deadline()
+        time.sleep(0.05)
+        assert overlaps == [0]
+
+        with accumulator._temporary_messages_lock:
+            accumulator.temporary_messages.clear()
+        release.set()
+        time.sleep(0.05)
+        accumulator.temporary_messages.append((None, {"received_at": time.monotonic()}))
+        accumulator._on_flush_deadline()
+        time.sleep(0.05)
+        assert overlaps == [0, 0]
+        assert len(threads) == 1
+    finally:
+        release.set()
+        accumulator.close()
@@ -0,0 +1,101 @@
+import threading
+
+from mirix.constants import INNER_THOUGHTS_KWARG
+from mirix.llm_api.tool_schema_cache import CompiledToolSchemaCache, fingerprint_tools
+
+
+def make_tools(*names):
+    return [
+        {
+            "name": name,
+            "description": f"The {name} tool.",
+            "parameters": {"type": "object", "properties": {"query": {"type": "string", "description": "What to look up."}}, "required": ["query"]},
+        }
+        for name in names
+    ]
+
+
+def counting_compiler(calls):
+    def compile_fn(functions):
+        calls.append(len(functions))
+        functions[0]["name"] = "mutated"  # converters are free to mutate their private copy
+        return [function["name"] for function in functions]
+
+    return compile_fn
+
+
+def test_compiles_once_per_format_and_tool_set():
+    cache = CompiledToolSchemaCache()
+    tools, calls = make_tools("search", "answer"), []
+    compile_fn = counting_compiler(calls)
+
+    first = cache.get_or_compile(("openai", None), tools, compile_fn)
+    assert cache.get_or_compile(("openai", None), tools, compile_fn) is first
+    # Equal content in another list object shares the compiled payload
+    assert cache.get_or_compile(("openai", None), make_tools("search", "answer"), compile_fn) is first
+    cache.get_or_compile(("openai", "Think first."), tools, compile_fn)
+    cache.get_or_compile(("openai", None), make_tools("search"), compile_fn)
+
+    assert len(calls) == 3
+    assert tools[0]["name"] == "search"
+    assert cache.stats() == {"entries": 3, "max_entries": cache.max_entries, "hits": 2, "misses": 3}
+
+
+def test_least_recently_used_payloads_are_evicted():
+    cache = CompiledToolSchemaCache(max_entries=2)
+    calls = []
+    compile_fn = counting_compiler(calls)
+    tool_sets = [make_tools(f"tool_{index}") for index in range(3)]
+
+    cache.get_or_compile(("openai",), tool_sets[0], compile_fn)
+    cache.get_or_compile(("openai",), tool_sets[1], compile_fn)
+    cache.get_or_compile(("openai",), tool_sets[0], compile_fn)
+    cache.get_or_compile(("openai",), tool_sets[2], compile_fn)
+    assert cache.stats()["entries"] == 2
+
+    cache.get_or_compile(("openai",), tool_sets[0], compile_fn)
+    cache.get_or_compile(("openai",), tool_sets[1], compile_fn)
+    assert len(calls) == 4
+
+    cache.clear()
+    assert cache.stats()["entries"] == 0
+
+
+def test_fingerprint_follows_content_not_key_order():
+    tools = make_tools("search")
+    reordered = [{key: tools[0][key] for key in reversed(list(tools[0]))}]
+
+    assert fingerprint_tools(tools) == fingerprint_tools(reordered)
+    assert fingerprint_tools(tools) != fingerprint_tools(make_tools("answer"))
+
+
+def test_concurrent_requests_get_an_equal_payload():
+    cache = CompiledToolSchemaCache()
+    tools = make_tools("search", "answer")
+    barrier = threading.Barrier(8)
+    results = []
+
+    def request():
+        barrier.wait()
+        results.append(cache.get_or_compile(("openai",), tools, lambda functions: [function["name"] for function in functions]))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert results == [["search", "answer"]] * 8
+
+
+def test_openai_payload_does_not_touch_the_agent_schemas():
+    from mirix.llm_api.openai_client import OpenAIClient
+
+    client = OpenAIClient.__new__(OpenAIClient)
+    tools = make_tools("search")
+    compiled = CompiledToolSchemaCache().get_or_compile(
+        ("openai", "Think first."), tools, lambda functions: client.compile_tools(functions, "Think first.")
+    )
+
+    assert compiled[0]["type"] == "function"
+    assert INNER_THOUGHTS_KWARG in compiled[0]["function"]["parameters"]["properties"]
+    assert INNER_THOUGHTS_KWARG not in tools[0]["parameters"]["properties"]
@@ -0,0 +1,119 @@
+import threading
+import time
+
+import pytest
+
+from mirix.agent.user_context_pool import UserAgentContext, UserContextPool
+
+
+class FakeQueue:
+    def get_queue_length(self):
+        return 0
+
+
+class FakeAccumulator:
+    def __init__(self):
+        self.pending = False
+        self.closed = False
+
+    def is_idle(self):
+        return not self.pending
+
+    def close(self):
+        self.closed = True
+
+
+class CountingFactory:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.created = []
+
+    def __call__(self, user_id):
+        time.sleep(self.delay)
+        self.created.append(user_id)
+        return UserAgentContext(user_id, client=None, message_queue=FakeQueue(), temp_message_accumulator=FakeAccumulator())
+
+
+def test_context_is_reused_per_user():
+    factory = CountingFactory()
+    pool = UserContextPool(factory, max_contexts=4)
+
+    with pool.acquire("user-a") as first:
+        assert first.active_requests == 1
+    with pool.acquire("user-a") as second:
+        pass
+
+    assert first is second
+    assert factory.created == ["user-a"]
+    assert first.active_requests == 0
+
+
+def test_concurrent_first_requests_build_one_context():
+    factory = CountingFactory(delay=0.1)
+    pool = UserContextPool(factory, max_contexts=4)
+    seen = []
+
+    def request():
+        with pool.acquire("user-a") as context:
+            seen.append(context)
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert factory.created == ["user-a"]
+    assert len(seen) == 8 and all(context is seen[0] for context in seen)
+
+
+def test_least_recently_used_idle_contexts_are_evicted():
+    pool = UserContextPool(CountingFactory(), max_contexts=2)
+    with pool.acquire("user-a") as user_a:
+        pass
+    with pool.acquire("user-b"):
+        pass
+    with pool.acquire("user-a"):
+        pass
+    with pool.acquire("user-c"):
+        pass
+
+    assert [context.user_id for context in pool.contexts()] == ["user-a", "user-c"]
+    assert not user_a.temp_message_accumulator.closed
+
+
+def test_busy_contexts_are_not_evicted():
+    pool = UserContextPool(CountingFactory(), max_contexts=1)
+    with pool.acquire("user-a") as user_a:
+        user_a.temp_message_accumulator.pending = True
+    with pool.acquire("user-b") as user_b:
+        # user-a still has content to absorb and user-b is serving this request
+        assert len(pool) == 2
+
+    # user-b went idle on release and was evicted; user-a is kept until it is idle too
+    assert [context.user_id for context in pool.contexts()] == ["user-a"]
+    assert user_b.temp_message_accumulator.closed
+
+    user_a.temp_message_accumulator.pending = False
+    with pool.acquire("user-c"):
+        pass
+    assert [context.user_id for context in pool.contexts()] == ["user-c"]
+    assert user_a.temp_message_accumulator.closed
+
+
+def test_failed_build_is_retried_by_the_next_request():
+    calls = []
+
+    def flaky_factory(user_id):
+        calls.append(user_id)
+        if len(calls) == 1:
+            raise RuntimeError("database unavailable")
+        return CountingFactory()(user_id)
+
+    pool = UserContextPool(flaky_factory, max_contexts=2)
+    with pytest.raises(RuntimeError):
+        with pool.acquire("user-a"):
+            pass
+    with pool.acquire("user-a") as context:
+        assert context.user_id == "user-a"
+    assert len(calls) == 2
@@ -0,0 +1,61 @@
+import pytest
+
+from mirix.orm.user import User as UserModel
+from mirix.services import user_manager
+from mirix.services.user_manager import UserManager, _ActiveUserPointer
+
+OTHER_USER_ID = "user-00000000-0000-4000-8000-000000000001"
+
+
+@pytest.fixture
+def users(bind_manager, session_maker, actor, monkeypatch):
+    monkeypatch.setattr(user_manager, "_active_user", _ActiveUserPointer())
+    with session_maker() as session:
+        session.add(UserModel(id=OTHER_USER_ID, name="other_user", organization_id=actor.organization_id, timezone="UTC", status="inactive"))
+        session.commit()
+    return bind_manager(UserManager)
+
+
+def test_stale_generation_is_not_cached():
+    pointer = _ActiveUserPointer()
+    _, _, generation = pointer.get()
+    pointer.invalidate()
+
+    pointer.set("user read before the write", generation)
+    assert pointer.get()[0] is False
+
+    pointer.set("fresh user", pointer.get()[2])
+    assert pointer.get()[:2] == (True, "fresh user")
+
+
+def test_active_user_is_cached_until_a_user_is_written(users, session_maker, actor):
+    assert users.get_active_user().id == actor.id
+
+    # Served from the cache: a change made behind the manager's back is not seen
+    with session_maker() as session:
+        session.get(UserModel, actor.id).name = "renamed"
+        session.commit()
+    assert users.get_active_user().name == "test_user"
+
+    users.update_user_status(OTHER_USER_ID, "inactive")
+    assert users.get_active_user().name == "renamed"
+
+    assert users.set_active_user(OTHER_USER_ID).id == OTHER_USER_ID
+    assert users.get_active_user().id == OTHER_USER_ID
+    with session_maker() as session:
+        assert session.get(UserModel, actor.id).status == "inactive"
+
+
+def test_lookup_racing_with_a_write_is_not_cached(users, session_maker, actor):
+    def session_with_concurrent_write():
+        # Another request switches the active user while this lookup is reading
+        user_manager._active_user.invalidate()
+        return session_maker()
+
+    users.session_maker = session_with_concurrent_write
+    assert users.get_active_user().id == actor.id
+    assert user_manager._active_user.get()[0] is False
+
+    users.session_maker = session_maker
+    users.get_active_user()
+    assert user_manager._active_user.get()[0] is True